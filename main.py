@@ -8,12 +8,26 @@ from src.usefonctions import showResult
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 
 from src.cli import cli
-from src.parser import parser
+from src.parser import benchmark, parser
 from src.executor import executor
+from src.server import serve
+from src.storage.wal import recover_databases
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--server":
+        # python main.py --server [hôte] [port]
+        serve(sys.argv[2] if len(sys.argv) > 2 else None, int(sys.argv[3]) if len(sys.argv) > 3 else None)
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench-parser":
+        # python main.py --bench-parser [lignes de l'INSERT] [colonnes du CREATE TABLE]
+        report = benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 1000, int(sys.argv[3]) if len(sys.argv) > 3 else 200)
+        for label, figures in report.items():
+            print(label, figures)
+        return
     print("Bienvenue dans le mini SGBD CLI (tape 'HELP' pour la liste des commandes)")
+    # rejoue les journaux (WAL) laissés par un arrêt brutal
+    recover_databases(Path.cwd() / "Data")
     for query in cli():
         parsed = parser(query)
         # print(parsed)
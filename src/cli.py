@@ -15,8 +15,8 @@ style = Style.from_dict({
 })
 
 # --- COMMANDES ---
-commands = ["CREATE", "SELECT", "INSERT", "UPDATE", "DELETE", "SHOW", "EXIT", "HELP", "DROP", "USE", "DESCRIBE"]
-key_words = ["TABLE", "DATABASE", "SET", "VALUE"]
+commands = ["CREATE", "SELECT", "INSERT", "UPDATE", "DELETE", "SHOW", "EXIT", "HELP", "DROP", "USE", "DESCRIBE", "COPY", "LOAD", "BEGIN", "START", "COMMIT", "ROLLBACK", "VACUUM"]
+key_words = ["TABLE", "DATABASE", "INDEX", "SET", "VALUE"]
 commands.extend(key_words)
 completer = WordCompleter(commands, ignore_case=True, sentence=True)
 
@@ -24,11 +24,16 @@ completer = WordCompleter(commands, ignore_case=True, sentence=True)
 SYNTAX_HINTS = {
     "CREATE D" : "CREATE DATABASE nom_du_database",
     "CREATE T": "CREATE TABLE nom_table (id INT PRIMARY KEY, nom TEXT, ...);",
+    "CREATE I": "CREATE INDEX nom_index ON nom_table (colonne, ...);",
     "SELECT": "SELECT * FROM nom_table WHERE condition;",
     "INSERT": "INSERT INTO nom_table VALUES (...);",
     "UPDATE": "UPDATE nom_table SET colonne=valeur WHERE condition;",
     "DELETE": "DELETE FROM nom_table WHERE condition;",
+    "COPY": "COPY nom_table FROM 'fichier.csv' WITH (HEADER true, CHUNK_SIZE 10000);",
+    "LOAD": "LOAD DATA INFILE 'fichier.csv' INTO TABLE nom_table;",
     "SHOW": "SHOW TABLES/DATABASES;",
+    "START": "START TRANSACTION;",
+    "VACUUM": "VACUUM nom_table;",
     "USE" : "DATABASE",
     "DESCRIBE" : "nom_table"
 }
@@ -73,7 +78,7 @@ def cli():
             if not user_input:
                 continue
 
-            cmd = user_input.upper().split()[0]
+            cmd = user_input.upper().split()[0].rstrip(";")
 
             if cmd in ["EXIT", "QUIT"]:
                 clear_current_db()
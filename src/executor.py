@@ -9,6 +9,8 @@ sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from src.models.databases import Database
 from src.models.table import Table
+from src.models import autovacuum, transaction
+from src import prepared
 
 from src.usefonctions import *
 
@@ -19,6 +21,34 @@ def executor(parsed: dict):
 
     t = parsed.get("action") or parsed.get("type")
 
+    if t == "BEGIN":
+        return transaction.begin()
+
+    if t == "COMMIT":
+        result = transaction.commit()
+        if result.get("committed"):
+            autovacuum.note_writes(result.get("tables") or [])
+        return result
+
+    if t == "ROLLBACK":
+        return transaction.rollback()
+
+    if t == "PREPARE":
+        return prepared.prepare_statement(parsed)
+
+    if t == "EXECUTE":
+        return prepared.execute_statement(parsed)
+
+    if t == "DEALLOCATE":
+        return prepared.deallocate(parsed.get("name"))
+
+    # un ordre DDL valide d'abord la transaction en cours (commit implicite)
+    if t in ("CREATE_DATABASE", "DROP_DATABASE", "CREATE_TABLE", "CREATE_INDEX", "DROP_INDEX") \
+            and transaction.current_transaction() is not None:
+        committed = transaction.commit()
+        if not committed.get("committed"):
+            return committed
+
     if t == "CREATE_DATABASE":
         db_name = parsed.get("database_name")
         if_not_exists = bool(parsed.get("if_not_exists", False))
@@ -35,7 +65,6 @@ def executor(parsed: dict):
         existing = Database.list_databases_at()
         if db_name not in existing:
             return {"success": False, "error": "database_not_found", "database": db_name}
-        clear_current_db()
         ok = set_current_db(db_name)
         if ok:
             return {"success": True, "database": db_name}
@@ -77,6 +106,15 @@ def executor(parsed: dict):
 
         return result
     
+    if t in ("CREATE_INDEX", "DROP_INDEX"):
+        dbname = get_current_db()
+        if not dbname:
+            return {"action": t, "error": "no_database_selected"}
+        db = Database(dbname)
+        if t == "CREATE_INDEX":
+            return db.create_index(parsed)
+        return db.drop_index(parsed)
+
     if t == "SHOW" and parsed.get("argument").upper() == "TABLES" :        
         # dbname = check_current_db_selected()
         dbname = get_current_db()
@@ -90,11 +128,35 @@ def executor(parsed: dict):
         table_name = parsed.get("argument")
         return Table.describe_table(table_name)
     
+    if t == "SELECT":
+        return Table.select(parsed)
+
     if t == "INSERT":
-        return Table.insert(parsed)
+        if len(parsed.get("rows") or []) > 1:
+            result = Table.insert_many(parsed)
+            result.pop("rows", None)
+            return _written(parsed, result)
+        return _written(parsed, Table.insert(parsed))
+
+    if t == "COPY":
+        return _written(parsed, Table.copy_from(parsed))
+
+    if t == "UPDATE":
+        return _written(parsed, Table.update(parsed))
+
+    if t == "DELETE":
+        return _written(parsed, Table.delete(parsed))
+
+    if t == "VACUUM":
+        return Table.vacuum(parsed)
     
     return {"error": "unsupported_action", "action": t}
 
+
+def _written(parsed: dict, result: dict) -> dict:
+    """Écriture validée hors transaction : la table devient candidate du compacteur de fond."""
+    return autovacuum.note_result(parsed.get("table") or parsed.get("table_name"), result)
+
     
 # if __name__ == "__main__":
     # test rapide
@@ -0,0 +1,66 @@
+import re
+from typing import Any, List, Tuple
+
+# Analyse lexicale des requêtes, en une seule passe sur le texte : une seule expression
+# régulière reconnaît chaque unité (texte entre quotes, nombre, mot, identifiant entre
+# backquotes, ponctuation). Elle sert au parser des ordres (src/parser.py) comme à
+# celui des expressions (src/models/expression.py), qui lisent la même suite d'unités.
+#
+# Une unité est un tuple (nature, valeur, début, fin) ; début et fin sont les positions
+# dans le texte (pour en recopier un morceau, la condition d'un WHERE par exemple) :
+#   ("lit", 'texte' | 12 | 1.5, ...)   constante : quotes retirées, '' -> ', nombre converti
+#   ("kw", "AND", ...)                 mot-clé des expressions, en majuscules (KEYWORDS)
+#   ("name", "users", ...)             autre mot, tel qu'écrit (`nom` : sans les backquotes)
+#   ("op", "<=", ...)                  ponctuation et opérateurs (!= est rendu <>)
+
+Token = Tuple[str, Any, int, int]
+
+KEYWORDS = frozenset({"AND", "OR", "NOT", "IN", "BETWEEN", "LIKE", "IS", "NULL", "TRUE", "FALSE"})
+
+
+class LexerError(ValueError):
+    """Caractère inattendu ou texte entre quotes non terminé."""
+
+
+# blancs de tête, puis une seule des unités (dans cet ordre : la ponctuation est la plus
+# fréquente) ; (\S) prend tout caractère non reconnu. Les unités se suivent sans trou : la
+# position de chacune est la somme des longueurs qui la précèdent (findall ne construit
+# pas d'objet Match par unité).
+_TOKEN = re.compile(r"""(\s*)(?:
+    (<=|>=|<>|!=|[=<>(),+\-*/%?;]|\.(?!\d))
+  | ('[^']*(?:''[^']*)*'|"[^"]*(?:""[^"]*)*")
+  | ((?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+  | ([^\W\d]\w*)
+  | (`[^`]*`)
+  | (\S))""", re.VERBOSE)
+
+
+def tokenize(text: str) -> List[Token]:
+    """Découpe le texte en unités. Lève LexerError sur un caractère non reconnu."""
+    tokens: List[Token] = []
+    append = tokens.append
+    pos = 0
+    for blank, op, quoted, num, word, backquoted, bad in _TOKEN.findall(text):
+        start = pos + len(blank)
+        if op:
+            pos = start + len(op)
+            append(("op", "<>" if op == "!=" else op, start, pos))
+        elif word:
+            pos = start + len(word)
+            up = word.upper()
+            append(("kw", up, start, pos) if up in KEYWORDS else ("name", word, start, pos))
+        elif num:
+            pos = start + len(num)
+            append(("lit", float(num) if "." in num or "e" in num or "E" in num else int(num), start, pos))
+        elif quoted:
+            pos = start + len(quoted)
+            q = quoted[0]
+            append(("lit", quoted[1:-1].replace(q + q, q) if q + q in quoted[1:-1] else quoted[1:-1], start, pos))
+        elif backquoted:
+            pos = start + len(backquoted)
+            append(("name", backquoted[1:-1], start, pos))
+        elif bad in "'\"`":
+            raise LexerError(f"unterminated {bad} quoted text at position {start}")
+        else:
+            raise LexerError(f"unexpected character {bad!r} at position {start}")
+    return tokens
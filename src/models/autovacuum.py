@@ -0,0 +1,96 @@
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.models.table import Table
+from src.models.transaction import current_transaction
+from src.usefonctions import get_current_db
+
+# Compacteur de fond : un thread du processus repasse toutes les SGBD_AUTOVACUUM_SECONDS
+# secondes sur les tables que ce processus a modifiées depuis son dernier passage, et lance
+# un VACUUM sur celles dont la part de lignes mortes atteint SGBD_AUTOVACUUM_DEAD_PCT %.
+# Le verrou de la table est demandé avec un délai court : une table occupée est reprise au
+# passage suivant. SGBD_AUTOVACUUM_SECONDS=0 désactive le compacteur (VACUUM reste là).
+
+DEFAULT_SECONDS = 60
+DEFAULT_DEAD_PCT = 20
+_LOCK_TIMEOUT = 0.5      # secondes d'attente du verrou d'une table avant de la remettre à plus tard
+
+stats: Dict[str, Any] = {"runs": 0, "vacuumed": 0, "reclaimed_bytes": 0, "last": []}
+
+_pending: Set[Tuple[str, str, str]] = set()   # (racine Data, base, table)
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def interval() -> float:
+    return float(os.environ.get("SGBD_AUTOVACUUM_SECONDS", DEFAULT_SECONDS))
+
+
+def note_writes(table_names: Iterable[str], db_name: Optional[str] = None, base_path: Optional[str] = None) -> None:
+    """Tables écrites par un ordre validé : examinées au prochain passage du compacteur."""
+    if interval() <= 0:
+        return
+    db_name = db_name or get_current_db()
+    if not db_name:
+        return
+    base = str((Path(base_path) if base_path else Path.cwd() / "Data").resolve())
+    with _lock:
+        _pending.update((base, db_name, t) for t in table_names if t)
+    _start()
+
+
+def note_result(table_name: Optional[str], result: Any, db_name: Optional[str] = None) -> Any:
+    """
+    Résultat d'une écriture (INSERT, COPY, UPDATE, DELETE), directe ou préparée : validée
+    hors transaction, sa table devient candidate du compacteur (COMMIT note les siennes).
+    """
+    if isinstance(result, dict) and not result.get("error") and current_transaction() is None:
+        note_writes([table_name], db_name)
+    return result
+
+
+def run_once() -> List[Dict[str, Any]]:
+    """
+    Un passage du compacteur : VACUUM des tables notées dont la part de lignes mortes
+    atteint le seuil. Retourne le rapport de chaque table examinée.
+    """
+    with _lock:
+        tables = sorted(_pending)
+        _pending.clear()
+    min_ratio = max(int(os.environ.get("SGBD_AUTOVACUUM_DEAD_PCT", DEFAULT_DEAD_PCT)), 1) / 100
+    reports = []
+    for base, db_name, table_name in tables:
+        if not (Path(base) / db_name).exists():
+            continue
+        result = Table.vacuum({"table_name": table_name}, db_name=db_name, base_path=base,
+                              min_ratio=min_ratio, timeout=_LOCK_TIMEOUT)
+        report = result.get("tables", [result])[0] if result.get("vacuumed") else result
+        if report.get("error") == "lock_timeout":
+            with _lock:
+                _pending.add((base, db_name, table_name))
+        reports.append({"database": db_name, "table": table_name, **report})
+    with _lock:
+        stats["runs"] += 1
+        done = [r for r in reports if not r.get("skipped") and not r.get("error")]
+        stats["vacuumed"] += len(done)
+        stats["reclaimed_bytes"] += sum(r.get("reclaimed_bytes", 0) for r in done)
+        if done:
+            stats["last"] = done
+    return reports
+
+
+def _start() -> None:
+    global _thread
+    with _lock:
+        if _thread is not None:
+            return
+
+        def run():
+            stop = threading.Event()
+            while not stop.wait(interval()):
+                run_once()
+
+        _thread = threading.Thread(target=run, name="autovacuum", daemon=True)
+        _thread.start()
@@ -0,0 +1,136 @@
+import copy
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from src.models.validator import RowValidator
+from src.storage.base import path_under
+
+# nom du fichier de catalogue d'une base
+CATALOG_FILE = "informationTable.json"
+
+
+class _CachedCatalog:
+    """Contenu décodé d'un informationTable.json et la signature du fichier lu."""
+    __slots__ = ("signature", "rules", "tables", "version", "validators")
+
+    def __init__(self, signature: Tuple[int, int, int], rules: Dict[str, Any]):
+        self.signature = signature
+        self.rules = rules
+        self.tables = {t.get("name"): t for t in rules.get("tables", []) if isinstance(t, dict)}
+        self.version = int(rules.get("catalog_version", 0))
+        self.validators: Dict[str, RowValidator] = {}
+
+
+# catalogues déjà lus dans ce processus (clé = chemin résolu du fichier)
+_catalogs: Dict[str, _CachedCatalog] = {}
+_lock = threading.RLock()
+
+
+def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+    """(inode, mtime en ns, taille) : change à chaque réécriture (os.replace crée un nouvel inode)."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _cached(rules_file: Path) -> Optional[_CachedCatalog]:
+    """
+    Catalogue en cache, relu seulement si le fichier a changé depuis (autre processus,
+    édition à la main). Retourne None si le fichier est absent ou illisible.
+    """
+    path = Path(rules_file)
+    key = str(path.resolve())
+    sig = _signature(path)
+    with _lock:
+        entry = _catalogs.get(key)
+        if sig is None:
+            _catalogs.pop(key, None)
+            return None
+        if entry is not None and entry.signature == sig:
+            return entry
+        try:
+            rules = json.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+        if not isinstance(rules, dict):
+            return None
+        entry = _CachedCatalog(sig, rules)
+        _catalogs[key] = entry
+        return entry
+
+
+def read_catalog(rules_file: Path) -> Optional[Dict[str, Any]]:
+    """
+    Copie modifiable du catalogue (pour une écriture via write_catalog).
+    Retourne None si le fichier est absent ou illisible.
+    """
+    entry = _cached(rules_file)
+    return copy.deepcopy(entry.rules) if entry is not None else None
+
+
+def get_table_entry(rules_file: Path, table_name: str) -> Optional[Dict[str, Any]]:
+    """Entrée d'une table (lecture seule : à ne pas modifier) ; None si inconnue."""
+    entry = _cached(rules_file)
+    return entry.tables.get(table_name) if entry is not None else None
+
+
+def table_entries(rules_file: Path) -> list:
+    """Entrées de toutes les tables, dans l'ordre du fichier (lecture seule)."""
+    entry = _cached(rules_file)
+    return list(entry.tables.values()) if entry is not None else []
+
+
+def get_validator(rules_file: Path, table_name: str) -> Optional[RowValidator]:
+    """
+    Validateur compilé de la table, gardé avec le catalogue en cache : il est recompilé
+    seulement quand le catalogue change (nouvelle entrée de cache). None si table inconnue.
+    """
+    entry = _cached(rules_file)
+    if entry is None:
+        return None
+    with _lock:
+        validator = entry.validators.get(table_name)
+        if validator is None:
+            table = entry.tables.get(table_name)
+            if table is None:
+                return None
+            validator = RowValidator(table.get("columns", []))
+            entry.validators[table_name] = validator
+        return validator
+
+
+def catalog_version(rules_file: Path) -> int:
+    """Version du catalogue, incrémentée à chaque écriture (0 si absent)."""
+    entry = _cached(rules_file)
+    return entry.version if entry is not None else 0
+
+
+def write_catalog(rules_file: Path, rules: Dict[str, Any]) -> None:
+    """
+    Écrit le catalogue (fichier temporaire + os.replace) en incrémentant sa version,
+    et met le cache à jour immédiatement : pas de relecture au prochain accès.
+    """
+    path = Path(rules_file)
+    rules["catalog_version"] = int(rules.get("catalog_version", 0)) + 1
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with _lock:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rules, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, path)
+        sig = _signature(path)
+        if sig is not None:
+            _catalogs[str(path.resolve())] = _CachedCatalog(sig, copy.deepcopy(rules))
+
+
+def forget_catalogs(path: str) -> None:
+    """Oublie les catalogues en cache sous le répertoire path (DROP DATABASE, renommage...)."""
+    root = str(Path(path).resolve())
+    with _lock:
+        for k in [k for k in _catalogs if path_under(k, root)]:
+            del _catalogs[k]
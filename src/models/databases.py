@@ -1,8 +1,21 @@
-import json
 import shutil
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 
+from src.models.catalog import CATALOG_FILE, forget_catalogs, read_catalog, table_entries, write_catalog
+from src.storage.blockfile import CODECS, DEFAULT_CODEC, forget_blocks
+from src.storage.btree import BTreeIndex, index_file
+from src.storage.bufferpool import get_buffer_pool
+from src.storage.hashindex import forget_indexes
+from src.storage.locks import LockTimeout, hold_catalog
+from src.storage.mvcc import forget_versions
+from src.storage.rowlog import forget_rowlogs
+from src.storage.wal import close_wal
+from src.models.validator import ColumnRule
+from src.storage.engines import DEFAULT_ENGINE, ENGINES, create_partitions, create_storage, data_file, \
+    existing_data_files, open_storage, partition_dir
+from src.storage.partitioned import PartitionError, PartitionScheme
+
 
 class Database:
     # déclaration des attributs (privés)
@@ -17,7 +30,7 @@ class Database:
         self._name = name
         self._base_path = Path(base_path) if base_path else Path.cwd() / "Data"
         self._path = (self._base_path / self._name).resolve()
-        self._rules_file = self._path / "informationTable.json"
+        self._rules_file = self._path / CATALOG_FILE
         self._tables = []
 
     @property
@@ -62,14 +75,12 @@ class Database:
 
             target_path.mkdir(parents=True, exist_ok=False)
             rules = {"relations": [], "tables": []}
-            rules_file = target_path / "informationTable.json"
-            with open(rules_file, "w", encoding="utf-8") as f:
-                json.dump(rules, f, indent=2, ensure_ascii=False)
+            write_catalog(target_path / CATALOG_FILE, rules)
 
             # mettre à jour l'objet pour pointer vers la DB créée
             self._name = created_name
             self._path = target_path.resolve()
-            self._rules_file = self._path / "informationTable.json"
+            self._rules_file = self._path / CATALOG_FILE
 
             return {"created": True, "name": created_name, "path": str(self._path)}
         except Exception as e:
@@ -77,8 +88,18 @@ class Database:
 
     def remove_db(self) -> bool:
         try:
-            if self._path.exists():
-                shutil.rmtree(self._path)
+            # verrous exclusifs : aucun autre processus n'utilise la base pendant sa suppression
+            with hold_catalog(self._path, self.show_tables()):
+                # journal abandonné sans checkpoint : la base disparaît
+                close_wal(self._path, checkpoint=False)
+                get_buffer_pool().discard(str(self._path))
+                forget_indexes(str(self._path))
+                forget_versions(str(self._path))
+                forget_blocks(str(self._path))
+                forget_rowlogs(str(self._path))
+                forget_catalogs(str(self._path))
+                if self._path.exists():
+                    shutil.rmtree(self._path)
             return True
         except Exception:
             return False
@@ -88,10 +109,20 @@ class Database:
             new_path = self._base_path / new_name
             if new_path.exists():
                 return False
-            self._path.rename(new_path)
+            with hold_catalog(self._path, self.show_tables()):
+                # pages retenues par le journal reportées dans les fichiers avant le renommage
+                close_wal(self._path)
+                get_buffer_pool().flush_all()
+                get_buffer_pool().discard(str(self._path))
+                forget_indexes(str(self._path))
+                forget_versions(str(self._path))
+                forget_blocks(str(self._path))
+                forget_rowlogs(str(self._path))
+                forget_catalogs(str(self._path))
+                self._path.rename(new_path)
             self._name = new_name
             self._path = new_path.resolve()
-            self._rules_file = self._path / "informationTable.json"
+            self._rules_file = self._path / CATALOG_FILE
             return True
         except Exception:
             return False
@@ -126,13 +157,20 @@ class Database:
     def create_table(self, table_def: Dict[str, Any]) -> Dict[str, Any]:
         """
         Ajoute la définition de la table dans informationTable.json ET initialise
-        le stockage des données en créant <table_name>.json contenant {"rows": []}.
+        le stockage des données selon le moteur demandé (table_def["engine"]) :
+        heap file paginé <table_name>.heap par défaut, journal <table_name>.log, ou blocs
+        compressés <table_name>.blk (codec table_def["compression"], zlib par défaut).
+        Avec PARTITION BY (table_def["partition_by"]), un fichier par partition sous
+        <table_name>/ (voir src/storage/partitioned.py).
         Vérifie que la table n'existe pas déjà dans informationTable.json ou comme
         fichier de données avant de créer. Retourne un dict résultat.
         """
         name = table_def.get("table_name") or table_def.get("name")
         if not name:
             return {"created": False, "error": "no_table_name"}
+        return self._locked([name], "created", self._create_table, name, table_def)
+
+    def _create_table(self, name: str, table_def: Dict[str, Any]) -> Dict[str, Any]:
 
         # assure le répertoire de la DB et le fichier de règles existent (au moins en mémoire)
         try:
@@ -140,18 +178,28 @@ class Database:
         except Exception as e:
             return {"created": False, "error": "cannot_create_db_dir", "detail": str(e)}
 
-        # charge ou initialise le fichier de règles
-        try:
-            if self._rules_file.exists():
-                with open(self._rules_file, "r", encoding="utf-8") as f:
-                    rules = json.load(f)
-            else:
-                rules = {"relations": [], "tables": []}
-        except Exception as e:
-            return {"created": False, "error": "cannot_read_rules", "detail": str(e)}
+        # charge (copie modifiable du cache) ou initialise le fichier de règles
+        if self._rules_file.exists():
+            rules = read_catalog(self._rules_file)
+            if rules is None:
+                return {"created": False, "error": "cannot_read_rules"}
+        else:
+            rules = {"relations": [], "tables": []}
 
         tables = rules.setdefault("tables", [])
 
+        # COMPRESSION sans ENGINE : table compressée par blocs
+        compression = table_def.get("compression")
+        engine = (table_def.get("engine") or ("block" if compression else DEFAULT_ENGINE)).lower()
+        if engine not in ENGINES:
+            return {"created": False, "error": "unknown_engine", "engine": engine}
+        if compression and engine != "block":
+            return {"created": False, "error": "compression_requires_block_engine", "engine": engine}
+        if engine == "block":
+            compression = (compression or DEFAULT_CODEC).lower()
+            if compression not in CODECS:
+                return {"created": False, "error": "unknown_compression", "compression": compression}
+
         # vérifie existence dans les règles
         for t in tables:
             if t.get("name") == name:
@@ -165,7 +213,7 @@ class Database:
             cname = c.get("name")
             ctype = c.get("type")
             ccons = c.get("constraints", []) or []
-            upper_cons = [tok.upper() for tok in ccons]
+            upper_cons = [str(tok).upper() for tok in ccons]
             if any("PRIMARY" in tok for tok in upper_cons):
                 primary_keys.append(cname)
             cols_meta.append({"name": cname, "type": ctype, "constraints": ccons[:]})
@@ -189,50 +237,147 @@ class Database:
             "name": name,
             "columns": cols_meta,
             "primary_keys": primary_keys,
-            "foreign_keys": fk_meta
+            "foreign_keys": fk_meta,
+            "schema_version": 1,
+            "storage": engine
         }
+        if engine == "block":
+            table_entry["compression"] = compression
+
+        # PARTITION BY : bornes converties au type de la colonne de partitionnement
+        partition_by = table_def.get("partition_by")
+        if partition_by:
+            column = next((c for c in cols_meta if c["name"] == partition_by.get("column")), None)
+            if column is None:
+                return {"created": False, "error": f"unknown column {partition_by.get('column')}"}
+            try:
+                table_entry["partitioning"] = PartitionScheme.define(partition_by, ColumnRule(column).convert)
+            except PartitionError as e:
+                return {"created": False, "error": "invalid_partitioning", "detail": str(e)}
 
-        # crée/initialise le fichier de données <table>.json (ne pas écraser s'il existe)
-        table_file = self._path / f"{name}.json"
-        if table_file.exists():
+        # crée/initialise le fichier de données (ne pas écraser s'il existe)
+        table_file = partition_dir(self._path, name) if partition_by else data_file(self._path, name, engine)
+        if existing_data_files(self._path, name):
             return {"created": False, "error": "table_data_file_exists", "table": name}
 
         try:
-            with open(table_file, "w", encoding="utf-8") as tf:
-                json.dump({"rows": []}, tf, indent=2, ensure_ascii=False)
+            if partition_by:
+                create_partitions(self._path, name, table_entry["partitioning"], engine, schema_version=1,
+                                  compression=compression)
+            else:
+                create_storage(self._path, name, engine, schema_version=1, compression=compression).close()
         except Exception as e:
             return {"created": False, "error": "cannot_create_table_file", "detail": str(e)}
 
-        # ajoute l'entrée dans informationTable.json et sauvegarde
+        # ajoute l'entrée dans informationTable.json et sauvegarde (le cache est mis à jour au passage)
         tables.append(table_entry)
         try:
-            self._rules_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self._rules_file, "w", encoding="utf-8") as f:
-                json.dump(rules, f, indent=2, ensure_ascii=False)
+            write_catalog(self._rules_file, rules)
         except Exception as e:
-            # rollback en mémoire
-            tables.pop()
             return {"created": False, "error": "cannot_write_rules", "detail": str(e)}
 
         return {"created": True, "table": name, "table_file": str(table_file), "rules_file": str(self._rules_file)}
 
-    def show_tables(self) -> List[str]:
+    def create_index(self, index_def: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        CREATE INDEX name ON table (col, ...) : construit le B+tree <table>.<name>.btree
+        à partir des lignes existantes puis enregistre l'index dans l'entrée de la table
+        ("indexes": [{"name", "columns", "type": "btree"}]). Les noms d'index sont uniques
+        dans la base (DROP INDEX peut omettre la table).
+        """
+        name = index_def.get("index_name")
+        table_name = index_def.get("table_name")
+        columns = index_def.get("columns") or []
+        if not name or not table_name or not columns:
+            return {"created": False, "error": "invalid_index_definition"}
+        return self._locked([table_name], "created", self._create_index, name, table_name, columns, index_def)
+
+    def _create_index(self, name: str, table_name: str, columns: List[str],
+                      index_def: Dict[str, Any]) -> Dict[str, Any]:
+        rules = read_catalog(self._rules_file)
+        if rules is None:
+            return {"created": False, "error": "cannot_read_rules"}
+
+        tables = rules.get("tables", [])
+        entry = next((t for t in tables if t.get("name") == table_name), None)
+        if entry is None:
+            return {"created": False, "error": "table_not_found", "table": table_name}
+        for t in tables:
+            if any(i.get("name") == name for i in t.get("indexes", [])):
+                if index_def.get("if_not_exists"):
+                    return {"created": False, "skipped": True, "index": name}
+                return {"created": False, "error": "index_exists", "index": name}
+        known = {c.get("name") for c in entry.get("columns", [])}
+        unknown = [c for c in columns if c not in known]
+        if unknown:
+            return {"created": False, "error": f"unknown column {unknown[0]}"}
+
+        path = index_file(self._path, table_name, name)
         try:
-            if not self._rules_file.exists():
-                return []
-            with open(self._rules_file, "r", encoding="utf-8") as f:
-                rules = json.load(f)
-            return [t.get("name") for t in rules.get("tables", []) if t.get("name")]
-        except Exception:
-            return []
+            with open_storage(self._path, entry) as storage:
+                with BTreeIndex.create(path, columns) as idx:
+                    latest = storage.committed()
+                    count = idx.build(latest.scan(), latest.stamp())
+        except Exception as e:
+            get_buffer_pool().discard(str(path))
+            if path.exists():
+                path.unlink()
+            return {"created": False, "error": "cannot_build_index", "detail": str(e)}
+
+        entry.setdefault("indexes", []).append({"name": name, "columns": list(columns), "type": "btree"})
+        try:
+            write_catalog(self._rules_file, rules)
+        except Exception as e:
+            return {"created": False, "error": "cannot_write_rules", "detail": str(e)}
+        return {"created": True, "index": name, "table": table_name, "columns": list(columns), "entries": count}
+
+    def drop_index(self, index_def: Dict[str, Any]) -> Dict[str, Any]:
+        """DROP INDEX name [ON table] : retire l'index du catalogue et supprime son fichier."""
+        name = index_def.get("index_name")
+        table_name = index_def.get("table_name")
+        if not table_name:
+            # table de l'index (noms uniques dans la base) : verrouillée avec le catalogue
+            owner = next((t for t in table_entries(self._rules_file)
+                          if any(i.get("name") == name for i in t.get("indexes", []))), None)
+            table_name = owner.get("name") if owner else None
+        return self._locked([table_name] if table_name else [], "dropped", self._drop_index,
+                            name, table_name, index_def)
+
+    def _drop_index(self, name: str, table_name: Optional[str], index_def: Dict[str, Any]) -> Dict[str, Any]:
+        rules = read_catalog(self._rules_file)
+        if rules is None:
+            return {"dropped": False, "error": "cannot_read_rules"}
+
+        for t in rules.get("tables", []):
+            if table_name and t.get("name") != table_name:
+                continue
+            indexes = t.get("indexes", [])
+            if any(i.get("name") == name for i in indexes):
+                t["indexes"] = [i for i in indexes if i.get("name") != name]
+                try:
+                    write_catalog(self._rules_file, rules)
+                except Exception as e:
+                    return {"dropped": False, "error": "cannot_write_rules", "detail": str(e)}
+                path = index_file(self._path, t.get("name"), name)
+                get_buffer_pool().discard(str(path))
+                if path.exists():
+                    path.unlink()
+                return {"dropped": True, "index": name, "table": t.get("name")}
+
+        if index_def.get("if_exists"):
+            return {"dropped": False, "skipped": True, "index": name}
+        return {"dropped": False, "error": "index_not_found", "index": name}
+
+    def _locked(self, tables: List[str], flag: str, action, *args) -> Dict[str, Any]:
+        """Ordre DDL sous verrou exclusif du catalogue et des tables touchées (autres processus compris)."""
+        try:
+            with hold_catalog(self._path, tables):
+                return action(*args)
+        except LockTimeout as e:
+            return {flag: False, "error": "lock_timeout", "detail": str(e)}
+
+    def show_tables(self) -> List[str]:
+        return [t.get("name") for t in table_entries(self._rules_file) if t.get("name")]
     
     def describe_tables(self) -> List[Dict[str, Any]]:
-        try:
-            if not self._rules_file.exists():
-                return []
-            import json
-            with open(self._rules_file, "r", encoding="utf-8") as f:
-                rules = json.load(f)
-            return [t for t in rules.get("tables", []) if isinstance(t, dict)]
-        except Exception:
-            return []
\ No newline at end of file
+        return [dict(t) for t in table_entries(self._rules_file)]
\ No newline at end of file
@@ -0,0 +1,639 @@
+import operator
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.lexer import LexerError, Token, tokenize
+from src.models.validator import ColumnRule
+
+# Expressions du WHERE.
+# L'analyse produit un arbre (AST) fait de dicts, comme le reste de la sortie du parser :
+#   {"op": "col", "name": "age"}                 colonne
+#   {"op": "lit", "value": 30}                   constante (NULL -> None)
+#   {"op": "and" | "or", "args": [...]}
+#   {"op": "not", "arg": ...}
+#   {"op": "=" | "<>" | "<" | "<=" | ">" | ">=", "left": ..., "right": ...}
+#   {"op": "+" | "-" | "*" | "/" | "%", "left": ..., "right": ...}   (/ : division réelle)
+#   {"op": "in", "arg": ..., "items": [...], "negated": bool}
+#   {"op": "between", "arg": ..., "low": ..., "high": ..., "negated": bool}
+#   {"op": "like", "arg": ..., "pattern": ..., "negated": bool}
+#   {"op": "is_null", "arg": ..., "negated": bool}
+#   {"op": "param", "index": 0}                 ? d'un ordre préparé (remplacé par bind_params)
+# compile_where le transforme, une fois par ordre, en une fonction ligne -> True / False /
+# None (logique à trois valeurs de SQL : None = inconnu, la ligne n'est pas retenue). Pour
+# un ordre préparé, une fois pour toutes ses exécutions : les ? sont lus dans un Params.
+
+
+class ExpressionError(ValueError):
+    """Expression WHERE invalide (syntaxe, colonne inconnue...)."""
+
+
+class ExpressionParser:
+    """
+    Descente récursive : or -> and -> not -> prédicat -> opérande, sur les unités de
+    src/lexer.py. Le parser des ordres en hérite pour lire le WHERE dans la même suite.
+    """
+
+    def __init__(self, tokens: List[Token]):
+        self.tokens = tokens
+        self.pos = 0
+        self.params = 0  # ? rencontrés, numérotés dans l'ordre du texte
+
+    def peek(self, kind: str, value: Any = None) -> bool:
+        if self.pos >= len(self.tokens):
+            return False
+        tok = self.tokens[self.pos]
+        return tok[0] == kind and (value is None or tok[1] == value)
+
+    def accept(self, kind: str, value: Any = None) -> bool:
+        if self.peek(kind, value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect(self, kind: str, value: Any = None) -> Any:
+        if not self.peek(kind, value):
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of condition"
+            raise ExpressionError(f"expected {value or kind} in WHERE, found {found!r}")
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def parse(self) -> Dict[str, Any]:
+        node = self.parse_or()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"unexpected {self.tokens[self.pos][1]!r} in WHERE")
+        return node
+
+    def parse_or(self) -> Dict[str, Any]:
+        args = [self.parse_and()]
+        while self.accept("kw", "OR"):
+            args.append(self.parse_and())
+        return args[0] if len(args) == 1 else {"op": "or", "args": args}
+
+    def parse_and(self) -> Dict[str, Any]:
+        args = [self.parse_not()]
+        while self.accept("kw", "AND"):
+            args.append(self.parse_not())
+        return args[0] if len(args) == 1 else {"op": "and", "args": args}
+
+    def parse_not(self) -> Dict[str, Any]:
+        if self.accept("kw", "NOT"):
+            return {"op": "not", "arg": self.parse_not()}
+        return self.parse_predicate()
+
+    def parse_predicate(self) -> Dict[str, Any]:
+        left = self.parse_additive()
+        if self.pos < len(self.tokens) and self.tokens[self.pos][0] == "op" \
+                and self.tokens[self.pos][1] in ("=", "<>", "<", "<=", ">", ">="):
+            op = self.tokens[self.pos][1]
+            self.pos += 1
+            return {"op": op, "left": left, "right": self.parse_additive()}
+        if self.accept("kw", "IS"):
+            negated = self.accept("kw", "NOT")
+            self.expect("kw", "NULL")
+            return {"op": "is_null", "arg": left, "negated": negated}
+        negated = self.accept("kw", "NOT")
+        if self.accept("kw", "IN"):
+            self.expect("op", "(")
+            items = [self.parse_additive()]
+            while self.accept("op", ","):
+                items.append(self.parse_additive())
+            self.expect("op", ")")
+            return {"op": "in", "arg": left, "items": items, "negated": negated}
+        if self.accept("kw", "BETWEEN"):
+            low = self.parse_additive()
+            self.expect("kw", "AND")
+            return {"op": "between", "arg": left, "low": low, "high": self.parse_additive(), "negated": negated}
+        if self.accept("kw", "LIKE"):
+            return {"op": "like", "arg": left, "pattern": self.parse_additive(), "negated": negated}
+        if negated:
+            raise ExpressionError("expected IN, BETWEEN or LIKE after NOT in WHERE")
+        return left
+
+    def parse_additive(self) -> Dict[str, Any]:
+        node = self.parse_term()
+        while self.peek("op", "+") or self.peek("op", "-"):
+            op = self.expect("op")
+            node = {"op": op, "left": node, "right": self.parse_term()}
+        return node
+
+    def parse_term(self) -> Dict[str, Any]:
+        node = self.parse_unary()
+        while self.peek("op", "*") or self.peek("op", "/") or self.peek("op", "%"):
+            op = self.expect("op")
+            node = {"op": op, "left": node, "right": self.parse_unary()}
+        return node
+
+    def parse_unary(self) -> Dict[str, Any]:
+        if self.accept("op", "-"):
+            if self.peek("lit") and isinstance(self.tokens[self.pos][1], (int, float)):
+                return {"op": "lit", "value": -self.expect("lit")}
+            return {"op": "-", "left": {"op": "lit", "value": 0}, "right": self.parse_unary()}
+        return self.parse_operand()
+
+    def parse_operand(self) -> Dict[str, Any]:
+        if self.accept("op", "("):
+            node = self.parse_or()
+            self.expect("op", ")")
+            return node
+        if self.peek("lit"):
+            return {"op": "lit", "value": self.expect("lit")}
+        if self.accept("kw", "NULL"):
+            return {"op": "lit", "value": None}
+        if self.accept("kw", "TRUE"):
+            return {"op": "lit", "value": True}
+        if self.accept("kw", "FALSE"):
+            return {"op": "lit", "value": False}
+        if self.accept("op", "?"):
+            self.params += 1
+            return {"op": "param", "index": self.params - 1}
+        if self.peek("name"):
+            return {"op": "col", "name": self.expect("name")}
+        found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of condition"
+        raise ExpressionError(f"unexpected {found!r} in WHERE")
+
+
+def parse_expression(text: str) -> Dict[str, Any]:
+    """Analyse une condition WHERE en AST. Lève ExpressionError si elle est invalide."""
+    try:
+        tokens = tokenize(text)
+    except LexerError as e:
+        raise ExpressionError(f"{e} in WHERE")
+    while tokens and tokens[-1][:2] == ("op", ";"):
+        tokens.pop()
+    if not tokens:
+        raise ExpressionError("empty WHERE condition")
+    return ExpressionParser(tokens).parse()
+
+
+def equality_ast(where: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """AST d'un WHERE sous l'ancienne forme {colonne: valeur} (conjonction d'égalités)."""
+    args = [{"op": "=", "left": {"op": "col", "name": c}, "right": {"op": "lit", "value": v}}
+            for c, v in where.items()]
+    if not args:
+        return None
+    return args[0] if len(args) == 1 else {"op": "and", "args": args}
+
+
+def bind_params(node: Optional[Dict[str, Any]], values: List[Any]) -> Optional[Dict[str, Any]]:
+    """Copie de l'AST où chaque ? devient la constante values[index] (l'AST d'origine est intact)."""
+    if node is None:
+        return None
+    op = node["op"]
+    if op == "param":
+        return {"op": "lit", "value": values[node["index"]]}
+    if op in ("col", "lit"):
+        return node
+    bound = {}
+    for key, value in node.items():
+        if isinstance(value, dict):
+            value = bind_params(value, values)
+        elif isinstance(value, list):
+            value = [bind_params(v, values) for v in value]
+        bound[key] = value
+    return bound
+
+
+def count_params(node: Optional[Dict[str, Any]]) -> int:
+    """Nombre de ? de l'expression."""
+    if node is None:
+        return 0
+    if node["op"] == "param":
+        return 1
+    total = 0
+    for value in node.values():
+        if isinstance(value, dict):
+            total += count_params(value)
+        elif isinstance(value, list):
+            total += sum(count_params(v) for v in value)
+    return total
+
+
+# --- compilation ---
+
+COMPARISONS = {"=": operator.eq, "<>": operator.ne, "<": operator.lt, "<=": operator.le,
+               ">": operator.gt, ">=": operator.ge}
+ARITHMETIC = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv, "%": operator.mod}
+_FLIP = {"=": "=", "<>": "<>", "<": ">", "<=": ">=", ">": "<", ">=": "<="}
+
+Row = Dict[str, Any]
+
+
+class Predicate:
+    """
+    WHERE compilé : test(ligne) -> True / False / None. `constant` vaut True, False ou
+    None si l'expression s'est réduite à une constante (test est alors None : aucun
+    appel par ligne). `equalities` : égalités colonne = constante de la conjonction de
+    tête (valeurs converties), utilisables pour un accès par index. `node` : l'AST
+    vérifié et plié dont test est issu ; `vector` : sa version vectorisée (voir
+    vectorized.compile_mask), posée par l'appelant si elle est disponible.
+    """
+    __slots__ = ("test", "equalities", "constant", "node", "vector")
+
+    def __init__(self, test: Optional[Callable[[Row], Any]], equalities: Dict[str, Any], constant: Any = None,
+                 node: Optional[Dict[str, Any]] = None):
+        self.test = test
+        self.equalities = equalities
+        self.constant = constant
+        self.node = node
+        self.vector = None
+
+    @property
+    def matches_all(self) -> bool:
+        return self.test is None and self.constant is True
+
+    @property
+    def matches_none(self) -> bool:
+        return self.test is None and self.constant is not True
+
+    def bound(self, params: "Params") -> "Predicate":
+        """
+        Prédicat d'une exécution d'un WHERE compilé avec des ? : même fonction de test (qui
+        lit params), égalités et AST avec les valeurs courantes (index, partitions, scan parallèle).
+        """
+        equalities = {}
+        for name, value in self.equalities.items():
+            if isinstance(value, dict):  # ? : valeur de l'exécution
+                value = params.values[value["index"]]
+                if value is None:
+                    continue
+            equalities[name] = value
+        predicate = Predicate(self.test, equalities, self.constant, bind_params(self.node, params.values))
+        predicate.vector = self.vector
+        return predicate
+
+
+class Params:
+    """
+    Valeurs des ? d'un WHERE compilé une seule fois (ordre préparé) : le prédicat les lit
+    ici ; set() les pose avant chaque exécution, converties au type de la colonne comparée.
+    """
+    __slots__ = ("values", "rules")
+
+    def __init__(self, count: int):
+        self.values: List[Any] = [None] * count
+        self.rules: Dict[int, Optional[ColumnRule]] = {}
+
+    def set(self, values: Sequence[Any]) -> None:
+        self.values[:] = [_convert(v, self.rules.get(i)) for i, v in enumerate(values)]
+
+
+def _is_lit(node: Dict[str, Any]) -> bool:
+    return node["op"] == "lit"
+
+
+def _is_value(node: Dict[str, Any]) -> bool:
+    """Constante ou ? : une valeur, pas une colonne ni un calcul."""
+    return node["op"] in ("lit", "param")
+
+
+def _convert(value: Any, rule: Optional[ColumnRule]) -> Any:
+    """Constante convertie au type de la colonne comparée (sans perte : 30.5 reste 30.5 face à un INT)."""
+    if rule is None or value is None:
+        return value
+    conv, ok, _ = rule.convert(value)
+    if not ok:
+        return value
+    if isinstance(value, (int, float)) and isinstance(conv, (int, float)) and conv != value:
+        return value
+    return conv
+
+
+def _bind(node: Dict[str, Any], rules: Dict[str, ColumnRule], params: Optional[Params] = None) -> Dict[str, Any]:
+    """
+    Vérifie les colonnes, convertit les constantes comparées à une colonne et plie les
+    constantes. Les ? (params donné) restent des valeurs lues à l'exécution, jamais pliées.
+    """
+    op = node["op"]
+    if op == "col":
+        if node["name"] not in rules:
+            raise ExpressionError(f"unknown column {node['name']}")
+        return node
+    if op == "lit":
+        return node
+    if op in ("and", "or"):
+        absorbing = op == "or"  # OR : une constante vraie décide, AND : une constante fausse
+        args = []
+        for a in node["args"]:
+            a = _bind(a, rules, params)
+            if a["op"] == op:
+                args.extend(a["args"])
+                continue
+            if _is_lit(a) and a["value"] is not None:
+                if bool(a["value"]) == absorbing:
+                    return {"op": "lit", "value": absorbing}
+                continue  # élément neutre
+            args.append(a)
+        if not args:
+            return {"op": "lit", "value": not absorbing}
+        node = args[0] if len(args) == 1 else {"op": op, "args": args}
+        if len(args) > 1 and all(_is_lit(a) for a in args):
+            return {"op": "lit", "value": _compile(node)({})}
+        return node
+    if op == "not":
+        arg = _bind(node["arg"], rules, params)
+        node = {"op": "not", "arg": arg}
+    elif op in COMPARISONS:
+        left, right = _bind(node["left"], rules, params), _bind(node["right"], rules, params)
+        if _is_value(left) and right["op"] == "col":
+            left, right, op = right, left, _FLIP[op]  # constante à droite
+        if left["op"] == "col" and _is_lit(right):
+            right = {"op": "lit", "value": _convert(right["value"], rules.get(left["name"]))}
+        elif left["op"] == "col" and right["op"] == "param":
+            params.rules[right["index"]] = rules.get(left["name"])
+        node = {"op": op, "left": left, "right": right}
+    elif op in ARITHMETIC:
+        node = {"op": op, "left": _bind(node["left"], rules, params), "right": _bind(node["right"], rules, params)}
+        if not _has_column(node):
+            return {"op": "lit", "value": _value(node)({})}
+        return node
+    elif op == "in":
+        arg = _bind(node["arg"], rules, params)
+        rule = rules.get(arg["name"]) if arg["op"] == "col" else None
+        items = []
+        for item in node["items"]:
+            item = _bind(item, rules, params)
+            if _is_lit(item):
+                item = {"op": "lit", "value": _convert(item["value"], rule)}
+            elif item["op"] == "param":
+                params.rules[item["index"]] = rule
+            items.append(item)
+        node = {"op": "in", "arg": arg, "items": items, "negated": node.get("negated", False)}
+    elif op == "between":
+        # x BETWEEN a AND b  ==  x >= a AND x <= b
+        arg = node["arg"]
+        expanded = {"op": "and", "args": [{"op": ">=", "left": arg, "right": node["low"]},
+                                          {"op": "<=", "left": arg, "right": node["high"]}]}
+        if node.get("negated"):
+            expanded = {"op": "not", "arg": expanded}
+        return _bind(expanded, rules, params)
+    elif op == "like":
+        node = {"op": "like", "arg": _bind(node["arg"], rules, params),
+                "pattern": _bind(node["pattern"], rules, params), "negated": node.get("negated", False)}
+    elif op == "is_null":
+        node = {"op": "is_null", "arg": _bind(node["arg"], rules, params), "negated": node.get("negated", False)}
+    elif op == "param":
+        if params is None:
+            raise ExpressionError("parameter ? outside of a prepared statement")
+        return {"op": "param", "index": node["index"], "params": params}
+    else:
+        raise ExpressionError(f"unsupported operator {op}")
+    if not _has_column(node):
+        return {"op": "lit", "value": _compile(node)({})}  # pliage : évaluée une seule fois
+    return node
+
+
+def _has_column(node: Dict[str, Any]) -> bool:
+    """L'expression dépend-elle de la ligne (ou d'un ?, connu à l'exécution seulement) ?"""
+    op = node["op"]
+    if op in ("col", "param"):
+        return True
+    if op == "lit":
+        return False
+    if op in ("and", "or"):
+        return any(_has_column(a) for a in node["args"])
+    if op in COMPARISONS or op in ARITHMETIC:
+        return _has_column(node["left"]) or _has_column(node["right"])
+    if op == "in":
+        return _has_column(node["arg"]) or any(_has_column(i) for i in node["items"])
+    if op == "like":
+        return _has_column(node["arg"]) or _has_column(node["pattern"])
+    return _has_column(node["arg"])
+
+
+def _like_regex(pattern: str) -> "re.Pattern":
+    parts = []
+    for ch in pattern:
+        parts.append(".*" if ch == "%" else "." if ch == "_" else re.escape(ch))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def _value(node: Dict[str, Any]) -> Callable[[Row], Any]:
+    """Valeur d'une opérande pour une ligne."""
+    if node["op"] == "col":
+        name = node["name"]
+        return lambda r: r.get(name)
+    if node["op"] == "lit":
+        v = node["value"]
+        return lambda r: v
+    if node["op"] == "param":
+        values, i = node["params"].values, node["index"]
+        return lambda r: values[i]
+    if node["op"] in ARITHMETIC:
+        fn = ARITHMETIC[node["op"]]
+        lf, rf = _value(node["left"]), _value(node["right"])
+
+        def arith(r):
+            x, y = lf(r), rf(r)
+            if x is None or y is None:
+                return None
+            try:
+                return fn(x, y)
+            except (TypeError, ZeroDivisionError):
+                return None  # types incompatibles, division par zéro : NULL
+        return arith
+    return _compile(node)
+
+
+def _compile(node: Dict[str, Any]) -> Callable[[Row], Any]:
+    """Fonction ligne -> True / False / None (inconnu) pour un nœud booléen."""
+    op = node["op"]
+    if op == "lit":
+        v = node["value"]
+        v = None if v is None else bool(v)
+        return lambda r: v
+    if op in ("col", "param") or op in ARITHMETIC:
+        value = _value(node)
+
+        def truth(r):
+            x = value(r)
+            return None if x is None else bool(x)
+        return truth
+    if op == "and":
+        fns = [_compile(a) for a in node["args"]]
+        if len(fns) == 2:
+            a, b = fns
+
+            def and2(r):
+                x = a(r)
+                if x is False:
+                    return False
+                y = b(r)
+                if y is False:
+                    return False
+                return None if x is None or y is None else True
+            return and2
+
+        def and_n(r):
+            result = True
+            for f in fns:
+                x = f(r)
+                if x is False:
+                    return False
+                if x is None:
+                    result = None
+            return result
+        return and_n
+    if op == "or":
+        fns = [_compile(a) for a in node["args"]]
+
+        def or_n(r):
+            result = False
+            for f in fns:
+                x = f(r)
+                if x is True:
+                    return True
+                if x is None:
+                    result = None
+            return result
+        return or_n
+    if op == "not":
+        inner = _compile(node["arg"])
+
+        def not_(r):
+            x = inner(r)
+            return None if x is None else not x
+        return not_
+    if op in COMPARISONS:
+        cmp = COMPARISONS[op]
+        left, right = node["left"], node["right"]
+        if left["op"] == "col" and _is_lit(right):
+            name, v = left["name"], right["value"]
+            if v is None:
+                return lambda r: None
+            if op == "=":
+                def eq_const(r):
+                    x = r.get(name)
+                    return None if x is None else x == v
+                return eq_const
+
+            def cmp_const(r):
+                x = r.get(name)
+                if x is None:
+                    return None
+                try:
+                    return cmp(x, v)
+                except TypeError:
+                    return None
+            return cmp_const
+        lf, rf = _value(left), _value(right)
+
+        def cmp_any(r):
+            x, y = lf(r), rf(r)
+            if x is None or y is None:
+                return None
+            try:
+                return cmp(x, y)
+            except TypeError:
+                return None
+        return cmp_any
+    if op == "in":
+        arg = _value(node["arg"])
+        negated = node.get("negated", False)
+        if all(_is_lit(i) for i in node["items"]):
+            values = [i["value"] for i in node["items"]]
+            has_null = any(v is None for v in values)
+            members = frozenset(v for v in values if v is not None)
+
+            def in_set(r):
+                x = arg(r)
+                if x is None:
+                    return None
+                if x in members:
+                    return not negated
+                return None if has_null else negated
+            return in_set
+        item_fns = [_value(i) for i in node["items"]]
+
+        def in_list(r):
+            x = arg(r)
+            if x is None:
+                return None
+            unknown = False
+            for f in item_fns:
+                y = f(r)
+                if y is None:
+                    unknown = True
+                elif y == x:
+                    return not negated
+            return None if unknown else negated
+        return in_list
+    if op == "like":
+        arg = _value(node["arg"])
+        negated = node.get("negated", False)
+        pattern = node["pattern"]
+        if _is_lit(pattern):
+            if pattern["value"] is None:
+                return lambda r: None
+            text = str(pattern["value"])
+            body = text[:-1]
+            if text.endswith("%") and not any(ch in body for ch in "%_"):
+                if node["arg"]["op"] == "col" and not negated:
+                    name = node["arg"]["name"]
+
+                    def like_prefix(r):  # col LIKE 'abc%' : le cas courant, sans appel intermédiaire
+                        x = r.get(name)
+                        if x is None:
+                            return None
+                        return (x if isinstance(x, str) else str(x)).startswith(body)
+                    return like_prefix
+                test = lambda s: s.startswith(body)  # 'abc%' : simple préfixe
+            else:
+                rx = _like_regex(text)
+                test = lambda s: rx.fullmatch(s) is not None
+        else:
+            pat = _value(pattern)
+            test = None
+            last: List[Any] = [None, None]  # (motif, regex) : un ? change une fois par exécution
+
+        def like(r):
+            x = arg(r)
+            if x is None:
+                return None
+            s = x if isinstance(x, str) else str(x)
+            if test is None:
+                p = pat(r)
+                if p is None:
+                    return None
+                if p != last[0]:
+                    last[:] = [p, _like_regex(str(p))]
+                found = last[1].fullmatch(s) is not None
+            else:
+                found = test(s)
+            return found != negated
+        return like
+    if op == "is_null":
+        arg = _value(node["arg"])
+        if node.get("negated", False):
+            return lambda r: arg(r) is not None
+        return lambda r: arg(r) is None
+    raise ExpressionError(f"unsupported operator {op}")
+
+
+def _equalities(node: Dict[str, Any]) -> Dict[str, Any]:
+    conjuncts = node["args"] if node["op"] == "and" else [node]
+    found: Dict[str, Any] = {}
+    for c in conjuncts:
+        if c["op"] != "=" or c["left"]["op"] != "col":
+            continue
+        if _is_lit(c["right"]) and c["right"]["value"] is not None:
+            found.setdefault(c["left"]["name"], c["right"]["value"])
+        elif c["right"]["op"] == "param":
+            found.setdefault(c["left"]["name"], c["right"])  # résolue par Predicate.bound
+    return found
+
+
+def compile_where(ast: Optional[Dict[str, Any]], rules: Dict[str, ColumnRule],
+                  params: Optional[Params] = None) -> Predicate:
+    """
+    Compile un WHERE (AST) pour les colonnes `rules` (une fois par ordre) : colonnes
+    vérifiées, constantes converties au type des colonnes et pliées. Sans WHERE, toutes
+    les lignes passent. Avec params, les ? sont lus dans params (voir Predicate.bound).
+    Lève ExpressionError (colonne inconnue...).
+    """
+    if ast is None:
+        return Predicate(None, {}, True)
+    node = _bind(ast, rules, params)
+    if _is_lit(node):
+        v = node["value"]
+        return Predicate(None, {}, None if v is None else bool(v))
+    return Predicate(_compile(node), _equalities(node), node=node)
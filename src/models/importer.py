@@ -0,0 +1,78 @@
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# formats reconnus par COPY ... FROM et extensions associées
+FORMATS = {
+    ".csv": "csv",
+    ".tsv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "jsonl",
+}
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def detect_format(path: Path, fmt: Optional[str] = None) -> Optional[str]:
+    if fmt:
+        fmt = fmt.lower()
+        return fmt if fmt in ("csv", "jsonl") else None
+    return FORMATS.get(Path(path).suffix.lower())
+
+
+def iter_csv(path: Path, delimiter: str = ",", header: bool = False,
+             encoding: str = "utf-8") -> Tuple[Optional[List[str]], Iterator[Tuple[int, List[Any]]]]:
+    """
+    Ouvre un CSV en streaming. Retourne (colonnes de l'en-tête ou None, itérateur (n° de ligne, valeurs)).
+    Un champ vide est lu comme NULL.
+    """
+    f = open(path, "r", encoding=encoding, newline="")
+    reader = csv.reader(f, delimiter=delimiter)
+    columns = None
+    if header:
+        columns = [c.strip() for c in next(reader, [])]
+
+    def records() -> Iterator[Tuple[int, List[Any]]]:
+        try:
+            for values in reader:
+                if not values:
+                    continue
+                yield reader.line_num, [v if v != "" else None for v in values]
+        finally:
+            f.close()
+
+    return columns, records()
+
+
+def iter_jsonl(path: Path, encoding: str = "utf-8") -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Streame un fichier JSON Lines : (n° de ligne, objet). Lève ValueError sur une ligne invalide."""
+    with open(path, "r", encoding=encoding) as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            if not isinstance(obj, dict):
+                raise ValueError(f"line {line_no}: JSON object expected")
+            yield line_no, obj
+
+
+def to_values(records: Iterable[Tuple[int, Any]], cols: List[str]) -> Iterator[Tuple[int, List[Any]]]:
+    """Aligne chaque enregistrement (liste ou objet JSON) sur la liste de colonnes cible."""
+    for line_no, rec in records:
+        if isinstance(rec, dict):
+            yield line_no, [rec.get(c) for c in cols]
+        else:
+            yield line_no, rec
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Regroupe un flux en listes d'au plus `size` éléments."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,42 @@
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.storage.base import RowStorage
+
+# Opérateurs d'exécution d'un SELECT : des générateurs branchés les uns sur les autres.
+# Chaque ligne est tirée du stockage seulement quand l'opérateur du dessus la demande :
+# un LIMIT arrête le scan dès qu'il a ses lignes et rien n'est chargé d'un coup.
+
+Pair = Tuple[int, Dict[str, Any]]
+
+
+def scan(storage: RowStorage) -> Iterator[Pair]:
+    """Toutes les lignes vivantes (rid, ligne), page par page."""
+    yield from storage.scan()
+
+
+def fetch(storage: RowStorage, rids: Iterable[int]) -> Iterator[Pair]:
+    """Lignes désignées par un index, lues une à une (les rids morts sont ignorés)."""
+    for rid in rids:
+        row = storage.read(rid)
+        if row is not None:
+            yield rid, row
+
+
+def filter_rows(source: Iterable[Pair], predicate: Callable[[Dict[str, Any]], bool]) -> Iterator[Pair]:
+    for rid, row in source:
+        if predicate(row):
+            yield rid, row
+
+
+def project(source: Iterable[Pair], columns: List[str]) -> Iterator[Dict[str, Any]]:
+    """Colonnes demandées, dans l'ordre du SELECT (NULL si la ligne n'a pas la colonne)."""
+    for _, row in source:
+        yield {c: row.get(c) for c in columns}
+
+
+def limit(source: Iterable[Any], count: Optional[int], offset: int = 0) -> Iterator[Any]:
+    """LIMIT count OFFSET offset : la source n'est plus tirée une fois la dernière ligne rendue."""
+    if count is None:
+        return islice(source, offset, None)
+    return islice(source, offset, offset + count)
@@ -0,0 +1,162 @@
+import atexit
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from operator import itemgetter
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from src.models import vectorized
+from src.models.expression import Predicate, compile_where
+from src.models.validator import RowValidator
+from src.storage.base import RowStorage
+from src.storage.bufferpool import BufferPool
+from src.storage.heapfile import HeapFile
+from src.storage.mvcc import VersionedStorage
+from src.storage.partitioned import PartitionedStorage
+from src.storage.wal import LoggedStorage
+
+# Scan parallèle d'une grosse table heap : le fichier (chaque partition lue, pour une
+# table partitionnée) est découpé en plages de pages, chaque plage est lue et filtrée
+# (WHERE recompilé dans le worker, vectorisé si numpy est là) par un processus d'un pool
+# partagé, et les lignes retenues reviennent au processus de l'ordre qui les fusionne
+# dans l'ordre du scan série. Les lignes qui ont
+# des versions (MVCC) ne sont lues que par le parent : lui seul connaît l'instantané.
+# Les écritures (UPDATE, DELETE) restent faites par le parent, seul écrivain du WAL.
+#
+# Les workers lisent le fichier sur disque : les pages encore en mémoire y sont d'abord
+# écrites (checkpoint du WAL). Le verrou de table de l'ordre empêche toute écriture
+# pendant la lecture. Hors transaction seulement (le write set d'une transaction n'est
+# qu'en mémoire), et sans accès par index.
+
+DEFAULT_MIN_PAGES = 256     # en dessous (SGBD_PARALLEL_MIN_PAGES), le scan série est plus rapide
+_TASKS_PER_WORKER = 4       # plages par worker : une plage lente ne retient pas tout le scan
+_MAX_VERSIONED = 50_000     # au-delà, les rids à exclure coûtent plus à envoyer que le scan
+_WORKER_POOL_PAGES = 64     # buffer pool d'un worker : les pages sont lues une fois, dans l'ordre
+
+Row = Dict[str, Any]
+Pair = Tuple[int, Row]
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_atexit_registered = False
+
+
+def workers() -> int:
+    """Processus du pool (SGBD_PARALLEL_WORKERS, par défaut un par cœur) ; 0 ou 1 : scan série."""
+    return int(os.environ.get("SGBD_PARALLEL_WORKERS", os.cpu_count() or 1))
+
+
+def _get_executor(count: int) -> ProcessPoolExecutor:
+    global _executor, _atexit_registered
+    with _executor_lock:
+        if _executor is None:
+            # spawn : le processus a des threads (WAL, serveur) qu'un fork copierait à mi-état
+            _executor = ProcessPoolExecutor(max_workers=count, mp_context=multiprocessing.get_context("spawn"))
+            if not _atexit_registered:
+                atexit.register(shutdown)
+                _atexit_registered = True
+        return _executor
+
+
+def shutdown() -> None:
+    """Arrête le pool de workers (recréé au prochain scan parallèle)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _scan_range(path: str, offset: int, first: int, stop: int, node: Optional[Dict[str, Any]],
+                cols_meta: List[Dict[str, Any]], versioned: FrozenSet[int]) -> List[Pair]:
+    """
+    Worker : lignes (rid, ligne) des pages first à stop exclue qui satisfont le WHERE ;
+    offset est le premier rid du fichier (partition) dans la table.
+    """
+    rules = RowValidator(cols_meta).rules
+    predicate = compile_where(node, rules)
+    heap = HeapFile(Path(path), pool=BufferPool(_WORKER_POOL_PAGES))
+    try:
+        pairs = [(offset | rid, row) for batch in heap.scan_batches(first, stop) for rid, row in batch
+                 if offset | rid not in versioned]
+    finally:
+        heap.close()
+    if predicate.test is None:
+        return pairs if predicate.matches_all else []
+    mask = vectorized.compile_mask(predicate.node, rules)
+    if mask is not None:
+        return list(vectorized.filter_batches(pairs, mask, predicate.test))
+    return [pair for pair in pairs if predicate.test(pair[1])]
+
+
+def scan(storage: RowStorage, predicate: Predicate, cols_meta: List[Dict[str, Any]]) -> Optional[List[Pair]]:
+    """
+    Lignes (rid, ligne) qui satisfont le WHERE, dans l'ordre du scan série, lues par le
+    pool de workers. Retourne None si le scan parallèle ne s'applique pas (stockage qui
+    n'est pas un heap file, table trop petite, pool désactivé ou indisponible) : à
+    l'appelant de faire le scan série.
+    """
+    count = workers()
+    if count < 2 or not isinstance(storage, VersionedStorage):
+        return None
+    inner = storage.inner
+    parts: List[Tuple[int, RowStorage, HeapFile]] = []
+    for offset, part in inner.active_parts() if isinstance(inner, PartitionedStorage) else [(0, inner)]:
+        heap = part.inner if isinstance(part, LoggedStorage) else part
+        if not isinstance(heap, HeapFile):
+            return None
+        parts.append((offset, part, heap))
+    sizes = [heap.page_count for _, _, heap in parts]
+    pages = sum(size - 1 for size in sizes)
+    if pages < int(os.environ.get("SGBD_PARALLEL_MIN_PAGES", DEFAULT_MIN_PAGES)):
+        return None
+    store = storage.store
+    with store.lock:
+        versioned = list(store.chains)
+    if len(versioned) > _MAX_VERSIONED:
+        return None
+    # le scan parallèle aura lieu : seulement maintenant, les pages en mémoire sont
+    # écrites (checkpoint synchrone du WAL), jamais pour une table lue en série
+    for _, part, heap in parts:
+        if heap.has_dirty_pages():
+            if isinstance(part, LoggedStorage):
+                part.checkpoint()
+            else:
+                heap.flush()
+            if heap.has_dirty_pages():
+                return None
+    files = [(offset, heap) for offset, _, heap in parts]
+
+    step = -(-pages // (count * _TASKS_PER_WORKER))
+    excluded = frozenset(versioned)
+    try:
+        executor = _get_executor(count)
+        futures = [executor.submit(_scan_range, str(heap.path), offset, first, min(first + step, size),
+                                   predicate.node, cols_meta, excluded)
+                   for (offset, heap), size in zip(files, sizes) for first in range(1, size, step)]
+        ranges = [future.result() for future in futures]
+    except (BrokenProcessPool, OSError):
+        shutdown()
+        return None
+
+    # lignes versionnées, vues par l'instantané : encore dans le stockage (rangées à leur
+    # rid, comme le scan série), ou supprimées depuis l'instantané (rendues à la fin)
+    present: List[Pair] = []
+    extra: List[Pair] = []
+    test = predicate.test
+    with store.lock:
+        for rid in versioned:
+            current = inner.read(rid)
+            row = store.resolve(rid, current, storage.snapshot)
+            if row is None or test is not None and not test(row):
+                continue
+            (present if current is not None else extra).append((rid, row))
+    present.sort(key=itemgetter(0))
+    rows = [pair for part in ranges for pair in part]
+    if present:
+        rows = list(heapq.merge(rows, present, key=itemgetter(0)))
+    return rows + extra
@@ -1,9 +1,24 @@
-import json
-import re
+import itertools
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import Callable, Iterable, Iterator, List, Dict, Optional, Any, Tuple, Union
 
 from src.usefonctions import get_current_db
+from src.models.catalog import CATALOG_FILE, get_table_entry, get_validator, table_entries
+from src.models.expression import ExpressionError, Params, Predicate, compile_where, equality_ast
+from src.models import operators, parallel, vectorized
+from src.models.importer import DEFAULT_CHUNK_SIZE, chunked, detect_format, iter_csv, iter_jsonl, to_values
+from src.models.transaction import TxStorage, current_transaction
+from src.models.validator import ColumnRule, RowValidator, compile_type
+from src.storage.base import RowStorage
+from src.storage.btree import BTreeIndex, index_file
+from src.storage.engines import open_storage
+from src.storage.hashindex import HashIndex, get_hash_index, index_key
+from src.storage.locks import EXCLUSIVE, SHARED, LockTimeout, hold_table
+from src.storage.sequence import SequenceFile
+
+
+def _as_is(value: Any) -> Any:
+    return value
 
 
 class Table:
@@ -52,19 +67,245 @@ class Table:
         if not db_name:
             return {"error":"no database selected"}
 
-        file = base / db_name / "informationTable.json"
-        if not file.exists():
-            return None
+        # catalogue en cache : relu seulement si le fichier a changé
+        entry = get_table_entry(base / db_name / CATALOG_FILE, table_name)
+        return entry.copy() if entry is not None else None
+
+    @staticmethod
+    def _lock(base: Path, db_name: str, table_name: str, write: bool = True):
+        """
+        Verrous d'un ordre sur la table (avec `with`) : catalogue partagé, table exclusive.
+        Dans une transaction, table partagée : les écritures n'ont lieu qu'au COMMIT.
+        Lecture seule (write=False) : table partagée.
+        """
+        mode = EXCLUSIVE if write and current_transaction() is None else SHARED
+        return hold_table(base / db_name, table_name, mode)
+
+    @staticmethod
+    def _open_storage(base: Path, db_name: str, table_name: str, schema: Dict[str, Any]) -> RowStorage:
+        """
+        Ouvre le stockage (heap file, journal...) de la table décrite par `schema`.
+        Dans une transaction : write set de la table (écrit seulement au COMMIT).
+        """
+        entry = dict(schema)
+        entry.setdefault("name", table_name)
+        tx = current_transaction()
+        if tx is not None:
+            return tx.storage(base / db_name, table_name, lambda: open_storage(base / db_name, entry, tx.snapshot))
+        return open_storage(base / db_name, entry)
 
+    @staticmethod
+    def _validator(base: Path, db_name: str, table_name: str, schema: Dict[str, Any]) -> RowValidator:
+        """Validateur compilé de la table (gardé avec le catalogue en cache)."""
+        validator = get_validator(base / db_name / CATALOG_FILE, table_name)
+        return validator if validator is not None else RowValidator(schema.get("columns", []))
+
+    @staticmethod
+    def _where(where: Optional[Dict[str, Any]], validator: RowValidator, params: Optional[Params] = None):
+        """
+        Compile le WHERE (AST du parser, ou ancienne forme {colonne: valeur brute}) une fois
+        pour l'ordre : prédicat appelé une fois par ligne, constantes converties au type des
+        colonnes. Avec params (ordre préparé), les ? y sont lus à chaque exécution.
+        Retourne (Predicate, erreur)
+        """
+        if where and "op" not in where:
+            where = equality_ast({c: Table._to_python(v) for c, v in where.items()})
         try:
-            data = json.loads(file.read_text(encoding="utf-8"))
-        except Exception:
+            predicate = compile_where(where or None, validator.rules, params)
+        except ExpressionError as e:
+            return None, str(e)
+        if predicate.test is not None:
+            predicate.vector = vectorized.compile_mask(predicate.node, validator.rules)
+        return predicate, None
+
+    @staticmethod
+    def _compiled_where(parsed: Dict[str, Any], validator: RowValidator):
+        """WHERE de l'ordre : déjà compilé (parsed["predicate"], ordre préparé) ou compilé ici."""
+        if parsed.get("predicate") is not None:
+            return parsed["predicate"], None
+        return Table._where(parsed.get("where"), validator)
+
+    @staticmethod
+    def _pk_index(base: Path, db_name: str, table_name: str, cols_meta: List[Dict[str, Any]], storage: RowStorage) -> Optional[HashIndex]:
+        """
+        Index de hachage persistant de la clé primaire (<table>.pk.hidx), chargé au premier
+        accès ; reconstruit par un scan s'il est absent ou ne couvre plus l'état du stockage.
+        Retourne None si la table n'a pas de clé primaire.
+        """
+        pk_cols = [c["name"] for c in cols_meta if any("PRIMARY" in str(x).upper() for x in (c.get("constraints") or []))]
+        if not pk_cols:
             return None
+        return Table._load_index(base / db_name / f"{table_name}.pk.hidx", pk_cols, storage)
+
+    @staticmethod
+    def _unique_indexes(base: Path, db_name: str, table_name: str, cols_meta: List[Dict[str, Any]], storage: RowStorage) -> Dict[str, HashIndex]:
+        """
+        Un index de hachage persistant par colonne UNIQUE (<table>.<colonne>.uniq.hidx),
+        même principe que l'index de clé primaire. Les NULL ne sont pas indexés.
+        """
+        indexes: Dict[str, HashIndex] = {}
+        for c in cols_meta:
+            if any("UNIQUE" in str(t).upper() for t in (c.get("constraints") or [])):
+                path = base / db_name / f"{table_name}.{c['name']}.uniq.hidx"
+                indexes[c["name"]] = Table._load_index(path, [c["name"]], storage)
+        return indexes
+
+    @staticmethod
+    def _sequence(base: Path, db_name: str, table_name: str, cols_meta: List[Dict[str, Any]], storage: RowStorage) -> Optional[SequenceFile]:
+        """
+        Compteurs AUTO_INCREMENT persistants de la table (<table>.seq). Une colonne
+        encore absente du fichier est initialisée une fois avec le max des lignes existantes.
+        Dans une transaction, les valeurs sont réservées par blocs (TxSequence).
+        Retourne None si la table n'a pas de colonne AUTO_INCREMENT.
+        """
+        if isinstance(storage, TxStorage) and storage.sequence is not None:
+            return storage.sequence
+        auto_cols = [c["name"] for c in cols_meta if any("AUTO_INCREMENT" in str(t).upper() for t in (c.get("constraints") or []))]
+        if not auto_cols:
+            return None
+        seq = SequenceFile(base / db_name / f"{table_name}.seq")
+        missing = [c for c in auto_cols if c not in seq.current()]
+        if missing:
+            maxima = {c: 0 for c in missing}
+            for r in storage.rows():
+                for c in missing:
+                    try:
+                        maxima[c] = max(maxima[c], int(r.get(c) or 0))
+                    except Exception:
+                        continue
+            for c in missing:
+                seq.seed(c, lambda c=c: maxima[c])
+        return storage.sequence_view(seq) if isinstance(storage, TxStorage) else seq
 
-        return next(
-            (t.copy() for t in data.get("tables", []) if t.get("name") == table_name),
-            None
-        )
+    @staticmethod
+    def _load_index(path: Path, columns: List[str], storage: RowStorage) -> HashIndex:
+        """
+        Index en cache du processus, reconstruit par un scan (état validé) s'il est absent
+        ou périmé. Dans une transaction, vue qui garde à part les changements non validés.
+        """
+        idx = get_hash_index(path, columns)
+        committed = storage.committed()
+        stamp = committed.stamp()
+        if not idx.exists() or idx.stamp != stamp:
+            idx.rebuild(((idx.key_of(r), rid) for rid, r in committed.scan()), stamp)
+        return storage.hash_view(idx) if isinstance(storage, TxStorage) else idx
+
+    @staticmethod
+    def _btree_indexes(base: Path, db_name: str, table_name: str, schema: Dict[str, Any], storage: RowStorage) -> List[BTreeIndex]:
+        """
+        Ouvre les index B+tree déclarés par CREATE INDEX (clé "indexes" de l'entrée de table) ;
+        un index absent ou périmé (stamp) est reconstruit. À fermer avec _close_indexes.
+        """
+        committed = storage.committed()
+
+        def open_index(path: Path, columns: List[str]) -> BTreeIndex:
+            idx = BTreeIndex(path, columns) if path.exists() else None
+            stamp = committed.stamp()
+            if idx is None or idx.stamp != stamp:
+                if idx is not None:
+                    idx.close()
+                idx = BTreeIndex.create(path, columns)
+                idx.build(committed.scan(), stamp)
+            return idx
+
+        opened: List[BTreeIndex] = []
+        for entry in schema.get("indexes") or []:
+            path = index_file(base / db_name, table_name, entry["name"])
+            if isinstance(storage, TxStorage):
+                # ouvert une fois pour toute la transaction, modifié seulement au COMMIT
+                opened.append(storage.btree_view(path, lambda p=path, c=entry["columns"]: open_index(p, c)))
+            else:
+                opened.append(open_index(path, entry["columns"]))
+        return opened
+
+    @staticmethod
+    def _close_indexes(btrees: List[BTreeIndex]) -> None:
+        for idx in btrees:
+            idx.close()
+
+    @staticmethod
+    def _sync_indexes(storage: RowStorage, *indexes: Any) -> None:
+        """Après une écriture : tous les index de la table enregistrent le nouvel état du stockage."""
+        stamp = storage.stamp()
+        for idx in indexes:
+            if idx is not None:
+                idx.sync(stamp)
+
+    @staticmethod
+    def _index_rids(storage: RowStorage, equalities: Dict[str, Any], pk_index: Optional[HashIndex] = None,
+                    btrees: Optional[List[BTreeIndex]] = None) -> Optional[Iterable[int]]:
+        """
+        Rids candidats d'après les égalités colonne = constante du WHERE. Si elles fixent
+        toute la clé primaire, accès direct par l'index de hachage ; sinon, le B+tree dont
+        le plus long préfixe de colonnes est fixé. None : aucun index utile, scan de la table.
+        """
+        rids = None
+        if pk_index is not None and equalities and all(c in equalities for c in pk_index.columns):
+            rids = pk_index.lookup(index_key([equalities[c] for c in pk_index.columns]))
+        elif equalities and btrees:
+            best, best_len = None, 0
+            for idx in btrees:
+                n = 0
+                for c in idx.columns:
+                    if c not in equalities:
+                        break
+                    n += 1
+                if n > best_len:
+                    best, best_len = idx, n
+            if best is not None:
+                prefix = [equalities[c] for c in best.columns[:best_len]]
+                rids = best.scan_range(prefix, prefix)
+        if rids is None:
+            return None
+        # lignes modifiées depuis l'instantané : l'index (état courant) ne les désigne plus forcément
+        changed = storage.snapshot_changes()
+        if changed:
+            rids = dict.fromkeys(itertools.chain(rids, changed))
+        return rids
+
+    @staticmethod
+    def _filtered(storage: RowStorage, predicate: Predicate, pk_index: Optional[HashIndex] = None,
+                  btrees: Optional[List[BTreeIndex]] = None,
+                  cols_meta: Optional[List[Dict[str, Any]]] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Lignes (rid, ligne) qui satisfont le WHERE compilé, en flux, par le meilleur chemin
+        d'accès. Un scan complet ne lit que les partitions utiles d'une table partitionnée et
+        est filtré par lots (numpy) quand le WHERE est vectorisable ; avec les colonnes du
+        schéma (cols_meta), celui d'une grosse table est réparti entre des processus (voir
+        parallel.py).
+        """
+        if predicate.matches_none:
+            return iter(())  # WHERE toujours faux (ou inconnu) : rien à lire
+        rids = Table._index_rids(storage, predicate.equalities, pk_index, btrees)
+        if rids is None:
+            storage = storage.pruned(predicate.node)
+        if rids is None and cols_meta is not None:
+            pairs = parallel.scan(storage, predicate, cols_meta)
+            if pairs is not None:
+                return iter(pairs)
+        if rids is not None:
+            source = operators.fetch(storage, rids)
+        elif predicate.vector is not None:
+            return vectorized.filter_batches(operators.scan(storage), predicate.vector, predicate.test)
+        else:
+            source = operators.scan(storage)
+        if predicate.test is None:
+            return source
+        return operators.filter_rows(source, predicate.test)
+
+    @staticmethod
+    def _matching(storage: RowStorage, predicate: Predicate, pk_index: Optional[HashIndex] = None,
+                  btrees: Optional[List[BTreeIndex]] = None,
+                  cols_meta: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        return list(Table._filtered(storage, predicate, pk_index, btrees, cols_meta))
+
+    @staticmethod
+    def _converter(parsed: Dict[str, Any]) -> Callable[[Any], Any]:
+        """
+        Lecture des valeurs de l'ordre : texte SQL brut ('abc', 12, NULL), ou valeurs déjà
+        python si l'ordre vient d'un ordre préparé ("typed": True, voir src/prepared.py).
+        """
+        return _as_is if parsed.get("typed") else Table._to_python
 
     # helper: convert raw token to python value
     @staticmethod
@@ -75,8 +316,9 @@ class Table:
             v = raw.strip()
             if v.upper() == "NULL":
                 return None
-            if (v.startswith("'") and v.endswith("'")) or (v.startswith('"') and v.endswith('"')):
-                return v[1:-1]
+            if len(v) >= 2 and v[0] == v[-1] and v[0] in ("'", '"'):
+                # quote doublée = quote littérale ('it''s')
+                return v[1:-1].replace(v[0] * 2, v[0])
             try:
                 return int(v)
             except Exception:
@@ -93,69 +335,52 @@ class Table:
     def check_data_type(value: Any, type_str: str) :
         """
         Vérifie / convertit `value` selon type_str supporté: INT, FLOAT, VARCHAR(n), TEXT, TIMESTAMP
+        (convertisseur compilé une fois par type, voir validator.compile_type).
         Retourne (converted_value, ok, error_msg)
         """
+        return compile_type(type_str)(value)
+
+    @staticmethod
+    def check_unique(value: Any, existing_rows: List[Dict[str, Any]], column_name: str,
+                     unique_index: Optional[HashIndex] = None, pending: Optional[set] = None,
+                     ignore_rids: Optional[set] = None) -> bool:
+        """
+        True si `value` est déjà prise dans la colonne UNIQUE.
+        Avec unique_index : accès direct à l'index (temps constant) ; `pending` contient les
+        clés déjà réservées par le même ordre (lot), `ignore_rids` les lignes en cours de
+        modification. Sans index : parcours de existing_rows.
+        """
         if value is None:
-            return None, True, None
-        typ = (type_str or "").strip().upper()
-        try:
-            if typ.startswith("INT"):
-                if isinstance(value, bool):
-                    return None, False, "invalid INT"
-                return int(value), True, None
-            if typ.startswith("FLOAT") or typ.startswith("REAL") or typ.startswith("DOUBLE"):
-                return float(value), True, None
-            if typ.startswith("VARCHAR"):
-                m = re.search(r"VARCHAR\s*\(\s*(\d+)\s*\)", typ)
-                s = str(value)
-                if m and len(s) > int(m.group(1)):
-                    return None, False, "VARCHAR length exceeded"
-                return s, True, None
-            if typ == "TEXT":
-                return str(value), True, None
-            if typ == "TIMESTAMP":
-                # accept string / numeric — keep as string for now
-                return str(value), True, None
-            # fallback: accept as string
-            return str(value), True, None
-        except Exception:
-            return None, False, "type conversion failed"
+            return False
+        if unique_index is None:
+            return any(r.get(column_name) == value for r in existing_rows)
+        key = index_key([value])
+        if pending is not None and key in pending:
+            return True
+        return any(rid not in (ignore_rids or ()) for rid in unique_index.lookup(key))
 
     @staticmethod
-    def check_constraints(col_meta: Dict[str, Any], value: Any, existing_rows: List[Dict[str, Any]], column_name: str) :
+    def check_constraints(col_meta: Union[Dict[str, Any], ColumnRule], value: Any, existing_rows: List[Dict[str, Any]], column_name: str,
+                          unique_index: Optional[HashIndex] = None, pending: Optional[set] = None,
+                          ignore_rids: Optional[set] = None) :
         """
         Vérifie contraintes pour une colonne et éventuellement transforme la valeur (DEFAULT).
         Contraintes supportées: PRIMARY_KEY, NOT_NULL, AUTO_INCREMENT, UNIQUE, DEFAULT
+        UNIQUE est vérifié par unique_index s'il est fourni (voir check_unique), sinon sur existing_rows.
         Renvoie (value_maybe_changed, ok, error)
+        `col_meta` peut être une ColumnRule déjà compilée (sinon elle est compilée ici).
         """
-        cons = [str(c).upper() for c in (col_meta.get("constraints") or [])]
-        cons_str = " ".join(cons)
-        # DEFAULT handling
-        default_val = None
-        for c in col_meta.get("constraints") or []:
-            if isinstance(c, dict) and "DEFAULT" in (k.upper() for k in c.keys()):
-                default_val = list(c.values())[0]
+        rule = col_meta if isinstance(col_meta, ColumnRule) else ColumnRule(dict(col_meta, name=column_name))
+        value, err = rule.fill_null(value)
+        if err:
+            return None, False, err
         if value is None:
-            if default_val is not None:
-                val_conv, ok, err = Table.check_data_type(default_val, col_meta.get("type", ""))
-                if not ok:
-                    return None, False, f"DEFAULT type error for {column_name}"
-                value = val_conv
-            elif any("AUTO_INCREMENT" in x for x in cons):
-                # leave None -> caller will assign next auto value
-                return None, True, None
-            elif "NOT" in cons_str and "NULL" in cons_str:
-                return None, False, f"NOT NULL violation on {column_name}"
-            elif any("PRIMARY" in x for x in cons):
-                return None, False, f"PRIMARY KEY cannot be NULL ({column_name})"
-            else:
-                return None, True, None
+            return None, True, None
 
         # UNIQUE check
-        if any("UNIQUE" in x for x in cons):
-            for r in existing_rows:
-                if r.get(column_name) == value:
-                    return None, False, f"UNIQUE violation on {column_name}"
+        if rule.unique:
+            if Table.check_unique(value, existing_rows, column_name, unique_index, pending, ignore_rids):
+                return None, False, f"UNIQUE violation on {column_name}"
 
         return value, True, None
 
@@ -166,6 +391,26 @@ class Table:
           {"action":"INSERT", "table":"T" or "table_name":"T", "columns":["c1","c2"] (opt), "values":[v1, v2]}
         Retour: {"inserted":True, "row": {...}} ou {"inserted":False, "error": "..."}
         """
+        values = parsed.get("values")
+        if values is None:
+            return {"inserted": False, "error": "no_values_provided"}
+        result = Table.insert_many(dict(parsed, rows=[values]), db_name=db_name, base_path=base_path)
+        if result.get("inserted"):
+            return {"inserted": True, "row": result["rows"][0]}
+        result.pop("row_index", None)
+        return result
+
+    @staticmethod
+    def insert_many(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Insertion d'un lot de lignes (INSERT ... VALUES (...), (...)) :
+        schéma et index chargés une fois, toutes les lignes validées
+        (PK/UNIQUE contrôlés par les index persistants, doublons du lot compris)
+        avant la moindre écriture, puis une seule écriture du lot.
+        parsed attendu minimalement:
+          {"action":"INSERT", "table_name":"T", "columns":["c1","c2"] (opt), "rows":[[v1, v2], ...]}
+        Retour: {"inserted":True, "count": n, "rows": [...]} ou {"inserted":False, "error": "...", "row_index": i}
+        """
         base = Path(base_path) if base_path else Path.cwd() / "Data"
         table_name = parsed.get("table") or parsed.get("table_name")
         if not table_name:
@@ -175,207 +420,425 @@ class Table:
         if not db_name:
             return {"inserted": False, "error": "no_database_selected"}
 
-        schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
-        if not schema or isinstance(schema, dict) and schema.get("error"):
-            return {"inserted": False, "error": "table_not_found"}
-
-        cols_meta = schema.get("columns", [])
-        cols_order = [c["name"] for c in cols_meta]
-
-        values = parsed.get("values")
-        if values is None:
-            return {"inserted": False, "error": "no_values_provided"}
+        try:
+            with Table._lock(base, db_name, table_name):
+                schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
+                if not schema or isinstance(schema, dict) and schema.get("error"):
+                    return {"inserted": False, "error": "table_not_found"}
+
+                rows_values = parsed.get("rows")
+                if rows_values is None:
+                    rows_values = [parsed["values"]] if parsed.get("values") is not None else None
+                if not rows_values:
+                    return {"inserted": False, "error": "no_values_provided"}
+
+                cols_meta = schema.get("columns", [])
+                cols = parsed.get("columns") or [c["name"] for c in cols_meta]
+
+                storage = Table._open_storage(base, db_name, table_name, schema)
+                btrees: List[BTreeIndex] = []
+                try:
+                    pk_index = Table._pk_index(base, db_name, table_name, cols_meta, storage)
+                    unique_indexes = Table._unique_indexes(base, db_name, table_name, cols_meta, storage)
+                    btrees = Table._btree_indexes(base, db_name, table_name, schema, storage)
+                    sequence = Table._sequence(base, db_name, table_name, cols_meta, storage)
+                    validator = Table._validator(base, db_name, table_name, schema)
+                    state = Table._insert_state(storage, cols_meta, cols, pk_index, unique_indexes, sequence, btrees, validator)
+                    return Table._insert_rows(storage, cols_meta, cols, rows_values, state, Table._converter(parsed))
+                finally:
+                    Table._close_indexes(btrees)
+                    storage.close()
+        except LockTimeout as e:
+            return {"inserted": False, "error": "lock_timeout", "detail": str(e)}
 
-        cols = parsed.get("columns") or cols_order
-        if len(cols) != len(values):
-            return {"inserted": False, "error": "columns_values_mismatch"}
+    @staticmethod
+    def _insert_state(storage: RowStorage, cols_meta: List[Dict[str, Any]], cols: List[str],
+                      pk_index: Optional[HashIndex] = None,
+                      unique_indexes: Optional[Dict[str, HashIndex]] = None,
+                      sequence: Optional[SequenceFile] = None,
+                      btrees: Optional[List[BTreeIndex]] = None,
+                      validator: Optional[RowValidator] = None) -> Dict[str, Any]:
+        """
+        Prépare les contrôles d'un ordre d'insertion. PK et UNIQUE sont contrôlés par leurs
+        index, AUTO_INCREMENT par la séquence persistante ; sans index / séquence, les clés
+        existantes et le max AUTO_INCREMENT sont collectés en un seul passage.
+        L'état est mis à jour au fil des lots (réutilisable entre plusieurs appels à _insert_rows).
+        """
+        validator = validator or RowValidator(cols_meta)
+        # toutes les colonnes AUTO_INCREMENT, y compris celles absentes de la liste de colonnes de l'INSERT
+        auto_columns = validator.auto_columns
+        unique_cols = validator.unique_cols
+        pk_cols = validator.pk_cols
+
+        unique_indexes = unique_indexes or {}
+        pk_seen = set()
+        unique_seen: Dict[str, set] = {c: set() for c in unique_cols}
+        auto_max: Dict[str, int] = {c: 0 for c in auto_columns}
+        scan_pk = bool(pk_cols) and pk_index is None
+        scan_unique = [c for c in unique_cols if c not in unique_indexes]
+        scan_auto = auto_columns if sequence is None else []
+        rows = storage.rows() if (scan_pk or scan_unique or scan_auto) else ()
+        for r in rows:
+            if scan_pk:
+                pk_seen.add(index_key([r.get(k) for k in pk_cols]))
+            for c in scan_unique:
+                if r.get(c) is not None:
+                    unique_seen[c].add(index_key([r.get(c)]))
+            for ac in scan_auto:
+                try:
+                    auto_max[ac] = max(auto_max[ac], int(r.get(ac) or 0))
+                except Exception:
+                    continue
+        return {
+            "validator": validator,
+            "auto_columns": auto_columns,
+            "unique_cols": unique_cols,
+            "pk_cols": pk_cols,
+            "pk_seen": pk_seen,
+            "pk_index": pk_index,
+            "unique_indexes": unique_indexes,
+            "unique_seen": unique_seen,
+            "auto_max": auto_max,
+            "sequence": sequence,
+            "btrees": btrees or [],
+        }
 
-        data_file = base / db_name / f"{table_name}.json"
-        # read existing rows
-        rows = []
-        if data_file.exists():
-            try:
-                df = json.loads(data_file.read_text(encoding="utf-8"))
-                rows = df.get("rows", [])
-            except Exception:
-                rows = []
-
-        # build new row with checks
-        new_row: Dict[str, Any] = {}
-        auto_columns: List[str] = []
-        # map column meta by name for fast access
-        meta_map = {c["name"]: c for c in cols_meta}
-
-        for cname, raw in zip(cols, values):
-            if cname not in meta_map:
-                return {"inserted": False, "error": f"unknown column {cname}"}
-            col_meta = meta_map[cname]
-            raw_py = Table._to_python(raw)
-            # data type check / conversion
-            conv, ok, err = Table.check_data_type(raw_py, col_meta.get("type", ""))
-            if not ok:
-                # allow None when AUTO_INCREMENT
-                if raw_py is None and any("AUTO_INCREMENT" in str(t).upper() for t in (col_meta.get("constraints") or [])):
-                    conv = None
-                else:
-                    return {"inserted": False, "error": f"type error on {cname}: {err}"}
-            # constraint checks (may assign DEFAULT or reject)
-            conv2, ok2, err2 = Table.check_constraints(col_meta, conv, rows, cname)
-            if not ok2:
-                return {"inserted": False, "error": err2}
-            new_row[cname] = conv2
-            if any("AUTO_INCREMENT" in str(t).upper() for t in (col_meta.get("constraints") or [])):
-                auto_columns.append(cname)
-
-        # handle AUTO_INCREMENT assignment for columns that are still None
+    @staticmethod
+    def _insert_rows(storage: RowStorage, cols_meta: List[Dict[str, Any]], cols: List[str], rows_values: List[List[Any]],
+                     state: Optional[Dict[str, Any]] = None,
+                     to_python: Optional[Callable[[Any], Any]] = None) -> Dict[str, Any]:
+        if state is None:
+            state = Table._insert_state(storage, cols_meta, cols)
+        validator = state["validator"]
+        auto_columns = state["auto_columns"]
+        unique_cols = state["unique_cols"]
+        pk_cols = state["pk_cols"]
+        pk_seen = state["pk_seen"]
+        pk_index = state["pk_index"]
+        unique_indexes = state["unique_indexes"]
+        unique_seen = state["unique_seen"]
+        auto_max = state["auto_max"]
+        sequence = state["sequence"]
+        btrees = state["btrees"]
+
+        # conversion de type, DEFAULT, NOT NULL : règles compilées, aucune analyse du schéma par valeur
+        new_rows, err, bad_index = validator.build_rows(cols, rows_values, to_python or Table._to_python)
+        if err:
+            return {"inserted": False, "error": err, "row_index": bad_index}
+
+        # AUTO_INCREMENT : une plage de valeurs réservée d'un coup pour tout le lot,
+        # au-dessus de la plus grande valeur explicite du lot
         for ac in auto_columns:
-            if new_row.get(ac) is None:
-                maxv = 0
-                for r in rows:
-                    try:
-                        v = int(r.get(ac) or 0)
-                        if v > maxv:
-                            maxv = v
-                    except Exception:
-                        continue
-                new_row[ac] = maxv + 1
-
-        # ensure PRIMARY KEY uniqueness if multi PKs exist
-        pk_cols = [c["name"] for c in cols_meta if any("PRIMARY" in str(x).upper() for x in (c.get("constraints") or []))]
-        if pk_cols:
-            for r in rows:
-                if all(r.get(k) == new_row.get(k) for k in pk_cols):
-                    return {"inserted": False, "error": "PRIMARY KEY violation"}
-
-        # append and save
-        rows.append(new_row)
+            pending = [r for r in new_rows if r.get(ac) is None]
+            floor = None
+            for r in new_rows:
+                try:
+                    v = int(r[ac]) if r.get(ac) is not None else None
+                except Exception:
+                    v = None
+                if v is not None and (floor is None or v > floor):
+                    floor = v
+            if sequence is not None:
+                if not pending and floor is None:
+                    continue
+                start = sequence.reserve(ac, len(pending), floor)
+            else:
+                auto_max[ac] = max(auto_max[ac], floor or 0)
+                start = auto_max[ac] + 1
+                auto_max[ac] += len(pending)
+            for n, r in enumerate(pending):
+                r[ac] = start + n
+        if any(ac not in cols for ac in auto_columns):
+            # colonne AUTO_INCREMENT absente de l'INSERT : on remet les colonnes dans l'ordre du schéma
+            order = [c for c in validator.columns if c in cols or c in auto_columns]
+            new_rows = [{c: r.get(c) for c in order} for r in new_rows]
+
+        for i, new_row in enumerate(new_rows):
+            # UNIQUE : index persistant + valeurs déjà prises par les lignes précédentes du lot
+            for c in unique_cols:
+                v = new_row.get(c)
+                if v is not None:
+                    if Table.check_unique(v, [], c, unique_indexes.get(c), unique_seen[c]):
+                        return {"inserted": False, "error": f"UNIQUE violation on {c}", "row_index": i}
+                    unique_seen[c].add(index_key([v]))
+
+            # table partitionnée : une partition doit accepter la ligne
+            err = storage.placement_error(new_row)
+            if err:
+                return {"inserted": False, "error": err, "row_index": i}
+
+            # ensure PRIMARY KEY uniqueness (index persistant + clés déjà vues dans le lot)
+            if pk_cols:
+                key = index_key([new_row.get(k) for k in pk_cols])
+                if key in pk_seen or (pk_index is not None and pk_index.contains(key)):
+                    return {"inserted": False, "error": "PRIMARY KEY violation", "row_index": i}
+                pk_seen.add(key)
+
+        # un seul cycle d'écriture pour tout le lot
         try:
-            data_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(data_file, "w", encoding="utf-8") as f:
-                json.dump({"rows": rows}, f, indent=2, ensure_ascii=False)
+            rids = storage.insert_many(new_rows)
+            storage.flush()
+            for idx in [pk_index, *unique_indexes.values()]:
+                if idx is not None:
+                    for rid, r in zip(rids, new_rows):
+                        idx.add(idx.key_of(r), rid)
+            for bt in btrees:
+                for rid, r in zip(rids, new_rows):
+                    bt.insert_row(r, rid)
+            Table._sync_indexes(storage, pk_index, *unique_indexes.values(), *btrees)
+        except ValueError as e:
+            return {"inserted": False, "error": "row_too_large", "detail": str(e)}
         except Exception as e:
             return {"inserted": False, "error": "io_error", "detail": str(e)}
 
-        return {"inserted": True, "row": new_row}
+        # les clés écrites sont désormais dans les index : inutile de les garder pour les lots suivants
+        if pk_index is not None:
+            pk_seen.clear()
+        for c in unique_indexes:
+            unique_seen[c].clear()
+
+        return {"inserted": True, "count": len(new_rows), "rows": new_rows}
 
     @staticmethod
-    def update(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
+    def copy_from(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
         """
+        COPY table [(cols)] FROM 'fichier' : import en streaming d'un CSV ou JSONL.
+        Le fichier traverse un pipeline de générateurs (lecture -> alignement sur les
+        colonnes -> lots) et chaque lot de chunk_size lignes est validé puis écrit
+        (commit) avant de lire le suivant : la mémoire reste bornée par la taille d'un lot.
         parsed attendu minimalement:
-          {"action":"UPDATE", "table":"T" or "table_name":"T", "set":{...}, "where":{...} (opt)}
-        Retour: {"updated":True, "row": {...}} ou {"updated":False, "error": "..."}
+          {"action":"COPY", "table_name":"T", "file":"data.csv", "columns":[...] (opt),
+           "format":"csv"|"jsonl" (opt), "header":bool, "delimiter":",", "chunk_size":n}
+        Retour: {"copied":True, "count": n, "chunks": k}
+             ou {"copied":False, "error": "...", "line": l, "count": lignes déjà validées}
         """
         base = Path(base_path) if base_path else Path.cwd() / "Data"
         table_name = parsed.get("table") or parsed.get("table_name")
         if not table_name:
-            return {"updated": False, "error": "no_table_name"}
+            return {"copied": False, "error": "no_table_name"}
 
         db_name = db_name or get_current_db()
         if not db_name:
-            return {"updated": False, "error": "no_database_selected"}
-
-        schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
-        if not schema or isinstance(schema, dict) and schema.get("error"):
-            return {"updated": False, "error": "table_not_found"}
+            return {"copied": False, "error": "no_database_selected"}
 
-        cols_meta = schema.get("columns", [])
-        cols_order = [c["name"] for c in cols_meta]
-
-        set_values = parsed.get("set")
-        if set_values is None:
-            return {"updated": False, "error": "no_set_values_provided"}
-
-        # read existing rows
-        data_file = base / db_name / f"{table_name}.json"
-        rows = []
-        if data_file.exists():
-            try:
-                df = json.loads(data_file.read_text(encoding="utf-8"))
-                rows = df.get("rows", [])
-            except Exception:
-                rows = []
+        try:
+            with Table._lock(base, db_name, table_name):
+                schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
+                if not schema or isinstance(schema, dict) and schema.get("error"):
+                    return {"copied": False, "error": "table_not_found"}
+
+                source = Path(parsed.get("file") or "")
+                if not source.is_file():
+                    return {"copied": False, "error": "file_not_found", "file": str(source)}
+                fmt = detect_format(source, parsed.get("format"))
+                if fmt is None:
+                    return {"copied": False, "error": "unknown_format", "file": str(source)}
+                try:
+                    chunk_size = max(1, int(parsed.get("chunk_size") or DEFAULT_CHUNK_SIZE))
+                except (TypeError, ValueError):
+                    return {"copied": False, "error": "invalid_chunk_size"}
+
+                cols_meta = schema.get("columns", [])
+                cols = parsed.get("columns")
+                if fmt == "csv":
+                    header_cols, records = iter_csv(source, delimiter=parsed.get("delimiter") or ",", header=bool(parsed.get("header")))
+                    cols = cols or header_cols
+                else:
+                    records = iter_jsonl(source)
+                cols = cols or [c["name"] for c in cols_meta]
 
-        # build updated rows with checks
-        updated_rows: List[Dict[str, Any]] = []
-        auto_columns: List[str] = []
-        for r in rows:
-            # check WHERE conditions
-            where = parsed.get("where")
-            if where:
-                match = True
-                for wc, wv in where.items():
-                    if r.get(wc) != wv:
-                        match = False
-                        break
-                if not match:
-                    updated_rows.append(r)
-                    continue  # no update for this row
-
-            new_row: Dict[str, Any] = {}
-            # map column meta by name for fast access
-            meta_map = {c["name"]: c for c in cols_meta}
-
-            for cname, raw in set_values.items():
-                if cname not in meta_map:
-                    return {"updated": False, "error": f"unknown column {cname}"}
-                col_meta = meta_map[cname]
-                raw_py = Table._to_python(raw)
-                # data type check / conversion
-                conv, ok, err = Table.check_data_type(raw_py, col_meta.get("type", ""))
-                if not ok:
-                    # allow None when AUTO_INCREMENT
-                    if raw_py is None and any("AUTO_INCREMENT" in str(t).upper() for t in (col_meta.get("constraints") or [])):
-                        conv = None
-                    else:
-                        return {"updated": False, "error": f"type error on {cname}: {err}"}
-                # constraint checks (may assign DEFAULT or reject)
-                conv2, ok2, err2 = Table.check_constraints(col_meta, conv, rows, cname)
-                if not ok2:
-                    return {"updated": False, "error": err2}
-                new_row[cname] = conv2
-                if any("AUTO_INCREMENT" in str(t).upper() for t in (col_meta.get("constraints") or [])):
-                    auto_columns.append(cname)
+                count = 0
+                chunks = 0
+                storage = Table._open_storage(base, db_name, table_name, schema)
+                btrees: List[BTreeIndex] = []
+                try:
+                    pk_index = Table._pk_index(base, db_name, table_name, cols_meta, storage)
+                    unique_indexes = Table._unique_indexes(base, db_name, table_name, cols_meta, storage)
+                    btrees = Table._btree_indexes(base, db_name, table_name, schema, storage)
+                    sequence = Table._sequence(base, db_name, table_name, cols_meta, storage)
+                    validator = Table._validator(base, db_name, table_name, schema)
+                    state = Table._insert_state(storage, cols_meta, cols, pk_index, unique_indexes, sequence, btrees, validator)
+                    try:
+                        for chunk in chunked(to_values(records, cols), chunk_size):
+                            result = Table._insert_rows(storage, cols_meta, cols, [values for _, values in chunk], state)
+                            if not result.get("inserted"):
+                                line = chunk[result["row_index"]][0] if "row_index" in result else None
+                                failure = {"copied": False, "error": result.get("error"), "line": line, "count": count}
+                                if result.get("detail"):
+                                    failure["detail"] = result["detail"]
+                                return failure
+                            count += result["count"]
+                            chunks += 1
+                    except (ValueError, UnicodeDecodeError) as e:
+                        return {"copied": False, "error": "invalid_input", "detail": str(e), "count": count}
+                finally:
+                    Table._close_indexes(btrees)
+                    storage.close()
+
+                return {"copied": True, "table": table_name, "count": count, "chunks": chunks}
+        except LockTimeout as e:
+            return {"copied": False, "error": "lock_timeout", "detail": str(e)}
 
-            updated_rows.append(new_row)
+    @staticmethod
+    def update(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        parsed attendu minimalement:
+          {"action":"UPDATE", "table":"T" or "table_name":"T", "set"/"assignments":{...}, "where": AST (opt)}
+        Retour: {"updated":True, "count": n, "row": [...]} ou {"updated":False, "error": "..."}
+        """
+        base = Path(base_path) if base_path else Path.cwd() / "Data"
+        table_name = parsed.get("table") or parsed.get("table_name")
+        if not table_name:
+            return {"updated": False, "error": "no_table_name"}
 
-        # handle AUTO_INCREMENT assignment for columns that are still None
-        for ac in auto_columns:
-            for ur in updated_rows:
-                if ur.get(ac) is None:
-                    maxv = 0
-                    for r in rows:
-                        try:
-                            v = int(r.get(ac) or 0)
-                            if v > maxv:
-                                maxv = v
-                        except Exception:
-                            continue
-                    ur[ac] = maxv + 1
-
-        # ensure PRIMARY KEY uniqueness if multi PKs exist
-        pk_cols = [c["name"] for c in cols_meta if any("PRIMARY" in str(x).upper() for x in (c.get("constraints") or []))]
-        if pk_cols:
-            for ur in updated_rows:
-                for r in rows:
-                    if all(r.get(k) == ur.get(k) for k in pk_cols):
-                        return {"updated": False, "error": "PRIMARY KEY violation"}
+        db_name = db_name or get_current_db()
+        if not db_name:
+            return {"updated": False, "error": "no_database_selected"}
 
-        # save updated rows
         try:
-            data_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(data_file, "w", encoding="utf-8") as f:
-                json.dump({"rows": updated_rows}, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            return {"updated": False, "error": "io_error", "detail": str(e)}
+            with Table._lock(base, db_name, table_name):
+                schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
+                if not schema or isinstance(schema, dict) and schema.get("error"):
+                    return {"updated": False, "error": "table_not_found"}
+
+                cols_meta = schema.get("columns", [])
+
+                set_values = parsed.get("set") or parsed.get("assignments")
+                if set_values is None:
+                    return {"updated": False, "error": "no_set_values_provided"}
+
+                # schéma compilé (convertisseurs et contraintes précalculés)
+                validator = Table._validator(base, db_name, table_name, schema)
+                where, err = Table._compiled_where(parsed, validator)
+                if err:
+                    return {"updated": False, "error": err}
+
+                # conversion des valeurs SET (une seule fois pour toutes les lignes)
+                to_python = Table._converter(parsed)
+                converted: Dict[str, Any] = {}
+                auto_columns: List[str] = []
+                for cname, raw in set_values.items():
+                    rule = validator.rules.get(cname)
+                    if rule is None:
+                        return {"updated": False, "error": f"unknown column {cname}"}
+                    conv, ok, err = rule.convert(to_python(raw))
+                    if not ok:
+                        return {"updated": False, "error": f"type error on {cname}: {err}"}
+                    converted[cname] = conv
+                    if rule.auto_increment:
+                        auto_columns.append(cname)
 
-        return {"updated": True, "row": updated_rows}
+                storage = Table._open_storage(base, db_name, table_name, schema)
+                btrees: List[BTreeIndex] = []
+                try:
+                    pk_index = Table._pk_index(base, db_name, table_name, cols_meta, storage)
+                    unique_indexes = Table._unique_indexes(base, db_name, table_name, cols_meta, storage)
+                    btrees = Table._btree_indexes(base, db_name, table_name, schema, storage)
+                    matched = Table._matching(storage, where, pk_index, btrees, cols_meta)
+                    matched_rids = {rid for rid, _ in matched}
+                    unique_set = [c for c in converted if c in unique_indexes]
+                    sequence = Table._sequence(base, db_name, table_name, cols_meta, storage) if auto_columns else None
+
+                    # constraint checks (may assign DEFAULT or reject) ; UNIQUE via l'index, hors lignes modifiées
+                    final_values: Dict[str, Any] = {}
+                    for cname, conv in converted.items():
+                        conv2, ok2, err2 = Table.check_constraints(validator.rules[cname], conv, [], cname,
+                                                                   unique_index=unique_indexes.get(cname), ignore_rids=matched_rids)
+                        if not ok2:
+                            return {"updated": False, "error": err2}
+                        if conv2 is not None and len(matched) > 1 and cname in unique_set:
+                            return {"updated": False, "error": f"UNIQUE violation on {cname}"}
+                        final_values[cname] = conv2
+
+                    updated_rows: List[Dict[str, Any]] = []
+                    for _, r in matched:
+                        new_row = dict(r)
+                        new_row.update(final_values)
+                        updated_rows.append(new_row)
+
+                    # handle AUTO_INCREMENT assignment for columns that are still None (plage réservée dans la séquence)
+                    for ac in auto_columns:
+                        if not updated_rows:
+                            break
+                        if final_values.get(ac) is None:
+                            start = sequence.reserve(ac, len(updated_rows))
+                            for n, ur in enumerate(updated_rows):
+                                ur[ac] = start + n
+                        else:
+                            try:
+                                sequence.reserve(ac, 0, int(final_values[ac]))
+                            except (TypeError, ValueError):
+                                pass
+
+                    # ensure PRIMARY KEY uniqueness : une clé déjà dans l'index doit appartenir à une ligne modifiée
+                    pk_changed = pk_index is not None and any(k in final_values or k in auto_columns for k in pk_index.columns)
+                    if pk_changed:
+                        seen = set()
+                        for ur in updated_rows:
+                            key = pk_index.key_of(ur)
+                            if key in seen or any(rid not in matched_rids for rid in pk_index.lookup(key)):
+                                return {"updated": False, "error": "PRIMARY KEY violation"}
+                            seen.add(key)
+
+                    # table partitionnée : la nouvelle valeur de la clé doit avoir une partition ; une
+                    # ligne qui change de partition y est déplacée (supprimée puis réinsérée, nouveau rid)
+                    moved: List[int] = []
+                    for n, ((rid, _), ur) in enumerate(zip(matched, updated_rows)):
+                        err = storage.placement_error(ur)
+                        if err:
+                            return {"updated": False, "error": err}
+                        if storage.moves(ur, rid):
+                            moved.append(n)
+
+                    # save updated rows : seules les pages des lignes modifiées sont touchées ; le
+                    # déplacement est validé au même flush que les autres lignes (une seule écriture)
+                    try:
+                        new_rids = [rid for rid, _ in matched]
+                        moved_set = set(moved)
+                        for n, ((rid, _), ur) in enumerate(zip(matched, updated_rows)):
+                            if n not in moved_set:
+                                storage.update(rid, ur)
+                        if moved:
+                            for n in moved:
+                                storage.delete(new_rids[n])
+                            for n, rid in zip(moved, storage.insert_many([updated_rows[n] for n in moved])):
+                                new_rids[n] = rid
+                        storage.flush()
+                        changed = [unique_indexes[c] for c in unique_set]
+                        if pk_changed:
+                            changed.append(pk_index)
+                        # index dont la clé change : toutes les lignes ; sinon, les lignes déplacées (rid)
+                        for idx in [pk_index, *unique_indexes.values()]:
+                            if idx is None:
+                                continue
+                            entries = range(len(matched)) if idx in changed else moved
+                            for n in entries:
+                                idx.remove(idx.key_of(matched[n][1]), matched[n][0])
+                            for n in entries:
+                                idx.add(idx.key_of(updated_rows[n]), new_rids[n])
+                        for bt in btrees:
+                            entries = range(len(matched)) if any(c in final_values for c in bt.columns) else moved
+                            for n in entries:
+                                bt.remove_row(matched[n][1], matched[n][0])
+                                bt.insert_row(updated_rows[n], new_rids[n])
+                        Table._sync_indexes(storage, pk_index, *unique_indexes.values(), *btrees)
+                    except Exception as e:
+                        return {"updated": False, "error": "io_error", "detail": str(e)}
+                finally:
+                    Table._close_indexes(btrees)
+                    storage.close()
+
+                return {"updated": True, "count": len(updated_rows), "row": updated_rows}
+        except LockTimeout as e:
+            return {"updated": False, "error": "lock_timeout", "detail": str(e)}
 
     @staticmethod
     def delete(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
         """
         parsed attendu minimalement:
-          {"action":"DELETE", "table":"T" or "table_name":"T", "where":{...} (opt)}
-        Retour: {"deleted":True, "row": {...}} ou {"deleted":False, "error": "..."}
+          {"action":"DELETE", "table":"T" or "table_name":"T", "where": AST (opt)}
+        Sans WHERE, toutes les lignes sont supprimées.
+        Retour: {"deleted":True, "count": n} ou {"deleted":False, "error": "..."}
         """
         base = Path(base_path) if base_path else Path.cwd() / "Data"
         table_name = parsed.get("table") or parsed.get("table_name")
@@ -386,32 +849,166 @@ class Table:
         if not db_name:
             return {"deleted": False, "error": "no_database_selected"}
 
-        schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
-        if not schema or isinstance(schema, dict) and schema.get("error"):
-            return {"deleted": False, "error": "table_not_found"}
+        try:
+            with Table._lock(base, db_name, table_name):
+                schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
+                if not schema or isinstance(schema, dict) and schema.get("error"):
+                    return {"deleted": False, "error": "table_not_found"}
+
+                validator = Table._validator(base, db_name, table_name, schema)
+                where, err = Table._compiled_where(parsed, validator)
+                if err:
+                    return {"deleted": False, "error": err}
+
+                storage = Table._open_storage(base, db_name, table_name, schema)
+                btrees: List[BTreeIndex] = []
+                try:
+                    # filter rows to delete (accès direct par un index si le WHERE le permet)
+                    pk_index = Table._pk_index(base, db_name, table_name, schema.get("columns", []), storage)
+                    unique_indexes = Table._unique_indexes(base, db_name, table_name, schema.get("columns", []), storage)
+                    btrees = Table._btree_indexes(base, db_name, table_name, schema, storage)
+                    targets = Table._matching(storage, where, pk_index, btrees, schema.get("columns", []))
+                    try:
+                        for rid, _ in targets:
+                            storage.delete(rid)
+                        storage.flush()
+                        for idx in [pk_index, *unique_indexes.values()]:
+                            if idx is not None:
+                                for rid, r in targets:
+                                    idx.remove(idx.key_of(r), rid)
+                        for bt in btrees:
+                            for rid, r in targets:
+                                bt.remove_row(r, rid)
+                        Table._sync_indexes(storage, pk_index, *unique_indexes.values(), *btrees)
+                    except Exception as e:
+                        return {"deleted": False, "error": "io_error", "detail": str(e)}
+                finally:
+                    Table._close_indexes(btrees)
+                    storage.close()
+
+                return {"deleted": True, "count": len(targets)}
+        except LockTimeout as e:
+            return {"deleted": False, "error": "lock_timeout", "detail": str(e)}
 
-        # read existing rows
-        data_file = base / db_name / f"{table_name}.json"
-        rows = []
-        if data_file.exists():
-            try:
-                df = json.loads(data_file.read_text(encoding="utf-8"))
-                rows = df.get("rows", [])
-            except Exception:
-                rows = []
+    @staticmethod
+    def vacuum(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None,
+               min_ratio: float = 0.0, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        parsed attendu minimalement:
+          {"action":"VACUUM", "table_name":"T" ou None (toutes les tables de la base)}
+        Rend la place des lignes supprimées ou remplacées, une table à la fois (verrou
+        exclusif de la table le temps de la sienne). Les rids ne changent pas : index et
+        transactions en cours restent valables. min_ratio : tables dont la part de lignes
+        mortes est en dessous laissées telles quelles (compacteur de fond).
+        Retour: {"vacuumed":True, "tables": [{"table", "dead_ratio", "reclaimed_bytes"}],
+                 "reclaimed_bytes": n} ou {"vacuumed":False, "error": "..."}
+        """
+        base = Path(base_path) if base_path else Path.cwd() / "Data"
+        if current_transaction() is not None:
+            return {"vacuumed": False, "error": "vacuum_in_transaction"}
+
+        db_name = db_name or get_current_db()
+        if not db_name:
+            return {"vacuumed": False, "error": "no_database_selected"}
 
-        # filter out rows to delete
-        where = parsed.get("where")
-        if where:
-            rows = [r for r in rows if not all(r.get(k) == v for k, v in where.items())]
+        table_name = parsed.get("table") or parsed.get("table_name")
+        if table_name:
+            names = [table_name]
+        else:
+            names = [t.get("name") for t in table_entries(base / db_name / CATALOG_FILE) if t.get("name")]
+        reports = []
+        for name in names:
+            try:
+                with hold_table(base / db_name, name, EXCLUSIVE, timeout=timeout):
+                    report = Table._vacuum_table(base, db_name, name, min_ratio)
+            except LockTimeout as e:
+                report = {"table": name, "error": "lock_timeout", "detail": str(e)}
+            except Exception as e:
+                report = {"table": name, "error": "io_error", "detail": str(e)}
+            if table_name and report.get("error"):
+                return {"vacuumed": False, **report}
+            reports.append(report)
+        return {"vacuumed": True, "tables": reports,
+                "reclaimed_bytes": sum(r.get("reclaimed_bytes", 0) for r in reports)}
 
-        # save updated rows
+    @staticmethod
+    def _vacuum_table(base: Path, db_name: str, table_name: str, min_ratio: float) -> Dict[str, Any]:
+        """VACUUM d'une table, verrou déjà pris. Les index enregistrent le stamp d'après."""
+        schema = Table.describe_table(table_name, db_name=db_name, base_path=str(base))
+        if not schema or isinstance(schema, dict) and schema.get("error"):
+            return {"table": table_name, "error": "table_not_found"}
+        storage = Table._open_storage(base, db_name, table_name, schema)
+        btrees: List[BTreeIndex] = []
         try:
-            data_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(data_file, "w", encoding="utf-8") as f:
-                json.dump({"rows": rows}, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            return {"deleted": False, "error": "io_error", "detail": str(e)}
+            ratio = storage.dead_ratio()
+            if min_ratio and ratio < min_ratio:
+                return {"table": table_name, "dead_ratio": round(ratio, 4), "reclaimed_bytes": 0, "skipped": True}
+            # index à jour avant : après, ils n'ont qu'à prendre le nouveau stamp
+            pk_index = Table._pk_index(base, db_name, table_name, schema.get("columns", []), storage)
+            unique_indexes = Table._unique_indexes(base, db_name, table_name, schema.get("columns", []), storage)
+            btrees = Table._btree_indexes(base, db_name, table_name, schema, storage)
+            reclaimed = storage.vacuum()
+            storage.flush()
+            Table._sync_indexes(storage, pk_index, *unique_indexes.values(), *btrees)
+        finally:
+            Table._close_indexes(btrees)
+            storage.close()
+        return {"table": table_name, "dead_ratio": round(ratio, 4), "reclaimed_bytes": reclaimed}
 
-        return {"deleted": True}
+    @staticmethod
+    def select(parsed: Dict[str, Any], db_name: Optional[str] = None, base_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        parsed attendu minimalement:
+          {"action":"SELECT", "table_name":"T", "columns":["*"] ou [...], "where": AST (opt),
+           "limit": n (opt), "offset": m (opt)}
+        Plan en flux : accès (scan ou index) -> filtre WHERE -> LIMIT/OFFSET -> projection ;
+        seules les lignes nécessaires sont lues.
+        Retour: {"table": "T", "columns": [...], "rows": [...], "count": n} ou {"error": "..."}
+        """
+        base = Path(base_path) if base_path else Path.cwd() / "Data"
+        table_name = parsed.get("table") or parsed.get("table_name")
+        if not table_name:
+            return {"error": "no_table_name"}
 
+        db_name = db_name or get_current_db()
+        if not db_name:
+            return {"error": "no_database_selected"}
+
+        try:
+            with Table._lock(base, db_name, table_name, write=False):
+                schema = Table.describe_table(table_name, db_name=db_name, base_path=base_path)
+                if not schema or isinstance(schema, dict) and schema.get("error"):
+                    return {"error": "table_not_found", "table": table_name}
+
+                known = [c.get("name") for c in schema.get("columns", [])]
+                columns = parsed.get("columns") or ["*"]
+                if columns == ["*"]:
+                    columns = known
+                unknown = [c for c in columns if c not in known]
+                if unknown:
+                    return {"error": f"unknown column {unknown[0]}"}
+
+                validator = Table._validator(base, db_name, table_name, schema)
+                where, err = Table._compiled_where(parsed, validator)
+                if err:
+                    return {"error": err}
+
+                storage = Table._open_storage(base, db_name, table_name, schema)
+                btrees: List[BTreeIndex] = []
+                try:
+                    pk_index = None
+                    if where.equalities:
+                        pk_index = Table._pk_index(base, db_name, table_name, schema.get("columns", []), storage)
+                        btrees = Table._btree_indexes(base, db_name, table_name, schema, storage)
+                    # scan parallèle seulement sans LIMIT : il lit toute la table d'un coup
+                    cols_meta = schema.get("columns", []) if parsed.get("limit") is None else None
+                    source = Table._filtered(storage, where, pk_index, btrees, cols_meta)
+                    source = operators.limit(source, parsed.get("limit"), parsed.get("offset") or 0)
+                    rows = list(operators.project(source, columns))
+                finally:
+                    Table._close_indexes(btrees)
+                    storage.close()
+
+                return {"table": table_name, "columns": columns, "rows": rows, "count": len(rows)}
+        except LockTimeout as e:
+            return {"error": "lock_timeout", "detail": str(e)}
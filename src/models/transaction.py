@@ -0,0 +1,486 @@
+import itertools
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from src.storage.base import RowStorage
+from src.storage.btree import BTreeIndex, sort_key
+from src.storage.hashindex import HashIndex
+from src.storage.locks import EXCLUSIVE, SHARED, LockTimeout, catalog_lock_path, hold, table_lock_path
+from src.storage.mvcc import publish, take_snapshot
+from src.storage.sequence import SequenceFile
+from src.storage.wal import flush_together
+
+
+class TxHashIndex:
+    """
+    Vue d'un index de hachage pendant une transaction : l'index persistant n'est pas
+    modifié, les ajouts / retraits de la transaction sont gardés à part et fusionnés
+    aux lectures. Reportés dans l'index au COMMIT.
+    """
+
+    def __init__(self, base: HashIndex):
+        self.base = base
+        self.added: Dict[str, List[int]] = {}
+        self.removed: Dict[str, Set[int]] = {}
+
+    @property
+    def path(self) -> Path:
+        return self.base.path
+
+    @property
+    def columns(self) -> List[str]:
+        return self.base.columns
+
+    @property
+    def stamp(self) -> Optional[str]:
+        return self.base.stamp
+
+    def exists(self) -> bool:
+        return self.base.exists()
+
+    def key_of(self, row: Dict[str, Any]) -> Optional[str]:
+        return self.base.key_of(row)
+
+    def lookup(self, key: str) -> List[int]:
+        gone = self.removed.get(key, ())
+        return [r for r in self.base.lookup(key) if r not in gone] + self.added.get(key, [])
+
+    def contains(self, key: str) -> bool:
+        return bool(self.lookup(key))
+
+    def add(self, key: Optional[str], rid: int) -> None:
+        if key is None:
+            return
+        gone = self.removed.get(key)
+        if gone and rid in gone:
+            gone.discard(rid)
+        else:
+            self.added.setdefault(key, []).append(rid)
+
+    def remove(self, key: Optional[str], rid: int) -> None:
+        if key is None:
+            return
+        pending = self.added.get(key)
+        if pending and rid in pending:
+            pending.remove(rid)
+        else:
+            self.removed.setdefault(key, set()).add(rid)
+
+    def sync(self, stamp: Optional[str]) -> None:
+        return None  # rien n'est écrit avant le COMMIT
+
+    def conflict(self) -> Optional[str]:
+        """Clé ajoutée par la transaction mais prise entre-temps dans l'index validé."""
+        for key, rids in self.added.items():
+            if rids and self.lookup(key) != rids:
+                if self.base.path.name.endswith(".pk.hidx"):
+                    return "PRIMARY KEY violation"
+                return f"UNIQUE violation on {self.base.columns[0]}"
+        return None
+
+    def apply(self, real_rid: Callable[[int], int]) -> None:
+        for key, rids in self.removed.items():
+            for rid in rids:
+                self.base.remove(key, rid)
+        for key, rids in self.added.items():
+            for rid in rids:
+                self.base.add(key, real_rid(rid))
+
+
+class TxBTree:
+    """Vue d'un index B+tree pendant une transaction (même principe que TxHashIndex)."""
+
+    def __init__(self, base: BTreeIndex, opener: Callable[[], BTreeIndex]):
+        self.base = base
+        self._opener = opener
+        self.added: Dict[tuple, Tuple[Dict[str, Any], int]] = {}
+        self.removed: Set[tuple] = set()
+
+    @property
+    def columns(self) -> List[str]:
+        return self.base.columns
+
+    @property
+    def stamp(self) -> Optional[str]:
+        return self.base.stamp
+
+    def entry_of(self, row: Dict[str, Any], rid: int) -> list:
+        return self.base.entry_of(row, rid)
+
+    def _pending(self, low: Optional[list], high: Optional[list], low_inclusive: bool, high_inclusive: bool) -> List[int]:
+        found = []
+        for entry in sorted(self.added):
+            key = list(entry[:-1])
+            if low is not None:
+                head = key[:len(low)]
+                if head < low or (head == low and not low_inclusive):
+                    continue
+            if high is not None:
+                head = key[:len(high)]
+                if head > high or (head == high and not high_inclusive):
+                    continue
+            found.append(entry[-1])
+        return found
+
+    def scan_range(self, low: Optional[Sequence[Any]] = None, high: Optional[Sequence[Any]] = None,
+                   low_inclusive: bool = True, high_inclusive: bool = True) -> Iterator[int]:
+        """Rids validés (hors entrées retirées) puis rids ajoutés par la transaction."""
+        gone = {e[-1] for e in self.removed}
+        for rid in self.base.scan_range(low, high, low_inclusive, high_inclusive):
+            if rid not in gone:
+                yield rid
+        lo = sort_key(low) if low is not None else None
+        hi = sort_key(high) if high is not None else None
+        yield from self._pending(lo, hi, low_inclusive, high_inclusive)
+
+    def lookup(self, values: Sequence[Any]) -> List[int]:
+        return list(self.scan_range(values, values))
+
+    def insert_row(self, row: Dict[str, Any], rid: int) -> None:
+        entry = tuple(self.base.entry_of(row, rid))
+        if entry in self.removed:
+            self.removed.discard(entry)
+        else:
+            self.added[entry] = (row, rid)
+
+    def remove_row(self, row: Dict[str, Any], rid: int) -> None:
+        entry = tuple(self.base.entry_of(row, rid))
+        if entry in self.added:
+            del self.added[entry]
+        else:
+            self.removed.add(entry)
+
+    def sync(self, stamp: Optional[str]) -> None:
+        return None
+
+    def flush(self) -> None:
+        return None
+
+    def close(self) -> None:
+        return None  # l'index validé reste ouvert jusqu'à la fin de la transaction
+
+    def reopen(self) -> None:
+        """Relit l'index validé (au COMMIT, sous verrou : un autre processus a pu le modifier)."""
+        self.base.close()
+        self.base = self._opener()
+
+    def apply(self, real_rid: Callable[[int], int]) -> None:
+        for entry in self.removed:
+            self.base.remove(list(entry))
+        for row, rid in self.added.values():
+            self.base.insert_row(row, real_rid(rid))
+
+
+class TxSequence:
+    """
+    Compteurs AUTO_INCREMENT pendant une transaction : les valeurs sont réservées dans
+    la séquence par blocs (un accès au fichier .seq par bloc et non par ordre) ; la fin
+    inutilisée d'un bloc est rendue à la fin de la transaction si personne n'a réservé après.
+    """
+    BLOCK = 256
+
+    def __init__(self, base: SequenceFile):
+        self.base = base
+        self._ranges: Dict[str, List[int]] = {}  # colonne -> [prochaine valeur, dernière réservée]
+
+    def reserve(self, column: str, count: int, floor: Optional[int] = None) -> int:
+        current = self._ranges.get(column)
+        if floor is not None:
+            # valeur explicite : la séquence doit passer au-dessus, le bloc local est abandonné
+            if current is not None and floor < current[0]:
+                floor = None
+            else:
+                if current is not None:
+                    self.base.release(column, current[1], current[0] - 1)
+                    del self._ranges[column]
+                return self.base.reserve(column, count, floor)
+        if current is None or current[1] - current[0] + 1 < count:
+            if current is not None:
+                self.base.release(column, current[1], current[0] - 1)
+            size = max(count, self.BLOCK)
+            start = self.base.reserve(column, size)
+            current = self._ranges[column] = [start, start + size - 1]
+        start = current[0]
+        current[0] += count
+        return start
+
+    def release(self) -> None:
+        for column, (nxt, end) in self._ranges.items():
+            self.base.release(column, end, nxt - 1)
+        self._ranges = {}
+
+
+class TxStorage(RowStorage):
+    """
+    Write set d'une table pendant une transaction, posé sur son stockage validé :
+    lignes insérées (rids temporaires négatifs), nouvelles valeurs et suppressions des
+    lignes existantes. Les lectures fusionnent les deux ; rien n'est écrit avant le COMMIT.
+    """
+
+    def __init__(self, base: RowStorage, name: str, db_path: Path):
+        self.base = base
+        self.name = name
+        self.db_path = db_path
+        self.inserted: Dict[int, Dict[str, Any]] = {}
+        self.updated: Dict[int, Dict[str, Any]] = {}
+        self.deleted: Set[int] = set()
+        self.hash_views: Dict[str, TxHashIndex] = {}
+        self.btree_views: Dict[str, TxBTree] = {}
+        self.sequence: Optional[TxSequence] = None
+        self._next_rid = itertools.count(-1, -1)
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        return self.base.schema_version
+
+    def committed(self) -> RowStorage:
+        return self.base
+
+    def stamp(self) -> Optional[str]:
+        return self.base.stamp()
+
+    def snapshot_changes(self) -> Set[int]:
+        return self.base.snapshot_changes()
+
+    def placement_error(self, row: Dict[str, Any], rid: Optional[int] = None) -> Optional[str]:
+        return self.base.placement_error(row, rid if rid is None or rid >= 0 else None)
+
+    def moves(self, row: Dict[str, Any], rid: int) -> bool:
+        # ligne insérée par la transaction : routée vers sa partition au COMMIT
+        return rid >= 0 and self.base.moves(row, rid)
+
+    def changes(self) -> int:
+        return len(self.inserted) + len(self.updated) + len(self.deleted)
+
+    # --- vues d'index ---
+
+    def hash_view(self, idx: HashIndex) -> TxHashIndex:
+        key = str(idx.path)
+        view = self.hash_views.get(key)
+        if view is None or view.base is not idx:
+            view = self.hash_views[key] = TxHashIndex(idx)
+        return view
+
+    def btree_view(self, path: Path, opener: Callable[[], BTreeIndex]) -> TxBTree:
+        key = str(path)
+        view = self.btree_views.get(key)
+        if view is None:
+            view = self.btree_views[key] = TxBTree(opener(), opener)
+        return view
+
+    def sequence_view(self, seq: SequenceFile) -> TxSequence:
+        if self.sequence is None:
+            self.sequence = TxSequence(seq)
+        return self.sequence
+
+    # --- lecture ---
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for rid, row in self.base.scan():
+            if rid in self.deleted:
+                continue
+            yield rid, self.updated.get(rid, row)
+        yield from list(self.inserted.items())
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        if rid < 0:
+            return self.inserted.get(rid)
+        if rid in self.deleted:
+            return None
+        if rid in self.updated:
+            return self.updated[rid]
+        return self.base.read(rid)
+
+    # --- écriture (en mémoire) ---
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        rid = next(self._next_rid)
+        self.inserted[rid] = row
+        return rid
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        return [self.insert(r) for r in rows]
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        if rid < 0:
+            if rid not in self.inserted:
+                return False
+            self.inserted[rid] = row
+            return True
+        if rid in self.deleted:
+            return False
+        self.updated[rid] = row
+        return True
+
+    def delete(self, rid: int) -> bool:
+        if rid < 0:
+            return self.inserted.pop(rid, None) is not None
+        if rid in self.deleted:
+            return False
+        self.updated.pop(rid, None)
+        self.deleted.add(rid)
+        return True
+
+    def flush(self) -> None:
+        return None  # écrit au COMMIT
+
+    def close(self) -> None:
+        return None  # reste ouvert jusqu'à la fin de la transaction
+
+    # --- fin de transaction ---
+
+    def conflict(self) -> Optional[str]:
+        """
+        Vérifie, juste avant d'écrire, que les lignes visées existent toujours, qu'aucune
+        n'a été modifiée depuis l'instantané de la transaction (le premier qui valide
+        gagne) et que les clés sont libres.
+        """
+        touched = list(itertools.chain(self.updated, self.deleted))
+        latest = self.base.committed()
+        if any(latest.read(rid) is None for rid in touched) or self.base.write_conflicts(touched):
+            return f"write conflict on {self.name}"
+        for view in self.hash_views.values():
+            err = view.conflict()
+            if err:
+                return err
+        return None
+
+    def apply(self) -> None:
+        """Reporte le write set dans le stockage validé et les index (sans flush)."""
+        for rid in self.deleted:
+            self.base.delete(rid)
+        for rid, row in self.updated.items():
+            self.base.update(rid, row)
+        temp = list(self.inserted)
+        real = dict(zip(temp, self.base.insert_many([self.inserted[t] for t in temp])))
+        real_rid = lambda rid: real.get(rid, rid)
+        for view in self.hash_views.values():
+            view.apply(real_rid)
+        for view in self.btree_views.values():
+            view.apply(real_rid)
+
+    def sync_indexes(self) -> None:
+        stamp = self.base.stamp()
+        for view in self.hash_views.values():
+            view.base.sync(stamp)
+        for view in self.btree_views.values():
+            view.base.sync(stamp)
+
+    def release(self) -> None:
+        """Ferme le stockage validé et les B+tree ouverts pour la transaction."""
+        if self.sequence is not None:
+            self.sequence.release()
+        try:
+            for view in self.btree_views.values():
+                view.base.close()
+        finally:
+            self.base.close()
+
+
+class Transaction:
+    """
+    Transaction explicite (BEGIN ... COMMIT / ROLLBACK) : chaque table touchée a son
+    write set (TxStorage). Au COMMIT, contraintes revérifiées puis toutes les
+    modifications écrites d'un coup : un seul commit du journal par base.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(Transaction._ids)
+        self.tables: Dict[str, TxStorage] = {}
+        # instantané de lecture pris au BEGIN, partagé par toutes les tables lues
+        self.snapshot = take_snapshot()
+
+    def storage(self, db_path: Path, table_name: str, opener: Callable[[], RowStorage]) -> TxStorage:
+        key = f"{db_path}/{table_name}"
+        tx_storage = self.tables.get(key)
+        if tx_storage is None:
+            tx_storage = self.tables[key] = TxStorage(opener(), table_name, db_path)
+        return tx_storage
+
+    def changes(self) -> int:
+        return sum(t.changes() for t in self.tables.values())
+
+    def commit(self) -> Dict[str, Any]:
+        touched = [t for t in self.tables.values() if t.changes()]
+        bases = [t.base for t in touched]
+        # tables écrites verrouillées en exclusif (autres processus compris) jusqu'à la fin
+        requests = [(catalog_lock_path(t.db_path), SHARED) for t in touched]
+        requests += [(table_lock_path(t.db_path, t.name), EXCLUSIVE) for t in touched]
+        try:
+            with hold(requests):
+                for t in touched:
+                    for view in t.btree_views.values():
+                        view.reopen()
+                # verrous d'écriture (WAL) pris avant la vérification : rien ne s'intercale jusqu'au flush
+                for base in sorted(bases, key=lambda b: str(b.path)):
+                    base.begin_write()
+                for t in touched:
+                    err = t.conflict()
+                    if err:
+                        flush_together(bases)  # rien d'écrit : relâche seulement les verrous
+                        return {"committed": False, "error": err, "rolled_back": True}
+                for t in touched:
+                    t.apply()
+                flush_together(bases)
+                publish(self.snapshot.writer)
+                for t in touched:
+                    t.sync_indexes()
+        except LockTimeout as e:
+            return {"committed": False, "error": "lock_timeout", "detail": str(e), "rolled_back": True}
+        except Exception as e:
+            return {"committed": False, "error": "io_error", "detail": str(e)}
+        finally:
+            self._release()
+        return {"committed": True, "tables": [t.name for t in touched], "changes": sum(t.changes() for t in touched)}
+
+    def rollback(self) -> Dict[str, Any]:
+        discarded = self.changes()
+        self._release()
+        return {"rolled_back": True, "discarded": discarded}
+
+    def _release(self) -> None:
+        tables, self.tables = list(self.tables.values()), {}
+        for t in tables:
+            try:
+                t.release()
+            except Exception:
+                continue
+        self.snapshot.release()
+
+
+# transaction en cours du thread (une session = un thread qui exécute ses ordres)
+_state = threading.local()
+
+
+def current_transaction() -> Optional[Transaction]:
+    return getattr(_state, "transaction", None)
+
+
+def set_transaction(tx: Optional[Transaction]) -> None:
+    _state.transaction = tx
+
+
+def begin() -> Dict[str, Any]:
+    if current_transaction() is not None:
+        return {"success": False, "error": "transaction_already_active"}
+    tx = Transaction()
+    set_transaction(tx)
+    return {"success": True, "transaction": tx.id}
+
+
+def commit() -> Dict[str, Any]:
+    tx = current_transaction()
+    if tx is None:
+        return {"committed": False, "error": "no_active_transaction"}
+    set_transaction(None)
+    return tx.commit()
+
+
+def rollback() -> Dict[str, Any]:
+    tx = current_transaction()
+    if tx is None:
+        return {"rolled_back": False, "error": "no_active_transaction"}
+    set_transaction(None)
+    return tx.rollback()
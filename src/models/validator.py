@@ -0,0 +1,186 @@
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# convertisseur compilé : valeur python -> (valeur_convertie, ok, message_erreur)
+Converter = Callable[[Any], Tuple[Any, bool, Optional[str]]]
+
+_VARCHAR_RE = re.compile(r"VARCHAR\s*\(\s*(\d+)\s*\)")
+
+
+def _to_int(value: Any):
+    if value is None:
+        return None, True, None
+    if isinstance(value, bool):
+        return None, False, "invalid INT"
+    try:
+        return int(value), True, None
+    except Exception:
+        return None, False, "type conversion failed"
+
+
+def _to_float(value: Any):
+    if value is None:
+        return None, True, None
+    try:
+        return float(value), True, None
+    except Exception:
+        return None, False, "type conversion failed"
+
+
+def _to_str(value: Any):
+    if value is None:
+        return None, True, None
+    try:
+        return str(value), True, None
+    except Exception:
+        return None, False, "type conversion failed"
+
+
+def _varchar(max_len: int) -> Converter:
+    def convert(value: Any):
+        if value is None:
+            return None, True, None
+        try:
+            s = str(value)
+        except Exception:
+            return None, False, "type conversion failed"
+        if len(s) > max_len:
+            return None, False, "VARCHAR length exceeded"
+        return s, True, None
+    return convert
+
+
+@lru_cache(maxsize=256)
+def compile_type(type_str: Optional[str]) -> Converter:
+    """
+    Convertisseur d'un type de colonne : INT, FLOAT, VARCHAR(n), TEXT, TIMESTAMP.
+    Le type est analysé une seule fois ; les types inconnus sont gardés en texte.
+    """
+    typ = (type_str or "").strip().upper()
+    if typ.startswith("INT"):
+        return _to_int
+    if typ.startswith("FLOAT") or typ.startswith("REAL") or typ.startswith("DOUBLE"):
+        return _to_float
+    if typ.startswith("VARCHAR"):
+        m = _VARCHAR_RE.search(typ)
+        return _varchar(int(m.group(1))) if m else _to_str
+    # TEXT, TIMESTAMP (gardé en texte pour l'instant) et repli : texte
+    return _to_str
+
+
+class ColumnRule:
+    """Règles précalculées d'une colonne : convertisseur, DEFAULT converti et drapeaux de contraintes."""
+    __slots__ = ("name", "meta", "convert", "max_length", "has_default", "default", "default_error",
+                 "auto_increment", "unique", "primary", "not_null")
+
+    def __init__(self, col_meta: Dict[str, Any]):
+        self.name = col_meta.get("name")
+        self.meta = col_meta
+        type_str = col_meta.get("type") or ""
+        self.convert = compile_type(type_str)
+        m = _VARCHAR_RE.search(type_str.upper())
+        self.max_length = int(m.group(1)) if m else None
+
+        raw_cons = col_meta.get("constraints") or []
+        cons = [str(c).upper() for c in raw_cons]
+        cons_str = " ".join(cons)
+        self.auto_increment = any("AUTO_INCREMENT" in x for x in cons)
+        self.unique = any("UNIQUE" in x for x in cons)
+        self.primary = any("PRIMARY" in x for x in cons)
+        self.not_null = "NOT" in cons_str and "NULL" in cons_str
+
+        # DEFAULT ({"DEFAULT": v}) converti une fois pour toutes
+        default_val = None
+        for c in raw_cons:
+            if isinstance(c, dict) and "DEFAULT" in (k.upper() for k in c.keys()):
+                default_val = list(c.values())[0]
+        self.has_default = default_val is not None
+        self.default = None
+        self.default_error = False
+        if self.has_default:
+            conv, ok, _ = self.convert(default_val)
+            self.default = conv
+            self.default_error = not ok
+
+    def fill_null(self, value: Any) -> Tuple[Any, Optional[str]]:
+        """
+        Applique DEFAULT / NOT NULL / PRIMARY KEY non nulle à une valeur déjà convertie.
+        AUTO_INCREMENT laisse None (valeur attribuée par l'appelant). Retourne (valeur, erreur)
+        """
+        if value is not None:
+            return value, None
+        if self.has_default:
+            if self.default_error:
+                return None, f"DEFAULT type error for {self.name}"
+            return self.default, None
+        if self.auto_increment:
+            return None, None
+        if self.not_null:
+            return None, f"NOT NULL violation on {self.name}"
+        if self.primary:
+            return None, f"PRIMARY KEY cannot be NULL ({self.name})"
+        return None, None
+
+
+class RowValidator:
+    """
+    Schéma d'une table compilé une fois : une ColumnRule par colonne et les listes de
+    colonnes AUTO_INCREMENT / UNIQUE / PRIMARY KEY. Valide une ligne ou un lot sans
+    ré-analyser types ni contraintes. Obtenu via catalog.get_validator (recompilé
+    seulement quand le catalogue change).
+    """
+
+    def __init__(self, cols_meta: List[Dict[str, Any]]):
+        self.rules: Dict[str, ColumnRule] = {c["name"]: ColumnRule(c) for c in cols_meta}
+        self.meta_map: Dict[str, Dict[str, Any]] = {c["name"]: c for c in cols_meta}
+        self.columns: List[str] = list(self.rules)
+        self.auto_columns: List[str] = [n for n, r in self.rules.items() if r.auto_increment]
+        self.unique_cols: List[str] = [n for n, r in self.rules.items() if r.unique]
+        self.pk_cols: List[str] = [n for n, r in self.rules.items() if r.primary]
+
+    def rules_for(self, cols: List[str]) -> Tuple[Optional[List[ColumnRule]], Optional[str]]:
+        """Règles des colonnes `cols`, dans l'ordre. Retourne (règles, erreur)"""
+        rules = []
+        for cname in cols:
+            rule = self.rules.get(cname)
+            if rule is None:
+                return None, f"unknown column {cname}"
+            rules.append(rule)
+        return rules, None
+
+    @staticmethod
+    def build_row(rules: List[ColumnRule], values: List[Any], to_python: Callable[[Any], Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Construit une ligne à partir des valeurs brutes (rules vient de rules_for) :
+        conversion de type puis DEFAULT / NOT NULL / PRIMARY KEY non nulle.
+        UNIQUE et PK sont contrôlés par l'appelant. Retourne (ligne, erreur)
+        """
+        if len(rules) != len(values):
+            return None, "columns_values_mismatch"
+        row: Dict[str, Any] = {}
+        for rule, raw in zip(rules, values):
+            conv, ok, err = rule.convert(to_python(raw))
+            if not ok:
+                return None, f"type error on {rule.name}: {err}"
+            conv, err = rule.fill_null(conv)
+            if err:
+                return None, err
+            row[rule.name] = conv
+        return row, None
+
+    def build_rows(self, cols: List[str], rows_values: List[List[Any]],
+                   to_python: Callable[[Any], Any]) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[int]]:
+        """Valide un lot : retourne (lignes, None, None) ou ([], erreur, indice de la ligne fautive)."""
+        rules, unknown = self.rules_for(cols)
+        rows = []
+        for i, values in enumerate(rows_values):
+            if len(cols) != len(values):
+                return [], "columns_values_mismatch", i
+            if unknown:
+                return [], unknown, i
+            row, err = self.build_row(rules, values, to_python)
+            if err:
+                return [], err, i
+            rows.append(row)
+        return rows, None, None
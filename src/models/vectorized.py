@@ -0,0 +1,281 @@
+import os
+from itertools import compress, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy absent : le WHERE est évalué ligne à ligne (Predicate.test)
+    np = None
+
+from src.models.expression import ARITHMETIC, COMPARISONS
+from src.models.validator import ColumnRule
+
+# Évaluation vectorisée du WHERE : les lignes d'un scan sont prises par lots, chaque
+# colonne utilisée devient un tableau numpy (valeurs + masque des NULL) et l'expression
+# est calculée sur tout le lot d'un coup. Un nœud booléen donne deux masques (vrai,
+# faux) : ce qui n'est dans aucun des deux est inconnu, comme None en ligne à ligne.
+# La sélection est exactement celle de Predicate.test ; un lot qui ne se laisse pas
+# calculer ainsi (types mélangés, entier hors int64...) repasse par Predicate.test.
+
+DEFAULT_BATCH_ROWS = 4096   # lignes par lot (SGBD_VECTOR_BATCH)
+_FIRST_BATCH_ROWS = 256     # premier lot plus petit : un LIMIT n'attend pas un lot plein
+_INT64_SAFE = 2.0 ** 62     # au-delà, un calcul entier risque de déborder d'int64
+
+Row = Dict[str, Any]
+Pair = Tuple[int, Row]
+
+
+class _Unsupported(Exception):
+    """Nœud sans équivalent vectorisé : le WHERE reste évalué ligne à ligne."""
+
+
+def enabled() -> bool:
+    """Vectorisation possible : numpy installé et pas désactivée par SGBD_VECTORIZE=0."""
+    return np is not None and os.environ.get("SGBD_VECTORIZE", "1") != "0"
+
+
+def _column_kind(rule: ColumnRule) -> str:
+    typ = str(rule.meta.get("type") or "").strip().upper()
+    if typ.startswith("INT"):
+        return "int"
+    if typ.startswith("FLOAT") or typ.startswith("REAL") or typ.startswith("DOUBLE"):
+        return "float"
+    return "object"  # VARCHAR, TEXT, TIMESTAMP (stocké en texte)
+
+
+class ColumnBatch:
+    """Un lot de lignes ; chaque colonne n'est convertie en tableau qu'à sa première utilisation."""
+    __slots__ = ("rows", "size", "kinds", "_columns")
+
+    def __init__(self, rows: List[Row], kinds: Dict[str, str]):
+        self.rows = rows
+        self.size = len(rows)
+        self.kinds = kinds
+        self._columns: Dict[str, Tuple[Any, Any]] = {}
+
+    def column(self, name: str):
+        """(valeurs, masque des NULL) ; les NULL d'une colonne numérique valent 0 dans valeurs."""
+        cached = self._columns.get(name)
+        if cached is not None:
+            return cached
+        values = [r.get(name) for r in self.rows]
+        kind = self.kinds.get(name, "object")
+        array = None
+        if None in values:
+            obj = np.empty(self.size, dtype=object)
+            obj[:] = values
+            nulls = obj == None  # noqa: E711 (comparaison élément par élément)
+            if kind != "object":
+                values = [0 if v is None else v for v in values]
+        else:
+            nulls = np.zeros(self.size, dtype=bool)
+        if kind != "object":
+            try:
+                array = np.array(values, dtype=np.int64 if kind == "int" else np.float64)
+            except (TypeError, ValueError, OverflowError):
+                array = None  # valeur inattendue ou trop grande : tableau d'objets
+        if array is None:
+            array = np.empty(self.size, dtype=object)
+            array[:] = [r.get(name) for r in self.rows]
+        self._columns[name] = (array, nulls)
+        return array, nulls
+
+
+Value = Callable[[ColumnBatch], Tuple[Any, Any]]   # lot -> (valeurs, NULL)
+Mask = Callable[[ColumnBatch], Tuple[Any, Any]]    # lot -> (vrai, faux)
+
+
+def _is_object(v: Any) -> bool:
+    return isinstance(v, np.ndarray) and v.dtype == object
+
+
+def _apply(fn: Callable[[Any, Any], Any], x: Any, y: Any, nulls: Any, out_dtype: Any) -> Any:
+    """fn(x, y) élément par élément ; un tableau d'objets n'est calculé que hors NULL."""
+    if not (_is_object(x) or _is_object(y)) or not nulls.any():
+        return fn(x, y)
+    valid = ~nulls
+    out = np.zeros(len(nulls), dtype=out_dtype)
+    out[valid] = fn(x[valid] if isinstance(x, np.ndarray) else x,
+                    y[valid] if isinstance(y, np.ndarray) else y)
+    return out
+
+
+def _as_mask(result: Any, size: int) -> Any:
+    """Résultat d'une comparaison (tableau, ou scalaire si numpy n'a pas comparé) en masque du lot."""
+    return np.broadcast_to(np.asarray(result, dtype=bool), (size,))
+
+
+def _value(node: Dict[str, Any], kinds: Dict[str, str]) -> Value:
+    op = node["op"]
+    if op == "col":
+        name = node["name"]
+        return lambda b: b.column(name)
+    if op == "lit":
+        v = node["value"]
+        if isinstance(v, bool) or not isinstance(v, (int, float, str, type(None))):
+            raise _Unsupported(op)
+        if isinstance(v, int) and abs(v) >= _INT64_SAFE:
+            raise _Unsupported(op)
+        return lambda b: (v, np.full(b.size, v is None))
+    if op == "param":
+        params, i = node["params"], node["index"]
+
+        def param(b):
+            v = params.values[i]
+            if isinstance(v, bool) or not isinstance(v, (int, float, str, type(None))) \
+                    or isinstance(v, int) and abs(v) >= _INT64_SAFE:
+                raise TypeError("param")  # valeur sans équivalent numpy : lot filtré ligne à ligne
+            return v, np.full(b.size, v is None)
+        return param
+    if op in ARITHMETIC:
+        fn = ARITHMETIC[op]
+        left, right = _value(node["left"], kinds), _value(node["right"], kinds)
+        divides = op in ("/", "%")
+
+        def arith(b):
+            x, xn = left(b)
+            y, yn = right(b)
+            nulls = xn | yn
+            if divides:
+                nulls = nulls | (np.asarray(y) == 0)  # division par zéro : NULL
+            values = _apply(fn, x, y, nulls, object)
+            if isinstance(values, np.ndarray) and values.dtype.kind in "iu":
+                # l'entier python ne déborde pas : au moindre doute, retour ligne à ligne
+                if np.abs(fn(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))).max(initial=0) >= _INT64_SAFE:
+                    raise OverflowError("int64")
+            return values, nulls
+        return arith
+    raise _Unsupported(op)
+
+
+def _mask(node: Dict[str, Any], kinds: Dict[str, str]) -> Mask:
+    op = node["op"]
+    if op == "lit":
+        v = node["value"]
+        t, f = v is not None and bool(v), v is not None and not bool(v)
+        return lambda b: (np.full(b.size, t), np.full(b.size, f))
+    if op == "col" or op in ARITHMETIC:
+        value = _value(node, kinds)
+
+        def truth(b):
+            x, nulls = value(b)
+            x = np.broadcast_to(np.asarray(x), (b.size,)).astype(bool)
+            valid = ~nulls
+            return x & valid, ~x & valid
+        return truth
+    if op in ("and", "or"):
+        masks = [_mask(a, kinds) for a in node["args"]]
+        conj = op == "and"
+
+        def combine(b):
+            t, f = masks[0](b)
+            for m in masks[1:]:
+                t2, f2 = m(b)
+                if conj:
+                    t, f = t & t2, f | f2
+                else:
+                    t, f = t | t2, f & f2
+            return t, f
+        return combine
+    if op == "not":
+        inner = _mask(node["arg"], kinds)
+
+        def not_(b):
+            t, f = inner(b)
+            return f, t
+        return not_
+    if op in COMPARISONS:
+        cmp = COMPARISONS[op]
+        left, right = _value(node["left"], kinds), _value(node["right"], kinds)
+
+        def compare(b):
+            x, xn = left(b)
+            y, yn = right(b)
+            nulls = xn | yn
+            res = _as_mask(_apply(cmp, x, y, nulls, bool), b.size)
+            valid = ~nulls
+            return res & valid, ~res & valid
+        return compare
+    if op == "in":
+        if not all(i["op"] == "lit" for i in node["items"]):
+            raise _Unsupported(op)
+        arg = _value(node["arg"], kinds)
+        negated = node.get("negated", False)
+        values = [i["value"] for i in node["items"]]
+        has_null = any(v is None for v in values)
+        members = frozenset(v for v in values if v is not None)
+        numeric = all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in members)
+        wanted = np.array(sorted(members)) if numeric and members else None
+
+        def in_(b):
+            x, nulls = arg(b)
+            x = np.broadcast_to(np.asarray(x), (b.size,))
+            valid = ~nulls
+            if wanted is not None and x.dtype.kind in "iuf":
+                found = np.isin(x, wanted)
+            else:
+                found = np.zeros(b.size, dtype=bool)
+                found[valid] = np.fromiter((v in members for v in x[valid]), dtype=bool, count=int(valid.sum()))
+            found &= valid
+            missing = np.zeros(b.size, dtype=bool) if has_null else valid & ~found
+            return (missing, found) if negated else (found, missing)
+        return in_
+    if op == "is_null":
+        arg = _value(node["arg"], kinds)
+        negated = node.get("negated", False)
+
+        def is_null(b):
+            _, nulls = arg(b)
+            return (~nulls, nulls) if negated else (nulls, ~nulls)
+        return is_null
+    raise _Unsupported(op)
+
+
+def _single_test(node: Dict[str, Any]) -> bool:
+    """Un seul test d'une colonne (x > 3, x IN (...), x IS NULL) : la fermeture ligne à ligne est aussi rapide."""
+    if node["op"] == "not":
+        return _single_test(node["arg"])
+    if node["op"] in ("and", "or"):
+        return False
+    return not any(isinstance(v, dict) and v.get("op") in ARITHMETIC for v in node.values())
+
+
+def compile_mask(node: Optional[Dict[str, Any]], rules: Dict[str, ColumnRule]) -> Optional[Callable[[List[Row]], Any]]:
+    """
+    Version vectorisée d'un WHERE lié par compile_where (Predicate.node) : fonction
+    lignes -> masque des lignes retenues. None si numpy manque, si la vectorisation est
+    désactivée, si le WHERE n'est qu'un test simple ou s'il a une partie sans équivalent
+    (LIKE, qui reste un appel python par valeur, ou IN sur des expressions).
+    """
+    if node is None or not enabled() or _single_test(node):
+        return None
+    kinds = {name: _column_kind(rule) for name, rule in rules.items()}
+    try:
+        mask = _mask(node, kinds)
+    except _Unsupported:
+        return None
+    return lambda rows: mask(ColumnBatch(rows, kinds))[0]
+
+
+def filter_batches(source: Iterable[Pair], mask: Callable[[List[Row]], Any],
+                   fallback: Callable[[Row], Any], size: Optional[int] = None) -> Iterator[Pair]:
+    """
+    Opérateur de filtre par lots : (rid, ligne) retenus par le masque, dans l'ordre de la
+    source. Les lots grandissent jusqu'à `size` (SGBD_VECTOR_BATCH) ; un lot que numpy
+    ne sait pas calculer est filtré ligne à ligne par `fallback`.
+    """
+    size = size or int(os.environ.get("SGBD_VECTOR_BATCH", DEFAULT_BATCH_ROWS))
+    batch = min(_FIRST_BATCH_ROWS, size)
+    it = iter(source)
+    while True:
+        chunk = list(islice(it, batch))
+        if not chunk:
+            return
+        try:
+            with np.errstate(all="ignore"):
+                selected = mask([row for _, row in chunk])
+        except (TypeError, ValueError, OverflowError, ZeroDivisionError):
+            yield from (pair for pair in chunk if fallback(pair[1]))
+        else:
+            yield from compress(chunk, selected.tolist())
+        batch = min(batch * 2, size)
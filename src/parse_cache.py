@@ -0,0 +1,180 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_CAPACITY = 1024   # formes de requêtes gardées (SGBD_PARSE_CACHE, 0 : pas de cache)
+MAX_PARAMETERS = 1000     # au-delà (gros INSERT multi-lignes), la requête est analysée sans cache
+
+# Cache des requêtes analysées, indexé par la « forme » de la requête : son texte dont les
+# constantes sont remplacées par des marqueurs numérotés. Une application qui envoie mille
+# fois la même forme (INSERT ... VALUES (12, 'alice'), SELECT ... WHERE id = 7) ne passe
+# qu'une fois par le parser ; ensuite les constantes de la requête sont reposées dans une
+# copie du résultat mis en cache.
+#
+# Le résultat doit être exactement celui du parser : au premier passage, la forme analysée
+# puis complétée par les constantes est comparée à l'analyse de la requête elle-même ; une
+# forme dont le résultat diffère n'est jamais servie par le cache. Le lexer (src/lexer.py)
+# ne lit le contenu d'un texte entre quotes que comme une valeur : seul un texte avec une
+# quote doublée ('it''s', dont la valeur diffère du texte) n'est pas extrait, la requête
+# est alors analysée normalement.
+
+# constante texte ('...' ou "...") ou nombre qui ne fait pas partie d'un identifiant ;
+# le (?=...) de tête évite d'essayer les trois branches à chaque caractère
+_LITERAL = re.compile(r"""(?=['"\d])('(?:[^']|'')*'|"(?:[^"]|"")*"|(?<![\w.])\d+(?:\.\d+)?(?![\w.]))""")
+_CACHED_ACTIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+# marqueurs : 987654321000kkk pour la constante numéro k (kkk.5 si elle est décimale),
+# \x00k\x00 entre les quotes d'origine pour un texte
+_NUMBER_BASE = 987654321000000
+_MARK = re.compile(r"\x00(\d+)\x00|987654321000(\d{3})(?:\.5)?")
+
+
+def _shape(query: str) -> Optional[Tuple[str, List[str]]]:
+    """(forme, constantes) de la requête ; None si une constante ne peut pas être extraite."""
+    pieces = _LITERAL.split(query)  # texte, constante, texte, constante, ..., texte
+    count = len(pieces) // 2
+    if count > MAX_PARAMETERS:
+        return None
+    literals = pieces[1::2]
+    for k in range(count):
+        tok = literals[k]
+        if tok[0] in "'\"":
+            text = tok[1:-1]
+            if tok[0] in text or "\x00" in text:
+                return None
+            pieces[2 * k + 1] = f"{tok[0]}\x00{k}\x00{tok[0]}"
+            literals[k] = text
+        else:
+            pieces[2 * k + 1] = str(_NUMBER_BASE + k) + (".5" if "." in tok else "")
+    return "".join(pieces), literals
+
+
+Binder = Callable[[List[str]], Any]
+
+
+def _binder(template: Any, literals: List[str]) -> Optional[Binder]:
+    """
+    Fonction constantes -> copie du résultat mis en cache, marqueurs remplacés (compilée
+    une fois par forme). None pour une valeur sans marqueur, non modifiable : elle est
+    reprise telle quelle.
+    """
+    if isinstance(template, dict):
+        items = [(k, v, _binder(v, literals)) for k, v in template.items()]
+        return lambda lits: {k: (f(lits) if f else v) for k, v, f in items}
+    if isinstance(template, list):
+        items = [(v, _binder(v, literals)) for v in template]
+        return lambda lits: [f(lits) if f else v for v, f in items]
+    if isinstance(template, str):
+        if "\x00" not in template and "987654321000" not in template:
+            return None
+        pieces = _MARK.split(template)  # texte, n° texte, n° nombre, texte...
+        parts: List[Any] = []
+        for i, piece in enumerate(pieces):
+            if i % 3 == 0:
+                if piece:
+                    parts.append(piece)
+            elif piece is not None:
+                parts.append(int(piece))
+        if len(parts) == 1 and isinstance(parts[0], int):
+            k = parts[0]
+            return lambda lits: lits[k]
+        return lambda lits: "".join([p if isinstance(p, str) else lits[p] for p in parts])
+    if isinstance(template, (int, float)) and not isinstance(template, bool) \
+            and _NUMBER_BASE <= abs(template) < _NUMBER_BASE + MAX_PARAMETERS:
+        k = int(abs(template)) - _NUMBER_BASE
+        if k >= len(literals) or isinstance(template, float) != ("." in literals[k]) \
+                or isinstance(template, float) and abs(template) != _NUMBER_BASE + k + 0.5:
+            return None  # pas un marqueur : la vérification de la forme tranchera
+        convert = float if isinstance(template, float) else int
+        if template < 0:
+            return lambda lits: -convert(lits[k])
+        return lambda lits: convert(lits[k])
+    return None
+
+
+class ParseCache:
+    """
+    Cache LRU borné des requêtes analysées, partagé par les threads du processus.
+    `_entries` : forme -> fonction qui rend le résultat du parser à partir des constantes,
+    ou None si la forme ne peut pas être servie par le cache (résultat dépendant des
+    constantes, erreur de syntaxe).
+    """
+    _capacity: int
+    _entries: "OrderedDict[str, Optional[Binder]]"
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._capacity = max(0, int(capacity))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed,
+                "entries": len(self._entries), "capacity": self._capacity}
+
+    def _store(self, shape: str, binder: Optional[Binder]) -> None:
+        with self._lock:
+            self._entries[shape] = binder
+            self._entries.move_to_end(shape)
+            while len(self._entries) > self._capacity:
+                self._entries.popitem(last=False)
+
+    def parse(self, query: str, parse: Callable[[str], Any]) -> Any:
+        """Résultat de parse(query), servi par le cache quand la forme de la requête y est."""
+        head = query.lstrip()[:6].upper()
+        shaped = _shape(query) if self._capacity and head in _CACHED_ACTIONS else None
+        if shaped is None:
+            with self._lock:
+                self.bypassed += 1
+            return parse(query)
+        shape, literals = shaped
+        with self._lock:
+            known = shape in self._entries
+            if known:
+                binder = self._entries[shape]
+                self._entries.move_to_end(shape)
+                if binder is None:
+                    self.bypassed += 1
+                else:
+                    self.hits += 1
+            else:
+                self.misses += 1
+        if known:
+            return parse(query) if binder is None else binder(literals)
+
+        parsed = parse(query)
+        binder = None
+        if isinstance(parsed, dict):
+            template = parse(shape) if literals else parsed
+            if isinstance(template, dict):
+                binder = _binder(template, literals)
+                if binder(literals) != parsed:
+                    binder = None
+        self._store(shape, binder)
+        return parsed
+
+
+_default_cache: Optional[ParseCache] = None
+
+
+def get_parse_cache() -> ParseCache:
+    """Retourne le cache de requêtes du processus (créé à la première utilisation)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache(int(os.environ.get("SGBD_PARSE_CACHE", DEFAULT_CAPACITY)))
+    return _default_cache
@@ -1,361 +1,689 @@
-import re
-from xml.etree.ElementTree import ParseError
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.lexer import LexerError, Token, tokenize
+from src.models.expression import ExpressionError, ExpressionParser
+from src.parse_cache import get_parse_cache
+
+# Analyse des requêtes. src/lexer.py découpe le texte en une seule passe (quotes, nombres,
+# mots, ponctuation), puis une descente récursive (StatementParser) reconnaît l'ordre et
+# produit son arbre : un dict {"action": ...} par ordre, décrit dans chaque parse_*. Le
+# WHERE est lu dans la même suite d'unités par le parser des expressions, dont
+# StatementParser hérite. Les valeurs d'INSERT / UPDATE / EXECUTE sont déjà des valeurs
+# python (texte, nombre, booléen, None ; "typed": True) et un ? y devient
+# {"op": "param", "index": n}, numéroté dans l'ordre du texte comme ceux du WHERE.
+# Une requête invalide affiche un message et donne None.
 
 def parser(query):
-    query_clean = normalize_query(query)
-    parsed = analyseSyntax(query_clean)
-    return parsed
-
-def normalize_query(query: str) -> str:
-    query = " ".join(query.split())
-    query = re.sub(r"\s+\(", "(", query)
-    query = re.sub(r"\s+\)", ")", query)
-    query = re.sub(r"\s+,", ",", query)
-    query = query.strip()
-
-    return query
-
-def analyseSyntax(query):
-    tokens = [token.strip().upper() for token in query.split()]
-
-    if len(tokens) <= 2 :
-        return parse_cmd(query,tokens)
-    
-    if tokens[0] == "CREATE":
-        if tokens[1] == "TABLE":
-            return parse_create_table(query, tokens)        
-        if tokens[1] == "DATABASE":
-            return parse_create_database(query, tokens)
-        else: 
-            print(f"creation impossible")
-    
-    if tokens[0] == "INSERT":
-        return parse_insert(query, tokens)
-    
-    if tokens[0] == "DELETE":
-        return parse_delete(query, tokens)
-    
-    if tokens[0] == "UPDATE":
-        return parse_update(query, tokens)
-    
-    if tokens[0] == "DROP":
-        return parse_drop(query, tokens)
-    
-    
-def parse_create_table(query, tokens):
-    if len(tokens) < 3 or tokens[1].upper() != "TABLE":
-        print("Erreur de syntaxe CREATE TABLE incorrecte.")
-        return None
-
-    match = re.match(r"CREATE\s+TABLE\s+(\w+)\s*\((.+)\)", query, re.IGNORECASE | re.DOTALL)
-    if not match:
-        print("Erreur de syntaxe CREATE TABLE. Vérifiez la structure.")
-        return None
+    """Analyse une requête ; les formes déjà vues sont servies par le cache (src/parse_cache.py)."""
+    return get_parse_cache().parse(query, parse_query)
 
-    table_name = match.group(1)
-    content_str = match.group(2).strip()
-
-    def split_top_level(s: str):
-        parts = []
-        cur = []
-        depth = 0
-        in_single = False
-        in_double = False
-        for ch in s:
-            if ch == "'" and not in_double:
-                in_single = not in_single
-            elif ch == '"' and not in_single:
-                in_double = not in_double
-            elif ch == '(' and not in_single and not in_double:
-                depth += 1
-            elif ch == ')' and not in_single and not in_double:
-                depth -= 1
-            if ch == ',' and depth == 0 and not in_single and not in_double:
-                parts.append(''.join(cur).strip())
-                cur = []
-            else:
-                cur.append(ch)
-        if cur:
-            parts.append(''.join(cur).strip())
-        return [p for p in parts if p]
-
-    def parse_column_def(col_def: str):
-        # récupère nom, type (avec params éventuels) et reste contraintes
-        m = re.match(r"^\s*(\w+)\s+(\w+(?:\s*\([^)]*\))?)(.*)$", col_def, re.IGNORECASE | re.DOTALL)
-        if not m:
-            return None, None, []
-        name = m.group(1)
-        typ = m.group(2).strip()
-        rest = m.group(3).strip()
-        # split constraints en mots (garde tokens composés comme PRIMARY KEY)
-        cons = [c.strip() for c in re.split(r'\s+(?=(?:PRIMARY|NOT|UNIQUE|DEFAULT|AUTO_INCREMENT|REFERENCES|CHECK|CONSTRAINT)\b)|\s+', rest) if c.strip()]
-        return name, typ, cons
-
-    columns = []
-    constraints = []
-
-    for definition in split_top_level(content_str):
-        if not definition:
-            continue
-        up = definition.strip()
-
-        # 1) Constraint table-level FOREIGN KEY (optionnel CONSTRAINT nom)
-        fk_table = re.match(
-            r"^(?:CONSTRAINT\s+(\w+)\s+)?FOREIGN\s+KEY\s*\(([^)]+)\)\s+REFERENCES\s+(\w+)\s*\(([^)]+)\)",
-            up, re.IGNORECASE | re.DOTALL
-        )
-        if fk_table:
-            constraint_name = fk_table.group(1)
-            local_cols = [c.strip() for c in fk_table.group(2).split(',')]
-            ref_table = fk_table.group(3)
-            ref_cols = [c.strip() for c in fk_table.group(4).split(',')]
-
-            # détecter ON DELETE et ON UPDATE indépendamment (ordre libre, optionnels)
-            on_delete_m = re.search(r"ON\s+DELETE\s+(CASCADE|SET\s+NULL|RESTRICT|NO\s+ACTION)", up, re.IGNORECASE)
-            on_update_m = re.search(r"ON\s+UPDATE\s+(CASCADE|SET\s+NULL|RESTRICT|NO\s+ACTION)", up, re.IGNORECASE)
-            on_delete = on_delete_m.group(1).upper().replace(" ", "_") if on_delete_m else None
-            on_update = on_update_m.group(1).upper().replace(" ", "_") if on_update_m else None
-
-            entry = {
-                "type": "FOREIGN_KEY",
-                "name": constraint_name,
-                "columns": local_cols,
-                "referenced_table": ref_table,
-                "referenced_columns": ref_cols,
-            }
-            if on_delete:
-                entry["on_delete"] = on_delete
-            if on_update:
-                entry["on_update"] = on_update
-
-            constraints.append(entry)
-            continue
-
-        # 2) Colonne possible avec REFERENCES inline
-        col_name, col_type, col_cons = parse_column_def(up)
-        if col_name is None:
-            # fallback : prendre tout comme colonne brute
-            columns.append({"name": up, "type": None, "constraints": []})
-            continue
-
-        # cherche un REFERENCES inline dans la définition
-        fk_inline = re.search(r"REFERENCES\s+(\w+)\s*\(([^)]+)\)", up, re.IGNORECASE | re.DOTALL)
-        if fk_inline:
-            ref_table = fk_inline.group(1)
-            ref_cols = [c.strip() for c in fk_inline.group(2).split(',')]
-
-            # détecter ON DELETE / ON UPDATE pour la définition inline
-            on_delete_m = re.search(r"ON\s+DELETE\s+(CASCADE|SET\s+NULL|RESTRICT|NO\s+ACTION)", up, re.IGNORECASE)
-            on_update_m = re.search(r"ON\s+UPDATE\s+(CASCADE|SET\s+NULL|RESTRICT|NO\s+ACTION)", up, re.IGNORECASE)
-            on_delete = on_delete_m.group(1).upper().replace(" ", "_") if on_delete_m else None
-            on_update = on_update_m.group(1).upper().replace(" ", "_") if on_update_m else None
-
-            # ajoute la colonne et la contrainte correspondante
-            columns.append({
-                "name": col_name,
-                "type": col_type,
-                "constraints": [c.upper() for c in col_cons if c]
-            })
-            fk_entry = {
-                "type": "FOREIGN_KEY",
-                "columns": [col_name],
-                "referenced_table": ref_table,
-                "referenced_columns": ref_cols,
-            }
-            if on_delete:
-                fk_entry["on_delete"] = on_delete
-            if on_update:
-                fk_entry["on_update"] = on_update
-
-            constraints.append(fk_entry)
-            continue
-
-        # sinon colonne normale
-        columns.append({
-            "name": col_name,
-            "type": col_type,
-            "constraints": [c.upper() for c in col_cons if c]
-        })
-
-    return {
-        "action": "CREATE_TABLE",
-        "table_name": table_name,
-        "columns": columns,
-        "constraints": constraints
-    }
-
-def parse_create_database(query, tokens):
-    if len(tokens) < 3 or tokens[1].upper() != "DATABASE":
-        print("Erreur de syntaxe CREATE DATABASE incorrecte.")
-        return None
+def parse_query(query):
+    """Analyse une requête sans passer par le cache. Retourne l'ordre (dict) ou None."""
+    try:
+        return StatementParser(query, tokenize(query)).parse()
+    except LexerError as e:
+        print(f"Erreur de syntaxe : {e}")
+    except SqlSyntaxError as e:
+        print(e)
+    return None
 
-    match = re.match(r"CREATE\s+DATABASE\s+(IF\s+NOT\s+EXISTS\s+)?(\w+)", query, re.IGNORECASE)
-    if not match:
-        print("Erreur de syntaxe CREATE DATABASE. Vérifiez la structure.")
-        return None
 
-    if_not_exists = bool(match.group(1))
-    db_name = match.group(2)
+class SqlSyntaxError(ValueError):
+    """Ordre mal formé ; le message est celui affiché à l'utilisateur."""
 
-    return {
-        "action": "CREATE_DATABASE",
-        "database_name": db_name,
-        "if_not_exists": if_not_exists
-    }
 
-def parse_insert(query, tokens):
-    if len(tokens) < 5 or tokens[1].upper() != "INTO":
-        # Erreur: Syntaxe de base incorrecte
-        print("Erreur de syntaxe INSERT INTO incorrecte.")
-        return None
+_FK_ACTIONS = ("CASCADE", "SET", "RESTRICT", "NO")
 
-    match = re.match(r"INSERT\s+INTO\s+(\w+)\s*(\((.*?)\))?\s*VALUES\s*\((.+)\)", query, re.IGNORECASE)
 
-    if not match:
-        print("Erreur de syntaxe INSERT INTO. Vérifiez la structure.")
-        return None
+class StatementParser(ExpressionParser):
+    """Descente récursive sur les unités d'une requête : un parse_* par ordre."""
 
-    table_name = match.group(1)
-    # Les colonnes sont optionnelles, group(3) peut être None si pas de parenthèses de colonnes.
-    columns_str = match.group(3)
-    values_str = match.group(4)
-
-    columns = [col.strip() for col in columns_str.split(',')] if columns_str else None
-    
-    values = [val.strip().strip("'\"") for val in values_str.split(',')]
-    
-    # Simple vérification de cohérence (basée sur les tokens/regex de base)
-    if columns and len(columns) != len(values):
-        print("Erreur: Le nombre de colonnes et de valeurs ne correspond pas.")
-        return None
+    def __init__(self, query: str, tokens: List[Token]):
+        while tokens and tokens[-1][0] == "op" and tokens[-1][1] == ";":
+            tokens = tokens[:-1]
+        super().__init__(tokens)
+        self.query = query
+        self.statement = ""  # ordre en cours, pour les messages d'erreur
 
-    return {
-        "action": "INSERT",
-        "table_name": table_name,
-        "columns": columns,
-        "values": values
-    }
+    # --- lecture des unités ---
 
-def parse_delete(query, tokens):
-    if len(tokens) < 3 or tokens[1].upper() != "FROM":
-        print("Erreur de syntaxe DELETE FROM incorrecte.")
-        return None
-    
-    # Expression régulière pour capturer :
-    # 1. Nom de la table (\w+)
-    # 2. Le reste de la requête après le nom de la table, y compris WHERE facultatif
-    match = re.match(r"DELETE\s+FROM\s+(\w+)\s*(.*)", query, re.IGNORECASE)
-    
-    if not match:
-        print("Erreur de syntaxe DELETE FROM. Vérifiez le nom de la table.")
-        return None
+    def error(self, expected: str) -> SqlSyntaxError:
+        found = repr(self.tokens[self.pos][1]) if self.pos < len(self.tokens) else "la fin de la requête"
+        where = f" {self.statement}" if self.statement else ""
+        return SqlSyntaxError(f"Erreur de syntaxe{where} : {expected} attendu, trouvé {found}.")
 
-    table_name = match.group(1)
-    where_clause = match.group(2).strip()
-
-    condition = None
-    if where_clause and where_clause.upper().startswith("WHERE"):
-        # Extrait la condition après 'WHERE' (y compris l'espace)
-        condition = where_clause[5:].strip()
-    
-    if not condition and len(tokens) > 3:
-         print("Attention: DELETE sans clause WHERE. Toutes les lignes seront supprimées.")
-
-    return {
-        "action": "DELETE",
-        "table_name": table_name,
-        "condition": condition  # La chaîne de condition (ex: "age > 30")
-    }
-    
-def parse_update(query, tokens):
-
-    if len(tokens) < 4 or tokens[2].upper() != "SET":
-        print("Erreur de syntaxe UPDATE incorrecte.")
-        return None
+    def peek_word(self, *words: str, offset: int = 0) -> bool:
+        pos = self.pos + offset
+        if pos >= len(self.tokens):
+            return False
+        tok = self.tokens[pos]
+        return (tok[0] == "name" or tok[0] == "kw") and tok[1].upper() in words
 
-    # Expression régulière pour capturer :up
-    # 1. Nom de la table (\w+)
-    # 2. La liste des assignments SET (col=val, ...) après SET (.*?)
-    # 3. Le reste de la requête (y compris WHERE facultatif)
-    match = re.match(r"UPDATE\s+(\w+)\s+SET\s+(.*?)(?:\s+WHERE\s+(.*))?$", query, re.IGNORECASE | re.DOTALL)
-    
-    if not match:
-        print("Erreur de syntaxe UPDATE. Vérifiez la clause SET.")
+    def accept_word(self, *words: str) -> Optional[str]:
+        if self.peek_word(*words):
+            self.pos += 1
+            return self.tokens[self.pos - 1][1].upper()
         return None
 
-    table_name = match.group(1)
-    set_assignments_str = match.group(2)
-    where_clause_str = match.group(3)
-
-    assignments = {}
-    
-    # Analyse des assignments SET (ex: "col1 = val1, col2 = val2")
-    try:
-        for assignment in set_assignments_str.split(','):
-            parts = [p.strip() for p in assignment.split('=', 1)]
-            if len(parts) == 2:
-                col_name = parts[0]
-                col_value = parts[1].strip().strip("'\"") # Retire les guillemets simples/doubles pour l'exemple
-                assignments[col_name] = col_value
+    def expect_word(self, *words: str) -> str:
+        word = self.accept_word(*words)
+        if word is None:
+            raise self.error(" ou ".join(words))
+        return word
+
+    def expect_op(self, op: str) -> None:
+        if not self.accept("op", op):
+            raise self.error(repr(op))
+
+    def identifier(self, what: str = "nom") -> str:
+        if not self.peek("name"):
+            raise self.error(what)
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def identifiers(self, what: str = "nom de colonne") -> List[str]:
+        """( nom, nom, ... )"""
+        self.expect_op("(")
+        names = [self.identifier(what)]
+        while self.accept("op", ","):
+            names.append(self.identifier(what))
+        self.expect_op(")")
+        return names
+
+    def string(self, what: str) -> str:
+        if not (self.peek("lit") and isinstance(self.tokens[self.pos][1], str)):
+            raise self.error(what)
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def integer(self) -> int:
+        if not (self.peek("lit") and type(self.tokens[self.pos][1]) is int):
+            raise self.error("nombre entier")
+        self.pos += 1
+        return self.tokens[self.pos - 1][1]
+
+    def if_exists(self, negated: bool) -> bool:
+        """[IF EXISTS] ou [IF NOT EXISTS]."""
+        if not self.accept_word("IF"):
+            return False
+        if negated:
+            self.expect("kw", "NOT")
+        self.expect_word("EXISTS")
+        return True
+
+    def text(self, start: int, end: int) -> str:
+        """Texte d'origine des unités start..end-1."""
+        if start >= end:
+            return ""
+        return self.query[self.tokens[start][2]:self.tokens[end - 1][3]]
+
+    def end(self) -> None:
+        if self.pos != len(self.tokens):
+            raise self.error("fin de requête")
+
+    def value(self) -> Any:
+        """
+        Valeur d'un INSERT, d'un SET ou d'un EXECUTE : constante (signe éventuel), NULL,
+        TRUE / FALSE, mot nu (gardé en texte) ou ? d'un ordre préparé.
+        """
+        tokens = self.tokens
+        if self.pos < len(tokens):
+            kind, v = tokens[self.pos][0], tokens[self.pos][1]
+            self.pos += 1
+            if kind == "lit" or kind == "name":
+                return v
+            if kind == "kw" and v in ("NULL", "TRUE", "FALSE"):
+                return None if v == "NULL" else v == "TRUE"
+            if kind == "op":
+                if v == "?":
+                    self.params += 1
+                    return {"op": "param", "index": self.params - 1}
+                if (v == "-" or v == "+") and self.peek("lit") and not isinstance(tokens[self.pos][1], str):
+                    self.pos += 1
+                    return -tokens[self.pos - 1][1] if v == "-" else tokens[self.pos - 1][1]
+            self.pos -= 1
+        raise self.error("valeur")
+
+    def constant(self) -> Any:
+        """Valeur sans ? (DEFAULT, EXECUTE)."""
+        value = self.value()
+        if isinstance(value, dict):
+            self.pos -= 1
+            raise self.error("constante")
+        return value
+
+    def values_row(self) -> List[Any]:
+        """( valeur, valeur, ... )"""
+        self.expect_op("(")
+        tokens, last = self.tokens, len(self.tokens) - 1
+        row = []
+        while True:
+            pos = self.pos
+            tok = tokens[pos] if pos < last else None
+            if tok is not None and (tok[0] == "lit" or tok[0] == "name"):
+                row.append(tok[1])  # cas courant lu sur place : constante suivie de , ou )
+                self.pos = pos + 1
             else:
-                raise ValueError("Format d'assignation SET incorrect.")
-    except ValueError as e:
-        print(f"Erreur d'analyse SET: {e}")
-        return None
+                row.append(self.value())
+            sep = tokens[self.pos] if self.pos <= last else None
+            if sep is None or sep[0] != "op" or (sep[1] != "," and sep[1] != ")"):
+                raise self.error("',' ou ')'")
+            self.pos += 1
+            if sep[1] == ")":
+                return row
+
+    def where(self) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """[WHERE condition] : (texte de la condition, AST) ou (None, None)."""
+        if not self.accept_word("WHERE"):
+            return None, None
+        start = self.pos
+        try:
+            node = self.parse_or()
+        except ExpressionError as e:
+            raise SqlSyntaxError(f"Erreur dans la clause WHERE : {e}")
+        return self.text(start, self.pos), node
+
+    # --- ordres ---
+
+    def parse(self) -> Dict[str, Any]:
+        if not self.tokens:
+            raise SqlSyntaxError("Erreur de syntaxe : requête vide.")
+        tok = self.tokens[0]
+        handler = _STATEMENTS.get(tok[1].upper()) if tok[0] == "name" else None
+        if handler is None:
+            if len(self.tokens) <= 2:
+                return self.parse_cmd()
+            raise SqlSyntaxError(f"Erreur de syntaxe : ordre {tok[1]!r} inconnu.")
+        self.statement = tok[1].upper()
+        self.pos = 1
+        return handler(self)
+
+    def parse_cmd(self) -> Dict[str, Any]:
+        """Commande d'un ou deux mots : USE base, SHOW TABLES, DESCRIBE table, HELP..."""
+        first = self.tokens[0]
+        parsed = {"action": self.query[first[2]:first[3]].upper()}
+        if len(self.tokens) == 2:
+            parsed["argument"] = str(self.tokens[1][1])
+        return parsed
+
+    def parse_create(self) -> Dict[str, Any]:
+        kind = self.expect_word("TABLE", "DATABASE", "INDEX")
+        self.statement = f"CREATE {kind}"
+        if kind == "TABLE":
+            return self.parse_create_table()
+        if kind == "DATABASE":
+            return self.parse_create_database()
+        return self.parse_create_index()
+
+    def parse_create_table(self) -> Dict[str, Any]:
+        """
+        CREATE TABLE nom (colonne type [contraintes], ..., [CONSTRAINT nom] FOREIGN KEY (...)
+        REFERENCES table (...) [ON DELETE | ON UPDATE action], PRIMARY KEY (...), UNIQUE (col))
+        [ENGINE = moteur] [COMPRESSION = zlib | lzma] [PARTITION BY ...]
+        (COMPRESSION sans ENGINE : moteur block, compressé). Les contraintes d'une colonne sont
+        ses mots en majuscules (PRIMARY, KEY, NOT, NULL, UNIQUE, AUTO_INCREMENT...), sauf
+        DEFAULT constante qui donne {"DEFAULT": valeur}.
+        """
+        table_name = self.identifier("nom de table")
+        self.expect_op("(")
+        columns: List[Dict[str, Any]] = []
+        constraints: List[Dict[str, Any]] = []
+        table_keys: List[Tuple[List[str], List[str]]] = []  # (colonnes, mots ajoutés à leurs contraintes)
+        while True:
+            if self.peek_word("CONSTRAINT", "FOREIGN"):
+                name = self.identifier("nom de contrainte") if self.accept_word("CONSTRAINT") else None
+                self.expect_word("FOREIGN")
+                self.expect_word("KEY")
+                entry = {"type": "FOREIGN_KEY", "name": name, "columns": self.identifiers()}
+                entry.update(self.references())
+                constraints.append(entry)
+            elif self.peek_word("PRIMARY") and self.peek_word("KEY", offset=1):
+                self.pos += 2
+                table_keys.append((self.identifiers(), ["PRIMARY", "KEY"]))
+            elif self.peek_word("UNIQUE") and self.pos + 1 < len(self.tokens) \
+                    and self.tokens[self.pos + 1][:2] == ("op", "("):
+                self.pos += 1
+                keys = self.identifiers()
+                if len(keys) > 1:
+                    raise SqlSyntaxError("Erreur: UNIQUE sur plusieurs colonnes non supporté.")
+                table_keys.append((keys, ["UNIQUE"]))
+            else:
+                columns.append(self.column_def(constraints))
+            if not self.accept("op", ","):
+                break
+        self.expect_op(")")
+        by_name = {c["name"]: c for c in columns}
+        for keys, words in table_keys:
+            for key in keys:
+                if key not in by_name:
+                    raise SqlSyntaxError(f"Erreur: colonne {key} inconnue dans {' '.join(words)}.")
+                cons = by_name[key]["constraints"]
+                cons.extend(w for w in words if w not in cons)
+        result = {
+            "action": "CREATE_TABLE",
+            "table_name": table_name,
+            "columns": columns,
+            "constraints": constraints
+        }
+        while self.pos < len(self.tokens):
+            if self.accept_word("ENGINE"):
+                self.accept("op", "=")
+                result["engine"] = self.identifier("moteur").lower()
+            elif self.accept_word("COMPRESSION"):
+                self.accept("op", "=")
+                result["compression"] = self.identifier("codec").lower()
+            else:
+                self.expect_word("PARTITION")
+                self.expect_word("BY")
+                result["partition_by"] = self.partition_by()
+        self.end()
+        return result
+
+    def partition_by(self) -> Dict[str, Any]:
+        """
+        HASH (colonne) PARTITIONS n
+        RANGE (colonne) (PARTITION nom VALUES LESS THAN (valeur) | MAXVALUE, ...)
+        """
+        method = self.expect_word("HASH", "RANGE")
+        self.expect_op("(")
+        column = self.identifier("colonne de partitionnement")
+        self.expect_op(")")
+        if method == "HASH":
+            self.expect_word("PARTITIONS")
+            return {"type": "HASH", "column": column, "partitions": self.integer()}
+        self.expect_op("(")
+        partitions: List[Dict[str, Any]] = []
+        while True:
+            self.expect_word("PARTITION")
+            name = self.identifier("nom de partition")
+            self.expect_word("VALUES")
+            self.expect_word("LESS")
+            self.expect_word("THAN")
+            grouped = self.accept("op", "(")
+            bound = None if self.accept_word("MAXVALUE") else self.constant()
+            if grouped:
+                self.expect_op(")")
+            partitions.append({"name": name, "less_than": bound})
+            if not self.accept("op", ","):
+                break
+        self.expect_op(")")
+        return {"type": "RANGE", "column": column, "partitions": partitions}
+
+    def column_def(self, constraints: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """colonne type[(n, ...)] [contraintes] ; un REFERENCES va dans `constraints`."""
+        name = self.identifier("nom de colonne")
+        col_type = self.identifier("type")
+        if self.accept("op", "("):
+            args = []
+            while True:
+                start = self.pos
+                self.constant()
+                args.append(self.text(start, self.pos))
+                if not self.accept("op", ","):
+                    break
+            self.expect_op(")")
+            col_type = f"{col_type}({','.join(args)})"
+        cons: List[Any] = []
+        while self.pos < len(self.tokens) and not (self.peek("op", ",") or self.peek("op", ")")):
+            if self.peek_word("REFERENCES"):
+                entry = {"type": "FOREIGN_KEY", "columns": [name]}
+                entry.update(self.references())
+                constraints.append(entry)
+            elif self.accept_word("DEFAULT"):
+                if self.peek("name"):  # DEFAULT CURRENT_TIMESTAMP... : gardé en mots
+                    cons.extend(["DEFAULT", self.identifier().upper()])
+                else:
+                    cons.append({"DEFAULT": self.constant()})
+            elif self.peek("op", "("):  # CHECK (...) : le groupe est gardé tel quel
+                start, depth = self.pos, 0
+                while self.pos < len(self.tokens):
+                    depth += {"(": 1, ")": -1}.get(self.tokens[self.pos][1], 0) if self.tokens[self.pos][0] == "op" else 0
+                    self.pos += 1
+                    if depth == 0:
+                        break
+                cons.append(self.text(start, self.pos).upper())
+            else:
+                cons.append(self.text(self.pos, self.pos + 1).upper())
+                self.pos += 1
+        return {"name": name, "type": col_type, "constraints": cons}
+
+    def references(self) -> Dict[str, Any]:
+        """REFERENCES table (colonnes) [ON DELETE action] [ON UPDATE action]"""
+        self.expect_word("REFERENCES")
+        entry: Dict[str, Any] = {"referenced_table": self.identifier("nom de table"),
+                                 "referenced_columns": self.identifiers()}
+        while self.accept_word("ON"):
+            event = self.expect_word("DELETE", "UPDATE")
+            action = self.expect_word(*_FK_ACTIONS)
+            if action == "SET":
+                self.expect("kw", "NULL")
+                action = "SET_NULL"
+            elif action == "NO":
+                self.expect_word("ACTION")
+                action = "NO_ACTION"
+            entry[f"on_{event.lower()}"] = action
+        return entry
+
+    def parse_create_database(self) -> Dict[str, Any]:
+        """CREATE DATABASE [IF NOT EXISTS] nom"""
+        if_not_exists = self.if_exists(negated=True)
+        db_name = self.identifier("nom de base")
+        self.end()
+        return {
+            "action": "CREATE_DATABASE",
+            "database_name": db_name,
+            "if_not_exists": if_not_exists
+        }
 
-    condition = where_clause_str.strip() if where_clause_str else None
+    def parse_create_index(self) -> Dict[str, Any]:
+        """CREATE INDEX [IF NOT EXISTS] nom ON table (col, ...)"""
+        if_not_exists = self.if_exists(negated=True)
+        index_name = self.identifier("nom d'index")
+        self.expect_word("ON")
+        table_name = self.identifier("nom de table")
+        columns = self.identifiers()
+        self.end()
+        return {
+            "action": "CREATE_INDEX",
+            "index_name": index_name,
+            "table_name": table_name,
+            "columns": columns,
+            "if_not_exists": if_not_exists
+        }
 
-    return {
-        "action": "UPDATE",
-        "table_name": table_name,
-        "assignments": assignments,  # Dictionnaire {colonne: nouvelle_valeur}
-        "condition": condition
-    }
+    def parse_drop(self) -> Dict[str, Any]:
+        """
+        DROP DATABASE [IF EXISTS] nom
+        DROP TABLE [IF EXISTS] [base.]table
+        DROP INDEX [IF EXISTS] nom [ON table]
+        """
+        kind = self.expect_word("DATABASE", "TABLE", "INDEX")
+        self.statement = f"DROP {kind}"
+        if_exists = self.if_exists(negated=False)
+        if kind == "INDEX":
+            index_name = self.identifier("nom d'index")
+            table_name = self.identifier("nom de table") if self.accept_word("ON") else None
+            self.end()
+            return {
+                "action": "DROP_INDEX",
+                "index_name": index_name,
+                "table_name": table_name,
+                "if_exists": if_exists
+            }
+        name = self.string("nom") if self.peek("lit") else self.identifier("nom")
+        if kind == "DATABASE":
+            self.end()
+            return {
+                "action": "DROP_DATABASE",
+                "database_name": name,
+                "if_exists": if_exists}
+        db = None
+        if self.accept("op", "."):
+            db, name = name, self.identifier("nom de table")
+        elif "." in name:  # 'base.table' entre quotes
+            db, name = name.split(".", 1)
+        self.end()
+        return {
+            "action": "DROP_TABLE",
+            "table_name": name, "database": db,
+            "if_exists": if_exists}
+
+    def parse_select(self) -> Dict[str, Any]:
+        """SELECT * | col1, col2 FROM table [WHERE condition] [LIMIT n [OFFSET m]]"""
+        if self.accept("op", "*"):
+            columns = ["*"]
+        else:
+            columns = [self.identifier("nom de colonne ou *")]
+            while self.accept("op", ","):
+                columns.append(self.identifier("nom de colonne"))
+        self.expect_word("FROM")
+        table_name = self.identifier("nom de table")
+        condition, where = self.where()
+        limit, offset = None, 0
+        if self.accept_word("LIMIT"):
+            limit = self.integer()
+            if self.accept_word("OFFSET"):
+                offset = self.integer()
+        self.end()
+        return {
+            "action": "SELECT",
+            "table_name": table_name,
+            "columns": columns,
+            "condition": condition,
+            "where": where,
+            "limit": limit,
+            "offset": offset,
+        }
 
-def parse_cmd(query, tokens):
-    action = tokens[0].upper()
+    def parse_insert(self) -> Dict[str, Any]:
+        """INSERT INTO table [(col, ...)] VALUES (valeur, ...)[, (valeur, ...)]..."""
+        self.expect_word("INTO")
+        table_name = self.identifier("nom de table")
+        columns = self.identifiers() if self.peek("op", "(") else None
+        self.expect_word("VALUES")
+        rows = [self.values_row()]
+        while self.accept("op", ","):
+            rows.append(self.values_row())
+        self.end()
+        width = len(columns) if columns else len(rows[0])
+        if any(len(values) != width for values in rows):
+            raise SqlSyntaxError("Erreur: Le nombre de colonnes et de valeurs ne correspond pas.")
+        return {
+            "action": "INSERT",
+            "table_name": table_name,
+            "columns": columns,
+            "values": rows[0],
+            "rows": rows,
+            "typed": True
+        }
 
-    if len(tokens) == 2:
+    def parse_update(self) -> Dict[str, Any]:
+        """UPDATE table SET col = valeur, ... [WHERE condition]"""
+        table_name = self.identifier("nom de table")
+        self.expect_word("SET")
+        assignments = {}
+        while True:
+            column = self.identifier("nom de colonne")
+            self.expect_op("=")
+            assignments[column] = self.value()
+            if not self.accept("op", ","):
+                break
+        condition, where = self.where()
+        self.end()
         return {
-            'action': action,
-            'argument' : query.split()[1].strip(';')
+            "action": "UPDATE",
+            "table_name": table_name,
+            "assignments": assignments,  # Dictionnaire {colonne: nouvelle_valeur}
+            "condition": condition,
+            "where": where,
+            "typed": True
         }
-    if len(tokens) == 1:
+
+    def parse_delete(self) -> Dict[str, Any]:
+        """DELETE FROM table [WHERE condition]"""
+        self.expect_word("FROM")
+        table_name = self.identifier("nom de table")
+        condition, where = self.where()
+        self.end()
         return {
-            'action': action
+            "action": "DELETE",
+            "table_name": table_name,
+            "condition": condition,  # La chaîne de condition (ex: "age > 30")
+            "where": where
         }
-    return None
 
-def parse_drop(query, tokens):
+    def parse_transaction(self) -> Dict[str, Any]:
+        """BEGIN [TRANSACTION | WORK] / START TRANSACTION / COMMIT [WORK] / ROLLBACK [WORK]"""
+        word = self.statement
+        if word == "START":
+            self.expect_word("TRANSACTION")
+        elif word == "BEGIN":
+            self.accept_word("TRANSACTION", "WORK")
+        else:
+            self.accept_word("WORK")
+        self.end()
+        return {"action": "BEGIN" if word == "START" else word}
+
+    def parse_prepare(self) -> Dict[str, Any]:
+        """PREPARE nom AS (SELECT | INSERT | UPDATE | DELETE) ... avec des ? à la place des valeurs"""
+        name = self.identifier("nom de l'ordre")
+        self.expect_word("AS")
+        start = self.pos
+        self.statement = self.expect_word("SELECT", "INSERT", "UPDATE", "DELETE")
+        statement = _STATEMENTS[self.statement](self)
+        return {"action": "PREPARE", "name": name, "statement": statement, "query": self.text(start, self.pos)}
+
+    def parse_execute(self) -> Dict[str, Any]:
+        """EXECUTE nom [(valeur, ...)]   une valeur par ?, dans l'ordre du texte"""
+        name = self.identifier("nom de l'ordre")
+        values = []
+        if self.accept("op", "("):
+            if not self.accept("op", ")"):
+                values.append(self.constant())
+                while self.accept("op", ","):
+                    values.append(self.constant())
+                self.expect_op(")")
+        self.end()
+        return {"action": "EXECUTE", "name": name, "values": values}
+
+    def parse_deallocate(self) -> Dict[str, Any]:
+        """DEALLOCATE [PREPARE] nom | ALL"""
+        if self.peek_word("PREPARE") and self.pos + 1 < len(self.tokens):
+            self.pos += 1
+        name = self.identifier("nom de l'ordre ou ALL")
+        self.end()
+        return {"action": "DEALLOCATE", "name": None if name.upper() == "ALL" else name}
+
+    def parse_vacuum(self) -> Dict[str, Any]:
+        """VACUUM [table]   sans table : toutes les tables de la base courante"""
+        table_name = self.identifier("nom de table") if self.pos < len(self.tokens) else None
+        self.end()
+        return {"action": "VACUUM", "table_name": table_name}
+
+    def parse_copy(self) -> Dict[str, Any]:
+        """
+        COPY table [(col, ...)] FROM 'fichier' [WITH (FORMAT CSV|JSONL, HEADER [true|false], DELIMITER ';', CHUNK_SIZE n)]
+        """
+        table_name = self.identifier("nom de table")
+        columns = self.identifiers() if self.peek("op", "(") else None
+        self.expect_word("FROM")
+        if self.peek("lit"):
+            source = self.string("nom de fichier")
+        else:  # chemin sans quotes : tout jusqu'à WITH
+            start = self.pos
+            while self.pos < len(self.tokens) and not self.peek_word("WITH"):
+                self.pos += 1
+            if start == self.pos:
+                raise self.error("nom de fichier")
+            source = self.text(start, self.pos)
+        parsed = {
+            "action": "COPY",
+            "table_name": table_name,
+            "columns": columns,
+            "file": source,
+        }
+        if self.accept_word("WITH"):
+            self.expect_op("(")
+            while not self.peek("op", ")"):
+                key = self.text(self.pos, self.pos + 1).upper()
+                self.identifier("option")
+                self.accept("op", "=")
+                val = None
+                if not (self.peek("op", ",") or self.peek("op", ")")):
+                    start = self.pos
+                    val = self.constant()
+                    if not isinstance(val, str) or self.tokens[start][0] != "lit":
+                        val = self.text(start, self.pos)  # nombre, TRUE, mot : texte d'origine
+                if key == "FORMAT":
+                    parsed["format"] = (val or "").lower()
+                elif key == "HEADER":
+                    parsed["header"] = (val or "TRUE").upper() in ("TRUE", "ON", "1", "YES")
+                elif key == "DELIMITER":
+                    parsed["delimiter"] = "\t" if val in ("\\t", "TAB") else val
+                elif key in ("CHUNK_SIZE", "BATCH_SIZE"):
+                    parsed["chunk_size"] = val
+                else:
+                    raise SqlSyntaxError(f"Option COPY inconnue : {key}")
+                if not self.accept("op", ","):
+                    break
+            self.expect_op(")")
+        self.end()
+        return parsed
+
+    def parse_load(self) -> Dict[str, Any]:
+        """
+        LOAD DATA [LOCAL] INFILE 'fichier' INTO TABLE table [FIELDS TERMINATED BY ';'] [IGNORE 1 LINES]
+        (équivalent à COPY table FROM 'fichier')
+        """
+        self.expect_word("DATA")
+        self.accept_word("LOCAL")
+        self.expect_word("INFILE")
+        source = self.string("nom de fichier")
+        self.expect_word("INTO")
+        self.expect_word("TABLE")
+        parsed = {
+            "action": "COPY",
+            "table_name": self.identifier("nom de table"),
+            "columns": None,
+            "file": source,
+            "header": False,
+        }
+        if self.accept_word("FIELDS"):
+            self.expect_word("TERMINATED")
+            self.expect_word("BY")
+            parsed["delimiter"] = self.string("séparateur").replace("\\t", "\t")
+        if self.accept_word("IGNORE"):
+            if self.integer() != 1:
+                self.pos -= 1
+                raise self.error("1")
+            self.expect_word("LINES", "ROWS")
+            parsed["header"] = True
+        self.end()
+        return parsed
+
+
+_STATEMENTS: Dict[str, Callable[[StatementParser], Dict[str, Any]]] = {
+    "CREATE": StatementParser.parse_create,
+    "DROP": StatementParser.parse_drop,
+    "SELECT": StatementParser.parse_select,
+    "INSERT": StatementParser.parse_insert,
+    "UPDATE": StatementParser.parse_update,
+    "DELETE": StatementParser.parse_delete,
+    "BEGIN": StatementParser.parse_transaction,
+    "START": StatementParser.parse_transaction,
+    "COMMIT": StatementParser.parse_transaction,
+    "ROLLBACK": StatementParser.parse_transaction,
+    "PREPARE": StatementParser.parse_prepare,
+    "EXECUTE": StatementParser.parse_execute,
+    "DEALLOCATE": StatementParser.parse_deallocate,
+    "COPY": StatementParser.parse_copy,
+    "LOAD": StatementParser.parse_load,
+    "VACUUM": StatementParser.parse_vacuum,
+}
+
+
+def benchmark(rows: int = 1000, columns: int = 200, repeat: int = 20) -> Dict[str, Dict[str, float]]:
     """
-    Supporte:
-      - DROP DATABASE [IF EXISTS] name
-      - DROP TABLE [IF EXISTS] [db.]table
-    Retourne dict minimal ou None si non reconnu.
+    Débit du parser (sans cache) sur un INSERT de `rows` lignes et un CREATE TABLE de
+    `columns` colonnes : ordres par seconde et Mo/s (python main.py --bench-parser).
     """
-    m = re.match(
-        r"DROP\s+(DATABASE|TABLE)\s+(IF\s+EXISTS\s+)?(`[^`]+`|'[^']+'|\"[^\"]+\"|[\w\.]+)\s*;?$",
-        query, re.IGNORECASE
-    )
-    if not m:
-        return None
-    kind = m.group(1).upper()
-    if_exists = bool(m.group(2))
-    name = m.group(3)
-    if name and (name[0] == name[-1]) and name[0] in ("'", '"', '`'):
-        name = name[1:-1]
-
-    if kind == "DATABASE":
-        return {
-            "action": "DROP_DATABASE",
-              "database_name": name, 
-              "if_exists": if_exists}
-    # TABLE (possibilité db.table)
-    if "." in name:
-        db, tbl = name.split(".", 1)
-    else:
-        db, tbl = None, name
-    return {
-        "action": "DROP_TABLE", 
-        "table_name": tbl, "database": db, 
-        "if_exists": if_exists}
+    insert = "INSERT INTO bench (id, name, score, active, note) VALUES " + ", ".join(
+        f"({i}, 'name {i}', {i * 0.5}, {'TRUE' if i % 2 else 'FALSE'}, {'NULL' if i % 3 else repr(f'it s {i}')})"
+        for i in range(rows))
+    create = "CREATE TABLE wide (id INT PRIMARY KEY AUTO_INCREMENT, " + ", ".join(
+        f"c{i} {('INT NOT NULL', 'VARCHAR(64) DEFAULT ' + repr(str(i)), 'FLOAT', 'TEXT UNIQUE')[i % 4]}"
+        for i in range(columns)) + ") ENGINE=LOG"
+    report = {}
+    for label, query in (("insert", insert), ("create_table", create)):
+        if parse_query(query) is None:
+            raise ValueError(f"benchmark query rejected: {label}")
+        start = time.perf_counter()
+        for _ in range(repeat):
+            parse_query(query)
+        elapsed = (time.perf_counter() - start) / repeat
+        report[label] = {"bytes": len(query), "ms": round(elapsed * 1000, 3),
+                         "statements_per_s": round(1 / elapsed, 1),
+                         "mb_per_s": round(len(query) / elapsed / 1e6, 2)}
+    report["insert"]["rows_per_s"] = round(rows * report["insert"]["statements_per_s"])
+    return report
@@ -0,0 +1,223 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.models import autovacuum
+from src.models.expression import Params, Predicate, count_params
+from src.models.table import Table
+from src.parser import parser
+from src.session import current_session
+from src.usefonctions import get_current_db
+
+# Ordres préparés : PREPARE nom AS ... / EXECUTE nom(...) / DEALLOCATE nom en SQL, et
+# prepare("INSERT ... VALUES (?, ?)").execute(1, "a") depuis python. Le texte est analysé
+# et vérifié contre le schéma, son WHERE compilé, une seule fois ; chaque exécution ne fait
+# que poser les valeurs (déjà python : aucune chaîne à construire ni à relire) dans une
+# copie de l'ordre et dans les ? du prédicat. Les écritures passent par la même note du
+# compacteur de fond (autovacuum.note_result) que celles de executor.
+
+
+class PrepareError(ValueError):
+    """Ordre impossible à préparer (syntaxe, table ou colonne inconnue, nombre de valeurs)."""
+
+
+class PreparedStatement:
+    """
+    Ordre SELECT / INSERT / UPDATE / DELETE analysé une fois, dont les ? reçoivent les
+    valeurs de chaque exécution, dans l'ordre du texte. Il reste attaché à la base
+    courante au moment de sa préparation. Ses exécutions se suivent (une à la fois) :
+    les ? du prédicat compilé sont partagés.
+    """
+
+    def __init__(self, parsed: Dict[str, Any], name: Optional[str] = None, db_name: Optional[str] = None):
+        self.name = name
+        self.action = parsed["action"]
+        self.table_name = parsed.get("table_name")
+        self.db_name = db_name or get_current_db()
+        self._parsed = parsed
+        self._rows: List[List[Any]] = []
+        self._row_slots: List[Tuple[int, int, int]] = []   # (ligne, colonne, n° du ?)
+        self._assignments: Dict[str, Any] = {}
+        self._assignment_slots: Dict[str, int] = {}
+        count = 0
+        convert = Table._converter(parsed)  # constantes : converties une fois
+        if self.action == "INSERT":
+            for i, parsed_row in enumerate(parsed.get("rows") or [parsed.get("values") or []]):
+                row = []
+                for j, value in enumerate(parsed_row):
+                    if isinstance(value, dict):  # ? : {"op": "param", "index": n}
+                        self._row_slots.append((i, j, value["index"]))
+                        count += 1
+                        row.append(None)
+                    else:
+                        row.append(convert(value))
+                self._rows.append(row)
+        if self.action == "UPDATE":
+            for column, value in (parsed.get("assignments") or {}).items():
+                if isinstance(value, dict):
+                    self._assignment_slots[column] = value["index"]
+                    count += 1
+                    self._assignments[column] = None
+                else:
+                    self._assignments[column] = convert(value)
+        # les ? sont numérotés dans l'ordre du texte, SET et WHERE compris
+        self.params = count + count_params(parsed.get("where"))
+        self._where_params = Params(self.params)
+        self._predicate: Optional[Predicate] = None   # WHERE compilé par check()
+        self._lock = threading.Lock()
+
+    def check(self) -> Optional[str]:
+        """Vérifie l'ordre contre le schéma de la table et compile son WHERE ; retourne l'erreur ou None."""
+        if not self.db_name:
+            return "no_database_selected"
+        schema = Table.describe_table(self.table_name, db_name=self.db_name)
+        if not schema or isinstance(schema, dict) and schema.get("error"):
+            return "table_not_found"
+        known = {c["name"] for c in schema.get("columns", [])}
+        validator = Table._validator(Path.cwd() / "Data", self.db_name, self.table_name, schema)
+        if self.action == "INSERT":
+            columns = self._parsed.get("columns") or [c["name"] for c in schema.get("columns", [])]
+            unknown = [c for c in columns if c not in known]
+            if unknown:
+                return f"unknown column {unknown[0]}"
+            if any(len(row) != len(columns) for row in self._rows):
+                return "columns_values_mismatch"
+        if self.action == "UPDATE":
+            unknown = [c for c in self._assignments if c not in known]
+            if unknown:
+                return f"unknown column {unknown[0]}"
+        if self.action == "SELECT":
+            unknown = [c for c in self._parsed.get("columns") or [] if c != "*" and c not in known]
+            if unknown:
+                return f"unknown column {unknown[0]}"
+        # colonnes et opérateurs du WHERE vérifiés ; prédicat gardé pour toutes les exécutions
+        self._predicate, err = Table._where(self._parsed.get("where"), validator, self._where_params)
+        return err
+
+    def bind(self, values: Sequence[Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Ordre prêt pour Table, valeurs (python) posées, WHERE compilé compris (à appeler
+        sous self._lock : les ? du prédicat sont posés ici). Retourne (ordre, erreur).
+        """
+        if len(values) != self.params:
+            return None, f"expected {self.params} values, got {len(values)}"
+        if self._predicate is None:
+            err = self.check()
+            if err:
+                return None, err
+        parsed = dict(self._parsed, typed=True)
+        if self.action == "INSERT":
+            rows = [list(row) for row in self._rows]
+            for i, j, k in self._row_slots:
+                rows[i][j] = values[k]
+            parsed["rows"], parsed["values"] = rows, rows[0]
+        if self.action == "UPDATE":
+            assignments = dict(self._assignments)
+            for column, k in self._assignment_slots.items():
+                assignments[column] = values[k]
+            parsed["assignments"] = assignments
+        if self._predicate is not None:
+            self._where_params.set(values)
+            parsed["predicate"] = self._predicate.bound(self._where_params)
+        return parsed, None
+
+    def execute(self, *values: Any) -> Dict[str, Any]:
+        """Exécute l'ordre avec une valeur python par ? (API embarquée)."""
+        with self._lock:
+            parsed, err = self.bind(values)
+            if err:
+                return {"error": "bad_parameters", "detail": err}
+            if self.action == "SELECT":
+                return Table.select(parsed, db_name=self.db_name)
+            if self.action == "INSERT":
+                if len(parsed["rows"]) > 1:
+                    result = Table.insert_many(parsed, db_name=self.db_name)
+                    result.pop("rows", None)
+                else:
+                    result = Table.insert(parsed, db_name=self.db_name)
+            elif self.action == "UPDATE":
+                result = Table.update(parsed, db_name=self.db_name)
+            else:
+                result = Table.delete(parsed, db_name=self.db_name)
+        return autovacuum.note_result(self.table_name, result, self.db_name)
+
+    def execute_many(self, rows: Sequence[Sequence[Any]]) -> Dict[str, Any]:
+        """
+        INSERT préparé exécuté pour chaque jeu de valeurs, en un seul lot : une seule
+        validation et une seule écriture (un seul fsync) pour tout le lot, comme un
+        INSERT ... VALUES (...), (...). Les autres ordres sont exécutés un par un.
+        """
+        if self.action != "INSERT":
+            return {"results": [self.execute(*values) for values in rows]}
+        batch: List[List[Any]] = []
+        parsed: Optional[Dict[str, Any]] = None
+        with self._lock:
+            for values in rows:
+                parsed, err = self.bind(values)
+                if err:
+                    return {"inserted": False, "error": "bad_parameters", "detail": err}
+                batch.extend(parsed["rows"])
+        if parsed is None:
+            return {"inserted": True, "count": 0}
+        parsed["rows"], parsed["values"] = batch, batch[0]
+        result = Table.insert_many(parsed, db_name=self.db_name)
+        result.pop("rows", None)
+        return autovacuum.note_result(self.table_name, result, self.db_name)
+
+
+def prepare(query: str, db_name: Optional[str] = None) -> PreparedStatement:
+    """
+    Prépare un ordre avec des ? (API embarquée) :
+        insert = prepare("INSERT INTO users (id, name) VALUES (?, ?)")
+        insert.execute(1, "alice")
+    Lève PrepareError si l'ordre est invalide ou ne correspond pas au schéma.
+    """
+    parsed = parser(query)
+    if not parsed or parsed.get("action") not in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        raise PrepareError("expected a SELECT, INSERT, UPDATE or DELETE statement")
+    statement = PreparedStatement(parsed, db_name=db_name)
+    err = statement.check()
+    if err:
+        raise PrepareError(err)
+    return statement
+
+
+# ordres nommés (PREPARE) de la ligne de commande ; chaque connexion du serveur a les siens
+_statements: Dict[str, PreparedStatement] = {}
+
+
+def _registry() -> Dict[str, PreparedStatement]:
+    session = current_session()
+    return session.prepared if session is not None else _statements
+
+
+def prepare_statement(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """PREPARE nom AS ... : l'ordre est vérifié puis gardé sous son nom (remplace le précédent)."""
+    name = parsed.get("name")
+    statement = PreparedStatement(parsed["statement"], name=name)
+    err = statement.check()
+    if err:
+        return {"prepared": False, "name": name, "error": err}
+    _registry()[name.lower()] = statement
+    return {"prepared": True, "name": name, "params": statement.params}
+
+
+def execute_statement(parsed: Dict[str, Any]) -> Dict[str, Any]:
+    """EXECUTE nom(valeurs) : les valeurs (déjà python) sont posées sur les ?."""
+    name = parsed.get("name") or ""
+    statement = _registry().get(name.lower())
+    if statement is None:
+        return {"error": "prepared_statement_not_found", "name": name}
+    return statement.execute(*(parsed.get("values") or []))
+
+
+def deallocate(name: Optional[str]) -> Dict[str, Any]:
+    """DEALLOCATE nom (ou ALL : name None)."""
+    registry = _registry()
+    if name is None:
+        count = len(registry)
+        registry.clear()
+        return {"deallocated": True, "count": count}
+    if registry.pop(name.lower(), None) is None:
+        return {"deallocated": False, "error": "prepared_statement_not_found", "name": name}
+    return {"deallocated": True, "name": name}
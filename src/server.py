@@ -0,0 +1,151 @@
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# ajoute la racine du projet au PYTHONPATH (python src/server.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.executor import executor
+from src.parse_cache import get_parse_cache
+from src.parser import parser
+from src.session import Session, activate
+from src.storage.wal import recover_databases
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5544
+DEFAULT_THREADS = 32     # ordres exécutés en même temps (accès disque, verrous)
+DEFAULT_PIPELINE = 128   # requêtes lues d'avance par connexion avant de suspendre la lecture
+DEFAULT_MAX_LINE = 16 * 1024 * 1024  # taille maximale d'une requête (INSERT multi-lignes)
+
+
+def _execute(session: Session, query: str) -> str:
+    """Exécute un ordre pour la session (thread du pool) ; retourne la réponse JSON sur une ligne."""
+    with activate(session):
+        try:
+            result = executor(parser(query))
+        except Exception as e:
+            result = {"error": "exception", "detail": str(e)}
+    return json.dumps(result, ensure_ascii=False, default=str)
+
+
+def _close_session(session: Session) -> None:
+    """Connexion fermée avec une transaction ouverte : elle est annulée."""
+    if session.transaction is not None:
+        with activate(session):
+            executor({"action": "ROLLBACK"})
+
+
+class Server:
+    """
+    Serveur TCP asyncio : une requête = une ligne (un ordre SQL), une réponse = une ligne
+    JSON (le résultat d'executor), dans l'ordre des requêtes. Chaque connexion a sa
+    session (base courante, transaction). Un client peut envoyer plusieurs requêtes sans
+    attendre les réponses (pipelining) : elles sont lues pendant que la précédente
+    s'exécute, puis exécutées une à une. Les ordres (bloquants : disque, verrous)
+    tournent dans un pool de threads borné ; la boucle ne fait que lire et écrire.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 threads: Optional[int] = None, pipeline: Optional[int] = None):
+        self.host = host or os.environ.get("SGBD_SERVER_HOST", DEFAULT_HOST)
+        self.port = int(port if port is not None else os.environ.get("SGBD_SERVER_PORT", DEFAULT_PORT))
+        self.threads = int(threads or os.environ.get("SGBD_SERVER_THREADS", DEFAULT_THREADS))
+        self.pipeline = int(pipeline or os.environ.get("SGBD_SERVER_PIPELINE", DEFAULT_PIPELINE))
+        self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="sgbd-worker")
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.connections = 0
+        self.requests = 0
+
+    async def start(self) -> None:
+        limit = int(os.environ.get("SGBD_SERVER_MAX_LINE", DEFAULT_MAX_LINE))
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=limit)
+        # port effectif (port 0 : choisi par le système)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"connections": self.connections, "requests": self.requests, "threads": self.threads,
+                "parse_cache": get_parse_cache().stats()}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        session = Session()
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline)
+        self.connections += 1
+
+        async def read_requests() -> None:
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    query = line.decode("utf-8", errors="replace").strip()
+                    if not query:
+                        continue
+                    if query.rstrip(";").strip().upper() in ("EXIT", "QUIT"):
+                        break
+                    await pending.put(query)  # file pleine : la lecture attend (contre-pression)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                pass  # ligne trop longue ou connexion coupée : fin de session
+            finally:
+                await pending.put(None)
+
+        reading = asyncio.create_task(read_requests())
+        try:
+            while True:
+                query = await pending.get()
+                if query is None:
+                    break
+                response = await loop.run_in_executor(self._pool, _execute, session, query)
+                self.requests += 1
+                writer.write(response.encode("utf-8") + b"\n")
+                await writer.drain()  # client qui ne lit plus ses réponses : on l'attend
+        except ConnectionError:
+            pass
+        finally:
+            reading.cancel()
+            await loop.run_in_executor(self._pool, _close_session, session)
+            self.connections -= 1
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None) -> None:
+    """Lance le serveur (bloquant) après avoir rejoué les journaux laissés par un arrêt brutal."""
+    recover_databases(Path.cwd() / "Data")
+    server = Server(host, port)
+
+    async def run() -> None:
+        await server.start()
+        print(f"mini SGBD : serveur en écoute sur {server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        print("Arrêt du serveur.")
+
+
+if __name__ == "__main__":
+    serve(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,48 @@
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from src.models import transaction
+
+
+class Session:
+    """
+    État propre à une connexion du serveur : base courante, transaction en cours et
+    ordres préparés (PREPARE). Sans session active (CLI), la base courante est celle de
+    Data/.current_db.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, current_db: Optional[str] = None):
+        self.id = next(Session._ids)
+        self.current_db = current_db
+        self.transaction: Optional[transaction.Transaction] = None
+        self.prepared: Dict[str, Any] = {}  # nom (minuscules) -> prepared.PreparedStatement
+
+
+# session du thread qui exécute l'ordre en cours (posée par activate)
+_state = threading.local()
+
+
+def current_session() -> Optional[Session]:
+    return getattr(_state, "session", None)
+
+
+@contextmanager
+def activate(session: Session) -> Iterator[Session]:
+    """
+    Exécute des ordres pour le compte de la session sur le thread courant (un thread du
+    pool, pas forcément le même d'un ordre à l'autre) : base courante et transaction de
+    la session remplacent celles du thread le temps du bloc `with`.
+    """
+    previous = current_session()
+    previous_tx = transaction.current_transaction()
+    _state.session = session
+    transaction.set_transaction(session.transaction)
+    try:
+        yield session
+    finally:
+        session.transaction = transaction.current_transaction()
+        transaction.set_transaction(previous_tx)
+        _state.session = previous
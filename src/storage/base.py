@@ -0,0 +1,115 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def path_under(key: str, root: str) -> bool:
+    """
+    Le chemin (résolu) key est-il root lui-même ou un fichier sous le répertoire root ?
+    Pas un simple préfixe : Data/d2/... n'est pas sous Data/d.
+    """
+    return key == root or key.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class RowStorage:
+    """
+    Interface commune des formats de stockage d'une table.
+    Chaque ligne est identifiée par un rid (entier) stable tant que la ligne existe :
+    les index et les UPDATE/DELETE ciblent directement ce rid.
+    """
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        raise NotImplementedError
+
+    def committed(self) -> "RowStorage":
+        """Stockage validé, hors écritures d'une transaction en cours (lui-même par défaut)."""
+        return self
+
+    def stamp(self) -> Optional[str]:
+        """
+        Identifie l'état écrit sur disque : change à chaque écriture. Les index
+        enregistrent le stamp qu'ils couvrent pour détecter qu'ils sont périmés.
+        """
+        return None
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Itère sur (rid, ligne) pour toutes les lignes vivantes."""
+        raise NotImplementedError
+
+    def scan_batches(self) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        """Comme scan, par lots (une page pour un heap file) copiés d'un seul tenant."""
+        batch = list(self.scan())
+        if batch:
+            yield batch
+
+    def members(self) -> List["RowStorage"]:
+        """Stockages de fichier qui composent celui-ci (les partitions ouvertes d'une table partitionnée)."""
+        return [self]
+
+    def pruned(self, node: Optional[Dict[str, Any]]) -> "RowStorage":
+        """Stockage limité aux partitions qui peuvent contenir des lignes satisfaisant le WHERE (AST compilé)."""
+        return self
+
+    def placement_error(self, row: Dict[str, Any], rid: Optional[int] = None) -> Optional[str]:
+        """Pourquoi la ligne (nouvelle, ou remplaçant celle de rid) ne peut pas être écrite ; None si elle peut l'être."""
+        return None
+
+    def moves(self, row: Dict[str, Any], rid: int) -> bool:
+        """La ligne remplaçant celle de rid change-t-elle de partition (supprimée puis réinsérée, nouveau rid) ?"""
+        return False
+
+    def snapshot_changes(self) -> Set[int]:
+        """Rids modifiés depuis l'instantané de lecture (les index, à jour, peuvent ne plus les désigner)."""
+        return set()
+
+    def write_conflicts(self, rids: Iterable[int]) -> bool:
+        """Une des lignes a-t-elle été modifiée par une écriture invisible pour l'instantané ?"""
+        return False
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        raise NotImplementedError
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        return [self.insert(r) for r in rows]
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def delete(self, rid: int) -> bool:
+        raise NotImplementedError
+
+    def begin_write(self) -> None:
+        """Appelé avant chaque écriture (prise du verrou du WAL par LoggedStorage)."""
+        return None
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for _, row in self.scan():
+            yield row
+
+    def flush(self) -> None:
+        """Écrit sur disque ce qui est encore en mémoire (no-op par défaut)."""
+        return None
+
+    def dead_ratio(self) -> float:
+        """Part de lignes mortes (supprimées ou remplacées) dans le fichier : ce qu'un VACUUM rendrait."""
+        return 0.0
+
+    def vacuum(self) -> int:
+        """
+        Rend la place des lignes mortes, sans changer le rid des lignes vivantes.
+        Retourne le nombre d'octets rendus au système de fichiers (0 par défaut).
+        """
+        return 0
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,540 @@
+import json
+import math
+import os
+import struct
+import threading
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.storage.base import RowStorage, path_under
+
+try:
+    import lzma
+except ImportError:  # python compilé sans liblzma
+    lzma = None
+
+# Stockage compressé par blocs (ENGINE = block) : <table>.blk, fait pour les grosses tables
+# de texte. Les lignes sont regroupées en blocs d'environ SGBD_BLOCK_BYTES octets (JSON, noms
+# de colonnes une seule fois par bloc), compressés avec le codec de la table (zlib ou lzma).
+# Chaque bloc a son en-tête : la liste des blocs se lit sans rien décompresser, et une ligne
+# se lit en décompressant son seul bloc.
+#
+#   en-tête du fichier : magic, version, codec, schema_version, prochain rid
+#   puis des enregistrements ajoutés en fin de fichier, chacun : en-tête + données
+#     R  lignes first .. first+count-1 : {"c": [colonnes], "r": [[valeurs] | {ligne} | null, ...]}
+#     U  nouvelles valeurs : [[rid, {ligne}], ...]
+#     D  suppressions : [rid, ...]
+#
+# Le rid d'une ligne est son numéro d'insertion : il ne change jamais (compaction comprise).
+# Les petites insertions s'ajoutent en petits enregistrements R (la "queue") ; quand la queue
+# atteint la taille d'un bloc, elle est réécrite en un seul bloc compressé qui remplace les
+# enregistrements qu'il couvre (un R remplace tous les R précédents de premier rid >= first).
+# Les UPDATE et DELETE ajoutent un U ou un D, appliqués par-dessus les blocs à la lecture.
+# La compaction réécrit le fichier (fichier temporaire puis os.replace) : blocs intacts
+# recopiés tels quels, U et D repliés dans les autres, place des enregistrements remplacés
+# rendue. Elle est lancée par VACUUM, ou par le compacteur de fond quand cette place dépasse
+# le seuil (src/models/autovacuum.py) : jamais pendant une écriture.
+#
+# Un append interrompu laisse au plus un enregistrement partiel en fin de fichier (crc
+# faux ou longueur qui dépasse) : il est ignoré à la lecture et écrasé par l'écriture suivante.
+
+BLOCK_MAGIC = b"SGBDBLCK"
+BLOCK_VERSION = 1
+
+_FILE_HEADER = struct.Struct("<8sHBxIQ")   # magic, version, codec, schema_version, prochain rid
+_RECORD = struct.Struct("<BBHIQIII")      # kind, codec, réservé, count, first, raw_len, length, crc32
+
+KIND_ROWS = 1
+KIND_UPDATE = 2
+KIND_DELETE = 3
+
+CODECS = {"zlib": 1, "lzma": 2} if lzma is not None else {"zlib": 1}
+DEFAULT_CODEC = "zlib"
+_CODEC_NAMES = {v: k for k, v in CODECS.items()}
+
+DEFAULT_BLOCK_BYTES = 128 * 1024   # JSON d'un bloc avant compression (SGBD_BLOCK_BYTES)
+_MIN_COMPRESS = 256                # en dessous, un enregistrement est écrit tel quel
+_CACHED_BLOCKS = 8                 # blocs décompressés gardés pour les lectures par rid
+
+Row = Dict[str, Any]
+# bloc vivant : (premier rid, nombre de lignes, offset de l'enregistrement, taille totale, raw_len)
+Block = Tuple[int, int, int, int, int]
+
+
+class BlockError(ValueError):
+    """Fichier .blk illisible (en-tête inconnu, bloc corrompu) ou codec non disponible."""
+
+
+def block_bytes() -> int:
+    return int(os.environ.get("SGBD_BLOCK_BYTES", DEFAULT_BLOCK_BYTES))
+
+
+def _compress(codec: int, data: bytes) -> bytes:
+    if codec == 1:
+        return zlib.compress(data, 6)
+    if codec == 2 and lzma is not None:
+        return lzma.compress(data)
+    raise BlockError(f"unsupported codec {codec}")
+
+
+def _decompress(codec: int, data: bytes) -> bytes:
+    if codec == 0:
+        return data
+    if codec == 1:
+        return zlib.decompress(data)
+    if codec == 2 and lzma is not None:
+        return lzma.decompress(data)
+    raise BlockError(f"unsupported codec {codec}")
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _record(kind: int, codec: int, count: int, first: int, raw: bytes) -> bytes:
+    """Enregistrement complet ; compressé seulement si le codec y gagne."""
+    data = raw
+    if codec and len(raw) >= _MIN_COMPRESS:
+        data = _compress(codec, raw)
+        if len(data) >= len(raw):
+            data, codec = raw, 0
+    else:
+        codec = 0
+    return _RECORD.pack(kind, codec, 0, count, first, len(raw), len(data), zlib.crc32(data)) + data
+
+
+def _rows_payloads(rows: List[Optional[Row]], limit: int) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Découpe les lignes (None : rid sans ligne) en blocs d'au plus `limit` octets de JSON.
+    Donne (position de la première ligne, nombre de lignes, JSON du bloc).
+    """
+    columns = next((list(r) for r in rows if r is not None), [])
+    head = '{"c":' + _dumps(columns) + ',"r":['
+    parts: List[str] = []
+    size = start = 0
+    for n, row in enumerate(rows):
+        if row is None:
+            part = "null"
+        elif len(row) == len(columns) and list(row) == columns:
+            part = _dumps(list(row.values()))
+        else:
+            part = _dumps(row)
+        parts.append(part)
+        size += len(part) + 1
+        if size >= limit:
+            yield start, len(parts), (head + ",".join(parts) + "]}").encode("utf-8")
+            start, parts, size = n + 1, [], 0
+    if parts:
+        yield start, len(parts), (head + ",".join(parts) + "]}").encode("utf-8")
+
+
+def _decode_rows(raw: bytes) -> List[Optional[Row]]:
+    payload = json.loads(raw)
+    columns = payload["c"]
+    return [dict(zip(columns, r)) if isinstance(r, list) else r for r in payload["r"]]
+
+
+class _Directory:
+    """
+    Ce que les en-têtes d'un fichier .blk disent de lui (un par fichier et par inode, partagé
+    par les ouvertures du processus) : blocs vivants triés par rid, UPDATE et DELETE pas encore
+    repliés, place récupérable. Relu de façon incrémentale quand le fichier a grandi.
+    """
+
+    def __init__(self, ino: int, codec: int, schema_version: int, next_row: int):
+        self.ino = ino
+        self.codec = codec
+        self.schema_version = schema_version
+        self.next_row = next_row
+        self.size = _FILE_HEADER.size      # fin du dernier enregistrement valide
+        self.blocks: List[Block] = []
+        self.tail = 0                      # blocks[tail:] : petits blocs, à regrouper
+        self.updated: Dict[int, Row] = {}
+        self.deleted: Set[int] = set()
+        self.dead = 0                      # octets d'enregistrements remplacés
+        self.deltas = 0                    # octets des U et D
+        self.cache: "OrderedDict[int, List[Optional[Row]]]" = OrderedDict()
+        self.lock = threading.RLock()
+
+    def rows_bytes(self) -> int:
+        return sum(b[3] for b in self.blocks)
+
+    def rows_count(self) -> int:
+        return sum(b[1] for b in self.blocks)
+
+    def garbage(self) -> int:
+        """Octets qu'une compaction rendrait (lignes remplacées ou supprimées : taille moyenne estimée)."""
+        changed = len(self.updated) + len(self.deleted)
+        per_row = self.rows_bytes() / max(self.rows_count(), 1)
+        return self.dead + self.deltas + int(changed * per_row)
+
+    def find(self, rid: int) -> Optional[Block]:
+        i = bisect_right(self.blocks, (rid, math.inf))
+        if i == 0:
+            return None
+        block = self.blocks[i - 1]
+        return block if rid < block[0] + block[1] else None
+
+    def add(self, kind: int, count: int, first: int, raw_len: int, offset: int, length: int,
+            payload: Optional[bytes], limit: int) -> None:
+        """Prend en compte un enregistrement (payload : JSON décompressé des U et D)."""
+        if kind == KIND_ROWS:
+            # remplace les blocs de la queue qu'il couvre
+            while self.blocks and self.blocks[-1][0] >= first:
+                old = self.blocks.pop()
+                self.dead += old[3]
+                self.cache.pop(old[2], None)
+            self.blocks.append((first, count, offset, length, raw_len))
+            self.next_row = max(self.next_row, first + count)
+            self.tail = len(self.blocks) if raw_len >= limit else min(self.tail, len(self.blocks) - 1)
+        elif kind == KIND_UPDATE:
+            self.deltas += length
+            for rid, row in json.loads(payload):
+                self.updated[rid] = row
+        elif kind == KIND_DELETE:
+            self.deltas += length
+            for rid in json.loads(payload):
+                self.updated.pop(rid, None)
+                self.deleted.add(rid)
+
+
+_directories: Dict[str, _Directory] = {}
+_directories_lock = threading.Lock()
+
+
+def forget_blocks(path: str) -> None:
+    """Oublie les listes de blocs des fichiers sous le répertoire path (DROP DATABASE, renommage...)."""
+    root = str(Path(path).resolve())
+    with _directories_lock:
+        for k in [k for k in _directories if path_under(k, root)]:
+            del _directories[k]
+
+
+class BlockFile(RowStorage):
+    """
+    Table compressée par blocs (voir l'en-tête du module). Le codec (zlib, lzma) est choisi
+    à la création et écrit dans l'en-tête ; chaque enregistrement note le sien (un petit
+    enregistrement que la compression ne réduit pas est écrit tel quel).
+    """
+    _path: Path
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+        self._key = str(self._path.resolve())
+        with self._open():  # vérifie l'en-tête et lit la liste des blocs
+            pass
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @staticmethod
+    def create(path: Path, codec: str = DEFAULT_CODEC, schema_version: int = 1) -> "BlockFile":
+        """Crée le fichier vide (échoue s'il existe déjà). Lève BlockError si le codec n'est pas disponible."""
+        if codec not in CODECS:
+            raise BlockError(f"unsupported codec {codec}")
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "xb") as f:
+            f.write(_FILE_HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, CODECS[codec], schema_version, 0))
+        return BlockFile(path)
+
+    # --- liste des blocs ---
+
+    def _open(self) -> "_Opened":
+        return _Opened(self)
+
+    def _directory(self, fd: int) -> _Directory:
+        """Liste des blocs du fichier ouvert sur fd, relue si le fichier a été remplacé, complétée s'il a grandi."""
+        st = os.fstat(fd)
+        with _directories_lock:
+            d = _directories.get(self._key)
+            if d is None or d.ino != st.st_ino or st.st_size < d.size:
+                raw = os.pread(fd, _FILE_HEADER.size, 0)
+                if len(raw) < _FILE_HEADER.size:
+                    raise BlockError(f"{self._path.name}: truncated header")
+                magic, version, codec, schema_version, next_row = _FILE_HEADER.unpack(raw)
+                if magic != BLOCK_MAGIC or version > BLOCK_VERSION:
+                    raise BlockError(f"{self._path.name}: not a block file")
+                d = _directories[self._key] = _Directory(st.st_ino, codec, schema_version, next_row)
+        with d.lock:
+            if st.st_size > d.size:
+                self._read_records(fd, d, st.st_size)
+        return d
+
+    def _read_records(self, fd: int, d: _Directory, end: int) -> None:
+        limit = block_bytes()
+        pos = d.size
+        while pos + _RECORD.size <= end:
+            kind, codec, _, count, first, raw_len, length, crc = _RECORD.unpack(os.pread(fd, _RECORD.size, pos))
+            stop = pos + _RECORD.size + length
+            if kind not in (KIND_ROWS, KIND_UPDATE, KIND_DELETE) or stop > end:
+                break
+            payload = None
+            # les données d'un bloc ne sont lues que pour le dernier enregistrement (seul à
+            # pouvoir être partiel) ; celles des U et D le sont toujours
+            if kind != KIND_ROWS or stop == end:
+                data = os.pread(fd, length, pos + _RECORD.size)
+                if zlib.crc32(data) != crc:
+                    break
+                if kind != KIND_ROWS:
+                    payload = _decompress(codec, data)
+            d.add(kind, count, first, raw_len, pos, stop - pos, payload, limit)
+            pos = stop
+        d.size = pos
+
+    def _block_rows(self, fd: int, d: _Directory, block: Block) -> List[Optional[Row]]:
+        """Lignes d'un bloc (None : rid sans ligne), telles qu'écrites dans le bloc."""
+        rows = d.cache.get(block[2])
+        if rows is not None:
+            d.cache.move_to_end(block[2])
+            return rows
+        raw = os.pread(fd, block[3], block[2])
+        kind, codec, _, count, first, raw_len, length, crc = _RECORD.unpack_from(raw, 0)
+        data = raw[_RECORD.size:]
+        if zlib.crc32(data) != crc:
+            raise BlockError(f"{self._path.name}: corrupted block at offset {block[2]}")
+        rows = _decode_rows(_decompress(codec, data))
+        d.cache[block[2]] = rows
+        while len(d.cache) > _CACHED_BLOCKS:
+            d.cache.popitem(last=False)
+        return rows
+
+    def _append(self, fd: int, d: _Directory, records: List[Tuple[int, int, int, bytes]]) -> None:
+        """Écrit les enregistrements (kind, count, first, JSON) en un seul write, puis les ajoute à la liste."""
+        if not records:
+            return
+        encoded = [(kind, count, first, len(raw), _record(kind, d.codec, count, first, raw))
+                   for kind, count, first, raw in records]
+        if os.fstat(fd).st_size > d.size:
+            os.ftruncate(fd, d.size)  # enregistrement partiel d'un append interrompu
+        os.pwrite(fd, b"".join(r[4] for r in encoded), d.size)
+        limit = block_bytes()
+        pos = d.size
+        for (kind, count, first, raw_len, data), (_, _, _, raw) in zip(encoded, records):
+            d.add(kind, count, first, raw_len, pos, len(data), raw if kind != KIND_ROWS else None, limit)
+            pos += len(data)
+        d.size = pos
+
+    # --- RowStorage ---
+
+    @property
+    def codec(self) -> str:
+        with self._open() as (fd, d):
+            return _CODEC_NAMES.get(d.codec, str(d.codec))
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        with self._open() as (fd, d):
+            return d.schema_version
+
+    def stamp(self) -> Optional[str]:
+        # append-only entre deux compactions : la taille change à chaque écriture, l'inode à chaque compaction
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return f"{st.st_ino}:{st.st_size}"
+
+    def scan_batches(self) -> Iterator[List[Tuple[int, Row]]]:
+        # un lot par bloc ; le fd reste ouvert : une compaction pendant le scan ne le dérange pas
+        with self._open() as (fd, d):
+            blocks = list(d.blocks)
+            for block in blocks:
+                with d.lock:
+                    rows = self._block_rows(fd, d, block)
+                    updated, deleted = d.updated, d.deleted
+                    batch = [(rid, updated.get(rid, row)) for rid, row in enumerate(rows, block[0])
+                             if row is not None and rid not in deleted]
+                if batch:
+                    yield batch
+
+    def scan(self) -> Iterator[Tuple[int, Row]]:
+        for batch in self.scan_batches():
+            yield from batch
+
+    def read(self, rid: int) -> Optional[Row]:
+        with self._open() as (fd, d):
+            with d.lock:
+                return self._read(fd, d, rid)
+
+    def _read(self, fd: int, d: _Directory, rid: int) -> Optional[Row]:
+        if rid in d.deleted:
+            return None
+        block = d.find(rid)
+        if block is None:
+            return None
+        row = self._block_rows(fd, d, block)[rid - block[0]]
+        if row is None:
+            return None
+        return d.updated.get(rid, row)
+
+    def insert(self, row: Row) -> int:
+        return self.insert_many([row])[0]
+
+    def insert_many(self, rows: Iterable[Row]) -> List[int]:
+        rows = list(rows)
+        if not rows:
+            return []
+        limit = block_bytes()
+        with self._open() as (fd, d):
+            with d.lock:
+                first = d.next_row
+                pending: List[Optional[Row]] = rows
+                start = first
+                tail = d.blocks[d.tail:]
+                if tail and self._fills_block(rows, limit - sum(b[4] for b in tail)):
+                    # la queue atteint la taille d'un bloc : réécrite avec les nouvelles lignes
+                    start = tail[0][0]
+                    pending = [None] * (first - start)
+                    for b in tail:
+                        pending[b[0] - start:b[0] - start + b[1]] = self._block_rows(fd, d, b)
+                    pending.extend(rows)
+                self._append(fd, d, [(KIND_ROWS, count, start + n, raw)
+                                     for n, count, raw in _rows_payloads(pending, limit)])
+        return list(range(first, first + len(rows)))
+
+    @staticmethod
+    def _fills_block(rows: List[Row], room: int) -> bool:
+        """Le JSON des lignes dépasse-t-il `room` octets ? (s'arrête dès qu'il le dépasse)"""
+        for row in rows:
+            room -= len(_dumps(row)) + 1
+            if room <= 0:
+                return True
+        return False
+
+    def append(self, row: Row) -> None:
+        self.insert(row)
+
+    def update(self, rid: int, row: Row) -> bool:
+        with self._open() as (fd, d):
+            with d.lock:
+                if self._read(fd, d, rid) is None:
+                    return False
+                self._append(fd, d, [(KIND_UPDATE, 1, rid, _dumps([[rid, row]]).encode("utf-8"))])
+        return True
+
+    def delete(self, rid: int) -> bool:
+        with self._open() as (fd, d):
+            with d.lock:
+                if self._read(fd, d, rid) is None:
+                    return False
+                self._append(fd, d, [(KIND_DELETE, 1, rid, _dumps([rid]).encode("utf-8"))])
+        return True
+
+    # --- compaction ---
+
+    def stats(self) -> Dict[str, Any]:
+        """Taille du fichier, blocs, JSON avant compression et place récupérable (estimée) par une compaction."""
+        with self._open() as (fd, d):
+            with d.lock:
+                return {
+                    "codec": _CODEC_NAMES.get(d.codec, str(d.codec)),
+                    "bytes": d.size,
+                    "blocks": len(d.blocks),
+                    "raw_bytes": sum(b[4] for b in d.blocks),
+                    "garbage_bytes": d.garbage(),
+                }
+
+    def dead_ratio(self) -> float:
+        # place récupérable rapportée à la taille du fichier (estimée comme dans stats)
+        with self._open() as (fd, d):
+            with d.lock:
+                return min(d.garbage() / d.size, 1.0) if d.size > _FILE_HEADER.size else 0.0
+
+    def vacuum(self) -> int:
+        """
+        Réécrit le fichier sans la place perdue : U et D repliés dans leurs blocs, petits
+        blocs regroupés, blocs intacts recopiés sans les décompresser. Les rids ne changent
+        pas. Retourne le nombre d'octets rendus.
+        """
+        limit = block_bytes()
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        with self._open() as (fd, d):
+            with d.lock:
+                changed = sorted(set(d.updated) | d.deleted)
+                out = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+                try:
+                    pos = _FILE_HEADER.size
+                    os.pwrite(out, _FILE_HEADER.pack(BLOCK_MAGIC, BLOCK_VERSION, d.codec, d.schema_version,
+                                                     d.next_row), 0)
+                    pending: List[Optional[Row]] = []
+                    start = 0
+
+                    def write_pending(final: bool) -> int:
+                        # garde un reste plus petit qu'un bloc pour le regrouper avec la suite
+                        nonlocal pending, start
+                        written = 0
+                        chunks = list(_rows_payloads(pending, limit))
+                        keep = not final and chunks and len(chunks[-1][2]) < limit
+                        for n, count, raw in chunks[:-1] if keep else chunks:
+                            if any(r is not None for r in pending[n:n + count]):
+                                data = _record(KIND_ROWS, d.codec, count, start + n, raw)
+                                os.pwrite(out, data, pos + written)
+                                written += len(data)
+                        if keep:
+                            n = chunks[-1][0]
+                            pending, start = pending[n:], start + n
+                        else:
+                            pending = []
+                        return written
+
+                    for block in d.blocks:
+                        first, count, offset, length, raw_len = block
+                        touched = _any_between(changed, first, first + count)
+                        if pending and start + len(pending) != first:
+                            pos += write_pending(True)
+                        if not touched and raw_len >= limit and not pending:
+                            os.pwrite(out, os.pread(fd, length, offset), pos)
+                            pos += length
+                            continue
+                        if not pending:
+                            start = first
+                        for rid, row in enumerate(self._block_rows(fd, d, block), first):
+                            if row is not None and rid in d.deleted:
+                                row = None
+                            pending.append(d.updated.get(rid, row) if row is not None else None)
+                        pos += write_pending(False)
+                    if pending:
+                        pos += write_pending(True)
+                    os.fsync(out)
+                finally:
+                    os.close(out)
+                os.replace(tmp, self._path)
+                reclaimed = d.size - pos
+                with _directories_lock:
+                    if _directories.get(self._key) is d:
+                        del _directories[self._key]
+        return reclaimed
+
+    def close(self) -> None:
+        self.flush()
+
+
+def _any_between(values: List[int], low: int, high: int) -> bool:
+    """values (trié) a-t-il une valeur dans [low, high) ?"""
+    i = bisect_left(values, low)
+    return i < len(values) and values[i] < high
+
+
+class _Opened:
+    """with : descripteur du fichier et sa liste de blocs à jour ; le descripteur est fermé à la sortie."""
+
+    def __init__(self, storage: BlockFile):
+        self._storage = storage
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> Tuple[int, _Directory]:
+        self._fd = os.open(self._storage.path, os.O_RDWR)
+        try:
+            return self._fd, self._storage._directory(self._fd)
+        except BaseException:
+            os.close(self._fd)
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        os.close(self._fd)
+        return False
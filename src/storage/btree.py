@@ -0,0 +1,386 @@
+import json
+import struct
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.storage.bufferpool import BufferPool, PagedFile, get_buffer_pool
+
+BTREE_MAGIC = b"SGBDBTRE"
+BTREE_VERSION = 1
+
+# page 0 : en-tête du fichier, suivi du stamp du stockage couvert (octets utf-8)
+_FILE_HEADER = struct.Struct("<8sHIIIH")  # magic, version, page_size, root, page_count, stamp_len
+# pages de nœud : en-tête puis contenu JSON {"e": entrées} (feuille) ou {"e": séparateurs, "c": enfants}
+_NODE_HEADER = struct.Struct("<BII")      # is_leaf, next_leaf (0 = aucune), payload_len
+_MAX_STAMP = 256
+# pages plus petites que celles des heap files : un nœud est décodé en entier à chaque lecture
+BTREE_PAGE_SIZE = 4096
+
+# rang de type : ordre total entre valeurs hétérogènes (NULL < nombres < chaînes)
+_RANK_NULL = 0
+_RANK_NUMBER = 1
+_RANK_TEXT = 2
+
+
+def sort_key(values: Sequence[Any]) -> list:
+    """
+    Encode des valeurs de colonnes en une clé comparable : liste plate
+    [rang1, valeur1, rang2, valeur2, ...] (une seule liste JSON par entrée).
+    """
+    key: list = []
+    for v in values:
+        if v is None:
+            key += (_RANK_NULL, 0)
+        elif isinstance(v, (bool, int, float)):
+            key += (_RANK_NUMBER, v)
+        else:
+            key += (_RANK_TEXT, str(v))
+    return key
+
+
+def index_file(db_path: Path, table_name: str, index_name: str) -> Path:
+    return Path(db_path) / f"{table_name}.{index_name}.btree"
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _dumps(obj: Any) -> bytes:
+    return _ENCODER.encode(obj).encode("utf-8")
+
+
+class _Node:
+    __slots__ = ("page", "leaf", "next", "entries", "children", "size")
+
+    def __init__(self, page: int, leaf: bool, entries: list, children: Optional[List[int]] = None,
+                 next_leaf: int = 0, size: Optional[int] = None):
+        self.page = page
+        self.leaf = leaf
+        self.next = next_leaf
+        self.entries = entries
+        self.children = children or []
+        # taille encodée (majorant), tenue à jour sans ré-encoder le nœud à chaque modification
+        self.size = size if size is not None else self.measure()
+
+    def measure(self) -> int:
+        return 16 + sum(len(_dumps(e)) + 1 for e in self.entries) + sum(len(str(c)) + 1 for c in self.children)
+
+    def payload(self) -> bytes:
+        return _dumps({"e": self.entries} if self.leaf else {"e": self.entries, "c": self.children})
+
+
+class BTreeIndex:
+    """
+    Index secondaire B+tree sur disque : <table>.<index>.btree
+    - pages de taille fixe lues/écrites via le buffer pool partagé (comme les heap files)
+    - entrée = clé triable (sort_key des colonnes) + rid en dernier élément : les doublons
+      de clé sont ordonnés par rid, chaque entrée est donc unique
+    - feuilles chaînées (next_leaf) : recherche par égalité, par préfixe de colonnes
+      et par intervalle en un seul parcours
+    - un nœud qui dépasse la page est coupé en deux ; les suppressions ne fusionnent pas
+      les nœuds (une feuille peut rester peu remplie jusqu'à la prochaine reconstruction)
+    Comme les index de hachage, l'en-tête enregistre le stamp du stockage de la table
+    couvert par l'index : l'appelant reconstruit l'index (build) s'il est périmé.
+    """
+    _file: PagedFile
+    _pool: BufferPool
+    _columns: List[str]
+    _nodes: Dict[int, _Node]
+    _dirty: set
+
+    def __init__(self, path: Path, columns: Sequence[str], pool: Optional[BufferPool] = None):
+        self._pool = pool if pool is not None else get_buffer_pool()
+        self._columns = list(columns)
+        # nœuds déjà décodés pendant la durée de vie de l'objet (un ordre SQL) : évite de
+        # re-parser le JSON des pages à chaque descente ; les nœuds modifiés ne sont
+        # encodés qu'une fois, au flush, même s'ils ont reçu plusieurs entrées
+        self._nodes = {}
+        self._dirty = set()
+        path = Path(path)
+        with open(path, "rb") as f:
+            raw = f.read(_FILE_HEADER.size)
+        if len(raw) < _FILE_HEADER.size or _FILE_HEADER.unpack(raw)[0] != BTREE_MAGIC:
+            raise ValueError(f"index B+tree invalide: {path}")
+        self._file = PagedFile(path, _FILE_HEADER.unpack(raw)[2])
+
+    @staticmethod
+    def create(path: Path, columns: Sequence[str], page_size: int = BTREE_PAGE_SIZE,
+               pool: Optional[BufferPool] = None) -> "BTreeIndex":
+        """Crée (ou écrase) un index vide : une racine feuille en page 1."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # les pages d'un ancien fichier au même chemin ne doivent pas être réécrites
+        (pool if pool is not None else get_buffer_pool()).discard(str(path))
+        header = bytearray(page_size)
+        _FILE_HEADER.pack_into(header, 0, BTREE_MAGIC, BTREE_VERSION, page_size, 1, 2, 0)
+        with open(path, "wb") as f:
+            f.write(header)
+        idx = BTreeIndex(path, columns, pool)
+        idx._write(_Node(1, True, []))
+        idx.flush()
+        return idx
+
+    # --- en-tête ---
+
+    def _header(self) -> Tuple[bytes, int, int, int, int, int]:
+        with self._pool.page(self._file, 0) as buf:
+            return _FILE_HEADER.unpack_from(buf, 0)
+
+    def _set_header(self, field: int, value: int) -> None:
+        with self._pool.page(self._file, 0, write=True) as hdr:
+            fields = list(_FILE_HEADER.unpack_from(hdr, 0))
+            fields[field] = value
+            _FILE_HEADER.pack_into(hdr, 0, *fields)
+
+    @property
+    def path(self) -> Path:
+        return self._file.path
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def stamp(self) -> Optional[str]:
+        with self._pool.page(self._file, 0) as buf:
+            n = _FILE_HEADER.unpack_from(buf, 0)[5]
+            if not n:
+                return None
+            return bytes(buf[_FILE_HEADER.size:_FILE_HEADER.size + n]).decode("utf-8")
+
+    def _set_stamp(self, stamp: Optional[str]) -> None:
+        data = (stamp or "").encode("utf-8")[:_MAX_STAMP]
+        with self._pool.page(self._file, 0, write=True) as hdr:
+            fields = list(_FILE_HEADER.unpack_from(hdr, 0))
+            fields[5] = len(data)
+            _FILE_HEADER.pack_into(hdr, 0, *fields)
+            hdr[_FILE_HEADER.size:_FILE_HEADER.size + len(data)] = data
+
+    # --- nœuds ---
+
+    @property
+    def _capacity(self) -> int:
+        return self._file.page_size - _NODE_HEADER.size
+
+    def _read(self, page_no: int) -> _Node:
+        node = self._nodes.get(page_no)
+        if node is not None:
+            return node
+        with self._pool.page(self._file, page_no) as buf:
+            leaf, next_leaf, n = _NODE_HEADER.unpack_from(buf, 0)
+            obj = json.loads(bytes(buf[_NODE_HEADER.size:_NODE_HEADER.size + n]))
+        node = _Node(page_no, bool(leaf), obj["e"], obj.get("c"), next_leaf, size=n + 16)
+        self._nodes[page_no] = node
+        return node
+
+    def _write(self, node: _Node) -> None:
+        """Marque le nœud modifié ; il sera encodé dans sa page au prochain flush."""
+        self._nodes[node.page] = node
+        self._dirty.add(node.page)
+
+    def _write_back(self) -> None:
+        for page_no in sorted(self._dirty):
+            node = self._nodes[page_no]
+            payload = node.payload()
+            if len(payload) > self._capacity:
+                raise ValueError("index node overflow")
+            with self._pool.page(self._file, page_no, write=True) as buf:
+                _NODE_HEADER.pack_into(buf, 0, 1 if node.leaf else 0, node.next, len(payload))
+                buf[_NODE_HEADER.size:_NODE_HEADER.size + len(payload)] = payload
+        self._dirty = set()
+
+    def _new_page(self) -> int:
+        page_count = self._header()[4]
+        self._set_header(4, page_count + 1)
+        return page_count
+
+    def entry_of(self, row: Dict[str, Any], rid: int) -> list:
+        return sort_key([row.get(c) for c in self._columns]) + [rid]
+
+    # --- lecture ---
+
+    def _leaf_for(self, probe: list) -> _Node:
+        node = self._read(self._header()[3])
+        while not node.leaf:
+            node = self._read(node.children[bisect_right(node.entries, probe)])
+        return node
+
+    def scan_range(self, low: Optional[Sequence[Any]] = None, high: Optional[Sequence[Any]] = None,
+                   low_inclusive: bool = True, high_inclusive: bool = True) -> Iterator[int]:
+        """
+        Rids des entrées dont la clé est dans [low, high] (bornes sur un préfixe des colonnes,
+        None = non bornée), dans l'ordre de l'index.
+        """
+        lo = sort_key(low) if low is not None else None
+        hi = sort_key(high) if high is not None else None
+        node = self._leaf_for(lo if lo is not None else [])
+        i = bisect_left(node.entries, lo) if lo is not None else 0
+        while True:
+            for entry in node.entries[i:]:
+                if lo is not None and not low_inclusive and entry[:len(lo)] == lo:
+                    continue
+                if hi is not None:
+                    prefix = entry[:len(hi)]
+                    if prefix > hi or (not high_inclusive and prefix == hi):
+                        return
+                yield entry[-1]
+            if not node.next:
+                return
+            node = self._read(node.next)
+            i = 0
+
+    def lookup(self, values: Sequence[Any]) -> List[int]:
+        """Rids dont les premières colonnes de l'index valent `values` (égalité sur un préfixe)."""
+        return list(self.scan_range(values, values))
+
+    # --- écriture ---
+
+    def add(self, entry: list) -> None:
+        n = len(_dumps(entry)) + 1
+        if n > self._capacity // 4:
+            raise ValueError("index key too large")
+        path: List[Tuple[_Node, int]] = []
+        node = self._read(self._header()[3])
+        while not node.leaf:
+            i = bisect_right(node.entries, entry)
+            path.append((node, i))
+            node = self._read(node.children[i])
+        pos = bisect_left(node.entries, entry)
+        if pos < len(node.entries) and node.entries[pos] == entry:
+            return
+        node.entries.insert(pos, entry)
+        node.size += n
+        self._store(node, path)
+
+    def _store(self, node: _Node, path: List[Tuple[_Node, int]]) -> None:
+        """Écrit le nœud ; s'il dépasse la page, le coupe en deux et remonte le séparateur."""
+        if node.size <= self._capacity:
+            self._write(node)
+            return
+        mid = len(node.entries) // 2
+        right = _Node(self._new_page(), node.leaf, [], [], node.next)
+        if node.leaf:
+            right.entries = node.entries[mid:]
+            node.entries = node.entries[:mid]
+            node.next = right.page
+            separator = right.entries[0]
+        else:
+            separator = node.entries[mid]
+            right.entries = node.entries[mid + 1:]
+            right.children = node.children[mid + 1:]
+            node.entries = node.entries[:mid]
+            node.children = node.children[:mid + 1]
+            right.next = 0
+        node.size = node.measure()
+        right.size = right.measure()
+        self._write(node)
+        self._write(right)
+        if path:
+            parent, i = path.pop()
+            parent.entries.insert(i, separator)
+            parent.children.insert(i + 1, right.page)
+            parent.size += len(_dumps(separator)) + len(str(right.page)) + 2
+            self._store(parent, path)
+        else:
+            root = _Node(self._new_page(), False, [separator], [node.page, right.page])
+            self._write(root)
+            self._set_header(3, root.page)
+
+    def remove(self, entry: list) -> bool:
+        node = self._leaf_for(entry)
+        pos = bisect_left(node.entries, entry)
+        if pos < len(node.entries) and node.entries[pos] == entry:
+            del node.entries[pos]
+            node.size -= len(_dumps(entry)) + 1
+            self._write(node)
+            return True
+        return False
+
+    def insert_row(self, row: Dict[str, Any], rid: int) -> None:
+        self.add(self.entry_of(row, rid))
+
+    def remove_row(self, row: Dict[str, Any], rid: int) -> None:
+        self.remove(self.entry_of(row, rid))
+
+    def build(self, rows: Iterable[Tuple[int, Dict[str, Any]]], stamp: Optional[str]) -> int:
+        """
+        Remplit un index vide (juste créé) par chargement en masse : entrées triées une fois,
+        feuilles remplies séquentiellement puis niveaux internes construits de bas en haut.
+        Retourne le nombre d'entrées.
+        """
+        entries = sorted(self.entry_of(row, rid) for rid, row in rows)
+        max_entry = self._capacity // 4
+        fill = self._capacity * 3 // 4  # marge pour les insertions futures
+        self._set_header(4, 1)
+        # niveau feuille
+        level: List[Tuple[list, int]] = []  # (première entrée, page)
+        chunk: list = []
+        size = 16
+        leaves: List[_Node] = []
+        for e in entries:
+            n = len(_dumps(e)) + 1
+            if n > max_entry:
+                raise ValueError("index key too large")
+            if chunk and size + n > fill:
+                leaves.append(_Node(0, True, chunk, size=size))
+                chunk, size = [], 16
+            chunk.append(e)
+            size += n
+        leaves.append(_Node(0, True, chunk, size=size))
+        for leaf in leaves:
+            leaf.page = self._new_page()
+        for a, b in zip(leaves, leaves[1:]):
+            a.next = b.page
+        for leaf in leaves:
+            self._write(leaf)
+            level.append((leaf.entries[0] if leaf.entries else [], leaf.page))
+        # niveaux internes
+        while len(level) > 1:
+            parents: List[Tuple[list, int]] = []
+            node = _Node(0, False, [], [level[0][1]])
+            first = level[0][0]
+            size = 16
+            for sep, page in level[1:]:
+                n = len(_dumps(sep)) + len(str(page)) + 2
+                if size + n > fill and len(node.children) > 1:
+                    node.page = self._new_page()
+                    node.size = node.measure()
+                    self._write(node)
+                    parents.append((first, node.page))
+                    node = _Node(0, False, [], [page])
+                    first, size = sep, 16
+                    continue
+                node.entries.append(sep)
+                node.children.append(page)
+                size += n
+            node.page = self._new_page()
+            node.size = node.measure()
+            self._write(node)
+            parents.append((first, node.page))
+            level = parents
+        self._set_header(3, level[0][1])
+        self.sync(stamp)
+        self._nodes = {}  # pas besoin de garder tout l'index décodé en mémoire
+        return len(entries)
+
+    def sync(self, stamp: Optional[str]) -> None:
+        self._set_stamp(stamp)
+        self.flush()
+
+    def flush(self) -> None:
+        self._write_back()
+        self._pool.flush_file(self._file)
+
+    def close(self) -> None:
+        self._write_back()
+        self._nodes = {}
+        self._pool.release_file(self._file)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
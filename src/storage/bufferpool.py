@@ -0,0 +1,260 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from src.storage.base import path_under
+
+DEFAULT_PAGE_SIZE = 8192
+DEFAULT_CAPACITY = 1024  # nombre de pages gardées en mémoire
+
+
+class PagedFile:
+    """Fichier découpé en pages de taille fixe, lu/écrit page par page (pread/pwrite)."""
+    _path: Path
+    _key: str
+    _page_size: int
+    _fd: Optional[int]
+
+    def __init__(self, path: Path, page_size: int = DEFAULT_PAGE_SIZE):
+        self._path = Path(path)
+        self._key = str(self._path.resolve())
+        self._page_size = page_size
+        self._fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def page_size(self) -> int:
+        return self._page_size
+
+    def pages_on_disk(self) -> int:
+        return os.fstat(self._fd).st_size // self._page_size
+
+    def read_page(self, page_no: int) -> bytearray:
+        data = os.pread(self._fd, self._page_size, page_no * self._page_size)
+        buf = bytearray(self._page_size)
+        buf[:len(data)] = data
+        return buf
+
+    def write_page(self, page_no: int, data: bytes) -> None:
+        os.pwrite(self._fd, bytes(data), page_no * self._page_size)
+
+    def sync(self) -> None:
+        os.fsync(self._fd)
+
+    def truncate(self, page_count: int) -> None:
+        """Raccourcit le fichier à ses page_count premières pages."""
+        os.ftruncate(self._fd, page_count * self._page_size)
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class BufferPool:
+    """
+    Cache de pages partagé par tous les fichiers du processus.
+    - éviction LRU des pages non épinglées
+    - les pages modifiées (dirty) sont réécrites sur disque à l'éviction ou au flush
+    - les fichiers "retenus" (hold) sont protégés par le journal (WAL) : leurs pages dirty
+      ne sont jamais évincées ni écrites, sauf par un checkpoint (force=True)
+    """
+    _capacity: int
+    _pages: "OrderedDict[Tuple[str, int], bytearray]"
+    _dirty: Set[Tuple[str, int]]
+    _pins: Dict[Tuple[str, int], int]
+    _files: Dict[str, PagedFile]
+    _held: Set[str]
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._capacity = max(2, int(capacity))
+        self._pages = OrderedDict()
+        self._dirty = set()
+        self._pins = {}
+        self._files = {}
+        self._held = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def _write_back(self, key: Tuple[str, int], force: bool = False) -> bool:
+        """Écrit la page si elle est dirty. Une page d'un fichier retenu n'est écrite qu'avec force."""
+        if key in self._dirty and key[0] in self._held and not force:
+            return False
+        pf = self._files.get(key[0])
+        if pf is not None and key in self._dirty:
+            pf.write_page(key[1], self._pages[key])
+        self._dirty.discard(key)
+        return True
+
+    def _evictable(self, key: Tuple[str, int]) -> bool:
+        return not self._pins.get(key) and not (key[0] in self._held and key in self._dirty)
+
+    def _evict(self) -> None:
+        while len(self._pages) > self._capacity:
+            victim = next((k for k in self._pages if self._evictable(k)), None)
+            if victim is None:
+                return  # tout est épinglé ou retenu : on dépasse temporairement la capacité
+            self._write_back(victim)
+            del self._pages[victim]
+
+    @contextmanager
+    def page(self, pf: PagedFile, page_no: int, write: bool = False) -> Iterator[bytearray]:
+        """
+        Épingle la page le temps du bloc `with` ; si write=True elle est marquée dirty
+        à la sortie (sera écrite au prochain flush ou à son éviction).
+        """
+        key = (pf.key, page_no)
+        with self._lock:
+            self._files[pf.key] = pf
+            buf = self._pages.get(key)
+            if buf is None:
+                self.misses += 1
+                buf = pf.read_page(page_no)
+                self._pages[key] = buf
+            else:
+                self.hits += 1
+                self._pages.move_to_end(key)
+            self._pins[key] = self._pins.get(key, 0) + 1
+        try:
+            yield buf
+        finally:
+            with self._lock:
+                if write:
+                    self._dirty.add(key)
+                self._pins[key] -= 1
+                if not self._pins[key]:
+                    del self._pins[key]
+                self._evict()
+
+    def has_dirty(self, pf: PagedFile) -> bool:
+        with self._lock:
+            return any(k[0] == pf.key for k in self._dirty)
+
+    def flush_file(self, pf: PagedFile, sync: bool = False, force: bool = False) -> int:
+        """
+        Réécrit les pages dirty d'un fichier. Retourne le nombre de pages écrites.
+        Un fichier retenu (hold) n'est écrit qu'avec force=True (checkpoint).
+        """
+        with self._lock:
+            self._files[pf.key] = pf
+            if pf.key in self._held and not force:
+                return 0
+            keys = sorted(k for k in self._dirty if k[0] == pf.key)
+            for k in keys:
+                self._write_back(k, force)
+            if sync and keys:
+                pf.sync()
+            return len(keys)
+
+    def flush_all(self, sync: bool = False) -> int:
+        """Réécrit les pages dirty de tous les fichiers non retenus."""
+        with self._lock:
+            keys = sorted(k for k in self._dirty if k[0] not in self._held)
+            files = {k[0] for k in keys}
+            for k in keys:
+                self._write_back(k)
+            if sync:
+                for fk in files:
+                    if fk in self._files:
+                        self._files[fk].sync()
+            return len(keys)
+
+    def discard(self, path: str) -> None:
+        """Oublie (sans écrire) les pages du fichier path, ou des fichiers sous le répertoire path."""
+        root = str(Path(path).resolve())
+        with self._lock:
+            for k in [k for k in self._pages if path_under(k[0], root)]:
+                del self._pages[k]
+                self._dirty.discard(k)
+            for fk in [fk for fk in self._files if path_under(fk, root)]:
+                del self._files[fk]
+            self._held = {fk for fk in self._held if not path_under(fk, root)}
+
+    def truncate(self, pf: PagedFile, page_count: int) -> None:
+        """Oublie (sans écrire) les pages du fichier à partir de page_count : il va être raccourci."""
+        with self._lock:
+            for k in [k for k in self._pages if k[0] == pf.key and k[1] >= page_count]:
+                del self._pages[k]
+                self._dirty.discard(k)
+
+    def invalidate(self, path_prefix: str) -> int:
+        """
+        Oublie les pages propres et non épinglées des fichiers sous path_prefix (fichiers
+        modifiés sur disque par un autre processus) ; elles seront relues au prochain accès.
+        """
+        with self._lock:
+            keys = [k for k in self._pages
+                    if k[0].startswith(path_prefix) and k not in self._dirty and not self._pins.get(k)]
+            for k in keys:
+                del self._pages[k]
+            return len(keys)
+
+    # --- fichiers protégés par le journal (no-steal jusqu'au checkpoint) ---
+
+    def hold(self, file_key: str) -> None:
+        """Les pages dirty du fichier restent en mémoire jusqu'au prochain checkpoint."""
+        with self._lock:
+            self._held.add(file_key)
+
+    def unhold(self, path: str) -> None:
+        """Fin de la rétention des fichiers sous le répertoire path (le journal d'une base)."""
+        root = str(Path(path).resolve())
+        with self._lock:
+            self._held = {fk for fk in self._held if not path_under(fk, root)}
+            self._evict()
+
+    def held_dirty(self, path: str) -> List[Tuple[str, int]]:
+        """Pages dirty retenues des fichiers sous le répertoire path, triées (fichier, page)."""
+        root = str(Path(path).resolve())
+        with self._lock:
+            return sorted(k for k in self._dirty if k[0] in self._held and path_under(k[0], root))
+
+    def page_image(self, key: Tuple[str, int]) -> Optional[bytes]:
+        """Copie du contenu d'une page en mémoire (None si elle n'y est plus)."""
+        with self._lock:
+            buf = self._pages.get(key)
+            return bytes(buf) if buf is not None else None
+
+    def mark_clean(self, keys: List[Tuple[str, int]]) -> None:
+        """Pages écrites par un checkpoint : plus dirty, de nouveau évinçables."""
+        with self._lock:
+            for k in keys:
+                self._dirty.discard(k)
+            self._evict()
+
+    def release_file(self, pf: PagedFile) -> None:
+        """Le descripteur de pf va être fermé : écrit ses pages dirty et l'oublie comme cible d'écriture."""
+        with self._lock:
+            self.flush_file(pf)
+            if self._files.get(pf.key) is pf:
+                del self._files[pf.key]
+
+
+_default_pool: Optional[BufferPool] = None
+
+
+def get_buffer_pool() -> BufferPool:
+    """Retourne le buffer pool partagé du processus (créé à la première utilisation)."""
+    global _default_pool
+    if _default_pool is None:
+        capacity = int(os.environ.get("SGBD_BUFFER_PAGES", DEFAULT_CAPACITY))
+        _default_pool = BufferPool(capacity)
+    return _default_pool
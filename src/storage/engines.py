@@ -0,0 +1,156 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.storage.base import RowStorage
+from src.storage.blockfile import DEFAULT_CODEC, BlockFile
+from src.storage.heapfile import HeapFile
+from src.storage.mvcc import Snapshot, VersionedStorage, get_version_store
+from src.storage.partitioned import PartitionScheme, PartitionedStorage
+from src.storage.rowlog import RowLog
+from src.storage.wal import LoggedStorage, get_wal, wal_enabled
+
+# moteurs de stockage disponibles (clé "storage" de l'entrée de table dans informationTable.json)
+DEFAULT_ENGINE = "heap"
+_EXTENSIONS = {
+    "heap": ".heap",
+    "log": ".log",
+    "block": ".blk",
+}
+ENGINES = tuple(_EXTENSIONS)
+
+
+def data_file(db_path: Path, table_name: str, engine: str = DEFAULT_ENGINE) -> Path:
+    return Path(db_path) / f"{table_name}{_EXTENSIONS[engine]}"
+
+
+def partition_dir(db_path: Path, table_name: str) -> Path:
+    """Répertoire des fichiers de partitions d'une table partitionnée."""
+    return Path(db_path) / table_name
+
+
+def existing_data_files(db_path: Path, table_name: str) -> List[Path]:
+    """Fichiers de données présents pour la table, quel que soit le format (y compris l'ancien .json et les partitions)."""
+    candidates = [data_file(db_path, table_name, e) for e in ENGINES]
+    candidates.append(Path(db_path) / f"{table_name}.json")
+    candidates.append(partition_dir(db_path, table_name))
+    return [p for p in candidates if p.exists()]
+
+
+def _read_legacy_rows(legacy_file: Path) -> List[Dict[str, Any]]:
+    try:
+        return json.loads(legacy_file.read_text(encoding="utf-8")).get("rows", [])
+    except Exception:
+        return []
+
+
+def create_storage(db_path: Path, table_name: str, engine: str = DEFAULT_ENGINE, schema_version: int = 1,
+                   compression: Optional[str] = None) -> RowStorage:
+    """Crée le fichier de données vide d'une table (échoue s'il existe déjà) ; compression : codec du moteur block."""
+    if engine not in _EXTENSIONS:
+        raise ValueError(f"unknown storage engine {engine}")
+    path = data_file(db_path, table_name, engine)
+    if engine == "log":
+        log = RowLog(path)
+        log.create(table_name, schema_version=schema_version)
+        return log
+    if engine == "block":
+        return BlockFile.create(path, compression or DEFAULT_CODEC, schema_version=schema_version)
+    return HeapFile.create(path, schema_version=schema_version)
+
+
+def create_partitions(db_path: Path, table_name: str, partitioning: Dict[str, Any],
+                      engine: str = DEFAULT_ENGINE, schema_version: int = 1,
+                      compression: Optional[str] = None) -> None:
+    """Crée le répertoire d'une table partitionnée et le fichier vide de chaque partition."""
+    if engine not in _EXTENSIONS:
+        raise ValueError(f"unknown storage engine {engine}")
+    directory = partition_dir(db_path, table_name)
+    directory.mkdir(parents=True)
+    for p in partitioning["partitions"]:
+        create_storage(directory, p["name"], engine, schema_version=schema_version, compression=compression).close()
+
+
+def resolve_engine(db_path: Path, table_entry: Dict[str, Any]) -> str:
+    """
+    Moteur d'une table : la clé "storage" du catalogue, sinon déduit des fichiers
+    présents (les tables créées avant les heap files utilisent le journal .log).
+    """
+    engine = table_entry.get("storage")
+    if engine in _EXTENSIONS:
+        return engine
+    if data_file(db_path, table_entry.get("name", ""), "log").exists():
+        return "log"
+    return DEFAULT_ENGINE
+
+
+def open_storage(db_path: Path, table_entry: Dict[str, Any], snapshot: Optional[Snapshot] = None) -> RowStorage:
+    """
+    Ouvre le stockage d'une table décrite par son entrée de catalogue.
+    Un ancien fichier <table>.json ({"rows": [...]}) est migré au passage.
+    Les écritures d'une table heap passent par le WAL de la base (sauf SGBD_WAL=0).
+    Une table block (compressée) garde le codec choisi à sa création (clé "compression").
+    Les lectures voient l'instantané `snapshot` (celui d'une transaction), sinon un
+    instantané pris à l'ouverture.
+    """
+    name = table_entry.get("name")
+    engine = resolve_engine(db_path, table_entry)
+    schema_version = table_entry.get("schema_version", 1)
+    if table_entry.get("partitioning"):
+        return _open_partitioned(db_path, table_entry, engine, snapshot)
+    path = data_file(db_path, name, engine)
+    legacy = Path(db_path) / f"{name}.json"
+
+    if engine == "log":
+        log = RowLog(path)
+        if not log.exists():
+            if not log.migrate_legacy(legacy, name, schema_version):
+                log.create(name, schema_version=schema_version)
+        log.upgrade()
+        return VersionedStorage(log, get_version_store(path), snapshot)
+
+    if engine == "block":
+        if path.exists():
+            blocks = BlockFile(path)
+        else:
+            blocks = BlockFile.create(path, table_entry.get("compression") or DEFAULT_CODEC, schema_version)
+        return VersionedStorage(blocks, get_version_store(path), snapshot)
+
+    # journal ouvert (et rejoué après un crash) avant de lire le fichier de la table
+    wal = get_wal(db_path) if wal_enabled() else None
+    if path.exists():
+        heap = HeapFile(path)
+    else:
+        heap = HeapFile.create(path, schema_version=schema_version)
+        if legacy.exists():
+            heap.insert_many(_read_legacy_rows(legacy))
+            heap.flush()
+            legacy.unlink()
+    storage = LoggedStorage(heap, wal) if wal is not None else heap
+    return VersionedStorage(storage, get_version_store(path), snapshot)
+
+
+def _open_partitioned(db_path: Path, table_entry: Dict[str, Any], engine: str,
+                      snapshot: Optional[Snapshot]) -> RowStorage:
+    """Table partitionnée : un seul instantané et un seul magasin de versions pour toutes ses partitions."""
+    scheme = PartitionScheme(table_entry["partitioning"])
+    directory = partition_dir(db_path, table_entry.get("name"))
+    schema_version = table_entry.get("schema_version", 1)
+    wal = get_wal(db_path) if engine == "heap" and wal_enabled() else None
+
+    def open_partition(i: int) -> RowStorage:
+        path = data_file(directory, scheme.names[i], engine)
+        if engine == "log":
+            log = RowLog(path)
+            if not log.exists():
+                log.create(scheme.names[i], schema_version=schema_version)
+            log.upgrade()
+            return log
+        if engine == "block":
+            if path.exists():
+                return BlockFile(path)
+            return BlockFile.create(path, table_entry.get("compression") or DEFAULT_CODEC, schema_version)
+        heap = HeapFile(path) if path.exists() else HeapFile.create(path, schema_version=schema_version)
+        return LoggedStorage(heap, wal) if wal is not None else heap
+
+    return VersionedStorage(PartitionedStorage(directory, scheme, open_partition), get_version_store(directory), snapshot)
@@ -0,0 +1,218 @@
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.storage.base import path_under
+
+# compaction quand le fichier contient plus de N enregistrements en trop
+_COMPACT_SLACK = 1000
+
+
+def index_key(values: Sequence[Any]) -> str:
+    """Clé d'index : encodage JSON des valeurs (1 et "1" restent distincts)."""
+    return json.dumps(list(values), ensure_ascii=False, separators=(",", ":"))
+
+
+class HashIndex:
+    """
+    Index de hachage persistant : clé (valeurs de colonnes) -> rids.
+    Sur disque : journal JSONL <table>.<nom>.hidx
+      ["+", clé, rid] / ["-", clé, rid]  ajout / retrait d'une entrée
+      ["s", stamp]                       état du stockage de la table couvert par l'index
+    Le fichier n'est lu qu'au premier accès (chargement paresseux), puis seules les
+    lignes ajoutées depuis (par ce processus ou un autre) sont rejouées. Il est
+    compacté quand les entrées mortes dominent. Si le stamp ne correspond plus au
+    stockage de la table, l'appelant reconstruit l'index (rebuild).
+    """
+    _path: Path
+    _columns: List[str]
+    _entries: Dict[str, List[int]]
+    _pending: List[list]
+
+    def __init__(self, path: Path, columns: Sequence[str]):
+        self._path = Path(path)
+        self._columns = list(columns)
+        self._entries = {}
+        self._pending = []
+        self._loaded = False
+        self._offset = 0
+        self._inode = None
+        self._records = 0
+        self._stamp = None
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._columns)
+
+    @property
+    def stamp(self) -> Optional[str]:
+        self._ensure_loaded()
+        return self._stamp
+
+    def key_of(self, row: Dict[str, Any]) -> Optional[str]:
+        """Clé de la ligne ; None si une des colonnes est NULL (non indexée : NULL ne viole pas UNIQUE)."""
+        values = [row.get(c) for c in self._columns]
+        if any(v is None for v in values):
+            return None
+        return index_key(values)
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    # --- lecture ---
+
+    def _apply(self, rec: list) -> None:
+        op = rec[0]
+        if op == "+":
+            rids = self._entries.setdefault(rec[1], [])
+            if rec[2] not in rids:
+                rids.append(rec[2])
+        elif op == "-":
+            rids = self._entries.get(rec[1])
+            if rids and rec[2] in rids:
+                rids.remove(rec[2])
+                if not rids:
+                    del self._entries[rec[1]]
+        elif op == "s":
+            self._stamp = rec[1]
+        self._records += 1
+
+    def _ensure_loaded(self) -> None:
+        """Charge le fichier au premier accès, puis rejoue seulement ce qui a été ajouté depuis."""
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            if self._loaded and self._inode is not None:
+                self._reset()
+            self._loaded = True
+            return
+        if not self._loaded or st.st_ino != self._inode or st.st_size < self._offset:
+            self._reset()
+            self._inode = st.st_ino
+        elif st.st_size == self._offset:
+            return
+        with open(self._path, "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # ligne partielle : sera relue quand elle sera complète
+                self._offset += len(line)
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(rec, list) and rec:
+                    self._apply(rec)
+        self._loaded = True
+
+    def _reset(self) -> None:
+        self._entries = {}
+        self._offset = 0
+        self._records = 0
+        self._stamp = None
+        self._inode = None
+
+    def lookup(self, key: str) -> List[int]:
+        self._ensure_loaded()
+        return list(self._entries.get(key, ()))
+
+    def contains(self, key: str) -> bool:
+        self._ensure_loaded()
+        return key in self._entries
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self._entries)
+
+    # --- écriture ---
+
+    def add(self, key: Optional[str], rid: int) -> None:
+        if key is None:
+            return
+        self._ensure_loaded()
+        rec = ["+", key, rid]
+        self._apply(rec)
+        self._pending.append(rec)
+
+    def remove(self, key: Optional[str], rid: int) -> None:
+        if key is None:
+            return
+        self._ensure_loaded()
+        rec = ["-", key, rid]
+        self._apply(rec)
+        self._pending.append(rec)
+
+    def discard_pending(self) -> None:
+        """Abandonne les modifications non synchronisées (relecture complète au prochain accès)."""
+        self._pending = []
+        self._loaded = False
+
+    def sync(self, stamp: Optional[str]) -> None:
+        """Ajoute les modifications en attente et le stamp du stockage en un seul append."""
+        self._ensure_loaded()
+        self._pending.append(["s", stamp])
+        data = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in self._pending)
+        self._pending = []
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "ab") as f:
+            f.write(data.encode("utf-8"))
+        self._stamp = stamp
+        self._records += 1
+        st = os.stat(self._path)
+        self._offset = st.st_size
+        self._inode = st.st_ino
+        if self._records > 2 * len(self._entries) + _COMPACT_SLACK:
+            self._write_snapshot()
+
+    def rebuild(self, entries: Iterable[Tuple[str, int]], stamp: Optional[str]) -> None:
+        """Reconstruit entièrement l'index (fichier absent ou désynchronisé du stockage)."""
+        self._reset()
+        self._pending = []
+        for key, rid in entries:
+            if key is not None:
+                self._entries.setdefault(key, []).append(rid)
+        self._stamp = stamp
+        self._loaded = True
+        self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with open(tmp, "w", encoding="utf-8") as f:
+            for key, rids in self._entries.items():
+                for rid in rids:
+                    f.write(json.dumps(["+", key, rid], ensure_ascii=False, separators=(",", ":")) + "\n")
+                    count += 1
+            f.write(json.dumps(["s", self._stamp], separators=(",", ":")) + "\n")
+        os.replace(tmp, self._path)
+        st = os.stat(self._path)
+        self._offset = st.st_size
+        self._inode = st.st_ino
+        self._records = count + 1
+
+
+# index déjà chargés dans ce processus (clé = chemin du fichier)
+_open_indexes: Dict[str, HashIndex] = {}
+
+
+def get_hash_index(path: Path, columns: Sequence[str]) -> HashIndex:
+    """Retourne l'index (mis en cache dans le processus) stocké dans `path`."""
+    key = str(Path(path).resolve())
+    idx = _open_indexes.get(key)
+    if idx is None or idx.columns != list(columns):
+        idx = HashIndex(path, columns)
+        _open_indexes[key] = idx
+    return idx
+
+
+def forget_indexes(path: str) -> None:
+    """Oublie les index en cache sous le répertoire path (DROP DATABASE...)."""
+    root = str(Path(path).resolve())
+    for k in [k for k in _open_indexes if path_under(k, root)]:
+        del _open_indexes[k]
@@ -0,0 +1,498 @@
+import json
+import struct
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.storage.base import RowStorage
+from src.storage.bufferpool import DEFAULT_PAGE_SIZE, BufferPool, PagedFile, get_buffer_pool
+
+HEAP_MAGIC = b"SGBDHEAP"
+HEAP_VERSION = 1
+
+# page 0 : en-tête du fichier
+_FILE_HEADER = struct.Struct("<8sHIIIQ")  # magic, version, page_size, page_count, schema_version, change_counter
+# plus loin dans la page 0 (des zéros dans un fichier qui ne les a jamais écrits) :
+# lignes vivantes, lignes supprimées depuis le dernier VACUUM, puis la liste des pages
+# que le VACUUM a trouvées assez vides pour recevoir de nouvelles lignes
+_VACUUM_OFFSET = 64
+_VACUUM_INFO = struct.Struct("<QQI")     # live_rows, dead_rows, n_free_pages
+_FREE_PAGE = struct.Struct("<I")
+_FREE_FRACTION = 4                       # page réutilisée si au moins 1/4 de sa place est libre
+# pages de données : en-tête de page puis tableau de slots ; les enregistrements
+# sont rangés depuis la fin de la page vers le début (slotted page)
+_PAGE_HEADER = struct.Struct("<HH")      # n_slots, free_end
+_SLOT = struct.Struct("<HHH")            # offset, length, flag
+_REDIRECT = struct.Struct("<Q")          # rid cible d'une ligne déplacée
+
+SLOT_FREE = 0      # slot libre (ligne supprimée), réutilisable
+SLOT_ROW = 1       # ligne stockée ici
+SLOT_REDIRECT = 2  # la ligne a grossi et vit ailleurs : le slot contient le rid cible
+SLOT_MOVED = 3     # ligne hébergée pour le compte d'un slot REDIRECT (ignorée par scan)
+
+RID_SLOT_BITS = 16
+
+
+def make_rid(page_no: int, slot: int) -> int:
+    return (page_no << RID_SLOT_BITS) | slot
+
+
+def split_rid(rid: int) -> Tuple[int, int]:
+    return rid >> RID_SLOT_BITS, rid & ((1 << RID_SLOT_BITS) - 1)
+
+
+def _encode(row: Dict[str, Any]) -> bytes:
+    # au moins la taille d'une redirection : une ligne peut toujours être remplacée sur place par un REDIRECT
+    data = json.dumps(row, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return data.ljust(_REDIRECT.size)
+
+
+def _decode(data: bytes) -> Dict[str, Any]:
+    return json.loads(data.decode("utf-8"))
+
+
+# --- primitives sur une page (bytearray) ---
+
+def _page_init(buf: bytearray) -> None:
+    buf[:] = bytes(len(buf))
+    _PAGE_HEADER.pack_into(buf, 0, 0, len(buf))
+
+
+def _page_header(buf: bytearray) -> Tuple[int, int]:
+    n_slots, free_end = _PAGE_HEADER.unpack_from(buf, 0)
+    if free_end == 0:  # page jamais initialisée (zéros)
+        free_end = len(buf)
+    return n_slots, free_end
+
+
+def _get_slot(buf: bytearray, i: int) -> Tuple[int, int, int]:
+    return _SLOT.unpack_from(buf, _PAGE_HEADER.size + i * _SLOT.size)
+
+
+def _set_slot(buf: bytearray, i: int, offset: int, length: int, flag: int) -> None:
+    _SLOT.pack_into(buf, _PAGE_HEADER.size + i * _SLOT.size, offset, length, flag)
+
+
+def _compact(buf: bytearray) -> None:
+    """Regroupe les enregistrements vivants en fin de page pour supprimer les trous."""
+    n_slots, _ = _page_header(buf)
+    records = []
+    for i in range(n_slots):
+        off, ln, flag = _get_slot(buf, i)
+        if flag != SLOT_FREE and ln:
+            records.append((i, bytes(buf[off:off + ln]), flag))
+    end = len(buf)
+    for i, data, flag in records:
+        end -= len(data)
+        buf[end:end + len(data)] = data
+        _set_slot(buf, i, end, len(data), flag)
+    _PAGE_HEADER.pack_into(buf, 0, n_slots, end)
+
+
+def _alloc(buf: bytearray, size: int, new_slot: bool) -> Optional[int]:
+    """Réserve `size` octets contigus (compacte la page si besoin). Retourne l'offset ou None."""
+    n_slots, free_end = _page_header(buf)
+    slots_end = _PAGE_HEADER.size + (n_slots + (1 if new_slot else 0)) * _SLOT.size
+    if free_end - slots_end < size:
+        used = sum(_get_slot(buf, i)[1] for i in range(n_slots) if _get_slot(buf, i)[2] != SLOT_FREE)
+        if len(buf) - slots_end - used < size:
+            return None
+        _compact(buf)
+        n_slots, free_end = _page_header(buf)
+    offset = free_end - size
+    _PAGE_HEADER.pack_into(buf, 0, n_slots, offset)
+    return offset
+
+
+def _place(buf: bytearray, data: bytes, flag: int, reuse_slots: bool = True) -> Optional[int]:
+    """Range `data` dans un slot libre (ou nouveau) de la page. Retourne le n° de slot ou None."""
+    n_slots, _ = _page_header(buf)
+    free_slot = None
+    if reuse_slots:
+        free_slot = next((i for i in range(n_slots) if _get_slot(buf, i)[2] == SLOT_FREE), None)
+    offset = _alloc(buf, len(data), new_slot=free_slot is None)
+    if offset is None:
+        return None
+    buf[offset:offset + len(data)] = data
+    if free_slot is None:
+        free_slot = n_slots
+        _PAGE_HEADER.pack_into(buf, 0, n_slots + 1, _page_header(buf)[1])
+    _set_slot(buf, free_slot, offset, len(data), flag)
+    return free_slot
+
+
+def _rewrite_slot(buf: bytearray, slot: int, data: bytes, flag: int) -> bool:
+    """Remplace le contenu d'un slot existant dans la même page ; False si la place manque."""
+    off, ln, old_flag = _get_slot(buf, slot)
+    if len(data) <= ln:
+        buf[off:off + len(data)] = data
+        _set_slot(buf, slot, off, len(data), flag)
+        return True
+    old = bytes(buf[off:off + ln])
+    _set_slot(buf, slot, 0, 0, SLOT_FREE)
+    offset = _alloc(buf, len(data), new_slot=False)
+    if offset is None:
+        # remet l'ancien contenu (il tenait, il tient toujours après compaction)
+        offset = _alloc(buf, len(old), new_slot=False)
+        buf[offset:offset + len(old)] = old
+        _set_slot(buf, slot, offset, len(old), old_flag)
+        return False
+    buf[offset:offset + len(data)] = data
+    _set_slot(buf, slot, offset, len(data), flag)
+    return True
+
+
+class HeapFile(RowStorage):
+    """
+    Heap file à pages fixes (slotted pages) : <table>.heap
+    - rid = (n° de page << 16) | n° de slot, stable pendant toute la vie de la ligne
+      (une ligne qui grossit est déplacée derrière un slot REDIRECT)
+    - toutes les pages passent par le buffer pool : INSERT/UPDATE/DELETE ne modifient
+      que les pages concernées, réécrites au flush ou à leur éviction.
+    - un DELETE libère le slot sur place ; VACUUM rend ensuite la place des pages vidées
+      (fin de fichier tronquée, pages à moitié vides reprises par les insertions)
+    Une ligne encodée doit tenir dans une page (≈ page_size - 10 octets).
+    """
+    _file: PagedFile
+    _pool: BufferPool
+    _changed: bool
+
+    def __init__(self, path: Path, pool: Optional[BufferPool] = None):
+        self._pool = pool if pool is not None else get_buffer_pool()
+        self._changed = False
+        path = Path(path)
+        with open(path, "rb") as f:
+            raw = f.read(_FILE_HEADER.size)
+        if len(raw) < _FILE_HEADER.size:
+            raise ValueError(f"heap file invalide: {path}")
+        magic, version, page_size = _FILE_HEADER.unpack(raw)[:3]
+        if magic != HEAP_MAGIC:
+            raise ValueError(f"heap file invalide: {path}")
+        self._file = PagedFile(path, page_size)
+
+    @staticmethod
+    def create(path: Path, schema_version: int = 1, page_size: int = DEFAULT_PAGE_SIZE,
+               pool: Optional[BufferPool] = None) -> "HeapFile":
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = bytearray(page_size)
+        _FILE_HEADER.pack_into(header, 0, HEAP_MAGIC, HEAP_VERSION, page_size, 1, schema_version, 0)
+        with open(path, "xb") as f:
+            f.write(header)
+        (pool if pool is not None else get_buffer_pool()).discard(str(path))
+        return HeapFile(path, pool)
+
+    # --- en-tête ---
+
+    def _header(self) -> Tuple[bytes, int, int, int, int, int]:
+        with self._pool.page(self._file, 0) as buf:
+            return _FILE_HEADER.unpack_from(buf, 0)
+
+    def _set_header(self, field: int, value: int) -> None:
+        with self._pool.page(self._file, 0, write=True) as hdr:
+            fields = list(_FILE_HEADER.unpack_from(hdr, 0))
+            fields[field] = value
+            _FILE_HEADER.pack_into(hdr, 0, *fields)
+
+    @property
+    def path(self) -> Path:
+        return self._file.path
+
+    @property
+    def file_key(self) -> str:
+        """Clé du fichier dans le buffer pool (chemin résolu)."""
+        return self._file.key
+
+    @property
+    def page_size(self) -> int:
+        return self._file.page_size
+
+    @property
+    def page_count(self) -> int:
+        return self._header()[3]
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        return self._header()[4]
+
+    def stamp(self) -> Optional[str]:
+        # le compteur est incrémenté à chaque flush qui écrit des pages
+        return f"{self.path.stat().st_ino}:{self._header()[5]}"
+
+    def _vacuum_info(self) -> Tuple[int, int, List[int]]:
+        """(lignes vivantes, lignes supprimées depuis le dernier VACUUM, pages à remplir)."""
+        with self._pool.page(self._file, 0) as hdr:
+            live, dead, n_free = _VACUUM_INFO.unpack_from(hdr, _VACUUM_OFFSET)
+            start = _VACUUM_OFFSET + _VACUUM_INFO.size
+            free = list(struct.unpack_from(f"<{n_free}I", hdr, start)) if n_free else []
+        return live, dead, free
+
+    def _set_vacuum_info(self, live: int, dead: int, free: List[int]) -> List[int]:
+        """Écrit les compteurs et la liste des pages à remplir ; retourne celle gardée (place de l'en-tête)."""
+        free = free[:(self.page_size - _VACUUM_OFFSET - _VACUUM_INFO.size) // _FREE_PAGE.size]
+        with self._pool.page(self._file, 0, write=True) as hdr:
+            _VACUUM_INFO.pack_into(hdr, _VACUUM_OFFSET, max(live, 0), max(dead, 0), len(free))
+            struct.pack_into(f"<{len(free)}I", hdr, _VACUUM_OFFSET + _VACUUM_INFO.size, *free)
+        return free
+
+    def _count_rows(self, inserted: int, deleted: int) -> None:
+        with self._pool.page(self._file, 0, write=True) as hdr:
+            live, dead, n_free = _VACUUM_INFO.unpack_from(hdr, _VACUUM_OFFSET)
+            _VACUUM_INFO.pack_into(hdr, _VACUUM_OFFSET, max(live + inserted - deleted, 0), dead + deleted, n_free)
+
+    def _new_page(self) -> int:
+        self._changed = True
+        page_count = self.page_count
+        self._set_header(3, page_count + 1)
+        with self._pool.page(self._file, page_count, write=True) as buf:
+            _page_init(buf)
+        return page_count
+
+    # --- accès aux lignes ---
+
+    def _store(self, data: bytes, flag: int, avoid_page: Optional[int] = None) -> int:
+        """
+        Range un enregistrement dans la dernière page, sinon dans une page rendue par le
+        VACUUM, sinon dans une nouvelle. Retourne son rid.
+        """
+        if len(data) > self.page_size - _PAGE_HEADER.size - _SLOT.size:
+            raise ValueError("row too large for a heap page")
+        self._changed = True
+        last = self.page_count - 1
+        if last >= 1 and last != avoid_page:
+            with self._pool.page(self._file, last, write=True) as buf:
+                slot = _place(buf, data, flag)
+            if slot is not None:
+                return make_rid(last, slot)
+        # pages rendues par le VACUUM : celles où la ligne ne tient plus sortent de la liste
+        live, dead, free = self._vacuum_info()
+        full = []
+        rid = None
+        for page_no in free:
+            if page_no == avoid_page:
+                continue
+            with self._pool.page(self._file, page_no, write=True) as buf:
+                slot = _place(buf, data, flag)
+            if slot is not None:
+                rid = make_rid(page_no, slot)
+                break
+            full.append(page_no)
+        if full:
+            self._set_vacuum_info(live, dead, [p for p in free if p not in full])
+        if rid is not None:
+            return rid
+        page_no = self._new_page()
+        with self._pool.page(self._file, page_no, write=True) as buf:
+            slot = _place(buf, data, flag)
+        return make_rid(page_no, slot)
+
+    def _valid(self, rid: int) -> bool:
+        page_no, _ = split_rid(rid)
+        return 1 <= page_no < self.page_count
+
+    def _slot_of(self, rid: int) -> Tuple[int, bytes]:
+        """Retourne (flag, contenu) du slot désigné par rid."""
+        page_no, slot = split_rid(rid)
+        with self._pool.page(self._file, page_no) as buf:
+            n_slots, _ = _page_header(buf)
+            if slot >= n_slots:
+                return SLOT_FREE, b""
+            off, ln, flag = _get_slot(buf, slot)
+            return flag, bytes(buf[off:off + ln])
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        rid = self._store(_encode(row), SLOT_ROW)
+        self._count_rows(1, 0)
+        return rid
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        """
+        Remplit la dernière page, puis les pages rendues par le VACUUM, puis des pages
+        neuves, en épinglant chaque page une seule fois.
+        """
+        pending = [_encode(r) for r in rows]
+        max_len = self.page_size - _PAGE_HEADER.size - _SLOT.size
+        if any(len(d) > max_len for d in pending):
+            raise ValueError("row too large for a heap page")
+        self._changed = True
+        rids: List[int] = []
+        page_no = self.page_count - 1
+        if page_no < 1:
+            page_no = self._new_page()
+        live, dead, free = self._vacuum_info()
+        candidates = [p for p in free if p != page_no]
+        full = []
+        i = 0
+        while i < len(pending):
+            with self._pool.page(self._file, page_no, write=True) as buf:
+                reuse = True
+                while i < len(pending):
+                    n_slots = _page_header(buf)[0]
+                    slot = _place(buf, pending[i], SLOT_ROW, reuse_slots=reuse)
+                    if slot is None:
+                        break
+                    # plus de slot libre dès qu'un slot a été ajouté : on ne rescanne pas
+                    reuse = reuse and slot < n_slots
+                    rids.append(make_rid(page_no, slot))
+                    i += 1
+            if i < len(pending):
+                if page_no in free:
+                    full.append(page_no)
+                page_no = candidates.pop(0) if candidates else self._new_page()
+        self._set_vacuum_info(live + len(rids), dead, [p for p in free if p not in full] if full else free)
+        return rids
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        if not self._valid(rid):
+            return None
+        flag, data = self._slot_of(rid)
+        if flag == SLOT_REDIRECT:
+            flag, data = self._slot_of(_REDIRECT.unpack(data)[0])
+            flag = SLOT_ROW if flag == SLOT_MOVED else SLOT_FREE
+        return _decode(data) if flag == SLOT_ROW else None
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        if not self._valid(rid):
+            return False
+        data = _encode(row)
+        page_no, slot = split_rid(rid)
+        flag, content = self._slot_of(rid)
+        self._changed = True
+        if flag == SLOT_ROW:
+            with self._pool.page(self._file, page_no, write=True) as buf:
+                if _rewrite_slot(buf, slot, data, SLOT_ROW):
+                    return True
+            # ne tient plus dans sa page : déplacement + redirection
+            target = self._store(data, SLOT_MOVED, avoid_page=page_no)
+            with self._pool.page(self._file, page_no, write=True) as buf:
+                ok = _rewrite_slot(buf, slot, _REDIRECT.pack(target), SLOT_REDIRECT)
+            return ok
+        if flag == SLOT_REDIRECT:
+            old_target = _REDIRECT.unpack(content)[0]
+            t_page, t_slot = split_rid(old_target)
+            with self._pool.page(self._file, t_page, write=True) as buf:
+                if _rewrite_slot(buf, t_slot, data, SLOT_MOVED):
+                    return True
+            new_target = self._store(data, SLOT_MOVED, avoid_page=t_page)
+            self._clear(old_target)
+            with self._pool.page(self._file, page_no, write=True) as buf:
+                _rewrite_slot(buf, slot, _REDIRECT.pack(new_target), SLOT_REDIRECT)
+            return True
+        return False
+
+    def _clear(self, rid: int) -> None:
+        self._changed = True
+        page_no, slot = split_rid(rid)
+        with self._pool.page(self._file, page_no, write=True) as buf:
+            _set_slot(buf, slot, 0, 0, SLOT_FREE)
+
+    def delete(self, rid: int) -> bool:
+        if not self._valid(rid):
+            return False
+        flag, content = self._slot_of(rid)
+        if flag == SLOT_REDIRECT:
+            self._clear(_REDIRECT.unpack(content)[0])
+        elif flag != SLOT_ROW:
+            return False
+        self._clear(rid)
+        self._count_rows(0, 1)
+        return True
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for batch in self.scan_batches():
+            yield from batch
+
+    def scan_batches(self, first: int = 1, stop: Optional[int] = None) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        """Lignes page par page (un lot par page), des pages first à stop exclue (tout par défaut)."""
+        for page_no in range(max(first, 1), self.page_count if stop is None else min(stop, self.page_count)):
+            # copie les enregistrements de la page avant de rendre la main :
+            # l'appelant peut modifier la page pendant l'itération
+            entries = []
+            with self._pool.page(self._file, page_no) as buf:
+                n_slots, _ = _page_header(buf)
+                for i in range(n_slots):
+                    off, ln, flag = _get_slot(buf, i)
+                    if flag in (SLOT_ROW, SLOT_REDIRECT):
+                        entries.append((make_rid(page_no, i), flag, bytes(buf[off:off + ln])))
+            batch = []
+            for rid, flag, data in entries:
+                if flag == SLOT_REDIRECT:
+                    row = self.read(rid)
+                    if row is not None:
+                        batch.append((rid, row))
+                else:
+                    batch.append((rid, _decode(data)))
+            if batch:
+                yield batch
+
+    # --- VACUUM ---
+
+    def dead_ratio(self) -> float:
+        # compteurs de l'en-tête (un fichier plus ancien ne compte ses lignes vivantes qu'à partir de son premier VACUUM)
+        live, dead, _ = self._vacuum_info()
+        return dead / (live + dead) if dead else 0.0
+
+    def vacuum(self, checkpoint: Optional[Callable[[], Any]] = None) -> int:
+        """
+        Rend la place des lignes supprimées sans déplacer aucune ligne (les rids restent
+        valides) : slots libres de fin de page retirés, pages assez vides notées dans
+        l'en-tête pour les prochaines insertions, pages vides de fin de fichier retirées
+        et fichier raccourci. checkpoint : écrit les pages d'un fichier protégé par le WAL
+        avant de raccourcir le fichier. Retourne le nombre d'octets rendus : ceux des pages
+        retirées, plus la place libre des pages remises dans la liste des pages à remplir
+        (celles qui n'y étaient pas déjà).
+        """
+        page_count = self.page_count
+        page_size = self.page_size
+        listed = set(self._vacuum_info()[2])
+        live = 0
+        last_used = 0
+        free = []
+        room: Dict[int, int] = {}
+        for page_no in range(1, page_count):
+            with self._pool.page(self._file, page_no) as buf:
+                n_slots, _ = _page_header(buf)
+                slots = [_get_slot(buf, i) for i in range(n_slots)]
+            live += sum(1 for _, _, flag in slots if flag in (SLOT_ROW, SLOT_REDIRECT))
+            keep = n_slots
+            while keep and slots[keep - 1][2] == SLOT_FREE:
+                keep -= 1
+            if keep < n_slots:
+                with self._pool.page(self._file, page_no, write=True) as buf:
+                    _PAGE_HEADER.pack_into(buf, 0, keep, _page_header(buf)[1])
+            if keep:
+                last_used = page_no
+            used = sum(ln for _, ln, flag in slots[:keep] if flag != SLOT_FREE)
+            room[page_no] = page_size - _PAGE_HEADER.size - keep * _SLOT.size - used
+            if room[page_no] * _FREE_FRACTION >= page_size:
+                free.append(page_no)
+        # la dernière page reçoit déjà les insertions ; les suivantes disparaissent
+        new_count = last_used + 1
+        self._changed = True
+        free = self._set_vacuum_info(live, 0, [p for p in free if p < last_used])
+        reusable = sum(room[p] for p in free if p not in listed)
+        if new_count < page_count:
+            self._set_header(3, new_count)
+            self._pool.truncate(self._file, new_count)
+        self.flush()
+        if checkpoint is not None:
+            checkpoint()
+        if new_count >= page_count:
+            return reusable
+        self._file.truncate(new_count)
+        return (page_count - new_count) * page_size + reusable
+
+    def has_dirty_pages(self) -> bool:
+        """Des pages du fichier ne sont encore qu'en mémoire (pas écrites sur disque)."""
+        return self._pool.has_dirty(self._file)
+
+    def flush(self) -> None:
+        # le compteur change à chaque flush qui suit une modification faite par cette instance
+        # (les pages d'un fichier protégé par le WAL restent dirty jusqu'au checkpoint)
+        if self._changed:
+            self._set_header(5, self._header()[5] + 1)
+            self._changed = False
+        self._pool.flush_file(self._file)
+
+    def close(self) -> None:
+        self._pool.release_file(self._file)
+        self._file.close()
@@ -0,0 +1,353 @@
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # plateformes sans fcntl : verrous limités au processus
+    fcntl = None
+
+from src.storage.bufferpool import get_buffer_pool
+from src.storage.mvcc import forget_table_versions
+
+# fichiers de verrou d'une base : Data/<db>/.locks/catalog.lock, Data/<db>/.locks/table.<t>.lock
+LOCKS_DIR = ".locks"
+SHARED = "shared"
+EXCLUSIVE = "exclusive"
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_POLL_MS = 5.0
+
+# état d'une table, en tête de son fichier de verrou :
+#   génération (incrémentée à chaque libération d'un verrou exclusif)
+#   propriétaire (n° du WAL + 1) des pages encore en mémoire d'un processus, 0 si aucun
+_GENERATION = struct.Struct("<Q")
+_OWNER = struct.Struct("<I")
+_OWNER_OFFSET = _GENERATION.size
+
+
+class LockTimeout(Exception):
+    """Verrou non obtenu dans le délai (SGBD_LOCK_TIMEOUT) : l'ordre est abandonné."""
+
+    def __init__(self, resource: str, mode: str):
+        super().__init__(f"lock timeout on {resource} ({mode})")
+        self.resource = resource
+        self.mode = mode
+
+
+def lock_timeout() -> float:
+    return float(os.environ.get("SGBD_LOCK_TIMEOUT", DEFAULT_TIMEOUT))
+
+
+def poll_interval() -> float:
+    return float(os.environ.get("SGBD_LOCK_POLL_MS", DEFAULT_POLL_MS)) / 1000.0
+
+
+@lru_cache(maxsize=1024)
+def _lock_dir(db_path: str) -> Path:
+    # résolu une fois par base : chaque ordre prend deux verrous
+    return Path(db_path).resolve() / LOCKS_DIR
+
+
+def catalog_lock_path(db_path: Path) -> Path:
+    return _lock_dir(str(db_path)) / "catalog.lock"
+
+
+def table_lock_path(db_path: Path, table_name: str) -> Path:
+    return _lock_dir(str(db_path)) / f"table.{table_name}.lock"
+
+
+def _table_of(lock_path: Path) -> Optional[str]:
+    name = lock_path.name
+    if name.startswith("table.") and name.endswith(".lock"):
+        return name[len("table."):-len(".lock")]
+    return None
+
+
+# --- état des tables (génération, propriétaire) ---
+
+def _read_state(lock_path: Path, fd: Optional[int] = None) -> Tuple[int, int]:
+    """(génération, propriétaire) lus dans le fichier de verrou (par fd s'il est déjà ouvert)."""
+    if fd is not None:
+        raw = os.pread(fd, _OWNER_OFFSET + _OWNER.size, 0)
+    else:
+        try:
+            with open(lock_path, "rb") as f:
+                raw = f.read(_OWNER_OFFSET + _OWNER.size)
+        except FileNotFoundError:
+            return 0, 0
+    if len(raw) < _OWNER_OFFSET + _OWNER.size:
+        return 0, 0
+    return _GENERATION.unpack_from(raw, 0)[0], _OWNER.unpack_from(raw, _OWNER_OFFSET)[0]
+
+
+def _write_field(lock_path: Path, packer: struct.Struct, offset: int, value: int) -> bool:
+    try:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    except FileNotFoundError:
+        return False  # base supprimée
+    try:
+        os.pwrite(fd, packer.pack(value), offset)
+    finally:
+        os.close(fd)
+    return True
+
+
+def read_owner(db_path: Path, table_name: str) -> int:
+    return _read_state(table_lock_path(db_path, table_name))[1]
+
+
+def set_owner(db_path: Path, table_name: str, owner: int) -> None:
+    """Note (owner > 0) ou efface (0) le WAL dont les pages de la table ne sont pas encore sur disque."""
+    _write_field(table_lock_path(db_path, table_name), _OWNER, _OWNER_OFFSET, owner)
+
+
+def clear_owner(db_path: Path, owner: int) -> List[str]:
+    """Efface la marque `owner` de toutes les tables de la base. Retourne les tables concernées."""
+    cleared = []
+    lock_dir = _lock_dir(str(db_path))
+    if not lock_dir.is_dir():
+        return cleared
+    for p in lock_dir.glob("table.*.lock"):
+        if _read_state(p)[1] == owner:
+            _write_field(p, _OWNER, _OWNER_OFFSET, 0)
+            cleared.append(_table_of(p))
+    return cleared
+
+
+def bump_generation(db_path: Path, table_name: str) -> None:
+    """Signale aux autres processus que le contenu de la table a changé sur disque."""
+    path = table_lock_path(db_path, table_name)
+    _write_field(path, _GENERATION, 0, _read_state(path)[0] + 1)
+
+
+def _invalidate(db_path: Path, table_name: str) -> None:
+    """
+    Table modifiée par un autre processus : pages en cache et versions en mémoire oubliées
+    (fichiers <table>.*, et partitions sous <table>/ d'une table partitionnée).
+    """
+    table = Path(db_path).resolve() / table_name
+    get_buffer_pool().invalidate(f"{table}.")
+    get_buffer_pool().invalidate(f"{table}{os.sep}")
+    forget_table_versions(table)
+
+
+# résolution d'une marque laissée par un autre WAL (installée par le module wal) :
+#   (base, table, n° du WAL, échéance) -> True si ce WAL est celui du processus
+_owner_resolver: Optional[Callable[[Path, str, int, float], bool]] = None
+
+
+def set_owner_resolver(resolver: Callable[[Path, str, int, float], bool]) -> None:
+    global _owner_resolver
+    _owner_resolver = resolver
+
+
+class _Resource:
+    """Un fichier de verrou : détenteurs du processus (par thread) et verrou flock correspondant."""
+    __slots__ = ("path", "db_path", "table", "mode", "holders", "fd", "busy", "waiting_exclusive",
+                 "seen", "cond")
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.db_path = path.parent.parent
+        self.table = _table_of(path)
+        self.mode: Optional[str] = None
+        self.holders: Dict[int, int] = {}
+        self.fd: Optional[int] = None
+        self.busy = False
+        self.waiting_exclusive = 0
+        self.seen: Optional[int] = None  # dernière génération connue du processus
+        self.cond = threading.Condition()
+
+
+class LockManager:
+    """
+    Verrous partagés / exclusifs par ressource (catalogue d'une base, table), valables entre
+    threads du processus et entre processus (flock sur un fichier de .locks/). Un thread peut
+    reprendre un verrou qu'il détient déjà ; un verrou partagé n'est pas converti en exclusif.
+    hold() prend les ressources dans l'ordre de leur chemin (catalogue avant tables, tables
+    par nom) : deux ordres ne s'attendent jamais en cycle. Chaque attente est bornée par un
+    délai (LockTimeout).
+    À la prise d'une table par le processus : si un autre processus l'a modifiée depuis
+    (génération), ses pages en cache sont oubliées ; si un autre WAL a encore des pages de
+    la table en mémoire, on attend son checkpoint (ou on rejoue son journal s'il est mort).
+    """
+
+    def __init__(self):
+        self._resources: Dict[str, _Resource] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> _Resource:
+        with self._lock:
+            res = self._resources.get(key)
+            if res is None:
+                res = self._resources[key] = _Resource(Path(key))
+            return res
+
+    @contextmanager
+    def hold(self, requests: Iterable[Tuple[Path, str]], timeout: Optional[float] = None) -> Iterator[None]:
+        wanted: Dict[str, str] = {}
+        for path, mode in requests:
+            key = str(path)
+            if wanted.get(key) != EXCLUSIVE:
+                wanted[key] = mode
+        deadline = time.monotonic() + (lock_timeout() if timeout is None else timeout)
+        acquired: List[_Resource] = []
+        try:
+            for key in sorted(wanted):
+                res = self._get(key)
+                self._acquire(res, wanted[key], deadline)
+                acquired.append(res)
+            yield
+        finally:
+            for res in reversed(acquired):
+                self._release(res)
+
+    def _acquire(self, res: _Resource, mode: str, deadline: float) -> None:
+        me = threading.get_ident()
+        with res.cond:
+            if mode == EXCLUSIVE:
+                res.waiting_exclusive += 1
+            try:
+                while True:
+                    if me in res.holders:
+                        if mode == EXCLUSIVE and res.mode != EXCLUSIVE:
+                            raise RuntimeError(f"lock upgrade not supported ({res.path.name})")
+                        res.holders[me] += 1
+                        return
+                    if not res.busy:
+                        if res.mode is None:
+                            res.busy = True
+                            break
+                        if mode == SHARED and res.mode == SHARED and not res.waiting_exclusive:
+                            res.holders[me] = 1
+                            return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise LockTimeout(res.path.name, mode)
+                    res.cond.wait(remaining)
+            finally:
+                if mode == EXCLUSIVE:
+                    res.waiting_exclusive -= 1
+        # premier détenteur du processus : verrou du fichier, hors du verrou interne
+        fd = None
+        try:
+            fd = self._flock(res, mode, deadline)
+            if res.table is not None and fd is not None:
+                self._refresh(res, fd, deadline)
+        except BaseException:
+            if fd is not None:
+                os.close(fd)
+            with res.cond:
+                res.busy = False
+                res.cond.notify_all()
+            raise
+        with res.cond:
+            res.fd = fd
+            res.mode = mode
+            res.holders[me] = 1
+            res.busy = False
+            res.cond.notify_all()
+
+    @staticmethod
+    def _flock(res: _Resource, mode: str, deadline: float) -> Optional[int]:
+        if fcntl is None:
+            return None
+        op = fcntl.LOCK_EX if mode == EXCLUSIVE else fcntl.LOCK_SH
+        poll = poll_interval()
+        while True:
+            try:
+                fd = os.open(res.path, os.O_RDWR | os.O_CREAT, 0o644)
+            except FileNotFoundError:
+                if not res.db_path.is_dir():
+                    return None  # base absente ou supprimée (ordre voué à l'échec) : verrou du processus seulement
+                try:
+                    res.path.parent.mkdir(exist_ok=True)
+                except FileNotFoundError:
+                    return None
+                continue
+            try:
+                while True:
+                    try:
+                        fcntl.flock(fd, op | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise LockTimeout(res.path.name, mode)
+                        time.sleep(poll)
+                # fichier recréé entre open et flock (DROP DATABASE) : on reprend le nouveau
+                try:
+                    if os.fstat(fd).st_ino == os.stat(res.path).st_ino:
+                        return fd
+                except FileNotFoundError:
+                    pass
+            except BaseException:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    @staticmethod
+    def _refresh(res: _Resource, fd: int, deadline: float) -> None:
+        generation, owner = _read_state(res.path, fd)
+        if owner:
+            if _owner_resolver is not None and _owner_resolver(res.db_path, res.table, owner - 1, deadline):
+                res.seen = generation  # pages en mémoire de ce processus : à jour par définition
+                return
+            generation, owner = _read_state(res.path, fd)
+        if generation != res.seen:
+            _invalidate(res.db_path, res.table)
+            res.seen = generation
+
+    def _release(self, res: _Resource) -> None:
+        me = threading.get_ident()
+        with res.cond:
+            count = res.holders.get(me, 0) - 1
+            if count > 0:
+                res.holders[me] = count
+                return
+            res.holders.pop(me, None)
+            if res.holders:
+                return
+            fd, mode = res.fd, res.mode
+            res.fd = None
+            res.mode = None
+            if fd is not None:
+                try:
+                    if mode == EXCLUSIVE and res.table is not None:
+                        generation = _read_state(res.path, fd)[0] + 1
+                        os.pwrite(fd, _GENERATION.pack(generation), 0)
+                        res.seen = generation
+                finally:
+                    os.close(fd)  # libère le flock
+            res.cond.notify_all()
+
+
+_manager = LockManager()
+
+
+def get_lock_manager() -> LockManager:
+    return _manager
+
+
+def hold(requests: Iterable[Tuple[Path, str]], timeout: Optional[float] = None):
+    """Prend les verrous (chemin de fichier de verrou, mode) dans l'ordre global ; à utiliser avec `with`."""
+    return _manager.hold(requests, timeout)
+
+
+def hold_table(db_path: Path, table_name: str, mode: str, catalog: str = SHARED,
+               timeout: Optional[float] = None):
+    """Verrous d'un ordre sur une table : catalogue de la base (partagé par défaut) puis la table."""
+    return _manager.hold([(catalog_lock_path(db_path), catalog),
+                          (table_lock_path(db_path, table_name), mode)], timeout)
+
+
+def hold_catalog(db_path: Path, tables: Iterable[str] = (), timeout: Optional[float] = None):
+    """Verrous d'un ordre DDL : catalogue exclusif et tables touchées exclusives."""
+    requests = [(catalog_lock_path(db_path), EXCLUSIVE)]
+    requests += [(table_lock_path(db_path, t), EXCLUSIVE) for t in tables]
+    return _manager.hold(requests, timeout)
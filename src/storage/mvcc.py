@@ -0,0 +1,360 @@
+import itertools
+import os
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from src.storage.base import RowStorage, path_under
+
+DEFAULT_GC_SECONDS = 1.0
+
+
+class Writer:
+    """Auteur d'écritures (ordre isolé ou transaction) ; commit_ts fixé une seule fois à la validation."""
+    __slots__ = ("id", "commit_ts")
+
+    def __init__(self, writer_id: int):
+        self.id = writer_id
+        self.commit_ts: Optional[int] = None
+
+
+class Snapshot:
+    """
+    Instantané de lecture : voit les écritures validées avec commit_ts <= ts,
+    plus celles de son propre writer.
+    """
+    __slots__ = ("ts", "writer", "_released")
+
+    def __init__(self, ts: int, writer: Writer):
+        self.ts = ts
+        self.writer = writer
+        self._released = False
+
+    def sees(self, writer: Writer) -> bool:
+        return writer is self.writer or (writer.commit_ts is not None and writer.commit_ts <= self.ts)
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            _release_snapshot(self.ts)
+
+
+class _Version:
+    """Image d'une ligne avant la modification faite par `writer` (None : la ligne n'existait pas)."""
+    __slots__ = ("writer", "before")
+
+    def __init__(self, writer: Writer, before: Optional[Dict[str, Any]]):
+        self.writer = writer
+        self.before = before
+
+
+# horloge des validations et instantanés actifs (pour le GC)
+_clock = 0
+_clock_lock = threading.Lock()
+_active: Counter = Counter()
+_writer_ids = itertools.count(1)
+
+
+def take_snapshot() -> Snapshot:
+    """Instantané courant, enregistré comme actif jusqu'à release()."""
+    with _clock_lock:
+        _active[_clock] += 1
+        return Snapshot(_clock, Writer(next(_writer_ids)))
+
+
+def _release_snapshot(ts: int) -> None:
+    with _clock_lock:
+        _active[ts] -= 1
+        if _active[ts] <= 0:
+            del _active[ts]
+
+
+def publish(writer: Writer) -> int:
+    """Valide les écritures du writer : visibles d'un coup pour les instantanés pris ensuite."""
+    global _clock
+    with _clock_lock:
+        if writer.commit_ts is None:
+            _clock += 1
+            writer.commit_ts = _clock
+        return writer.commit_ts
+
+
+def horizon() -> int:
+    """Plus ancien instantané actif : les versions validées avant lui ne servent plus à personne."""
+    with _clock_lock:
+        return min(_active) if _active else _clock
+
+
+class VersionStore:
+    """
+    Versions antérieures des lignes d'une table (undo en mémoire) : rid -> chaîne de
+    _Version, de la plus ancienne à la plus récente. La dernière version est toujours
+    dans le stockage ; un lecteur remonte la chaîne en défaisant les modifications
+    qu'il ne doit pas voir. Les chaînes plus vieilles que le plus ancien instantané
+    actif sont supprimées par le GC.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.chains: Dict[int, List[_Version]] = {}
+        self.collected = 0
+
+    def __len__(self) -> int:
+        return sum(len(c) for c in self.chains.values())
+
+    def record(self, rid: int, writer: Writer, before: Optional[Dict[str, Any]]) -> None:
+        chain = self.chains.setdefault(rid, [])
+        if chain and chain[-1].writer is writer:
+            return  # l'image d'avant la première modification de ce writer suffit
+        chain.append(_Version(writer, before))
+
+    def resolve(self, rid: int, current: Optional[Dict[str, Any]], snapshot: Snapshot) -> Optional[Dict[str, Any]]:
+        """État de la ligne rid vu par l'instantané (current = état dans le stockage)."""
+        chain = self.chains.get(rid)
+        if not chain:
+            return current
+        row = current
+        for v in reversed(chain):
+            if snapshot.sees(v.writer):
+                break
+            row = v.before
+        return row
+
+    def invisible(self, snapshot: Snapshot) -> Set[int]:
+        """Rids modifiés par des écritures que l'instantané ne voit pas."""
+        with self.lock:
+            return {rid for rid, chain in self.chains.items() if not snapshot.sees(chain[-1].writer)}
+
+    def gc(self, limit: int) -> int:
+        """Supprime les versions validées au plus tard à `limit` (et toutes les plus anciennes)."""
+        removed = 0
+        with self.lock:
+            for rid in list(self.chains):
+                chain = self.chains[rid]
+                keep_from = 0
+                for i in range(len(chain) - 1, -1, -1):
+                    ts = chain[i].writer.commit_ts
+                    if ts is not None and ts <= limit:
+                        keep_from = i + 1
+                        break
+                if keep_from:
+                    removed += keep_from
+                    if keep_from >= len(chain):
+                        del self.chains[rid]
+                    else:
+                        del chain[:keep_from]
+            self.collected += removed
+        return removed
+
+
+class VersionedStorage(RowStorage):
+    """
+    Stockage lu à travers un instantané : les lecteurs ne prennent aucun verrou logique
+    et voient un état cohérent pendant que les écrivains avancent. Chaque écriture
+    enregistre d'abord l'image précédente de la ligne dans le VersionStore de la table.
+    Sans instantané fourni, l'ordre prend le sien (validé au flush) ; une transaction
+    fournit le sien et valide elle-même (publish) au COMMIT.
+    """
+
+    def __init__(self, inner: RowStorage, store: VersionStore, snapshot: Optional[Snapshot] = None):
+        self.inner = inner
+        self.store = store
+        self._owned = snapshot is None
+        self.snapshot = snapshot if snapshot is not None else take_snapshot()
+        self._wrote = False
+
+    @property
+    def path(self) -> Path:
+        return self.inner.path
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        return self.inner.schema_version
+
+    def committed(self) -> RowStorage:
+        return self.inner.committed()
+
+    def stamp(self) -> Optional[str]:
+        return self.inner.stamp()
+
+    def snapshot_changes(self) -> Set[int]:
+        return self.store.invisible(self.snapshot)
+
+    def pruned(self, node: Optional[Dict[str, Any]]) -> RowStorage:
+        # vue sur le même instantané, jamais fermée : c'est ce stockage qui le libère
+        inner = self.inner.pruned(node)
+        return self if inner is self.inner else VersionedStorage(inner, self.store, self.snapshot)
+
+    def placement_error(self, row: Dict[str, Any], rid: Optional[int] = None) -> Optional[str]:
+        return self.inner.placement_error(row, rid)
+
+    def moves(self, row: Dict[str, Any], rid: int) -> bool:
+        return self.inner.moves(row, rid)
+
+    def write_conflicts(self, rids: Iterable[int]) -> bool:
+        """Une des lignes a été modifiée par une écriture que l'instantané ne voit pas."""
+        with self.store.lock:
+            for rid in rids:
+                chain = self.store.chains.get(rid)
+                if chain and not self.snapshot.sees(chain[-1].writer):
+                    return True
+        return False
+
+    # --- lecture ---
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        store = self.store
+        batches = self.inner.scan_batches()
+        seen: Set[int] = set()
+        while True:
+            # une page copiée et résolue sous le verrou : jamais entre une écriture et sa version
+            with store.lock:
+                batch = next(batches, None)
+                if batch is None:
+                    break
+                seen.update(rid for rid, _ in batch)
+                if store.chains:
+                    resolved = []
+                    for rid, row in batch:
+                        if rid in store.chains:
+                            row = store.resolve(rid, row, self.snapshot)
+                            if row is None:
+                                continue
+                        resolved.append((rid, row))
+                    batch = resolved
+            yield from batch
+        # lignes supprimées (ou déplacées) depuis l'instantané : absentes du stockage, encore visibles
+        with store.lock:
+            extra = [(rid, store.resolve(rid, None, self.snapshot)) for rid in store.chains if rid not in seen]
+        for rid, row in extra:
+            if row is not None:
+                yield rid, row
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        with self.store.lock:
+            return self.store.resolve(rid, self.inner.read(rid), self.snapshot)
+
+    # --- écriture ---
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        return self.insert_many([row])[0]
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        rows = list(rows)
+        self.inner.begin_write()
+        with self.store.lock:
+            rids = self.inner.insert_many(rows)
+            for rid in rids:
+                self.store.record(rid, self.snapshot.writer, None)
+        self._wrote = self._wrote or bool(rids)
+        return rids
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        self.inner.begin_write()
+        with self.store.lock:
+            before = self.inner.read(rid)
+            if before is None:
+                return False
+            self.store.record(rid, self.snapshot.writer, before)
+            ok = self.inner.update(rid, row)
+        self._wrote = True
+        return ok
+
+    def delete(self, rid: int) -> bool:
+        self.inner.begin_write()
+        with self.store.lock:
+            before = self.inner.read(rid)
+            if before is None:
+                return False
+            self.store.record(rid, self.snapshot.writer, before)
+            ok = self.inner.delete(rid)
+        self._wrote = True
+        return ok
+
+    def begin_write(self) -> None:
+        self.inner.begin_write()
+
+    def dead_ratio(self) -> float:
+        return self.inner.dead_ratio()
+
+    def vacuum(self) -> int:
+        # les rids ne changent pas : les versions gardées pour les instantanés restent valables
+        return self.inner.vacuum()
+
+    def flush(self) -> None:
+        self.inner.flush()
+        if self._owned and self._wrote:
+            # nouvel instantané après validation : l'ordre suivant sur ce stockage voit ses écritures
+            ts = publish(self.snapshot.writer)
+            self._wrote = False
+            self.snapshot.release()
+            self.snapshot = take_snapshot()
+            if horizon() >= ts:
+                self.store.gc(ts)  # aucun lecteur plus ancien : versions inutiles tout de suite
+
+    def close(self) -> None:
+        try:
+            self.flush()
+            self.inner.close()
+        finally:
+            if self._owned:
+                self.snapshot.release()
+
+
+# versions en mémoire par table (clé = chemin résolu du fichier de données)
+_stores: Dict[str, VersionStore] = {}
+_stores_lock = threading.Lock()
+_gc_thread: Optional[threading.Thread] = None
+
+
+def get_version_store(path: Path) -> VersionStore:
+    key = str(Path(path).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = VersionStore()
+            _start_gc()
+        return store
+
+
+def forget_versions(path: str) -> None:
+    """Oublie les versions des tables sous le répertoire path, une base (DROP DATABASE, renommage...)."""
+    root = str(Path(path).resolve())
+    with _stores_lock:
+        for k in [k for k in _stores if path_under(k, root)]:
+            del _stores[k]
+
+
+def forget_table_versions(table: Path) -> None:
+    """
+    Oublie les versions d'une seule table (chemin sans extension) : son fichier de données
+    <table>.<moteur>, ou le répertoire <table> d'une table partitionnée.
+    """
+    key = str(Path(table).resolve())
+    with _stores_lock:
+        for k in [k for k in _stores if k == key or (k.startswith(key + ".") and os.sep not in k[len(key):])]:
+            del _stores[k]
+
+
+def collect_garbage() -> int:
+    """Un passage du GC sur toutes les tables. Retourne le nombre de versions supprimées."""
+    limit = horizon()
+    with _stores_lock:
+        stores = list(_stores.values())
+    return sum(s.gc(limit) for s in stores)
+
+
+def _start_gc() -> None:
+    global _gc_thread
+    if _gc_thread is not None:
+        return
+    interval = float(os.environ.get("SGBD_MVCC_GC_SECONDS", DEFAULT_GC_SECONDS))
+
+    def run():
+        stop = threading.Event()
+        while not stop.wait(interval):
+            collect_garbage()
+
+    _gc_thread = threading.Thread(target=run, name="mvcc-gc", daemon=True)
+    _gc_thread.start()
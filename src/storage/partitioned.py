@@ -0,0 +1,296 @@
+import hashlib
+import re
+import zlib
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from src.storage.base import RowStorage
+from src.storage.wal import flush_together
+
+# Table partitionnée (CREATE TABLE ... PARTITION BY) : un fichier de données par partition
+# sous Data/<base>/<table>/, choisi d'après la valeur d'une colonne. Une écriture ne touche
+# que la partition de la ligne ; un WHERE sur la colonne de partitionnement ne lit que les
+# partitions qui peuvent contenir des lignes retenues. Un UPDATE qui change la partition
+# d'une ligne la déplace (Table.update) : supprimée de l'une, insérée dans l'autre, au même
+# commit du journal ; elle change de rid.
+#
+# Entrée "partitioning" du catalogue :
+#   {"type": "hash", "column": "id", "partitions": [{"name": "p0"}, ...]}
+#   {"type": "range", "column": "day", "partitions": [{"name": "old", "less_than": 100}, ...,
+#                                                     {"name": "rest", "less_than": None}]}
+# (less_than None : MAXVALUE, seulement pour la dernière partition)
+
+PARTITION_SHIFT = 48                 # rid = (n° de partition << 48) | rid dans la partition
+_LOCAL_MASK = (1 << PARTITION_SHIFT) - 1
+MAX_PARTITIONS = 1024
+_NAME = re.compile(r"^\w+$")         # nom de partition : aussi nom de fichier
+
+
+class PartitionError(ValueError):
+    """Définition de partitionnement invalide, ou ligne sans partition."""
+
+
+def _hash(value: Any) -> int:
+    """Hachage stable d'un processus à l'autre (hash() des textes ne l'est pas)."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int):
+        return value
+    return zlib.crc32(str(value).encode("utf-8"))
+
+
+class PartitionScheme:
+    """
+    Répartition des lignes entre les partitions d'après la valeur de `column` :
+    - hash : valeur modulo le nombre de partitions (crc32 du texte pour les non-entiers)
+    - range : première partition dont la borne less_than est strictement supérieure
+    NULL va toujours dans la première partition.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.kind = spec["type"]
+        self.column = spec["column"]
+        self.names = [p["name"] for p in spec["partitions"]]
+        self.bounds = [p.get("less_than") for p in spec["partitions"]] if self.kind == "range" else []
+        # bornes finies, triées : bisect donne la partition d'une valeur
+        self._finite = self.bounds[:-1] if self.bounds and self.bounds[-1] is None else self.bounds
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @staticmethod
+    def define(spec: Dict[str, Any], convert: Callable[[Any], Tuple[Any, bool, Optional[str]]]) -> Dict[str, Any]:
+        """
+        Entrée de catalogue d'un PARTITION BY du parser, bornes converties au type de la
+        colonne (convert : ColumnRule.convert). Lève PartitionError si elle est invalide.
+        """
+        kind = str(spec.get("type") or "").lower()
+        if kind == "hash":
+            count = spec.get("partitions")
+            if not isinstance(count, int) or not 1 <= count <= MAX_PARTITIONS:
+                raise PartitionError(f"PARTITIONS must be between 1 and {MAX_PARTITIONS}")
+            return {"type": "hash", "column": spec["column"], "partitions": [{"name": f"p{i}"} for i in range(count)]}
+        if kind != "range":
+            raise PartitionError(f"unknown partitioning {spec.get('type')}")
+        partitions = []
+        previous = None
+        for n, p in enumerate(spec.get("partitions") or []):
+            bound = p.get("less_than")
+            if bound is None:
+                if n != len(spec["partitions"]) - 1:
+                    raise PartitionError("MAXVALUE must be the last partition")
+            else:
+                bound, ok, err = convert(bound)
+                if not ok or bound is None:
+                    raise PartitionError(f"invalid bound for partition {p.get('name')}: {err or 'NULL'}")
+                try:
+                    if previous is not None and not previous < bound:
+                        raise PartitionError("partition bounds must be strictly increasing")
+                except TypeError:
+                    raise PartitionError("partition bounds must be strictly increasing")
+                previous = bound
+            partitions.append({"name": p.get("name"), "less_than": bound})
+        if not 1 <= len(partitions) <= MAX_PARTITIONS:
+            raise PartitionError(f"a table needs between 1 and {MAX_PARTITIONS} partitions")
+        names = [str(p["name"]) for p in partitions]
+        if len({n.lower() for n in names}) != len(names) or not all(_NAME.match(n) for n in names):
+            raise PartitionError("partition names must be unique words")
+        return {"type": "range", "column": spec["column"], "partitions": partitions}
+
+    def route(self, value: Any) -> Optional[int]:
+        """Partition d'une valeur de la colonne ; None si aucune ne l'accepte (au-delà des bornes)."""
+        if value is None:
+            return 0
+        if self.kind == "hash":
+            return _hash(value) % len(self.names)
+        try:
+            i = bisect_right(self._finite, value)
+        except TypeError:
+            return None
+        return i if i < len(self.names) else None
+
+    def candidates(self, node: Optional[Dict[str, Any]]) -> Optional[Set[int]]:
+        """
+        Partitions qui peuvent contenir des lignes satisfaisant le WHERE (AST compilé) ;
+        None : toutes. Seules les conditions sur la colonne de partitionnement comptent.
+        """
+        if node is None:
+            return None
+        op = node["op"]
+        if op in ("and", "or"):
+            parts = [self.candidates(a) for a in node["args"]]
+            if op == "and":
+                known = [p for p in parts if p is not None]
+                return set.intersection(*known) if known else None
+            return None if any(p is None for p in parts) else set().union(*parts)
+        arg = node.get("left") if "left" in node else node.get("arg")
+        if not arg or arg["op"] != "col" or arg["name"] != self.column or node.get("negated"):
+            return None
+        if op == "is_null":
+            return {0}
+        if op == "in":
+            if not all(item["op"] == "lit" for item in node["items"]):
+                return None
+            values = [item["value"] for item in node["items"] if item["value"] is not None]
+            return {i for i in map(self.route, values) if i is not None}
+        right = node.get("right")
+        if not right or right["op"] != "lit":
+            return None
+        value = right["value"]
+        if value is None:
+            return set()  # comparaison à NULL : jamais vraie
+        if op == "=":
+            i = self.route(value)
+            return set() if i is None else {i}
+        if self.kind != "range" or op not in ("<", "<=", ">", ">="):
+            return None
+        try:
+            if op in ("<", "<="):
+                # partition i : valeurs >= borne i-1
+                lows = [None] + self.bounds[:-1]
+                return {i for i, low in enumerate(lows) if low is None or (low < value if op == "<" else low <= value)}
+            # partition i : valeurs < borne i
+            return {i for i, high in enumerate(self.bounds) if high is None or high > value}
+        except TypeError:
+            return None
+
+
+class PartitionedStorage(RowStorage):
+    """
+    Stockage d'une table partitionnée : une partition = un stockage de fichier (heap file
+    journalisé par le WAL, ou journal .log), ouvert à la première opération qui la
+    concerne. Le flush valide les partitions modifiées en un seul commit du journal.
+    pruned() donne une vue limitée à certaines partitions, qui partage les partitions
+    ouvertes (c'est le stockage d'origine qui les ferme).
+    """
+
+    def __init__(self, path: Path, scheme: PartitionScheme, opener: Callable[[int], RowStorage],
+                 active: Optional[List[int]] = None, opened: Optional[Dict[int, RowStorage]] = None):
+        self._path = Path(path)
+        self.scheme = scheme
+        self._opener = opener
+        self._opened: Dict[int, RowStorage] = opened if opened is not None else {}
+        self.active = active if active is not None else list(range(len(scheme)))
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def part(self, i: int) -> RowStorage:
+        storage = self._opened.get(i)
+        if storage is None:
+            storage = self._opened[i] = self._opener(i)
+        return storage
+
+    def active_parts(self) -> List[Tuple[int, RowStorage]]:
+        """(premier rid, stockage) de chaque partition lue par ce stockage."""
+        return [(i << PARTITION_SHIFT, self.part(i)) for i in self.active]
+
+    def members(self) -> List[RowStorage]:
+        return [self._opened[i] for i in sorted(self._opened)]
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        return self.part(0).schema_version
+
+    def stamp(self) -> Optional[str]:
+        stamps = [self.part(i).stamp() for i in range(len(self.scheme))]
+        if any(s is None for s in stamps):
+            return None
+        return hashlib.sha1("|".join(stamps).encode("utf-8")).hexdigest()
+
+    def pruned(self, node: Optional[Dict[str, Any]]) -> RowStorage:
+        keep = self.scheme.candidates(node)
+        if keep is None or keep.issuperset(self.active):
+            return self
+        return PartitionedStorage(self._path, self.scheme, self._opener,
+                                  [i for i in self.active if i in keep], self._opened)
+
+    def placement_error(self, row: Dict[str, Any], rid: Optional[int] = None) -> Optional[str]:
+        column = self.scheme.column
+        i = self.scheme.route(row.get(column))
+        if i is None:
+            return f"no partition for {column} = {row.get(column)!r}"
+        if rid is not None and rid >> PARTITION_SHIFT != i:
+            return f"cannot move row to partition {self.scheme.names[i]} (partition key {column})"
+        return None
+
+    def moves(self, row: Dict[str, Any], rid: int) -> bool:
+        i = self.scheme.route(row.get(self.scheme.column))
+        return i is not None and rid >> PARTITION_SHIFT != i
+
+    # --- lecture ---
+
+    def scan_batches(self) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        for first, storage in self.active_parts():
+            for batch in storage.scan_batches():
+                yield [(first | rid, row) for rid, row in batch] if first else batch
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for batch in self.scan_batches():
+            yield from batch
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        i = rid >> PARTITION_SHIFT
+        if rid < 0 or i >= len(self.scheme):
+            return None
+        return self.part(i).read(rid & _LOCAL_MASK)
+
+    # --- écriture ---
+
+    def _route(self, row: Dict[str, Any]) -> int:
+        i = self.scheme.route(row.get(self.scheme.column))
+        if i is None:
+            raise PartitionError(self.placement_error(row))
+        return i
+
+    def begin_write(self) -> None:
+        # verrou d'écriture du WAL : celui de la base, commun à toutes les partitions
+        self.part(0).begin_write()
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        return self.insert_many([row])[0]
+
+    def insert_many(self, rows) -> List[int]:
+        rows = list(rows)
+        groups: Dict[int, List[int]] = {}
+        for n, row in enumerate(rows):
+            groups.setdefault(self._route(row), []).append(n)
+        rids = [0] * len(rows)
+        for i, positions in groups.items():
+            first = i << PARTITION_SHIFT
+            for n, rid in zip(positions, self.part(i).insert_many([rows[n] for n in positions])):
+                rids[n] = first | rid
+        return rids
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        i = rid >> PARTITION_SHIFT
+        if self._route(row) != i:
+            raise PartitionError(self.placement_error(row, rid))
+        return self.part(i).update(rid & _LOCAL_MASK, row)
+
+    def delete(self, rid: int) -> bool:
+        i = rid >> PARTITION_SHIFT
+        if rid < 0 or i >= len(self.scheme):
+            return False
+        return self.part(i).delete(rid & _LOCAL_MASK)
+
+    def dead_ratio(self) -> float:
+        # la partition la plus encombrée : c'est elle qu'un VACUUM vaut la peine de traiter
+        return max(self.part(i).dead_ratio() for i in range(len(self.scheme)))
+
+    def vacuum(self) -> int:
+        return sum(self.part(i).vacuum() for i in range(len(self.scheme)))
+
+    def flush(self) -> None:
+        flush_together(self.members())
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            for storage in self.members():
+                storage.close()
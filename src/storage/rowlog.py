@@ -0,0 +1,352 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.storage.base import RowStorage, path_under
+
+# format du journal de lignes : une ligne d'en-tête JSON puis une ligne JSON par enregistrement
+ROWLOG_FORMAT = "rowlog"
+ROWLOG_VERSION = 3
+_VACUUM_BATCH = 1000   # lignes par enregistrement "b" réécrit par un VACUUM
+
+
+def _parse_header(first: bytes) -> Optional[Dict[str, Any]]:
+    try:
+        header = json.loads(first)
+    except ValueError:
+        return None
+    if not isinstance(header, dict) or header.get("format") != ROWLOG_FORMAT:
+        return None
+    return header
+
+
+class _LiveRows:
+    """
+    Lignes vivantes d'un journal par rid (une par fichier et par inode, partagée par les
+    ouvertures du processus), relue de façon incrémentale quand le fichier a grandi : lire
+    une ligne par son rid (avant un UPDATE ou un DELETE) ne relit que ce qui a été ajouté
+    depuis, pas tout le fichier.
+    """
+
+    def __init__(self, ino: int, header: Dict[str, Any], pos: int):
+        self.ino = ino
+        self.base = int(header.get("rid_base", 0))
+        self.legacy = int(header.get("version", 1)) < 2
+        self.pos = pos                          # fin du dernier enregistrement complet lu
+        self.rows: Dict[int, Dict[str, Any]] = {}
+        self.written = 0                        # valeurs de lignes écrites (insertions et UPDATE)
+        self.lock = threading.Lock()
+
+    def apply(self, rid: int, rec: Dict[str, Any]) -> None:
+        rows = self.rows
+        if "d" in rec:
+            rows.pop(rec["d"], None)
+        elif "u" in rec:
+            self.written += 1
+            if rec["u"] in rows:
+                rows[rec["u"]] = rec.get("r") or {}
+        elif "b" in rec:
+            self.written += len(rec["b"])
+            if "k" in rec:
+                rows.update(zip(rec["k"], rec["b"]))
+            else:
+                # offset + i < offset + longueur de la ligne : pas de collision avec la ligne suivante
+                for i, row in enumerate(rec["b"]):
+                    rows[rid + i] = row
+        else:
+            self.written += 1
+            rows[rid] = rec.get("r") or {}
+
+
+_lives: Dict[str, _LiveRows] = {}
+_lives_lock = threading.Lock()
+
+
+def forget_rowlogs(path: str) -> None:
+    """Oublie les lignes gardées des journaux sous le répertoire path (DROP DATABASE, renommage...)."""
+    root = str(Path(path).resolve())
+    with _lives_lock:
+        for k in [k for k in _lives if path_under(k, root)]:
+            del _lives[k]
+
+
+class RowLog(RowStorage):
+    """
+    Stockage append-only d'une table : <table>.log
+      ligne 1   : {"format": "rowlog", "version": 3, "table": ..., "schema_version": n, "rid_base": n}
+      lignes 2+ : un enregistrement JSON compact par ligne
+        {"r": {...}}            insertion ; rid = rid_base + offset (octets) de la ligne dans le fichier
+        {"b": [{...}, ...]}     lot inséré d'un bloc ; rid de la i-ème ligne = rid_base + offset + i
+        {"b": [...], "k": [..]} lot recopié par un VACUUM : rids donnés par "k"
+        {"u": rid, "r": {...}}  nouvelle valeur de la ligne rid
+        {"d": rid}              suppression de la ligne rid
+    Toute écriture est un simple append ; la lecture reconstruit la table en streamant le fichier
+    (une fois par processus, puis seulement ce qui a été ajouté depuis). VACUUM réécrit le
+    fichier sans les lignes mortes.
+    Un lot tient sur une seule ligne : un append interrompu n'en laisse jamais une moitié.
+    (version 1 : chaque ligne après l'en-tête est directement une ligne de la table ;
+    version 2 : sans rid_base ni "k", lue telle quelle)
+    """
+    _path: Path
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    @staticmethod
+    def _encode(obj: Dict[str, Any]) -> str:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    def create(self, table_name: str, schema_version: int = 1) -> None:
+        """Crée le fichier avec son en-tête (échoue si le fichier existe déjà)."""
+        header = {
+            "format": ROWLOG_FORMAT,
+            "version": ROWLOG_VERSION,
+            "table": table_name,
+            "schema_version": schema_version,
+            "rid_base": 0,
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._path, "x", encoding="utf-8") as f:
+            f.write(self._encode(header))
+
+    def header(self) -> Optional[Dict[str, Any]]:
+        if not self._path.exists():
+            return None
+        with open(self._path, "rb") as f:
+            return _parse_header(f.readline())
+
+    @property
+    def version(self) -> int:
+        header = self.header()
+        return int(header.get("version", 1)) if header else ROWLOG_VERSION
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        header = self.header()
+        return header.get("schema_version") if header else None
+
+    def stamp(self) -> Optional[str]:
+        # append-only : la taille change à chaque écriture, l'inode à chaque réécriture
+        try:
+            st = os.stat(self._path)
+        except FileNotFoundError:
+            return None
+        return f"{st.st_ino}:{st.st_size}"
+
+    def _repair_tail(self, fd: int) -> None:
+        """
+        Un crash pendant un append peut laisser une dernière ligne sans '\\n'.
+        On tronque jusqu'au dernier saut de ligne pour ne pas coller le prochain
+        enregistrement à une ligne partielle.
+        """
+        size = os.lseek(fd, 0, os.SEEK_END)
+        if size == 0 or os.pread(fd, 1, size - 1) == b"\n":
+            return
+        pos = size
+        chunk = 4096
+        while pos > 0:
+            start = max(0, pos - chunk)
+            data = os.pread(fd, pos - start, start)
+            idx = data.rfind(b"\n")
+            if idx != -1:
+                os.ftruncate(fd, start + idx + 1)
+                return
+            pos = start
+        os.ftruncate(fd, 0)
+
+    def _append(self, records: List[Dict[str, Any]]) -> List[int]:
+        """Ajoute des enregistrements en un seul write. Retourne l'offset de chacun."""
+        if not records:
+            return []
+        encoded = [self._encode(r).encode("utf-8") for r in records]
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            self._repair_tail(fd)
+            pos = os.lseek(fd, 0, os.SEEK_END)
+            offsets = []
+            for data in encoded:
+                offsets.append(pos)
+                pos += len(data)
+            os.write(fd, b"".join(encoded))
+        finally:
+            os.close(fd)
+        return offsets
+
+    def _live(self) -> Optional[_LiveRows]:
+        """
+        Lignes vivantes du fichier, mises à jour des enregistrements ajoutés depuis la
+        dernière lecture (à lire sous live.lock) ; None si le fichier n'est pas un journal.
+        Le rid d'un enregistrement est rid_base + son offset ; une ligne partielle en fin
+        de fichier (append interrompu) est ignorée.
+        """
+        key = str(self._path.resolve())
+        try:
+            f = open(self._path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            st = os.fstat(f.fileno())
+            with _lives_lock:
+                live = _lives.get(key)
+                if live is None or live.ino != st.st_ino or live.pos > st.st_size:
+                    first = f.readline()
+                    header = _parse_header(first)
+                    if header is None:
+                        return None
+                    live = _lives[key] = _LiveRows(st.st_ino, header, len(first))
+            with live.lock:
+                if live.pos < st.st_size:
+                    f.seek(live.pos)
+                    pos = live.pos
+                    for line in f:
+                        if not line.endswith(b"\n"):
+                            break
+                        offset = pos
+                        pos += len(line)
+                        try:
+                            rec = json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(rec, dict):
+                            live.apply(live.base + offset, {"r": rec} if live.legacy else rec)
+                    live.pos = pos
+        return live
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        live = self._live()
+        if live is None:
+            return
+        with live.lock:
+            # copies : l'appelant peut modifier les lignes reçues
+            items = [(rid, dict(row)) for rid, row in live.rows.items()]
+        yield from items
+
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        return self.rows()
+
+    def read_rows(self) -> List[Dict[str, Any]]:
+        return list(self.rows())
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        live = self._live()
+        if live is None:
+            return None
+        with live.lock:
+            row = live.rows.get(rid)
+            return dict(row) if row is not None else None
+
+    def _rid_base(self) -> int:
+        header = self.header()
+        return int(header.get("rid_base", 0)) if header else 0
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        return self._rid_base() + self._append([{"r": row}])[0]
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        rows = list(rows)
+        base = self._rid_base()
+        if len(rows) <= 1:
+            return [base + offset for offset in self._append([{"r": r} for r in rows])]
+        offset = base + self._append([{"b": rows}])[0]
+        return [offset + i for i in range(len(rows))]
+
+    def append(self, row: Dict[str, Any]) -> None:
+        self.insert(row)
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        self._append([{"u": rid, "r": row}])
+        return True
+
+    def delete(self, rid: int) -> bool:
+        self._append([{"d": rid}])
+        return True
+
+    def rewrite(self, rows: Iterable[Dict[str, Any]], table_name: Optional[str] = None, schema_version: Optional[int] = None) -> None:
+        """
+        Réécrit entièrement le journal (compaction) via un fichier temporaire
+        et un os.replace atomique : un crash ne laisse jamais une table tronquée.
+        Les rids des lignes changent.
+        """
+        header = self.header() or {"format": ROWLOG_FORMAT}
+        header["version"] = ROWLOG_VERSION
+        if table_name is not None:
+            header["table"] = table_name
+        if schema_version is not None:
+            header["schema_version"] = schema_version
+        header.setdefault("schema_version", 1)
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self._encode(header))
+            for r in rows:
+                f.write(self._encode({"r": r}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path)
+
+    def dead_ratio(self) -> float:
+        live = self._live()
+        if live is None:
+            return 0.0
+        with live.lock:
+            return 1 - len(live.rows) / live.written if live.written else 0.0
+
+    def vacuum(self) -> int:
+        """
+        Réécrit le journal avec ses seules lignes vivantes, en gardant leurs rids (lots
+        "k") ; rid_base passe au-delà de tout rid de l'ancien fichier, pour que les lignes
+        ajoutées ensuite n'en reprennent aucun. Retourne le nombre d'octets rendus.
+        """
+        header = self.header()
+        if header is None:
+            return 0
+        size = self._path.stat().st_size
+        live = self._live()
+        with live.lock:
+            rows = dict(live.rows)
+            end = max(size, live.pos)
+        header["version"] = ROWLOG_VERSION
+        header["rid_base"] = int(header.get("rid_base", 0)) + end
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        rids = list(rows)
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self._encode(header))
+            for i in range(0, len(rids), _VACUUM_BATCH):
+                chunk = rids[i:i + _VACUUM_BATCH]
+                f.write(self._encode({"b": [rows[rid] for rid in chunk], "k": chunk}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._path)
+        return max(size - self._path.stat().st_size, 0)
+
+    def upgrade(self) -> bool:
+        """Réécrit un journal version 1 au format courant. Retourne True si réécrit."""
+        if not self._path.exists() or self.version >= 2:
+            return False
+        self.rewrite(list(self.rows()))
+        return True
+
+    def migrate_legacy(self, legacy_file: Path, table_name: str, schema_version: int = 1) -> bool:
+        """
+        Convertit un ancien fichier <table>.json ({"rows": [...]}) en journal.
+        Retourne True si une migration a eu lieu.
+        """
+        legacy_file = Path(legacy_file)
+        if self._path.exists() or not legacy_file.exists():
+            return False
+        try:
+            rows = json.loads(legacy_file.read_text(encoding="utf-8")).get("rows", [])
+        except Exception:
+            rows = []
+        self.rewrite(rows, table_name=table_name, schema_version=schema_version)
+        legacy_file.unlink()
+        return True
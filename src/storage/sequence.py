@@ -0,0 +1,92 @@
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # plateformes sans fcntl : pas de verrou inter-processus
+    fcntl = None
+
+
+class SequenceFile:
+    """
+    Compteurs AUTO_INCREMENT d'une table, dans un fichier annexe <table>.seq :
+      {"id": 1042, ...}   dernière valeur attribuée (ou observée) par colonne
+    Chaque avance se fait sous verrou exclusif (flock) : lecture, incrément,
+    réécriture et fsync ; deux processus ne reçoivent jamais la même plage.
+    Une colonne absente du fichier (table ancienne, fichier perdu) est initialisée
+    par l'appelant à partir du max des lignes existantes (seed).
+    """
+    _path: Path
+
+    def __init__(self, path: Path):
+        self._path = Path(path)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def exists(self) -> bool:
+        return self._path.exists()
+
+    @contextmanager
+    def _locked(self) -> Iterator[Dict[str, int]]:
+        """Verrouille le fichier, fournit les compteurs et les réécrit à la sortie du bloc."""
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            size = os.fstat(fd).st_size
+            raw = os.pread(fd, size, 0) if size else b""
+            try:
+                counters = json.loads(raw) if raw else {}
+            except ValueError:
+                counters = {}  # fichier abîmé : les colonnes seront ré-initialisées par seed
+            if not isinstance(counters, dict):
+                counters = {}
+            before = dict(counters)
+            yield counters
+            if counters != before:
+                data = json.dumps(counters, separators=(",", ":")).encode("utf-8")
+                os.ftruncate(fd, 0)
+                os.pwrite(fd, data, 0)
+                os.fsync(fd)
+        finally:
+            os.close(fd)  # libère aussi le verrou
+
+    def current(self) -> Dict[str, int]:
+        with self._locked() as counters:
+            return dict(counters)
+
+    def seed(self, column: str, compute: Callable[[], int]) -> None:
+        """Initialise le compteur d'une colonne absente du fichier avec compute() (max existant)."""
+        with self._locked() as counters:
+            if column not in counters:
+                counters[column] = int(compute())
+
+    def reserve(self, column: str, count: int, floor: Optional[int] = None) -> int:
+        """
+        Réserve `count` valeurs consécutives et retourne la première.
+        `floor` : plus grande valeur explicite déjà fournie, la plage commence au-dessus.
+        count=0 ne fait que remonter le compteur à floor.
+        """
+        with self._locked() as counters:
+            last = int(counters.get(column, 0))
+            if floor is not None and floor > last:
+                last = floor
+            counters[column] = last + max(0, count)
+            return last + 1
+
+    def release(self, column: str, reserved_end: int, last_used: int) -> bool:
+        """
+        Rend la fin inutilisée d'une plage réservée (reserved_end = dernière valeur réservée),
+        seulement si personne n'a réservé après : le compteur revient à last_used.
+        """
+        with self._locked() as counters:
+            if int(counters.get(column, 0)) != reserved_end or last_used >= reserved_end:
+                return False
+            counters[column] = last_used
+            return True
@@ -0,0 +1,797 @@
+import atexit
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.storage.base import RowStorage
+from src.storage.bufferpool import BufferPool, get_buffer_pool
+from src.storage.heapfile import HeapFile
+from src.storage.locks import LockTimeout, bump_generation, clear_owner, poll_interval, read_owner, set_owner, \
+    set_owner_resolver
+from src.storage.mvcc import VersionedStorage
+
+try:
+    import fcntl
+except ImportError:  # plateformes sans fcntl : un seul processus par base
+    fcntl = None
+
+# journal d'une base : Data/<db>/.wal (fichiers cachés : pas de collision avec un nom de table) ;
+# chaque processus qui ouvre la base a son propre journal (n° 0 : .wal, n° k : .wal.k)
+WAL_FILE = ".wal"
+DWB_FILE = ".wal.dwb"
+WAL_FORMAT = "wal"
+WAL_VERSION = 1
+
+# double-write buffer du checkpoint : une entrée par page puis un trailer
+_DWB_ENTRY = struct.Struct("<HII")   # longueur du chemin, n° de page, taille de page
+_DWB_TRAILER = struct.Struct("<8sIQ")  # magic, nombre de pages, lsn couvert
+_DWB_MAGIC = b"SGBDDWB1"
+
+DEFAULT_CHECKPOINT_SECONDS = 5.0
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def wal_enabled() -> bool:
+    """Le WAL protège les tables heap sauf si SGBD_WAL vaut 0 / off / false."""
+    return os.environ.get("SGBD_WAL", "1").strip().lower() not in ("0", "off", "false", "no")
+
+
+def wal_file(slot: int) -> str:
+    return WAL_FILE if slot == 0 else f"{WAL_FILE}.{slot}"
+
+
+def dwb_file(slot: int) -> str:
+    return DWB_FILE if slot == 0 else f"{WAL_FILE}.{slot}.dwb"
+
+
+def _slots(db_path: Path) -> List[int]:
+    """Numéros des journaux présents dans la base."""
+    slots = []
+    for p in Path(db_path).glob(WAL_FILE + "*"):
+        if p.name == WAL_FILE:
+            slots.append(0)
+        else:
+            suffix = p.name[len(WAL_FILE) + 1:]
+            if suffix.isdigit():
+                slots.append(int(suffix))
+    return sorted(slots)
+
+
+def _encode(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+def _fsync_dir(path: Path) -> None:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Journal d'écriture anticipée d'une base : Data/<db>/.wal
+      ligne 1   : {"format": "wal", "version": 1, "checkpoint_lsn": n}
+      lignes 2+ : "<crc32 hex> " + {"lsn": n, "ops": [...]}   un commit par ligne
+        ["i", fichier, [rid, ...], [ligne, ...]]   insertion (rids attribués)
+        ["u", fichier, rid, ligne]                 nouvelle valeur de la ligne rid
+        ["d", fichier, rid]                        suppression
+    Protocole :
+    - un commit est durable dès que sa ligne est fsyncée ; les commits concurrents sont
+      regroupés (group commit) : un seul fsync pour toutes les lignes en attente ;
+    - les pages modifiées des tables restent dirty dans le buffer pool (no-steal) et ne
+      sont écrites qu'au checkpoint : double-write buffer (.wal.dwb) fsyncé, écriture
+      en place, fsync, puis journal vidé ; un thread fait un checkpoint périodique ;
+    - au démarrage, un .wal.dwb complet est recopié (checkpoint interrompu) puis les
+      commits postérieurs au dernier checkpoint sont rejoués sur les fichiers de tables,
+      qui sont exactement dans l'état de ce checkpoint : les rids retrouvés sont identiques.
+    Plusieurs processus : chacun a son journal (slot), verrouillé (flock) tant qu'il vit.
+    Une table dont les pages sont retenues porte la marque du journal dans son fichier de
+    verrou (locks.set_owner) jusqu'au checkpoint ; un autre processus qui veut la lire
+    demande ce checkpoint (fichier .locks/checkpoint.<slot>) ou, si le processus est
+    mort, rejoue son journal.
+    """
+    _db_path: Path
+    _path: Path
+    _pool: BufferPool
+
+    def __init__(self, db_path: Path, pool: Optional[BufferPool] = None, slot: int = 0):
+        self._db_path = Path(db_path).resolve()
+        self.slot = slot
+        self._path = self._db_path / wal_file(slot)
+        self._dwb = self._db_path / dwb_file(slot)
+        self._request = self._db_path / ".locks" / f"checkpoint.{slot}"
+        self._marked: set = set()  # tables marquées (pages retenues) depuis le dernier checkpoint
+        self._pool = pool if pool is not None else get_buffer_pool()
+        # latch : exclut un checkpoint pendant qu'un ordre modifie des pages
+        self.latch = threading.RLock()
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._buffer: List[bytes] = []
+        self._flushing = False
+        self._checkpoint_lsn = 0
+        self._next_lsn = 1
+        self._durable_lsn = 0
+        self._pending = 0  # commits non encore reportés dans les fichiers de tables
+        self._fd: Optional[int] = None
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_checkpoint = time.monotonic()
+        self.checkpoint_seconds = float(os.environ.get("SGBD_WAL_CHECKPOINT_SECONDS", DEFAULT_CHECKPOINT_SECONDS))
+        self.max_bytes = int(os.environ.get("SGBD_WAL_MAX_BYTES", DEFAULT_MAX_BYTES))
+        self.commit_delay = float(os.environ.get("SGBD_WAL_COMMIT_DELAY_US", 0)) / 1e6
+        self.stats = {"commits": 0, "fsyncs": 0, "checkpoints": 0, "replayed": 0}
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path
+
+    def claim(self) -> bool:
+        """
+        Prend le journal pour ce processus (flock exclusif gardé jusqu'à close).
+        False si un autre processus vivant le détient.
+        """
+        self._db_path.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+        self._fd = fd
+        return True
+
+    def mark(self, table_name: str) -> None:
+        """Première écriture d'une table depuis le checkpoint : marque son fichier de verrou."""
+        if table_name not in self._marked:
+            set_owner(self._db_path, table_name, self.slot + 1)
+            self._marked.add(table_name)
+
+    # --- fichier du journal ---
+
+    def _write_header(self, checkpoint_lsn: int) -> None:
+        """Remplace le journal par un en-tête seul (tmp + os.replace) et rouvre le descripteur."""
+        header = {"format": WAL_FORMAT, "version": WAL_VERSION, "checkpoint_lsn": checkpoint_lsn}
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        # le nouveau fichier est verrouillé avant de remplacer l'ancien : le slot reste pris
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            os.write(fd, (_encode(header) + "\n").encode("utf-8"))
+            os.fsync(fd)
+            os.replace(tmp, self._path)
+        except BaseException:
+            os.close(fd)
+            raise
+        _fsync_dir(self._db_path)
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = fd
+        self._checkpoint_lsn = checkpoint_lsn
+
+    def _read(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """(checkpoint_lsn, commits lisibles) ; s'arrête à la première ligne abîmée (fin d'un append interrompu)."""
+        if not self._path.exists():
+            return 0, []
+        records: List[Dict[str, Any]] = []
+        with open(self._path, "rb") as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = {}
+            checkpoint_lsn = int(header.get("checkpoint_lsn", 0)) if isinstance(header, dict) else 0
+            for line in f:
+                if not line.endswith(b"\n") or len(line) < 10:
+                    break
+                crc, payload = line[:8], line[9:-1]
+                try:
+                    if int(crc, 16) != zlib.crc32(payload):
+                        break
+                    rec = json.loads(payload)
+                except ValueError:
+                    break
+                records.append(rec)
+        return checkpoint_lsn, records
+
+    def size(self) -> int:
+        try:
+            return self._path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    # --- commit ---
+
+    def append(self, ops: List[list]) -> int:
+        """Ajoute un commit au tampon du journal. Retourne son lsn (durable après wait_durable)."""
+        with self.latch:
+            with self._cond:
+                lsn = self._next_lsn
+                self._next_lsn += 1
+                payload = _encode({"lsn": lsn, "ops": ops}).encode("utf-8")
+                self._buffer.append(b"%08x " % zlib.crc32(payload) + payload + b"\n")
+                self._pending += 1
+                self.stats["commits"] += 1
+            return lsn
+
+    def wait_durable(self, lsn: int) -> None:
+        """
+        Attend que le commit lsn soit sur disque. Le premier arrivé devient leader :
+        il écrit tout le tampon (ses commits et ceux des autres threads) en un seul fsync ;
+        les autres attendent le résultat au lieu de faire chacun leur fsync.
+        """
+        with self._cond:
+            while self._durable_lsn < lsn:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flushing = True
+                try:
+                    if self.commit_delay:
+                        # laisse aux commits concurrents le temps de rejoindre le lot
+                        self._cond.wait(self.commit_delay)
+                    batch, self._buffer = self._buffer, []
+                    upto = self._next_lsn - 1
+                    self._cond.release()
+                    try:
+                        self._write(batch)
+                    finally:
+                        self._cond.acquire()
+                    self._durable_lsn = max(self._durable_lsn, upto)
+                finally:
+                    self._flushing = False
+                    self._cond.notify_all()
+
+    def _write(self, batch: List[bytes]) -> None:
+        if not batch:
+            return
+        with self._io_lock:
+            data = b"".join(batch)
+            view = memoryview(data)
+            while view:
+                n = os.write(self._fd, view)
+                view = view[n:]
+            os.fsync(self._fd)
+            self.stats["fsyncs"] += 1
+
+    def sync(self) -> None:
+        """Rend durables tous les commits déjà ajoutés."""
+        with self._cond:
+            lsn = self._next_lsn - 1
+        self.wait_durable(lsn)
+
+    def commit(self, ops: List[list]) -> int:
+        lsn = self.append(ops)
+        self.wait_durable(lsn)
+        return lsn
+
+    # --- checkpoint ---
+
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Reporte les pages retenues dans les fichiers de tables et vide le journal.
+        Un crash à n'importe quelle étape laisse soit le journal complet (fichiers intacts),
+        soit un double-write buffer complet à recopier.
+        """
+        with self.latch:
+            if self._closed:
+                return {"checkpoint": False, "pages": 0}
+            self.sync()
+            keys = self._pool.held_dirty(str(self._db_path))
+            images = []
+            for k in keys:
+                data = self._pool.page_image(k)
+                if data is not None:
+                    images.append((k, data))
+            with self._cond:
+                covered = self._next_lsn - 1
+            if images:
+                self._write_dwb(images, covered)
+                self._write_pages(images)
+            if images or covered > self._checkpoint_lsn:
+                self._write_header(covered)
+            if images:
+                self._dwb.unlink()
+                _fsync_dir(self._db_path)
+                self._pool.mark_clean([k for k, _ in images])
+            # pages sur disque : les autres processus peuvent lire ces tables
+            for table in self._marked:
+                set_owner(self._db_path, table, 0)
+            self._marked = set()
+            if self._request.exists():
+                try:
+                    self._request.unlink()
+                except FileNotFoundError:
+                    pass
+            self._pending = 0
+            self._last_checkpoint = time.monotonic()
+            self.stats["checkpoints"] += 1
+            return {"checkpoint": True, "pages": len(images), "lsn": covered}
+
+    def _write_dwb(self, images: List[Tuple[Tuple[str, int], bytes]], lsn: int) -> None:
+        with open(self._dwb, "wb") as f:
+            for (file_key, page_no), data in images:
+                raw = file_key.encode("utf-8")
+                f.write(_DWB_ENTRY.pack(len(raw), page_no, len(data)))
+                f.write(raw)
+                f.write(data)
+            f.write(_DWB_TRAILER.pack(_DWB_MAGIC, len(images), lsn))
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(self._db_path)
+
+    @staticmethod
+    def _write_pages(images: Iterable[Tuple[Tuple[str, int], bytes]]) -> None:
+        fds: Dict[str, int] = {}
+        try:
+            for (file_key, page_no), data in images:
+                fd = fds.get(file_key)
+                if fd is None:
+                    fd = fds[file_key] = os.open(file_key, os.O_RDWR | os.O_CREAT, 0o644)
+                os.pwrite(fd, data, page_no * len(data))
+            for fd in fds.values():
+                os.fsync(fd)
+        finally:
+            for fd in fds.values():
+                os.close(fd)
+
+    def _read_dwb(self) -> Optional[Tuple[int, List[Tuple[Tuple[str, int], bytes]]]]:
+        """(lsn, pages) d'un double-write buffer complet, None s'il est absent ou incomplet."""
+        try:
+            raw = self._dwb.read_bytes()
+        except FileNotFoundError:
+            return None
+        if len(raw) < _DWB_TRAILER.size:
+            return None
+        magic, count, lsn = _DWB_TRAILER.unpack_from(raw, len(raw) - _DWB_TRAILER.size)
+        if magic != _DWB_MAGIC:
+            return None
+        images = []
+        pos = 0
+        for _ in range(count):
+            plen, page_no, size = _DWB_ENTRY.unpack_from(raw, pos)
+            pos += _DWB_ENTRY.size
+            file_key = raw[pos:pos + plen].decode("utf-8")
+            pos += plen
+            images.append(((file_key, page_no), raw[pos:pos + size]))
+            pos += size
+        return lsn, images
+
+    def need_checkpoint(self) -> bool:
+        """Trop de pages retenues en mémoire : le checkpoint doit passer avant de continuer."""
+        return len(self._pool.held_dirty(str(self._db_path))) > self._pool.capacity * 3 // 4
+
+    def after_commit(self) -> None:
+        """Déclenche un checkpoint : tout de suite si la mémoire est sous pression, sinon en arrière-plan."""
+        if self.need_checkpoint():
+            self.checkpoint()
+        elif self.size() > self.max_bytes:
+            self._wakeup.set()
+
+    # --- récupération ---
+
+    def recover(self) -> Dict[str, Any]:
+        """
+        Remet la base dans l'état du dernier commit durable : recopie un double-write
+        buffer complet, rejoue les commits postérieurs au checkpoint puis fait un checkpoint.
+        """
+        report: Dict[str, Any] = {"restored_pages": 0, "replayed": 0, "tables": [], "errors": []}
+        with self.latch:
+            checkpoint_lsn, records = self._read()
+            dwb = self._read_dwb()
+            if dwb is not None:
+                lsn, images = dwb
+                self._pool.discard(str(self._db_path))
+                self._write_pages(images)
+                checkpoint_lsn = max(checkpoint_lsn, lsn)
+                report["restored_pages"] = len(images)
+            if self._dwb.exists():
+                self._dwb.unlink()  # incomplet : les fichiers de tables n'ont pas été touchés
+
+            heaps: Dict[str, Optional[HeapFile]] = {}
+            broken = set()
+            last = checkpoint_lsn
+            try:
+                for rec in records:
+                    lsn = int(rec.get("lsn", 0))
+                    if lsn <= checkpoint_lsn:
+                        continue
+                    touched = []
+                    for op in rec.get("ops", []):
+                        name = op[1]
+                        if name in broken:
+                            continue
+                        if name not in heaps:
+                            heaps[name] = self._open_for_replay(name)
+                        heap = heaps[name]
+                        if heap is None:
+                            continue
+                        if not self._replay_op(heap, op):
+                            broken.add(name)
+                            report["errors"].append({"file": name, "lsn": lsn, "error": "rid_mismatch"})
+                            continue
+                        touched.append(heap)
+                    for heap in touched:
+                        heap.flush()
+                    last = lsn
+                    report["replayed"] += 1
+            finally:
+                for heap in heaps.values():
+                    if heap is not None:
+                        heap.close()
+            report["tables"] = sorted(n for n, h in heaps.items() if h is not None)
+            self._next_lsn = last + 1
+            self._durable_lsn = last
+            if report["replayed"]:
+                # le journal n'est vidé qu'une fois les pages rejouées écrites (checkpoint)
+                if self._fd is None and self._path.exists():
+                    self._fd = os.open(self._path, os.O_WRONLY | os.O_APPEND)
+                self.stats["replayed"] += report["replayed"]
+                self._pending = report["replayed"]
+                for name in report["tables"]:
+                    self._drop_derived(name)
+                self.checkpoint()
+            else:
+                self._write_header(max(checkpoint_lsn, last))
+            # marques laissées par un processus mort qui avait ce journal ; tables rejouées
+            # signalées aux autres processus (caches à relire)
+            cleared = clear_owner(self._db_path, self.slot + 1)
+            for table in set(cleared) | {table_of(n) for n in report["tables"]}:
+                bump_generation(self._db_path, table)
+        return report
+
+    def _open_for_replay(self, file_name: str) -> Optional[HeapFile]:
+        path = self._db_path / file_name
+        if not path.exists():
+            return None  # table supprimée depuis
+        try:
+            heap = HeapFile(path, self._pool)
+        except ValueError:
+            return None  # fichier jamais écrit sur disque (création non synchronisée)
+        self._pool.hold(heap.file_key)
+        return heap
+
+    @staticmethod
+    def _replay_op(heap: HeapFile, op: list) -> bool:
+        kind = op[0]
+        if kind == "i":
+            return heap.insert_many(op[3]) == list(op[2])
+        if kind == "u":
+            return heap.update(op[2], op[3])
+        if kind == "d":
+            return heap.delete(op[2])
+        return True
+
+    def _drop_derived(self, file_name: str) -> None:
+        """Les index d'une table rejouée sont supprimés : reconstruits à la prochaine utilisation."""
+        table = table_of(file_name)
+        for pattern in (f"{table}.pk.hidx", f"{table}.*.uniq.hidx", f"{table}.*.btree"):
+            for p in self._db_path.glob(pattern):
+                self._pool.discard(str(p))
+                p.unlink()
+
+    # --- cycle de vie ---
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"wal-checkpoint-{self._db_path.name}", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        # réveil fréquent : un autre processus peut attendre un checkpoint (fichier de demande)
+        interval = min(self.checkpoint_seconds, max(poll_interval(), 0.001) * 4)
+        while not self._closed:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            if self._closed:
+                return
+            due = time.monotonic() - self._last_checkpoint >= self.checkpoint_seconds
+            if self._request.exists():
+                try:
+                    self.checkpoint()
+                except OSError:
+                    pass
+                continue
+            if self._pending and (due or self.size() > self.max_bytes):
+                try:
+                    self.checkpoint()
+                except OSError:
+                    pass  # réessayé au prochain réveil ; le journal reste valide
+
+    def close(self, checkpoint: bool = True) -> None:
+        """Arrête le thread de checkpoint ; checkpoint=False abandonne tout (DROP DATABASE)."""
+        if checkpoint and not self._closed:
+            self.checkpoint()
+        with self.latch:
+            self._closed = True
+            self._wakeup.set()
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        self._pool.unhold(str(self._db_path))
+
+
+def table_of(file_name: str) -> str:
+    """Table d'un fichier journalisé : <table>.heap, ou <table>/<partition>.heap (table partitionnée)."""
+    return file_name.split("/", 1)[0] if "/" in file_name else file_name.rsplit(".", 1)[0]
+
+
+def _file_name(wal: "WriteAheadLog", heap: HeapFile) -> str:
+    """Nom du fichier dans le journal : chemin relatif au répertoire de la base."""
+    try:
+        return Path(heap.file_key).relative_to(wal._db_path).as_posix()
+    except ValueError:
+        return heap.path.name
+
+
+class LoggedStorage(RowStorage):
+    """
+    Heap file dont les écritures passent par le WAL de la base : chaque modification est
+    appliquée en mémoire (pages retenues dans le buffer pool) et notée ; flush() écrit le
+    commit dans le journal et attend son fsync (groupé avec les commits concurrents).
+    """
+
+    def __init__(self, inner: HeapFile, wal: WriteAheadLog):
+        self._inner = inner
+        self._wal = wal
+        self._name = _file_name(wal, inner)
+        self._ops: List[list] = []
+        self._latched = False
+        wal._pool.hold(inner.file_key)
+
+    @property
+    def inner(self) -> HeapFile:
+        return self._inner
+
+    @property
+    def path(self) -> Path:
+        return self._inner.path
+
+    @property
+    def schema_version(self) -> Optional[int]:
+        return self._inner.schema_version
+
+    def stamp(self) -> Optional[str]:
+        return self._inner.stamp()
+
+    def _begin(self) -> None:
+        if not self._latched:
+            self._wal.latch.acquire()
+            self._latched = True
+            self._wal.mark(table_of(self._name))
+
+    def _end(self) -> None:
+        if self._latched:
+            self._latched = False
+            self._wal.latch.release()
+
+    def scan(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        return self._inner.scan()
+
+    def scan_batches(self) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+        return self._inner.scan_batches()
+
+    def read(self, rid: int) -> Optional[Dict[str, Any]]:
+        return self._inner.read(rid)
+
+    def begin_write(self) -> None:
+        self._begin()
+
+    def checkpoint(self) -> None:
+        """Écrit dans les fichiers les pages retenues en mémoire (checkpoint du journal de la base)."""
+        self._wal.checkpoint()
+
+    def insert(self, row: Dict[str, Any]) -> int:
+        return self.insert_many([row])[0]
+
+    def insert_many(self, rows: Iterable[Dict[str, Any]]) -> List[int]:
+        rows = list(rows)
+        self._begin()
+        rids = self._inner.insert_many(rows)
+        if rids:
+            self._ops.append(["i", self._name, rids, rows])
+        return rids
+
+    def update(self, rid: int, row: Dict[str, Any]) -> bool:
+        self._begin()
+        ok = self._inner.update(rid, row)
+        if ok:
+            self._ops.append(["u", self._name, rid, row])
+        return ok
+
+    def delete(self, rid: int) -> bool:
+        self._begin()
+        ok = self._inner.delete(rid)
+        if ok:
+            self._ops.append(["d", self._name, rid])
+        return ok
+
+    def dead_ratio(self) -> float:
+        return self._inner.dead_ratio()
+
+    def vacuum(self) -> int:
+        # pas d'enregistrement au journal : les pages réorganisées sont écrites par un
+        # checkpoint pris sous le verrou du WAL, avant toute autre écriture de la base
+        self._begin()
+        try:
+            return self._inner.vacuum(checkpoint=self._wal.checkpoint)
+        finally:
+            self._end()
+
+    def flush(self) -> None:
+        ops, self._ops = self._ops, []
+        lsn = None
+        try:
+            self._inner.flush()
+            if ops:
+                lsn = self._wal.append(ops)
+        finally:
+            self._end()
+        if lsn is not None:
+            self._wal.wait_durable(lsn)
+            self._wal.after_commit()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._inner.close()
+
+
+def flush_together(storages: Iterable[RowStorage]) -> None:
+    """
+    Valide ensemble les écritures de plusieurs tables (COMMIT d'une transaction) :
+    un seul commit du journal par base, donc atomique au rejeu.
+    """
+    groups: Dict[int, Tuple[WriteAheadLog, List[LoggedStorage]]] = {}
+    for storage in storages:
+        while isinstance(storage, VersionedStorage):
+            storage = storage.inner
+        for s in storage.members():  # une table partitionnée : ses partitions ouvertes
+            if isinstance(s, LoggedStorage):
+                groups.setdefault(id(s._wal), (s._wal, []))[1].append(s)
+            else:
+                s.flush()
+    for wal, members in groups.values():
+        ops: List[list] = []
+        lsn = None
+        try:
+            for s in members:
+                s._inner.flush()
+                ops.extend(s._ops)
+                s._ops = []
+            if ops:
+                lsn = wal.append(ops)
+        finally:
+            for s in members:
+                s._end()
+        if lsn is not None:
+            wal.wait_durable(lsn)
+            wal.after_commit()
+
+
+# journaux ouverts dans ce processus (clé = chemin résolu de la base)
+_wals: Dict[str, WriteAheadLog] = {}
+_wals_lock = threading.Lock()
+_atexit_registered = False
+
+
+def get_wal(db_path: Path) -> WriteAheadLog:
+    """Journal de la base, ouvert (et rejoué si besoin) à la première utilisation dans le processus."""
+    global _atexit_registered
+    key = str(Path(db_path).resolve())
+    with _wals_lock:
+        wal = _wals.get(key)
+        if wal is None:
+            slot = 0
+            while True:
+                wal = WriteAheadLog(Path(key), slot=slot)
+                if wal.claim():
+                    break
+                slot += 1  # journal d'un autre processus vivant
+            wal.recover()
+            wal.start()
+            _wals[key] = wal
+            if not _atexit_registered:
+                atexit.register(checkpoint_all)
+                _atexit_registered = True
+        return wal
+
+
+def recover_databases(base_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Au démarrage : rejoue les journaux de chaque base qui en a, sauf ceux détenus par un
+    processus vivant. Retourne un rapport par base (clé "<base>" pour le journal 0,
+    "<base>.<k>" pour le journal k).
+    """
+    reports = {}
+    base = Path(base_path)
+    if not base.is_dir():
+        return reports
+    for db in sorted(p for p in base.iterdir() if p.is_dir()):
+        key = str(db.resolve())
+        with _wals_lock:
+            own = _wals.get(key)
+        for slot in _slots(db):
+            if own is not None and own.slot == slot:
+                continue
+            wal = WriteAheadLog(db, slot=slot)
+            if not wal.claim():
+                continue
+            try:
+                reports[db.name if slot == 0 else f"{db.name}.{slot}"] = wal.recover()
+            finally:
+                wal.close(checkpoint=False)
+    return reports
+
+
+def _resolve_owner(db_path: Path, table_name: str, slot: int, deadline: float) -> bool:
+    """
+    La table porte la marque du journal `slot` (pages pas encore sur disque). True si ce
+    journal est celui du processus ; sinon rend la table lisible : journal d'un processus mort
+    rejoué ici (pool privé), ou checkpoint demandé au processus vivant et attendu.
+    """
+    key = str(Path(db_path).resolve())
+    with _wals_lock:
+        own = _wals.get(key)
+    if own is not None and own.slot == slot:
+        return True
+    # pool privé : recover() oublie les pages de la base et close() relâche leur rétention
+    # dans le pool du journal rejoué ; celles du journal de ce processus n'en font pas partie
+    orphan = WriteAheadLog(Path(key), pool=BufferPool(), slot=slot)
+    if orphan.claim():
+        try:
+            orphan.recover()
+        finally:
+            orphan.close(checkpoint=False)
+        return False
+    request = orphan._request
+    poll = poll_interval()
+    while read_owner(key, table_name) == slot + 1:
+        try:
+            request.touch()
+        except FileNotFoundError:
+            return False  # base supprimée
+        if time.monotonic() >= deadline:
+            raise LockTimeout(f"checkpoint.{slot}", "checkpoint")
+        time.sleep(poll)
+    return False
+
+
+set_owner_resolver(_resolve_owner)
+
+
+def checkpoint_all() -> None:
+    with _wals_lock:
+        wals = list(_wals.values())
+    for wal in wals:
+        try:
+            wal.checkpoint()
+        except OSError:
+            pass
+
+
+def close_wal(db_path: Path, checkpoint: bool = True) -> None:
+    """Ferme le journal d'une base (checkpoint d'abord, sauf DROP DATABASE)."""
+    key = str(Path(db_path).resolve())
+    with _wals_lock:
+        wal = _wals.pop(key, None)
+    if wal is not None:
+        wal.close(checkpoint=checkpoint)
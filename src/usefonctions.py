@@ -1,7 +1,10 @@
+import os
 from pathlib import Path
 from typing import Optional
 import json
 
+from src.session import current_session
+
 # fichier pour persister la DB courante
 _CURRENT_DB_FILE = Path(__file__).resolve().parent.parent / "Data" / ".current_db"
 _current_db_cache: Optional[str] = None
@@ -34,7 +37,10 @@ def _write_current_db_file(name: Optional[str]) -> bool:
                 _CURRENT_DB_FILE.unlink()
             _current_db_cache = None
             return True
-        _CURRENT_DB_FILE.write_text(str(name), encoding="utf-8")
+        # fichier temporaire puis os.replace : un autre processus lit l'ancien nom ou le nouveau, jamais un fichier vide
+        tmp = _CURRENT_DB_FILE.with_name(f"{_CURRENT_DB_FILE.name}.{os.getpid()}.tmp")
+        tmp.write_text(str(name), encoding="utf-8")
+        os.replace(tmp, _CURRENT_DB_FILE)
         _current_db_cache = str(name)
         return True
     except Exception:
@@ -45,16 +51,27 @@ def get_current_db(force_reload: bool = False) -> Optional[str]:
     Retourne le nom de la DB courante. Si force_reload True, bypass le cache et relit le fichier.
     """
     global _current_db_cache
+    session = current_session()
+    if session is not None:
+        return session.current_db  # connexion du serveur : base propre à la session
     if force_reload:
         _current_db_cache = None
     return _read_current_db_file()
 
 def set_current_db(name: str) -> bool:
-    """Définit la DB courante (persiste et met à jour cache)."""
+    """Définit la DB courante (persiste et met à jour cache ; dans une session du serveur, la session seulement)."""
+    session = current_session()
+    if session is not None:
+        session.current_db = name
+        return True
     return _write_current_db_file(name)
 
 def clear_current_db() -> bool:
     """Supprime la sélection de DB courante."""
+    session = current_session()
+    if session is not None:
+        session.current_db = None
+        return True
     return _write_current_db_file(None)
 
 
@@ -96,6 +113,17 @@ def showResult(result):
             print("FAIL:", result.get("error", ""))
         return
 
+    if "rows" in result and "columns" in result:
+        cols = result["columns"]
+        lines = [[str(r.get(c)) if r.get(c) is not None else "NULL" for c in cols] for r in result["rows"]]
+        widths = [max([len(c)] + [len(l[i]) for l in lines]) for i, c in enumerate(cols)]
+        print(" | ".join(c.ljust(w) for c, w in zip(cols, widths)))
+        print("-+-".join("-" * w for w in widths))
+        for l in lines:
+            print(" | ".join(v.ljust(w) for v, w in zip(l, widths)))
+        print(f"({result.get('count', len(lines))} ligne(s))")
+        return
+
     if "databases" in result:
         dbs = result.get("databases") or []
         print("Bases:", ", ".join(dbs) if dbs else "(aucune)"); return
@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.session import Session, activate  # noqa: E402
+from src.storage import wal  # noqa: E402
+from src.storage.base import path_under  # noqa: E402
+from src.storage.bufferpool import get_buffer_pool  # noqa: E402
+
+# en tête du code exécuté par child() : ordres SQL dans une session (base courante propre
+# au processus, Data/.current_db du dépôt n'est pas touché)
+_PRELUDE = """
+import os, sys, time
+from src.executor import executor
+from src.parser import parser
+from src.session import Session, activate
+
+def run(q):
+    return executor(parser(q))
+"""
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    Répertoire de travail neuf (Data/ vide) et session propre au test. À la fin, les
+    journaux ouverts sous Data/ sont fermés sans checkpoint et leurs pages oubliées.
+    """
+    monkeypatch.chdir(tmp_path)
+    data = tmp_path / "Data"
+    data.mkdir()
+    monkeypatch.setenv("SGBD_AUTOVACUUM_SECONDS", "0")
+    with activate(Session()):
+        yield data
+    root = str(data.resolve())
+    for key in [k for k in wal._wals if path_under(k, root)]:
+        wal.close_wal(Path(key), checkpoint=False)
+    get_buffer_pool().discard(root)
+
+
+@pytest.fixture
+def child(data_dir):
+    """
+    child(code, env=None, wait=True) : exécute du code Python dans un autre processus,
+    même répertoire de travail. wait=False retourne le Popen (stdin/stdout en texte).
+    """
+    def start(code: str, env=None, wait: bool = True):
+        full_env = dict(os.environ, PYTHONPATH=str(ROOT), **(env or {}))
+        args = [sys.executable, "-c", _PRELUDE + textwrap.dedent(code)]
+        if wait:
+            return subprocess.run(args, cwd=data_dir.parent, env=full_env, capture_output=True, text=True,
+                                  timeout=120)
+        return subprocess.Popen(args, cwd=data_dir.parent, env=full_env, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, text=True)
+    return start
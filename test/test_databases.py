@@ -0,0 +1,36 @@
+from src.executor import executor
+from src.models import catalog
+from src.parser import parser
+from src.storage import blockfile, hashindex, rowlog
+from src.storage.base import path_under
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def cached(db_path):
+    """Entrées des caches par fichier du processus qui concernent la base."""
+    root = str(db_path.resolve())
+    registries = {"index": hashindex._open_indexes, "block": blockfile._directories,
+                  "rowlog": rowlog._lives, "catalog": catalog._catalogs}
+    return {name: sorted(k for k in registry if path_under(k, root)) for name, registry in registries.items()}
+
+
+def test_drop_database_keeps_caches_of_database_with_same_prefix(data_dir):
+    for q in ["CREATE DATABASE d", "CREATE DATABASE d2", "USE d2",
+              "CREATE TABLE l (id INT PRIMARY KEY, v INT) ENGINE = log",
+              "CREATE TABLE b (id INT PRIMARY KEY, v INT) COMPRESSION = zlib",
+              "INSERT INTO l VALUES (1, 1), (2, 2)", "INSERT INTO b VALUES (1, 1), (2, 2)",
+              "SELECT * FROM l", "SELECT * FROM b WHERE id = 2"]:
+        run(q)
+    d2 = data_dir / "d2"
+    before = cached(d2)
+    assert all(before.values()), before
+    assert run("DROP DATABASE d")["dropped"]
+    assert cached(d2) == before
+    assert len(run("SELECT * FROM l")["rows"]) == 2
+    assert len(run("SELECT * FROM b")["rows"]) == 2
+    # la base supprimée, elle, est bien oubliée
+    assert run("DROP DATABASE d2")["dropped"]
+    assert not any(cached(d2).values())
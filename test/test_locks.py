@@ -0,0 +1,110 @@
+import signal
+
+from src.executor import executor
+from src.parser import parser
+from src.storage.bufferpool import get_buffer_pool
+from src.storage.wal import get_wal
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def ids(table):
+    return sorted(r["id"] for r in run(f"SELECT id FROM {table}")["rows"])
+
+
+def test_concurrent_writers_in_several_processes(data_dir, child):
+    for q in ["CREATE DATABASE mp", "USE mp", "CREATE TABLE a (id INT PRIMARY KEY, who INT)",
+              "CREATE TABLE b (id INT PRIMARY KEY, who INT)"]:
+        run(q)
+    writer = """
+        k = {k}
+        errors = won = 0
+        with activate(Session("mp")):
+            for i in range(100):
+                table = "a" if i % 2 == 0 else "b"
+                errors += not run(f"INSERT INTO {{table}} VALUES ({{k * 1000 + i}}, {{k}})").get("inserted")
+                if i % 2 == 0:
+                    # clé disputée : le même id dans tous les processus, un seul gagnant
+                    won += bool(run(f"INSERT INTO a VALUES ({{100000 + i}}, {{k}})").get("inserted"))
+                if i % 10 == 0:
+                    errors += not run(f"UPDATE b SET who = {{k + 10}} WHERE id = {{k * 1000 + 1}}").get("updated")
+            run("BEGIN")
+            run(f"INSERT INTO a VALUES ({{k * 1000 + 999}}, {{k}})")
+            run(f"INSERT INTO b VALUES ({{k * 1000 + 999}}, {{k}})")
+            errors += not run("COMMIT").get("committed")
+        print(errors, won)
+    """
+    procs = [child(writer.format(k=k), wait=False) for k in range(1, 5)]
+    outs = [p.communicate(timeout=120)[0].split() for p in procs]
+    assert all(p.returncode == 0 for p in procs)
+    assert [int(errors) for errors, _ in outs] == [0, 0, 0, 0]
+    assert sum(int(won) for _, won in outs) == 50
+    a, b = ids("a"), ids("b")
+    for k in range(1, 5):
+        own = range(k * 1000, k * 1000 + 1000)
+        assert [i for i in a if i in own] == list(range(k * 1000, k * 1000 + 100, 2)) + [k * 1000 + 999]
+        assert [i for i in b if i in own] == list(range(k * 1000 + 1, k * 1000 + 100, 2)) + [k * 1000 + 999]
+        assert run(f"SELECT who FROM b WHERE id = {k * 1000 + 1}")["rows"] == [{"who": k + 10}]
+    assert [i for i in a if i >= 100000] == list(range(100000, 100100, 2))
+    assert "error" in run("INSERT INTO a VALUES (100000, 9)")
+
+
+def test_exclusive_table_lock_times_out(data_dir, child, monkeypatch):
+    for q in ["CREATE DATABASE lk", "USE lk", "CREATE TABLE t (id INT PRIMARY KEY)", "INSERT INTO t VALUES (1)"]:
+        run(q)
+    holder = child("""
+        from pathlib import Path
+        from src.storage.locks import EXCLUSIVE, hold_table
+        with hold_table(Path("Data/lk"), "t", EXCLUSIVE):
+            print("held", flush=True)
+            sys.stdin.readline()
+    """, wait=False)
+    try:
+        assert holder.stdout.readline().strip() == "held"
+        monkeypatch.setenv("SGBD_LOCK_TIMEOUT", "0.3")
+        assert run("INSERT INTO t VALUES (2)")["error"] == "lock_timeout"
+        assert run("SELECT * FROM t")["error"] == "lock_timeout"
+        # DDL : catalogue et tables en exclusif
+        assert run("CREATE INDEX ti ON t (id)").get("error") == "lock_timeout"
+        holder.stdin.write("\n")
+        holder.stdin.flush()
+        assert holder.wait(timeout=30) == 0
+        assert run("INSERT INTO t VALUES (2)")["inserted"]
+        assert ids("t") == [1, 2]
+    finally:
+        holder.kill()
+        holder.wait()
+
+
+def test_killed_writer_journal_replayed_without_touching_own_pages(data_dir, child, monkeypatch):
+    """
+    Le journal d'un processus tué est rejoué dans un pool privé : les pages retenues par
+    le journal de ce processus (commits pas encore au checkpoint) restent en mémoire.
+    """
+    monkeypatch.setenv("SGBD_WAL_CHECKPOINT_SECONDS", "3600")
+    for q in ["CREATE DATABASE kd", "USE kd", "CREATE TABLE a (id INT PRIMARY KEY, v INT)",
+              "CREATE TABLE b (id INT PRIMARY KEY, v INT)", "INSERT INTO b VALUES (0, 0)", "SELECT * FROM a",
+              "INSERT INTO b VALUES " + ", ".join(f"({i}, {i})" for i in range(1, 300))]:
+        run(q)
+    held = get_buffer_pool().held_dirty(str(data_dir / "kd"))
+    assert any(k[0].endswith("b.heap") for k in held)
+    out = child("""
+        with activate(Session("kd")):
+            for i in range(50):
+                run(f"INSERT INTO a VALUES ({i}, {i})")
+        os.kill(os.getpid(), 9)
+    """, env={"SGBD_WAL_CHECKPOINT_SECONDS": "3600"})
+    assert out.returncode == -signal.SIGKILL
+    # a porte la marque du journal du processus mort : rejoué ici
+    assert ids("a") == list(range(50))
+    assert get_buffer_pool().held_dirty(str(data_dir / "kd")) == held
+    assert ids("b") == list(range(300))
+    # le checkpoint de ce processus écrit bien les pages de b : un autre processus les lit
+    assert get_wal(data_dir / "kd").checkpoint()["pages"] >= len(held)
+    out = child("""
+        with activate(Session("kd")):
+            print(len(run("SELECT * FROM a")["rows"]), len(run("SELECT * FROM b")["rows"]))
+    """)
+    assert out.stdout.split() == ["50", "300"], out.stderr
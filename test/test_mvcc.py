@@ -0,0 +1,146 @@
+import random
+import threading
+
+from src.executor import executor
+from src.parser import parser
+from src.session import Session, activate
+from src.storage import mvcc
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def as_session(session, *queries):
+    """Exécute les ordres pour le compte de la session ; retourne le résultat du dernier."""
+    with activate(session):
+        for q in queries:
+            result = run(q)
+    return result
+
+
+def values(result):
+    return sorted((r["id"], r["v"]) for r in result["rows"])
+
+
+def test_drop_database_keeps_snapshots_of_database_with_same_prefix(data_dir):
+    writer, reader = Session(), Session()
+    as_session(writer, "CREATE DATABASE d", "CREATE DATABASE d2", "USE d2",
+               "CREATE TABLE t (id INT PRIMARY KEY, v INT)", "INSERT INTO t VALUES (1, 10), (2, 20)")
+    before = as_session(reader, "USE d2", "BEGIN", "SELECT * FROM t")
+    as_session(writer, "UPDATE t SET v = 11 WHERE id = 1", "DROP DATABASE d",
+               "UPDATE t SET v = 12 WHERE id = 1", "DELETE FROM t WHERE id = 2")
+    # les versions de d2 survivent à la suppression de d : l'instantané reste celui du BEGIN
+    assert values(as_session(reader, "SELECT * FROM t")) == values(before)
+    assert as_session(reader, "COMMIT")["committed"]
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 12)]
+
+
+def test_transaction_reads_its_snapshot(data_dir):
+    writer, reader = Session(), Session()
+    as_session(writer, "CREATE DATABASE mv", "USE mv", "CREATE TABLE t (id INT PRIMARY KEY, v INT)",
+               "INSERT INTO t VALUES (1, 10), (2, 20), (4, 40)")
+    before = as_session(reader, "USE mv", "BEGIN", "SELECT * FROM t")
+    as_session(writer, "UPDATE t SET v = 11 WHERE id = 1", "DELETE FROM t WHERE id = 2", "INSERT INTO t VALUES (3, 30)")
+    # lecture répétable, index compris ; la transaction voit ses propres écritures
+    assert values(as_session(reader, "SELECT * FROM t")) == values(before) == [(1, 10), (2, 20), (4, 40)]
+    assert values(as_session(reader, "SELECT * FROM t WHERE id = 2")) == [(2, 20)]
+    assert as_session(reader, "SELECT * FROM t WHERE id = 3")["rows"] == []
+    as_session(reader, "UPDATE t SET v = 41 WHERE id = 4")
+    assert values(as_session(reader, "SELECT * FROM t WHERE id = 4")) == [(4, 41)]
+    assert values(as_session(writer, "SELECT * FROM t WHERE id = 4")) == [(4, 40)]
+    assert as_session(reader, "COMMIT")["committed"]
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 11), (3, 30), (4, 41)]
+
+
+def test_uncommitted_writes_are_invisible(data_dir):
+    writer, reader = Session(), Session()
+    as_session(writer, "CREATE DATABASE mv", "USE mv", "CREATE TABLE t (id INT PRIMARY KEY, v INT)",
+               "INSERT INTO t VALUES (1, 10)")
+    as_session(reader, "USE mv")
+    as_session(writer, "BEGIN", "UPDATE t SET v = 11 WHERE id = 1", "INSERT INTO t VALUES (2, 20)")
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 10)]
+    as_session(writer, "ROLLBACK")
+    assert values(as_session(writer, "SELECT * FROM t")) == [(1, 10)]
+    as_session(writer, "BEGIN", "INSERT INTO t VALUES (2, 20)")
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 10)]
+    assert as_session(writer, "COMMIT")["committed"]
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 10), (2, 20)]
+
+
+def test_write_write_conflict_first_committer_wins(data_dir):
+    first, second, other = Session(), Session(), Session()
+    as_session(first, "CREATE DATABASE mv", "USE mv", "CREATE TABLE t (id INT PRIMARY KEY, v INT)",
+               "INSERT INTO t VALUES (1, 10), (2, 20)")
+    as_session(second, "USE mv")
+    as_session(other, "USE mv")
+    as_session(first, "BEGIN", "UPDATE t SET v = 11 WHERE id = 1")
+    as_session(second, "BEGIN", "UPDATE t SET v = 12 WHERE id = 1", "UPDATE t SET v = 22 WHERE id = 2")
+    assert as_session(first, "COMMIT")["committed"]
+    result = as_session(second, "COMMIT")
+    assert not result["committed"] and result["rolled_back"]
+    assert "conflict" in result["error"]
+    # transaction annulée en entier : la ligne 2 n'a pas bougé
+    assert values(as_session(other, "SELECT * FROM t")) == [(1, 11), (2, 20)]
+    # ligne modifiée hors transaction après l'instantané : même conflit
+    as_session(first, "BEGIN", "SELECT * FROM t")
+    as_session(other, "DELETE FROM t WHERE id = 2")
+    as_session(first, "UPDATE t SET v = 23 WHERE id = 2")
+    assert not as_session(first, "COMMIT")["committed"]
+    # lignes différentes : pas de conflit
+    as_session(first, "BEGIN", "UPDATE t SET v = 13 WHERE id = 1")
+    as_session(second, "BEGIN", "INSERT INTO t VALUES (3, 30)")
+    assert as_session(first, "COMMIT")["committed"] and as_session(second, "COMMIT")["committed"]
+    assert values(as_session(other, "SELECT * FROM t")) == [(1, 13), (3, 30)]
+
+
+def test_versions_collected_once_no_snapshot_needs_them(data_dir):
+    writer, reader = Session(), Session()
+    as_session(writer, "CREATE DATABASE mv", "USE mv", "CREATE TABLE t (id INT PRIMARY KEY, v INT)",
+               "INSERT INTO t VALUES (1, 0), (2, 0)")
+    store = mvcc.get_version_store(data_dir / "mv" / "t.heap")
+    mvcc.collect_garbage()
+    assert len(store) == 0
+    as_session(reader, "USE mv", "BEGIN", "SELECT * FROM t")
+    for i in range(1, 6):
+        as_session(writer, f"UPDATE t SET v = {i} WHERE id = 1")
+    # l'instantané du lecteur a encore besoin de l'image d'avant
+    mvcc.collect_garbage()
+    assert len(store) > 0
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 0), (2, 0)]
+    as_session(reader, "COMMIT")
+    mvcc.collect_garbage()
+    assert len(store) == 0
+    assert values(as_session(reader, "SELECT * FROM t")) == [(1, 5), (2, 0)]
+
+
+def test_readers_see_consistent_totals_during_transfers(data_dir):
+    setup = Session()
+    as_session(setup, "CREATE DATABASE mv", "USE mv", "CREATE TABLE acc (id INT PRIMARY KEY, bal INT)",
+               "INSERT INTO acc VALUES " + ", ".join(f"({i}, 100)" for i in range(50)))
+    done = threading.Event()
+    totals = []
+
+    def transfers():
+        rnd = random.Random(1)
+        session = Session("mv")
+        for _ in range(100):
+            a, b = rnd.sample(range(50), 2)
+            bal = dict((r["id"], r["bal"]) for r in as_session(session, "SELECT * FROM acc")["rows"])
+            as_session(session, "BEGIN", f"UPDATE acc SET bal = {bal[a] - 1} WHERE id = {a}",
+                       f"UPDATE acc SET bal = {bal[b] + 1} WHERE id = {b}", "COMMIT")
+        done.set()
+
+    def scans():
+        session = Session("mv")
+        while not done.is_set():
+            rows = as_session(session, "SELECT bal FROM acc")["rows"]
+            totals.append((len(rows), sum(r["bal"] for r in rows)))
+
+    threads = [threading.Thread(target=transfers)] + [threading.Thread(target=scans) for _ in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert totals and set(totals) == {(50, 5000)}
+    assert sum(r["bal"] for r in as_session(setup, "SELECT bal FROM acc")["rows"]) == 5000
@@ -0,0 +1,47 @@
+from src.executor import executor
+from src.models import parallel
+from src.parser import parser
+from src.storage.wal import get_wal
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def test_parallel_select_after_parallel_delete(data_dir, monkeypatch):
+    """
+    Un worker réutilisé ne doit pas servir les pages lues pour une tâche précédente :
+    un SELECT parallèle après un DELETE parallèle ne voit plus les lignes supprimées.
+    """
+    monkeypatch.setenv("SGBD_PARALLEL_WORKERS", "3")
+    monkeypatch.setenv("SGBD_PARALLEL_MIN_PAGES", "4")
+    try:
+        for q in ["CREATE DATABASE par", "USE par", "CREATE TABLE t (id INT PRIMARY KEY, v INT)"]:
+            run(q)
+        for s in range(0, 20000, 5000):
+            run("INSERT INTO t VALUES " + ", ".join(f"({i}, {i % 97})" for i in range(s, s + 5000)))
+        deleted = run("SELECT id FROM t WHERE v = 5 OR v = 6")["rows"]
+        assert run("DELETE FROM t WHERE v = 5 OR v = 6")["count"] == len(deleted)
+        for _ in range(4):
+            assert run("SELECT id FROM t WHERE v = 5 OR v = 6")["rows"] == []
+            assert len(run("SELECT id FROM t")["rows"]) == 20000 - len(deleted)
+        parallel_rows = run("SELECT id FROM t")["rows"]
+        monkeypatch.setenv("SGBD_PARALLEL_WORKERS", "0")
+        assert run("SELECT id FROM t")["rows"] == parallel_rows
+    finally:
+        parallel.shutdown()
+
+
+def test_small_table_scan_does_not_force_checkpoint(data_dir, monkeypatch):
+    """Une table trop petite pour le scan parallèle est lue en série, sans checkpoint synchrone."""
+    monkeypatch.setenv("SGBD_PARALLEL_WORKERS", "4")
+    monkeypatch.setenv("SGBD_WAL_CHECKPOINT_SECONDS", "3600")
+    for q in ["CREATE DATABASE par", "USE par", "CREATE TABLE t (id INT PRIMARY KEY, v INT)",
+              "INSERT INTO t VALUES " + ", ".join(f"({i}, {i})" for i in range(100))]:
+        run(q)
+    wal = get_wal(data_dir / "par")
+    before = wal.stats["checkpoints"]
+    for i in range(50):
+        assert run(f"UPDATE t SET v = {i + 1000} WHERE v = {i}")["count"] == 1
+    assert wal.stats["checkpoints"] == before
+    assert parallel._executor is None
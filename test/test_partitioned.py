@@ -0,0 +1,102 @@
+from src.executor import executor
+from src.parser import parser
+from src.session import Session, activate
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def rows(q):
+    return sorted((r["id"], r["day"], r["note"]) for r in run(q)["rows"])
+
+
+def setup_table():
+    for q in ["CREATE DATABASE pt", "USE pt",
+              "CREATE TABLE r (id INT PRIMARY KEY, day INT, note VARCHAR(20) UNIQUE) PARTITION BY RANGE (day) "
+              "(PARTITION old VALUES LESS THAN (100), PARTITION mid VALUES LESS THAN (200), "
+              "PARTITION rest VALUES LESS THAN MAXVALUE)",
+              "CREATE INDEX r_day ON r (day)",
+              "INSERT INTO r VALUES " + ", ".join(f"({i}, {i * 3}, 'n{i}')" for i in range(100))]:
+        run(q)
+
+
+def test_update_moves_row_to_new_partition(data_dir):
+    setup_table()
+    reader = Session("pt")
+    with activate(reader):
+        run("BEGIN")
+        before = rows("SELECT * FROM r")
+    result = run("UPDATE r SET day = 250 WHERE id < 5")
+    assert result["updated"] and result["count"] == 5
+    # WHERE sur la clé de partitionnement : seule la partition rest est lue
+    assert rows("SELECT * FROM r WHERE day >= 200") == [(i, 250, f"n{i}") for i in range(5)] + \
+        [(i, i * 3, f"n{i}") for i in range(67, 100)]
+    assert rows("SELECT * FROM r WHERE day < 100") == [(i, i * 3, f"n{i}") for i in range(5, 34)]
+    # index à jour : clé primaire, UNIQUE et B+tree désignent le nouveau rid
+    assert rows("SELECT * FROM r WHERE id = 3") == [(3, 250, "n3")]
+    assert rows("SELECT * FROM r WHERE day = 250") == [(i, 250, f"n{i}") for i in range(5)]
+    assert rows("SELECT * FROM r WHERE note = 'n2'") == [(2, 250, "n2")]
+    assert "error" in run("INSERT INTO r VALUES (3, 10, 'x')")
+    assert "error" in run("INSERT INTO r VALUES (500, 10, 'n4')")
+    assert len(run("SELECT * FROM r")["rows"]) == 100
+    # retour dans la première partition, clé primaire changée en même temps
+    assert run("UPDATE r SET day = 7, id = 1000 WHERE id = 4")["count"] == 1
+    assert rows("SELECT * FROM r WHERE day < 100 AND note = 'n4'") == [(1000, 7, "n4")]
+    assert run("SELECT * FROM r WHERE id = 4")["rows"] == []
+    # l'instantané d'un lecteur ouvert avant les déplacements ne voit ni doublon ni trou
+    with activate(reader):
+        assert rows("SELECT * FROM r") == before
+        assert run("COMMIT")["committed"]
+        assert len(run("SELECT * FROM r")["rows"]) == 100
+
+
+def test_partition_move_inside_transaction(data_dir):
+    setup_table()
+    run("BEGIN")
+    assert run("UPDATE r SET day = 150 WHERE id = 1")["count"] == 1
+    assert run("INSERT INTO r VALUES (200, 5, 'new')")["inserted"]
+    assert run("UPDATE r SET day = 300 WHERE id = 200")["count"] == 1
+    assert rows("SELECT * FROM r WHERE day >= 100 AND id IN (1, 200)") == [(1, 150, "n1"), (200, 300, "new")]
+    assert run("ROLLBACK")
+    assert rows("SELECT * FROM r WHERE id IN (1, 200)") == [(1, 3, "n1")]
+    run("BEGIN")
+    assert run("UPDATE r SET day = 150 WHERE id = 1")["count"] == 1
+    assert run("INSERT INTO r VALUES (200, 5, 'new')")["inserted"]
+    assert run("UPDATE r SET day = 300 WHERE id = 200")["count"] == 1
+    assert run("COMMIT")["committed"]
+    assert rows("SELECT * FROM r WHERE day >= 100 AND id IN (1, 200)") == [(1, 150, "n1"), (200, 300, "new")]
+    assert rows("SELECT * FROM r WHERE id = 1") == [(1, 150, "n1")]
+    assert len(run("SELECT * FROM r")["rows"]) == 101
+
+
+def test_update_without_target_partition_changes_nothing(data_dir):
+    for q in ["CREATE DATABASE pt", "USE pt",
+              "CREATE TABLE r (id INT PRIMARY KEY, day INT) PARTITION BY RANGE (day) "
+              "(PARTITION a VALUES LESS THAN (10), PARTITION b VALUES LESS THAN (20))",
+              "INSERT INTO r VALUES (1, 1), (2, 2), (3, 15)"]:
+        run(q)
+    result = run("UPDATE r SET day = 25 WHERE id < 3")
+    assert not result["updated"] and "no partition" in result["error"]
+    assert run("UPDATE r SET day = 12 WHERE id < 3")["count"] == 2
+    assert sorted((r["id"], r["day"]) for r in run("SELECT * FROM r WHERE day >= 10")["rows"]) == \
+        [(1, 12), (2, 12), (3, 15)]
+
+
+def test_partition_move_replayed_after_crash(data_dir, child):
+    out = child("""
+        with activate(Session()):
+            for q in ["CREATE DATABASE pt", "USE pt",
+                      "CREATE TABLE h (id INT PRIMARY KEY, v INT) PARTITION BY HASH (id) PARTITIONS 4",
+                      "INSERT INTO h VALUES " + ", ".join(f"({i}, {i})" for i in range(40))]:
+                run(q)
+            for i in range(10):
+                assert run(f"UPDATE h SET id = {i + 101} WHERE id = {i}")["count"] == 1
+        os._exit(0)  # sans checkpoint : suppressions et insertions ne sont que dans le journal
+    """, env={"SGBD_WAL_CHECKPOINT_SECONDS": "3600"})
+    assert out.returncode == 0, out.stderr
+    run("USE pt")
+    ids = sorted(r["id"] for r in run("SELECT id FROM h")["rows"])
+    assert ids == list(range(10, 40)) + list(range(101, 111))
+    assert run("SELECT v FROM h WHERE id = 106")["rows"] == [{"v": 5}]
+    assert run("SELECT v FROM h WHERE id = 5")["rows"] == []
@@ -0,0 +1,53 @@
+from src.executor import executor
+from src.models import autovacuum, table
+from src.parser import parser
+from src.prepared import prepare
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def setup_table():
+    for q in ["CREATE DATABASE pr", "USE pr", "CREATE TABLE t (id INT PRIMARY KEY, name VARCHAR(20), v INT)",
+              "INSERT INTO t VALUES " + ", ".join(f"({i}, 'n{i}', {i % 10})" for i in range(100))]:
+        run(q)
+
+
+def test_where_compiled_once_at_prepare(data_dir, monkeypatch):
+    setup_table()
+    select = prepare("SELECT id FROM t WHERE v = ? AND name LIKE ?")
+    by_id = prepare("SELECT name FROM t WHERE id = ?")
+    update = prepare("UPDATE t SET v = ? WHERE id IN (?, ?)")
+    delete = prepare("DELETE FROM t WHERE v = ? OR name IS NULL")
+    compiled = []
+    compile_where = table.compile_where
+    monkeypatch.setattr(table, "compile_where", lambda *a: compiled.append(a) or compile_where(*a))
+    assert [r["id"] for r in select.execute(3, "n1%")["rows"]] == [13]
+    assert [r["id"] for r in select.execute(4, "n%4")["rows"]] == [4, 14, 24, 34, 44, 54, 64, 74, 84, 94]
+    # valeur convertie au type de la colonne : accès par l'index de la clé primaire
+    assert by_id.execute("42")["rows"] == [{"name": "n42"}]
+    assert by_id.execute(None)["rows"] == []
+    assert update.execute(77, 1, 2)["count"] == 2
+    assert update.execute(77, 3, 3)["count"] == 1
+    assert delete.execute(77)["count"] == 3
+    assert compiled == []
+    assert len(run("SELECT id FROM t")["rows"]) == 97
+    assert run("SELECT id FROM t WHERE v = 77")["rows"] == []
+
+
+def test_prepared_writes_feed_autovacuum(data_dir, monkeypatch):
+    setup_table()
+    monkeypatch.setenv("SGBD_AUTOVACUUM_SECONDS", "3600")
+    delete = prepare("DELETE FROM t WHERE v < ?")
+    run("BEGIN")
+    assert delete.execute(2)["count"] == 20
+    assert run("ROLLBACK")
+    assert autovacuum.run_once() == []
+    assert delete.execute(5)["count"] == 50
+    run("PREPARE ins AS INSERT INTO t VALUES (?, ?, ?)")
+    assert run("EXECUTE ins(1000, 'x', 1)")["inserted"]
+    reports = autovacuum.run_once()
+    assert [(r["database"], r["table"]) for r in reports] == [("pr", "t")]
+    assert reports[0]["dead_ratio"] > 0.2 and not reports[0].get("skipped")
+    assert len(run("SELECT id FROM t")["rows"]) == 51
@@ -0,0 +1,29 @@
+from src.executor import executor
+from src.parser import parser
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def test_vacuum_counts_pages_returned_to_free_list(data_dir):
+    for q in ["CREATE DATABASE va", "USE va", "CREATE TABLE t (id INT PRIMARY KEY, pad VARCHAR(200))"]:
+        run(q)
+    for s in range(0, 3000, 1000):
+        run("INSERT INTO t VALUES " + ", ".join(f"({i}, '{'x' * 150}')" for i in range(s, s + 1000)))
+    heap = data_dir / "va" / "t.heap"
+    run("VACUUM t")
+    size = heap.stat().st_size
+    # une ligne sur deux supprimée partout sauf en fin de fichier : aucune page retirée,
+    # mais toutes les pages à moitié vides retournent dans la liste des pages à remplir
+    assert run("DELETE FROM t WHERE id < 2500 AND id % 2 = 0")["count"] == 1250
+    result = run("VACUUM t")
+    assert result["vacuumed"] and heap.stat().st_size == size
+    assert result["reclaimed_bytes"] >= 1250 * 150
+    # déjà dans la liste : pas comptées une seconde fois
+    assert run("VACUUM t")["reclaimed_bytes"] == 0
+    # la place comptée est bien réutilisée par les insertions suivantes
+    run("INSERT INTO t VALUES " + ", ".join(f"({i}, '{'y' * 150}')" for i in range(5000, 5500)))
+    run("VACUUM t")  # checkpoint : pages écrites sur disque
+    assert heap.stat().st_size == size
+    assert len(run("SELECT id FROM t")["rows"]) == 2250
@@ -0,0 +1,169 @@
+import threading
+
+from src.executor import executor
+from src.models.databases import Database
+from src.parser import parser
+from src.session import Session, activate
+from src.storage.bufferpool import BufferPool, get_buffer_pool
+from src.storage.wal import checkpoint_all, get_wal
+
+
+def run(q):
+    return executor(parser(q))
+
+
+def ids(table):
+    return sorted(r["id"] for r in run(f"SELECT id FROM {table}")["rows"])
+
+
+def test_pool_matches_database_directory_not_name_prefix(tmp_path):
+    pool = BufferPool()
+    d, d2 = tmp_path / "d", tmp_path / "d2"
+    key = str(d2 / "t.heap")
+    pool._pages[(key, 1)] = bytearray(8)
+    pool._dirty.add((key, 1))
+    pool.hold(key)
+    assert pool.held_dirty(str(d)) == []
+    assert pool.held_dirty(str(d2)) == [(key, 1)]
+    pool.unhold(str(d))
+    pool.discard(str(d))
+    assert pool.held_dirty(str(d2)) == [(key, 1)]
+
+
+def test_drop_database_keeps_pages_of_database_with_same_prefix(data_dir, child, monkeypatch):
+    monkeypatch.setenv("SGBD_WAL_CHECKPOINT_SECONDS", "3600")
+    for q in ["CREATE DATABASE d", "CREATE DATABASE d2", "USE d", "CREATE TABLE x (id INT)",
+              "INSERT INTO x VALUES (1)", "USE d2", "CREATE TABLE t (id INT PRIMARY KEY)",
+              "INSERT INTO t VALUES (1), (2), (3)"]:
+        run(q)
+    held = get_buffer_pool().held_dirty(str(data_dir / "d2"))
+    assert held
+    assert run("DROP DATABASE d")["dropped"]
+    assert get_buffer_pool().held_dirty(str(data_dir / "d2")) == held
+    assert ids("t") == [1, 2, 3]
+    # checkpoint de d2 puis relecture par un autre processus : les lignes sont sur disque
+    checkpoint_all()
+    out = child("""
+        with activate(Session("d2")):
+            print(sorted(r["id"] for r in run("SELECT id FROM t")["rows"]))
+    """)
+    assert out.stdout.strip() == "[1, 2, 3]", out.stderr
+
+
+def test_rename_database_keeps_pages_of_database_with_same_prefix(data_dir, monkeypatch):
+    monkeypatch.setenv("SGBD_WAL_CHECKPOINT_SECONDS", "3600")
+    for q in ["CREATE DATABASE d", "CREATE DATABASE d2", "USE d2", "CREATE TABLE t (id INT PRIMARY KEY)",
+              "INSERT INTO t VALUES (1), (2)"]:
+        run(q)
+    wal = get_wal(data_dir / "d2")
+    assert Database("d", str(data_dir)).modify_db("e")
+    assert ids("t") == [1, 2]
+    assert wal.checkpoint()["pages"] > 0
+
+
+def test_commits_replayed_after_crash(data_dir, child):
+    out = child("""
+        with activate(Session()):
+            for q in ["CREATE DATABASE c", "USE c",
+                      "CREATE TABLE t (id INT PRIMARY KEY AUTO_INCREMENT, name VARCHAR(20) UNIQUE, v INT)"]:
+                run(q)
+            for i in range(300):
+                run(f"INSERT INTO t (name, v) VALUES ('n{i}', {i})")
+            run("UPDATE t SET v = 999 WHERE id = 5")
+            run("DELETE FROM t WHERE id = 7")
+            run("UPDATE t SET name = 'grown_longer_name' WHERE id = 1")
+        os._exit(0)  # sans checkpoint : les commits ne sont que dans le journal
+    """, env={"SGBD_WAL_CHECKPOINT_SECONDS": "3600"})
+    assert out.returncode == 0, out.stderr
+    assert (data_dir / "c" / ".wal").stat().st_size > 1000
+    run("USE c")
+    rows = {r["id"]: r for r in run("SELECT * FROM t")["rows"]}
+    assert len(rows) == 299 and 7 not in rows
+    assert rows[5]["v"] == 999 and rows[1]["name"] == "grown_longer_name"
+    # index reconstruits : contraintes et AUTO_INCREMENT toujours respectés
+    assert "error" in run("INSERT INTO t (name, v) VALUES ('n10', 0)")
+    assert run("INSERT INTO t (name, v) VALUES ('new', 0)")["inserted"]
+    assert run("SELECT id FROM t WHERE name = 'new'")["rows"][0]["id"] > 300
+
+
+def test_double_write_buffer_restores_torn_checkpoint(data_dir, child):
+    out = child("""
+        from pathlib import Path
+        from src.storage.wal import get_wal
+        with activate(Session()):
+            for q in ["CREATE DATABASE c", "USE c", "CREATE TABLE t (id INT PRIMARY KEY, v INT)"]:
+                run(q)
+            for s in range(0, 2000, 500):
+                run("INSERT INTO t VALUES " + ", ".join(f"({i}, {i})" for i in range(s, s + 500)))
+            run("UPDATE t SET v = -1 WHERE id < 100")
+        wal = get_wal(Path("Data/c"))
+        # crash au milieu d'un checkpoint : double-write buffer complet, une page écrite
+        # en place, une autre déchirée (écrite à moitié)
+        keys = wal._pool.held_dirty(str(wal.db_path))
+        images = [(k, wal._pool.page_image(k)) for k in keys]
+        wal.sync()
+        wal._write_dwb(images, wal._next_lsn - 1)
+        wal._write_pages(images[:1])
+        (file_key, page_no), data = images[-1]
+        with open(file_key, "r+b") as f:
+            f.seek(page_no * len(data))
+            f.write(b"\\xff" * (len(data) // 2))
+        print(len(images))
+        os._exit(0)
+    """, env={"SGBD_WAL_CHECKPOINT_SECONDS": "3600"})
+    assert out.returncode == 0, out.stderr
+    assert int(out.stdout) > 2
+    assert (data_dir / "c" / ".wal.dwb").exists()
+    run("USE c")
+    rows = run("SELECT * FROM t")["rows"]
+    assert sorted(r["id"] for r in rows) == list(range(2000))
+    assert all(r["v"] == (-1 if r["id"] < 100 else r["id"]) for r in rows)
+    assert not (data_dir / "c" / ".wal.dwb").exists()
+
+
+def test_group_commit_shares_fsyncs(data_dir, monkeypatch):
+    monkeypatch.setenv("SGBD_WAL_COMMIT_DELAY_US", "2000")
+    for q in ["CREATE DATABASE g", "USE g"] + [f"CREATE TABLE {t} (id INT, v INT)" for t in "abcd"]:
+        run(q)
+    wal = get_wal(data_dir / "g")
+    before = dict(wal.stats)
+
+    def work(table):
+        with activate(Session("g")):
+            for i in range(50):
+                assert run(f"INSERT INTO {table} VALUES ({i}, {i})")["inserted"]
+
+    threads = [threading.Thread(target=work, args=(t,)) for t in "abcd"]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    commits = wal.stats["commits"] - before["commits"]
+    fsyncs = wal.stats["fsyncs"] - before["fsyncs"]
+    assert commits == 200
+    assert fsyncs < commits
+    assert all(len(run(f"SELECT * FROM {t}")["rows"]) == 50 for t in "abcd")
+
+
+def test_reader_gets_checkpoint_from_live_writer(data_dir, child):
+    run("CREATE DATABASE c")
+    writer = child("""
+        with activate(Session("c")):
+            run("CREATE TABLE t (id INT PRIMARY KEY, v INT)")
+            run("INSERT INTO t VALUES " + ", ".join(f"({i}, {i})" for i in range(100)))
+            print("ready", flush=True)
+            sys.stdin.readline()
+            print(len(run("SELECT * FROM t")["rows"]), flush=True)
+    """, env={"SGBD_WAL_CHECKPOINT_SECONDS": "3600"}, wait=False)
+    try:
+        assert writer.stdout.readline().strip() == "ready"
+        # pages du writer pas encore sur disque : la lecture lui demande un checkpoint
+        run("USE c")
+        assert len(run("SELECT * FROM t")["rows"]) == 100
+        assert run("INSERT INTO t VALUES (100, 100)")["inserted"]
+        writer.stdin.write("\n")
+        writer.stdin.flush()
+        assert writer.stdout.readline().strip() == "101"
+    finally:
+        writer.kill()
+        writer.wait()